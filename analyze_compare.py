@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+Side-by-side benchmark of the three analysis endpoints.
+
+    /api/analyze         unified two-pass (show_transcript.py, the UI)
+    /api/analyze-simple  the same pipeline without legacy scores (test_simple_analysis.py)
+    /api/analyze-v2      three sequential passes (unified-analysis-v2.ts)
+
+Every recording is sent to all three endpoints at once, so they see the same
+upstream conditions, with --concurrency recordings in flight. Per endpoint the
+report shows end-to-end latency, per-stage latency (metadata.stages.timings_ms
+on the two-pass routes, data.timing on v2), response size and token usage,
+then how often each pair agrees on outcome, monthly_premium, enrollment_fee
+and customer_name, with the disagreements listed.
+
+The two-pass routes memoize stages, so requests go out with no_cache; the
+stage columns still show any hits.
+
+    python analyze_compare.py --base http://localhost:3000 [--csv test-calls.csv] [--calls 10]
+                              [--repeat 1] [--concurrency 4]
+                              [--report analyze_compare.md] [--json rows.json]
+    python analyze_compare.py --stub [--latency 0.2] ...
+
+--base is a dev server running the real routes. Its ASR can be pointed at
+local_stub.py so the comparison costs only LLM calls and every route
+analyzes the same cached transcript:
+
+    python local_stub.py --port 3999 --latency 0.5
+    DEEPGRAM_BASE_URL=http://localhost:3999 npm run dev
+
+Adding OPENAI_BASE_URL=http://localhost:3999/v1 sends the LLM passes to the
+stub's /v1/chat/completions as well, which answers every schema from fixed
+fixtures: the routes' own code (prompt assembly, parsing, normalization)
+still runs, and repeated runs give the same fields.
+
+--stub runs against an in-process local_stub.py instead. All three routes
+then answer from one fixture after fixed shares of --latency, so agreement
+and stage timings are known in advance; that only checks the harness, and
+the report leaves those sections out.
+"""
+import csv
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ENDPOINTS = ("analyze", "analyze-simple", "analyze-v2")
+FIELDS = ("outcome", "monthly_premium", "enrollment_fee", "customer_name")
+TIMEOUT = 300
+
+
+def payload(endpoint, rec):
+    meta = {"call_id": rec.get("call_id"), "agent_name": rec.get("agent_name"), "campaign": rec.get("campaign")}
+    if endpoint == "analyze-v2":
+        return {"audioUrl": rec["recording_url"], "meta": meta}
+    return {"recording_url": rec["recording_url"], "meta": meta, "no_cache": True}
+
+
+def dig(body, *path):
+    for key in path:
+        if not isinstance(body, dict):
+            return None
+        body = body.get(key)
+    return body
+
+
+def extract(endpoint, body):
+    """The four compared fields, wherever this endpoint keeps them"""
+    if endpoint == "analyze-v2":
+        card = body.get("data") or {}
+    else:
+        card = body.get("analysis") or {}
+    fields = {field: card.get(field) for field in FIELDS}
+    if endpoint == "analyze" and not body.get("analysis"):
+        # Older /api/analyze responses only carry the legacy card
+        name = " ".join(filter(None, (dig(body, "contact_guess", "first_name"),
+                                      dig(body, "contact_guess", "last_name"))))
+        fields = {"outcome": dig(body, "outcome", "sale_status"),
+                  "monthly_premium": dig(body, "facts", "pricing", "premium_amount"),
+                  "enrollment_fee": dig(body, "facts", "pricing", "signup_fee"),
+                  "customer_name": name or None}
+    return fields
+
+
+def stages(endpoint, body):
+    """(stage timings in ms, cache hits, input tokens, output tokens)"""
+    if endpoint == "analyze-v2":
+        timing = dig(body, "data", "timing") or {}
+        tokens = dig(body, "data", "tokens") or {}
+        timings = {name[:-3] if name.endswith("_ms") else name: ms for name, ms in timing.items() if name != "total_ms"}
+        return timings, 0, tokens.get("total_input"), tokens.get("total_output")
+    summary = dig(body, "metadata", "stages") or {}
+    tokens = (summary.get("tokens") or {}).values()
+    hits = sum(1 for status in (summary.get("status") or {}).values() if status == "hit")
+    if not tokens:
+        return summary.get("timings_ms") or {}, hits, None, None
+    return (summary.get("timings_ms") or {}, hits, sum(t.get("input", 0) for t in tokens),
+            sum(t.get("output", 0) for t in tokens))
+
+
+def normalize(field, value):
+    if value is None or value == "":
+        return None
+    if field in ("monthly_premium", "enrollment_fee"):
+        try:
+            return round(float(value), 2)
+        except (TypeError, ValueError):
+            return None
+    return " ".join(str(value).split()).lower()
+
+
+def load_recordings(path, calls):
+    with open(path, newline="") as f:
+        recs = [rec for rec in csv.DictReader(f) if rec.get("recording_url")]
+    return recs[:calls] if calls else recs
+
+
+def run(base, recordings, concurrency, repeat):
+    """POST every recording to every endpoint; returns one row per request"""
+    import requests
+
+    local = threading.local()
+    rows = []
+    rows_lock = threading.Lock()
+
+    def call(endpoint, rec, round_no):
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        row = {"endpoint": endpoint, "call_id": rec.get("call_id") or rec["recording_url"], "round": round_no,
+               "status": "error", "ms": None, "bytes": 0, "fields": {}, "stages": {}, "hits": 0,
+               "tokens_in": None, "tokens_out": None}
+        t0 = time.perf_counter()
+        try:
+            response = local.session.post(f"{base}/api/{endpoint}", json=payload(endpoint, rec), timeout=TIMEOUT)
+            row["ms"] = (time.perf_counter() - t0) * 1000
+            row["status"] = response.status_code
+            row["bytes"] = len(response.content)
+            if response.ok:
+                body = response.json()
+                row["fields"] = extract(endpoint, body)
+                row["stages"], row["hits"], row["tokens_in"], row["tokens_out"] = stages(endpoint, body)
+        except (requests.RequestException, ValueError) as e:
+            row["ms"] = (time.perf_counter() - t0) * 1000
+            row["error"] = str(e)[:200]
+        with rows_lock:
+            rows.append(row)
+
+    def fan_out(rec, round_no):
+        # All three endpoints at once for this recording
+        threads = [threading.Thread(target=call, args=(endpoint, rec, round_no)) for endpoint in ENDPOINTS]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for round_no in range(repeat):
+            for rec in recordings:
+                pool.submit(fan_out, rec, round_no)
+    return rows, time.perf_counter() - t0
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def mean(values):
+    values = [v for v in values if v is not None]
+    return sum(values) / len(values) if values else None
+
+
+def agreement(rows):
+    """{(a, b): {field: (agree, compared)}} plus the disagreeing rows"""
+    by_call = {}
+    for row in rows:
+        if row["status"] == 200:
+            by_call.setdefault((row["call_id"], row["round"]), {})[row["endpoint"]] = row["fields"]
+    pairs = [(a, b) for i, a in enumerate(ENDPOINTS) for b in ENDPOINTS[i + 1:]]
+    counts = {pair: {field: [0, 0] for field in FIELDS} for pair in pairs}
+    diffs = []
+    for (call_id, _), fields in sorted(by_call.items()):
+        for a, b in pairs:
+            if a not in fields or b not in fields:
+                continue
+            for field in FIELDS:
+                va, vb = normalize(field, fields[a].get(field)), normalize(field, fields[b].get(field))
+                counts[(a, b)][field][1] += 1
+                if va == vb:
+                    counts[(a, b)][field][0] += 1
+                else:
+                    diffs.append((call_id, field, a, fields[a].get(field), b, fields[b].get(field)))
+    return counts, diffs
+
+
+def report(rows, wall, base, harness=False):
+    """Markdown report; `harness` marks a --stub run, whose agreement and stage split are fixed"""
+    lines = ["# Analysis endpoint comparison" + (" (harness check)" if harness else ""), ""]
+    calls = len({(row["call_id"], row["round"]) for row in rows})
+    lines.append(f"{calls} recording runs x {len(ENDPOINTS)} endpoints against {base}, {wall:.1f}s wall")
+    if harness:
+        lines += ["", "Every route answered from one local_stub.py fixture, so these numbers are not a comparison; "
+                      "run with --base against a dev server for that."]
+    lines += ["", "## Latency and size", "",
+              "| endpoint | ok | errors | p50 ms | p95 ms | max ms | mean KB | tokens in | tokens out | stage hits |",
+              "|---|---|---|---|---|---|---|---|---|---|"]
+    for endpoint in ENDPOINTS:
+        mine = [row for row in rows if row["endpoint"] == endpoint]
+        ok = [row for row in mine if row["status"] == 200]
+        ms = [row["ms"] for row in ok]
+        kb = mean([row["bytes"] / 1024 for row in ok])
+        tokens_in, tokens_out = mean([row["tokens_in"] for row in ok]), mean([row["tokens_out"] for row in ok])
+        lines.append(f"| {endpoint} | {len(ok)} | {len(mine) - len(ok)} | {percentile(ms, 50):.0f} | "
+                     f"{percentile(ms, 95):.0f} | {max(ms) if ms else 0:.0f} | {kb or 0:.1f} | "
+                     f"{'-' if tokens_in is None else f'{tokens_in:.0f}'} | "
+                     f"{'-' if tokens_out is None else f'{tokens_out:.0f}'} | {sum(row['hits'] for row in ok)} |")
+
+    errors = [row for row in rows if row["status"] != 200]
+    if harness:
+        return "\n".join(lines + error_lines(errors)) + "\n"
+
+    lines += ["", "## Mean stage latency (ms)", ""]
+    for endpoint in ENDPOINTS:
+        ok = [row for row in rows if row["endpoint"] == endpoint and row["status"] == 200]
+        names = []
+        for row in ok:
+            names += [name for name in row["stages"] if name not in names]
+        if not names:
+            lines.append(f"- {endpoint}: no stage timings in response")
+            continue
+        parts = [f"{name} {mean([row['stages'].get(name) for row in ok]):.0f}" for name in names]
+        unstaged = mean([row["ms"] - sum(row["stages"].values()) for row in ok])
+        parts.append(f"outside stages {unstaged:.0f}")
+        lines.append(f"- {endpoint}: " + ", ".join(parts))
+
+    counts, diffs = agreement(rows)
+    lines += ["", "## Field agreement", "", "| pair | " + " | ".join(FIELDS) + " |",
+              "|---|" + "---|" * len(FIELDS)]
+    for (a, b), per_field in counts.items():
+        cells = [f"{agree / total:.0%} ({agree}/{total})" if total else "-" for agree, total in per_field.values()]
+        lines.append(f"| {a} vs {b} | " + " | ".join(cells) + " |")
+    if diffs:
+        lines += ["", "### Disagreements", ""]
+        for call_id, field, a, va, b, vb in diffs[:50]:
+            lines.append(f"- {call_id} {field}: {a}={va!r} {b}={vb!r}")
+        if len(diffs) > 50:
+            lines.append(f"- ... {len(diffs) - 50} more")
+    return "\n".join(lines + error_lines(errors)) + "\n"
+
+
+def error_lines(errors):
+    if not errors:
+        return []
+    lines = ["", "### Errors", ""]
+    for row in errors[:20]:
+        lines.append(f"- {row['endpoint']} {row['call_id']}: {row['status']} {row.get('error', '')}".rstrip())
+    return lines
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if args and args[0] in ("-h", "--help"):
+        print(__doc__)
+        sys.exit(0)
+    stub = "--stub" in args
+    args = [arg for arg in args if arg != "--stub"]
+    opts = dict(zip(args[0::2], args[1::2]))
+    base = opts.get("--base", "").rstrip("/")
+    if not base and not stub:
+        print("Pass --base <dev server> to compare the routes, or --stub for a harness check (see --help)")
+        sys.exit(1)
+    recordings = load_recordings(opts.get("--csv", "test-calls.csv"), int(opts.get("--calls", 0)))
+    if not recordings:
+        print("No recordings with a recording_url in the CSV")
+        sys.exit(1)
+
+    server = None
+    if stub:
+        import local_stub
+
+        port = int(opts.get("--port", 3993))
+        server, _ = local_stub.serve(port, latency=float(opts.get("--latency", 0.2)))
+        base = f"http://127.0.0.1:{port}"
+
+    print("ANALYSIS ENDPOINT COMPARISON")
+    print("=" * 60)
+    print(f"{len(recordings)} recordings x {len(ENDPOINTS)} endpoints, base {base}\n")
+    try:
+        rows, wall = run(base, recordings, int(opts.get("--concurrency", 4)), int(opts.get("--repeat", 1)))
+    finally:
+        if server:
+            server.shutdown()
+            server.server_close()
+
+    text = report(rows, wall, base if not server else f"local_stub ({base})", harness=bool(server))
+    print(text)
+    path = opts.get("--report", "analyze_compare.md")
+    with open(path, "w") as f:
+        f.write(text)
+    print(f"[OK] Report saved to {path}")
+    if "--json" in opts:
+        with open(opts["--json"], "w") as f:
+            json.dump(rows, f, indent=2)
+        print(f"[OK] Rows saved to {opts['--json']}")
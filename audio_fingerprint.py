@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Audio fingerprint dedup for recordings behind rotating signed URLs.
+
+Convoso hands out the same recording under different
+play-recording-public/...?rlt= URLs, so URL-keyed caches miss. This decodes
+the first few seconds of audio (ffmpeg, mono 8 kHz), builds a spectral-peak
+constellation hash (peak pairs: f1, f2, dt) that survives re-encoding, and
+keeps a local SQLite index of hashes, their anchor times and the duration so
+a new recording can be linked to an already transcribed one instead of
+paying for ASR twice.
+
+A match needs the shared hashes to line up at one time offset (a histogram of
+indexed minus query anchor time per candidate), in every part of the hashed
+window rather than just a shared IVR greeting, and both durations to be known
+and within DURATION_TOLERANCE_SEC. A false match copies another call's
+result, so anything short of that is treated as a new recording.
+
+Usage:
+    python audio_fingerprint.py add <id> <url-or-file> [--index fingerprints.db]
+    python audio_fingerprint.py match <url-or-file> [--index fingerprints.db]
+    python audio_fingerprint.py stats [--index fingerprints.db]
+
+The backfill runner uses it with `backfill_runner.py run --dedup`.
+"""
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+
+import numpy as np
+
+INDEX_PATH = os.getenv("FINGERPRINT_INDEX", "fingerprints.db")
+
+SAMPLE_RATE = 8000
+FINGERPRINT_SEC = 20        # only the opening of the call is hashed
+WINDOW = 512
+HOP = 256
+PEAKS_PER_FRAME = 3
+FAN_OUT = 5                 # targets paired with each anchor peak
+MAX_DT_FRAMES = 40
+DURATION_TOLERANCE_SEC = 1.5
+MATCH_THRESHOLD = 0.3       # fraction of the candidate's hashes that must line up at one offset (unrelated: ~0.01)
+OFFSET_SLACK_FRAMES = 1     # re-encoding can move a peak by a hop
+COVERAGE_SEGMENTS = 5       # the hashed window is split into this many parts ...
+SEGMENT_THRESHOLD = 0.15    # ... and each must line up on its own, so a shared greeting is not enough
+
+
+def decode_pcm(source, seconds=FINGERPRINT_SEC):
+    """Decode the first `seconds` of audio to mono float32 at SAMPLE_RATE via ffmpeg"""
+    cmd = ["ffmpeg", "-nostdin", "-loglevel", "error", "-i", source, "-t", str(seconds),
+           "-ac", "1", "-ar", str(SAMPLE_RATE), "-f", "s16le", "-"]
+    proc = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=False)
+    if proc.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed: {proc.stderr.decode(errors='replace')[:200]}")
+    return np.frombuffer(proc.stdout, dtype="<i2").astype(np.float32) / 32768.0
+
+
+def probe_duration(source):
+    """Container duration in seconds via ffprobe"""
+    cmd = ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "json", source]
+    proc = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=False)
+    try:
+        return float(json.loads(proc.stdout)["format"]["duration"])
+    except (ValueError, KeyError):
+        return None
+
+
+def spectral_peaks(samples):
+    """Return (frame, bin) of the strongest peaks per STFT frame, one per frequency band"""
+    if len(samples) < WINDOW:
+        return []
+    n_frames = 1 + (len(samples) - WINDOW) // HOP
+    idx = np.arange(WINDOW)[None, :] + HOP * np.arange(n_frames)[:, None]
+    frames = samples[idx] * np.hanning(WINDOW)[None, :]
+    spec = np.log1p(np.abs(np.fft.rfft(frames, axis=1)))
+
+    # Split the spectrum into log-spaced bands and keep the loudest bin in each
+    edges = np.unique(np.geomspace(4, spec.shape[1] - 1, PEAKS_PER_FRAME + 1).astype(int))
+    floor = np.median(spec) + spec.std()
+    peaks = []
+    for t in range(n_frames):
+        row = spec[t]
+        for lo, hi in zip(edges[:-1], edges[1:]):
+            b = int(lo) + int(np.argmax(row[lo:hi]))
+            if row[b] > floor:
+                peaks.append((t, b))
+    return peaks
+
+
+def hash_peaks(peaks):
+    """Combine anchor/target peak pairs into (32-bit hash, anchor frame) pairs"""
+    hashes = set()
+    for i, (t1, f1) in enumerate(peaks):
+        paired = 0
+        for t2, f2 in peaks[i + 1:]:
+            dt = t2 - t1
+            if dt <= 0:
+                continue
+            if dt > MAX_DT_FRAMES or paired >= FAN_OUT:
+                break
+            hashes.add((((f1 & 0x3FF) << 22) | ((f2 & 0x3FF) << 12) | (dt & 0xFFF), t1))
+            paired += 1
+    return hashes
+
+
+def fingerprint(source, duration=None):
+    """Fingerprint a URL or file; returns {"duration": sec, "hashes": {(hash, frame)}}"""
+    samples = decode_pcm(source)
+    return {
+        "duration": duration if duration else probe_duration(source),
+        "hashes": hash_peaks(spectral_peaks(samples)),
+    }
+
+
+class FingerprintIndex:
+    """SQLite inverted index from peak hash to recording id"""
+
+    def __init__(self, path=INDEX_PATH):
+        self.path = path
+        self.conn = sqlite3.connect(path, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS fingerprints (
+                recording_id TEXT PRIMARY KEY,
+                duration REAL,
+                hash_count INTEGER NOT NULL,
+                duplicate_of TEXT
+            );
+            CREATE TABLE IF NOT EXISTS fp_hashes (
+                hash INTEGER NOT NULL,
+                recording_id TEXT NOT NULL,
+                frame INTEGER
+            );
+            CREATE INDEX IF NOT EXISTS idx_fp_hashes_hash ON fp_hashes(hash);
+        """)
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(fp_hashes)")]
+        if "frame" not in columns:
+            # Older indexes stored no anchor times; those rows can never align and stop matching
+            self.conn.execute("ALTER TABLE fp_hashes ADD COLUMN frame INTEGER")
+        self.conn.commit()
+
+    def match(self, fp):
+        """Best matching indexed recording as (recording_id, score), or (None, score)"""
+        if not fp["hashes"] or not fp["duration"]:
+            return None, 0.0
+        frames_by_hash = {}
+        for h, frame in fp["hashes"]:
+            frames_by_hash.setdefault(h, []).append(frame)
+        # Per candidate, the shared (hash, query anchor frame) pairs, bucketed by time offset
+        offsets = {}
+        keys = list(frames_by_hash)
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            marks = ",".join("?" for _ in chunk)
+            for rec_id, h, frame in self.conn.execute(
+                f"SELECT recording_id, hash, frame FROM fp_hashes WHERE hash IN ({marks}) AND frame IS NOT NULL", chunk
+            ):
+                by_offset = offsets.setdefault(rec_id, {})
+                for query_frame in frames_by_hash[h]:
+                    by_offset.setdefault(frame - query_frame, set()).add((h, query_frame))
+
+        last_frame = max(frame for _, frame in fp["hashes"]) + 1
+        best, best_score = None, 0.0
+        for rec_id, by_offset in offsets.items():
+            row = self.conn.execute(
+                "SELECT duration, hash_count, duplicate_of FROM fingerprints WHERE recording_id = ?", (rec_id,)
+            ).fetchone()
+            if not row or row[2] or not row[0]:
+                continue
+            duration, count, _ = row
+            if abs(fp["duration"] - duration) > DURATION_TOLERANCE_SEC:
+                continue
+            aligned = max(
+                (set().union(*(by_offset.get(dt + d, ()) for d in range(-OFFSET_SLACK_FRAMES, OFFSET_SLACK_FRAMES + 1)))
+                 for dt in by_offset),
+                key=len,
+            )
+            if not self.covers(fp["hashes"], aligned, last_frame):
+                continue
+            score = len(aligned) / max(count, len(fp["hashes"]))
+            if score > best_score:
+                best, best_score = rec_id, score
+        if best_score < MATCH_THRESHOLD:
+            return None, best_score
+        return best, best_score
+
+    @staticmethod
+    def covers(hashes, aligned, last_frame):
+        """True when every part of the window that has hashes has enough of them aligned"""
+        total, hits = [0] * COVERAGE_SEGMENTS, [0] * COVERAGE_SEGMENTS
+        for _, frame in hashes:
+            total[frame * COVERAGE_SEGMENTS // last_frame] += 1
+        for _, frame in aligned:
+            hits[frame * COVERAGE_SEGMENTS // last_frame] += 1
+        return all(hit >= SEGMENT_THRESHOLD * n for hit, n in zip(hits, total))
+
+    def add(self, recording_id, fp, duplicate_of=None):
+        """Index a recording; duplicates are recorded but their hashes are not stored"""
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO fingerprints (recording_id, duration, hash_count, duplicate_of) VALUES (?, ?, ?, ?)",
+                (recording_id, fp["duration"], len(fp["hashes"]), duplicate_of)
+            )
+            if not duplicate_of:
+                self.conn.execute("DELETE FROM fp_hashes WHERE recording_id = ?", (recording_id,))
+                self.conn.executemany(
+                    "INSERT INTO fp_hashes (hash, recording_id, frame) VALUES (?, ?, ?)",
+                    ((h, recording_id, frame) for h, frame in fp["hashes"])
+                )
+
+    def check_and_add(self, recording_id, source, duration=None):
+        """Fingerprint `source`, link it to an existing recording if it is a duplicate"""
+        fp = fingerprint(source, duration)
+        original, score = self.match(fp)
+        if original == recording_id:
+            original = None
+        self.add(recording_id, fp, duplicate_of=original)
+        return original, score
+
+    def stats(self):
+        total, dupes = self.conn.execute(
+            "SELECT COUNT(*), COUNT(duplicate_of) FROM fingerprints"
+        ).fetchone()
+        return {"recordings": total, "duplicates": dupes, "dedup_rate": dupes / total if total else 0.0}
+
+    def close(self):
+        self.conn.close()
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    index_path = INDEX_PATH
+    if "--index" in args:
+        idx = args.index("--index")
+        index_path = args[idx + 1]
+        del args[idx:idx + 2]
+
+    if not args or args[0] not in ("add", "match", "stats"):
+        print(__doc__)
+        sys.exit(1)
+
+    index = FingerprintIndex(index_path)
+    if args[0] == "add":
+        original, score = index.check_and_add(args[1], args[2])
+        if original:
+            print(f"{args[1]} is a duplicate of {original} (score {score:.2f})")
+        else:
+            print(f"{args[1]} indexed (best score {score:.2f})")
+    elif args[0] == "match":
+        original, score = index.match(fingerprint(args[1]))
+        print(f"Match: {original or 'none'} (score {score:.2f})")
+    else:
+        s = index.stats()
+        print(f"Recordings: {s['recordings']}  Duplicates: {s['duplicates']}  Dedup rate: {s['dedup_rate']:.1%}")
+    index.close()
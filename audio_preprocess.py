@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""
+Audio pre-processing before Deepgram submission.
+
+Recordings are sent as-is today: stereo, original sample rate, with long
+leading/trailing silence. This stage streams a recording through ffmpeg
+(downmix to mono, resample to 8 or 16 kHz), trims silence at the edges and
+collapses long internal silences, writing a 16-bit mono WAV plus an offset
+map so word start/end times from the processed audio can be mapped back to
+the original timeline.
+
+Audio is processed frame by frame; whole files are never held in memory.
+
+Usage:
+    python audio_preprocess.py process <in-url-or-file> <out.wav> [--rate 16000]
+    python audio_preprocess.py measure <file-or-dir> [...] [--rate 8000]
+
+`measure` reports bytes uploaded, billed seconds and the WER of the processed
+transcript against the original one (both transcribed via DEEPGRAM_URL, which
+can point at local_stub.py for a dry run).
+"""
+import collections
+import glob
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import wave
+
+import numpy as np
+
+DEEPGRAM_URL = os.getenv("DEEPGRAM_URL", "https://api.deepgram.com/v1/listen")
+DEEPGRAM_API_KEY = os.getenv("DEEPGRAM_API_KEY", "")
+
+FRAME_MS = 20
+SILENCE_DBFS = -45.0
+EDGE_PAD_SEC = 0.25       # keep a little silence before the first / after the last speech
+MAX_GAP_SEC = 1.5         # internal silences longer than this are collapsed ...
+KEEP_GAP_SEC = 0.6        # ... down to this much, so diarization still sees a pause
+
+DEEPGRAM_PARAMS = {
+    "model": "nova-3",
+    "smart_format": "true",
+    "punctuate": "true",
+    "diarize": "true",
+}
+
+
+class OffsetMap:
+    """Piecewise map from processed-audio time to original time"""
+
+    def __init__(self, pieces=None):
+        # (processed_start_sec, original_start_sec), sorted by processed time
+        self.pieces = pieces or []
+
+    def add(self, processed_start, original_start):
+        if self.pieces:
+            last_processed, last_original = self.pieces[-1]
+            if abs((processed_start - last_processed) - (original_start - last_original)) < 1e-9:
+                # Contiguous with the previous piece; no new breakpoint needed
+                return
+            if last_processed == processed_start:
+                self.pieces[-1] = (processed_start, original_start)
+                return
+        self.pieces.append((processed_start, original_start))
+
+    def to_original(self, t):
+        if not self.pieces:
+            return t
+        lo, hi = 0, len(self.pieces) - 1
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if self.pieces[mid][0] <= t:
+                lo = mid
+            else:
+                hi = mid - 1
+        processed_start, original_start = self.pieces[lo]
+        return original_start + max(0.0, t - processed_start)
+
+    def to_json(self):
+        return {"pieces": self.pieces}
+
+    @classmethod
+    def from_json(cls, data):
+        return cls([tuple(p) for p in data["pieces"]])
+
+
+def remap_words(result, offset_map):
+    """Rewrite start/end times in a Deepgram response onto the original timeline"""
+    results = result.get("results", {})
+
+    def fix(item):
+        for key in ("start", "end"):
+            if key in item:
+                item[key] = offset_map.to_original(item[key])
+
+    for channel in results.get("channels", []):
+        for alt in channel.get("alternatives", []):
+            for word in alt.get("words", []):
+                fix(word)
+            for paragraph in (alt.get("paragraphs") or {}).get("paragraphs", []):
+                fix(paragraph)
+                for sentence in paragraph.get("sentences", []):
+                    fix(sentence)
+    for utt in results.get("utterances", []):
+        fix(utt)
+        for word in utt.get("words", []):
+            fix(word)
+    for item in results.get("search", []):
+        for hit in item.get("hits", []):
+            fix(hit)
+    return result
+
+
+def decode_stream(source, rate, stderr):
+    """Start ffmpeg decoding `source` to mono s16le at `rate`, with its stderr going to the file `stderr`"""
+    cmd = ["ffmpeg", "-nostdin", "-loglevel", "error", "-i", source,
+           "-ac", "1", "-ar", str(rate), "-f", "s16le", "-"]
+    # A file, not a pipe: a decoder repeating one error per packet can write more than a pipe buffer before
+    # stdout hits EOF, and nothing reads stderr until then
+    return subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=stderr)
+
+
+def frame_dbfs(frame):
+    samples = np.frombuffer(frame, dtype="<i2").astype(np.float32)
+    rms = np.sqrt(np.mean(samples * samples)) if len(samples) else 0.0
+    return 20 * np.log10(rms / 32768.0) if rms > 0 else -120.0
+
+
+def preprocess(source, dest, rate=16000, silence_dbfs=SILENCE_DBFS, max_gap=MAX_GAP_SEC, keep_gap=KEEP_GAP_SEC,
+               edge_pad=EDGE_PAD_SEC):
+    """Write a trimmed mono WAV to `dest`; returns (OffsetMap, stats)"""
+    frame_bytes = rate * 2 * FRAME_MS // 1000
+    frame_sec = FRAME_MS / 1000.0
+    pad_frames = int(edge_pad / frame_sec)
+    keep_frames = int(keep_gap / frame_sec)
+    max_gap_frames = int(max_gap / frame_sec)
+
+    errors = tempfile.TemporaryFile()
+    proc = decode_stream(source, rate, errors)
+    offsets = OffsetMap()
+    out = wave.open(dest, "wb")
+    out.setnchannels(1)
+    out.setsampwidth(2)
+    out.setframerate(rate)
+
+    in_frames = 0
+    out_frames = 0
+    started = False
+    # Silence seen since the last speech frame, only written once speech resumes. A gap of up to max_gap is
+    # held whole; past that it will be collapsed, so only its first and last frames are kept
+    half = keep_frames // 2
+    head_limit = max(half, pad_frames)
+    gap_len = 0
+    gap_start = 0
+    head = []
+    tail = collections.deque(maxlen=keep_frames - half)
+    # Leading silence: only the last edge_pad is ever kept
+    lead = collections.deque(maxlen=pad_frames)
+
+    def emit(frames, original_index):
+        nonlocal out_frames
+        if not frames:
+            return
+        offsets.add(out_frames * frame_sec, original_index * frame_sec)
+        out.writeframes(b"".join(frames))
+        out_frames += len(frames)
+
+    try:
+        while True:
+            frame = proc.stdout.read(frame_bytes)
+            if not frame:
+                break
+            silent = frame_dbfs(frame) < silence_dbfs
+            index = in_frames
+            in_frames += 1
+
+            if silent:
+                if not gap_len:
+                    gap_start = index
+                gap_len += 1
+                if not started:
+                    lead.append(frame)
+                elif gap_len <= max_gap_frames:
+                    head.append(frame)
+                else:
+                    if len(head) > head_limit:
+                        # The gap just became long enough to collapse; drop its middle
+                        tail.extend(head)
+                        del head[head_limit:]
+                    tail.append(frame)
+                continue
+
+            if gap_len:
+                if not started:
+                    emit(list(lead), index - len(lead))
+                elif gap_len <= max_gap_frames:
+                    emit(head, gap_start)
+                else:
+                    # Collapse a long gap: keep its start and end halves of keep_gap
+                    emit(head[:half], gap_start)
+                    emit(list(tail), index - len(tail))
+                gap_len = 0
+                head = []
+                tail.clear()
+                lead.clear()
+            started = True
+            emit([frame], index)
+    finally:
+        proc.stdout.close()
+        returncode = proc.wait()
+        errors.seek(0)
+        error = errors.read()
+        errors.close()
+        # Trailing silence: keep edge_pad of it
+        if started and gap_len:
+            emit(head[:pad_frames], gap_start)
+        out.close()
+    if returncode != 0:
+        # A truncated decode would otherwise pass for a short recording
+        os.remove(dest)
+        raise RuntimeError(f"ffmpeg failed: {error.decode(errors='replace')[:200]}")
+
+    stats = {
+        "original_sec": in_frames * frame_sec,
+        "processed_sec": out_frames * frame_sec,
+        "bytes": os.path.getsize(dest),
+        "sample_rate": rate,
+    }
+    return offsets, stats
+
+
+def word_error_rate(reference, hypothesis):
+    """Word-level Levenshtein distance / reference length"""
+    ref = reference.lower().split()
+    hyp = hypothesis.lower().split()
+    if not ref:
+        return 0.0 if not hyp else 1.0
+    prev = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        cur = [i] + [0] * len(hyp)
+        for j, h in enumerate(hyp, 1):
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (r != h))
+        prev = cur
+    return prev[-1] / len(ref)
+
+
+def transcribe(session, source):
+    """Transcribe a local file (streamed upload) or URL; returns (result, uploaded_bytes)"""
+    headers = {"Authorization": f"Token {DEEPGRAM_API_KEY}"}
+    if os.path.exists(source):
+        headers["Content-Type"] = "audio/wav" if source.endswith(".wav") else "audio/*"
+        with open(source, "rb") as f:
+            response = session.post(DEEPGRAM_URL, params=DEEPGRAM_PARAMS, headers=headers, data=f, timeout=300)
+        uploaded = os.path.getsize(source)
+    else:
+        headers["Content-Type"] = "application/json"
+        response = session.post(DEEPGRAM_URL, params=DEEPGRAM_PARAMS, headers=headers, json={"url": source}, timeout=300)
+        uploaded = 0
+    response.raise_for_status()
+    return response.json(), uploaded
+
+
+def transcript_text(result):
+    channels = result.get("results", {}).get("channels", [])
+    return channels[0].get("alternatives", [{}])[0].get("transcript", "") if channels else ""
+
+
+def measure(sources, rate=8000, workdir="preprocessed"):
+    """Compare original vs pre-processed submissions over a corpus"""
+    import requests
+
+    session = requests.Session()
+    os.makedirs(workdir, exist_ok=True)
+    totals = {"original_bytes": 0, "processed_bytes": 0, "original_sec": 0.0, "processed_sec": 0.0}
+    wers = []
+
+    for source in sources:
+        name = os.path.splitext(os.path.basename(source.split("?", 1)[0]))[0] or "recording"
+        dest = os.path.join(workdir, f"{name}.{rate}.wav")
+        try:
+            offsets, stats = preprocess(source, dest, rate)
+        except RuntimeError as e:
+            print(f"{name}: skipped, {e}")
+            continue
+        with open(f"{dest}.offsets.json", "w") as f:
+            json.dump(offsets.to_json(), f)
+
+        original, original_bytes = transcribe(session, source)
+        processed, processed_bytes = transcribe(session, dest)
+        remap_words(processed, offsets)
+        wer = word_error_rate(transcript_text(original), transcript_text(processed))
+        wers.append(wer)
+
+        original_sec = original.get("metadata", {}).get("duration") or stats["original_sec"]
+        totals["original_bytes"] += original_bytes
+        totals["processed_bytes"] += processed_bytes
+        totals["original_sec"] += original_sec
+        totals["processed_sec"] += stats["processed_sec"]
+        print(f"{name}: {original_bytes or '(url)'} -> {processed_bytes} bytes, "
+              f"{original_sec:.1f}s -> {stats['processed_sec']:.1f}s billed, WER vs original {wer:.1%}")
+
+    return totals, wers
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    rate = 16000
+    if "--rate" in args:
+        idx = args.index("--rate")
+        rate = int(args[idx + 1])
+        del args[idx:idx + 2]
+
+    if len(args) >= 3 and args[0] == "process":
+        offsets, stats = preprocess(args[1], args[2], rate)
+        with open(f"{args[2]}.offsets.json", "w") as f:
+            json.dump(offsets.to_json(), f)
+        print(f"{stats['original_sec']:.1f}s -> {stats['processed_sec']:.1f}s, {stats['bytes']} bytes at {rate} Hz")
+        print(f"Offset map ({len(offsets.pieces)} pieces) saved to {args[2]}.offsets.json")
+    elif len(args) >= 2 and args[0] == "measure":
+        sources = []
+        for path in args[1:]:
+            sources.extend(sorted(glob.glob(os.path.join(path, "*.mp3"))) if os.path.isdir(path) else [path])
+
+        print("PRE-PROCESSING MEASUREMENT")
+        print("=" * 60)
+        totals, wers = measure(sources, rate)
+        print("\n" + "=" * 60)
+        print("SUMMARY")
+        print("-" * 60)
+        if totals["original_bytes"]:
+            print(f"Bytes uploaded: {totals['original_bytes']} -> {totals['processed_bytes']} "
+                  f"({100.0 * (1 - totals['processed_bytes'] / totals['original_bytes']):.1f}% less)")
+        if totals["original_sec"]:
+            print(f"Billed seconds: {totals['original_sec']:.0f} -> {totals['processed_sec']:.0f} "
+                  f"({100.0 * (1 - totals['processed_sec'] / totals['original_sec']):.1f}% less)")
+        if wers:
+            print(f"WER vs original transcript: mean {sum(wers) / len(wers):.1%}, max {max(wers):.1%}")
+    else:
+        print(__doc__)
+        sys.exit(1)
@@ -0,0 +1,806 @@
+#!/usr/bin/env python3
+"""
+Resumable, checkpointed backfill runner.
+
+Every recording's progress lives in a SQLite journal (WAL mode):
+
+    queued -> fetching -> transcribed -> analyzed
+    (any stage) -> failed, once a recording has used MAX_ATTEMPTS
+
+Workers claim recordings with time-limited leases, so several processes can
+share one journal and a crashed worker's recordings become claimable again
+once its lease expires. The lease is renewed before every stage and outlasts
+the longest request a stage can make, and a worker that finds its lease gone
+drops the recording. Deepgram responses (each with a packed
+sentiment_timeline.py .timeline beside it) and analysis results are written
+to disk before the state advances, so a restart never redoes finished work.
+
+Each recording is transcribed once: the cached Deepgram response goes to the
+analysis endpoint in the request body (`deepgram`), so the server reuses it
+instead of running ASR on the audio again.
+
+Usage:
+    python backfill_runner.py enqueue test-calls.csv [--journal backfill_journal.db]
+    python backfill_runner.py run [--worker-id w1] [--batch 1] [--out backfill_out]
+    python backfill_runner.py run --workers 8            # N local processes, one shard each
+    python backfill_runner.py run --shard 2/4            # one shard of this host's journal
+    python backfill_runner.py merge [--out backfill_out] # combine results into results.jsonl
+    python backfill_runner.py run --dedup [--index fingerprints.db]
+    python backfill_runner.py run --metrics-port 9464 [--metrics-file /var/lib/node_exporter/backfill.prom]
+    python backfill_runner.py run --threads 32 --adaptive # AIMD in-flight limit per upstream
+    python backfill_runner.py run --schedule fifo         # claim order: aged (default) or fifo
+    python backfill_runner.py run --redact                # redact PII before transcripts hit disk
+    python backfill_runner.py status
+    python backfill_runner.py retry-failed
+
+Input is a Convoso style CSV (call_id, agent_name, campaign, duration_sec,
+started_at, disposition, recording_url) or a text file of recording URLs.
+Point DEEPGRAM_URL / ANALYZE_URL at local_stub.py for dry runs.
+
+Sharding: every recording gets a stable hash key at enqueue time and worker i
+of N only claims keys with key % N == i, so processes never contend for the
+same recordings. Single host only: the journal is SQLite in WAL mode, whose
+shared-memory index does not work across machines, so never put it on NFS/SMB
+for several nodes. Split the input CSV per node instead, each with its own
+journal, and combine the results with merge. A shard process that dies is
+reported by --workers; its leases expire and a rerun picks the recordings up.
+
+Dedup (--dedup): before ASR each recording is fingerprinted with
+audio_fingerprint.py; a recording that matches one already processed under a
+different signed URL is linked to it instead of being transcribed again.
+
+Metrics (--metrics-port / --metrics-file): request latency histograms per
+endpoint, in-flight requests, bytes, cache hits, retries and audio seconds
+per wall second, served at /metrics in OpenMetrics format or rewritten every
+15s as a textfile-collector file. With --workers N, shard i uses port + i and
+its own <file>-shard<i>.prom.
+
+Adaptive concurrency (--threads N --adaptive): N worker threads share the
+journal, and every Deepgram / analyze request takes a slot from that
+upstream's AIMD limiter (concurrency.py), which grows the in-flight limit
+while latency per audio second stays flat and halves it on 429/5xx. N is only the ceiling;
+the current limits are exported as callai_concurrency_limit.
+
+Scheduling: claims follow queue_scheduler.py, so compliance calls (DNC
+dispositions, compliance campaigns) go first and, within a class, the
+shortest expected job by duration_sec, aged so long calls still get their
+turn. --schedule fifo (or BACKFILL_SCHEDULE=fifo) restores enqueue order.
+
+Redaction (--redact or BACKFILL_REDACT=1): each Deepgram response goes
+through transcript_redaction.py before it is written, so only the redacted
+transcript is cached, with a <id>.spans.json span map beside it. Card
+numbers, SSNs, routing/account numbers and DOBs are covered in one local
+pass, with no second ASR request. The analysis is sent that redacted
+response, and its result is only stored when metadata.transcript_source is
+"request", i.e. the route analyzed what it was sent; a route that
+re-transcribed the recording_url would put the unredacted transcript and
+mentions table in results/<id>.json, so that recording fails instead.
+A transcript already cached without a span map (by a run without --redact)
+is redacted in place when it is loaded, and --dedup only reuses a
+duplicate's transcript or result when that was redacted too.
+Names, addresses and phone numbers are not redacted.
+"""
+import csv
+import glob
+import hashlib
+import json
+import multiprocessing
+import os
+import queue
+import socket
+import sqlite3
+import sys
+import threading
+import time
+
+import concurrency
+import metrics
+import queue_scheduler
+from call_preclassifier import ROUTE_MINIMAL, analysis_seconds, classify, minimal_result
+from sentiment_timeline import build_timeline, timeline_path, write_timeline
+from transcript_redaction import redact, spans_path
+
+DEEPGRAM_URL = os.getenv("DEEPGRAM_URL", "https://api.deepgram.com/v1/listen")
+DEEPGRAM_API_KEY = os.getenv("DEEPGRAM_API_KEY", "")
+ANALYZE_URL = os.getenv("ANALYZE_URL", "http://localhost:3007/api/analyze-simple")
+# Metrics endpoint label: "analyze" or "analyze-simple", from the last path segment
+ANALYZE_ENDPOINT = ANALYZE_URL.rstrip("/").rsplit("/", 1)[-1]
+
+JOURNAL_PATH = os.getenv("BACKFILL_JOURNAL", "backfill_journal.db")
+SCHEDULE = os.getenv("BACKFILL_SCHEDULE", "aged")
+OUT_DIR = os.getenv("BACKFILL_OUT", "backfill_out")
+
+REQUEST_TIMEOUT_SEC = 300
+# Renewed before each stage; must outlast the slowest request a stage makes
+LEASE_SEC = 2 * REQUEST_TIMEOUT_SEC
+MAX_ATTEMPTS = 3
+RETRY_BACKOFF_SEC = 30
+
+QUEUED = "queued"
+FETCHING = "fetching"
+TRANSCRIBED = "transcribed"
+ANALYZED = "analyzed"
+FAILED = "failed"
+
+DEEPGRAM_PARAMS = {
+    "model": "nova-3",
+    "utterances": "true",
+    "diarize": "true",
+    "smart_format": "true",
+    "punctuate": "true",
+    "numerals": "true",
+    "sentiment": "true",
+    "intents": "true",
+    "detect_entities": "true",
+}
+
+
+def shard_key(rec_id):
+    """Stable 32-bit hash used to partition recordings across workers"""
+    return int(hashlib.sha1(str(rec_id).encode()).hexdigest()[:8], 16)
+
+
+def analysis_payload(dg):
+    """The parts of a Deepgram response the analysis reads, without per-utterance word lists"""
+    results = dg.get("results", {})
+    alt = ((results.get("channels") or [{}])[0].get("alternatives") or [{}])[0]
+    return {
+        "metadata": {key: dg.get("metadata", {}).get(key) for key in ("request_id", "duration")},
+        "results": {
+            "utterances": [{key: u.get(key) for key in ("start", "end", "speaker", "confidence", "transcript")}
+                           for u in results.get("utterances", [])],
+            # Entity positions are word indexes; only the word timings are needed to place them
+            "channels": [{"alternatives": [{
+                "transcript": alt.get("transcript", ""),
+                "entities": alt.get("entities", []),
+                "words": [{"start": w.get("start"), "end": w.get("end")} for w in alt.get("words", [])],
+            }]}],
+        },
+    }
+
+
+def schedule_fields(meta):
+    """Priority class and expected processing seconds used to order claims"""
+    return queue_scheduler.priority_class(meta), queue_scheduler.expected_seconds(meta.get("duration_sec"))
+
+
+def check_redacted_source(result):
+    """Refuse an analysis that did not run on the redacted transcript it was sent"""
+    source = (result.get("metadata") or {}).get("transcript_source")
+    if source != "request":
+        raise RuntimeError(f"analysis transcript_source is {source!r}, not 'request': it re-transcribed the "
+                           "recording, so its result holds unredacted text; point ANALYZE_URL at a route that "
+                           "accepts the deepgram payload")
+
+
+def recording_id(url, call_id=None):
+    """Stable id for a recording: the Convoso call_id, else a hash of the URL"""
+    if call_id:
+        return str(call_id)
+    return hashlib.sha1(url.encode()).hexdigest()[:16]
+
+
+class Journal:
+    """SQLite journal of per-recording backfill state"""
+
+    def __init__(self, path=JOURNAL_PATH):
+        self.path = path
+        # Autocommit mode; claims take an explicit write lock
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS recordings (
+                id TEXT PRIMARY KEY,
+                recording_url TEXT NOT NULL,
+                meta TEXT NOT NULL DEFAULT '{}',
+                state TEXT NOT NULL DEFAULT 'queued',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                lease_owner TEXT,
+                lease_expires REAL NOT NULL DEFAULT 0,
+                error TEXT,
+                transcript_path TEXT,
+                result_path TEXT,
+                shard_key INTEGER,
+                duplicate_of TEXT,
+                priority_class INTEGER,
+                expected_sec REAL,
+                enqueued_at REAL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        # Journals created by older versions of the runner
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(recordings)")]
+        for column, kind in (("shard_key", "INTEGER"), ("duplicate_of", "TEXT"), ("priority_class", "INTEGER"),
+                             ("expected_sec", "REAL"), ("enqueued_at", "REAL")):
+            if column not in columns:
+                self.conn.execute(f"ALTER TABLE recordings ADD COLUMN {column} {kind}")
+        # Best guess for rows journaled before enqueued_at existed
+        self.conn.execute("UPDATE recordings SET enqueued_at = updated_at WHERE enqueued_at IS NULL")
+        self.conn.create_function("shard_key", 1, shard_key, deterministic=True)
+        self.conn.execute("UPDATE recordings SET shard_key = shard_key(id) WHERE shard_key IS NULL")
+        unscheduled = self.conn.execute("SELECT id, meta FROM recordings WHERE priority_class IS NULL").fetchall()
+        if unscheduled:
+            self.conn.executemany("UPDATE recordings SET priority_class = ?, expected_sec = ? WHERE id = ?",
+                                  ((*schedule_fields(json.loads(meta)), rec_id) for rec_id, meta in unscheduled))
+        self.schedule = os.getenv("BACKFILL_SCHEDULE", SCHEDULE)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_recordings_claim ON recordings(state, lease_expires)")
+
+    def enqueue(self, rows):
+        """Insert recordings that are not already journaled; returns the number added"""
+        now = time.time()
+        before = self.conn.total_changes
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO recordings (id, recording_url, meta, shard_key, priority_class, expected_sec, "
+                "enqueued_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                ((r["id"], r["recording_url"], json.dumps(r.get("meta", {})), shard_key(r["id"]),
+                  *schedule_fields(r.get("meta", {})), now, now) for r in rows)
+            )
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        return self.conn.total_changes - before
+
+    def claim(self, owner, limit=1, lease_sec=LEASE_SEC, where="", params=()):
+        """Lease up to `limit` claimable recordings to `owner`"""
+        now = time.time()
+        # Age from enqueue time; updated_at moves on every stage change and retry
+        order, order_params = "enqueued_at", ()
+        if self.schedule != "fifo":
+            # queue_scheduler.schedule_key: promoted class, aged expected cost, then age
+            order = (f"MAX({queue_scheduler.CLASS_COMPLIANCE}, priority_class - "
+                     f"CAST((? - enqueued_at) / {queue_scheduler.CLASS_PROMOTE_SEC} AS INTEGER)), "
+                     f"expected_sec - {queue_scheduler.AGING_RATE} * (? - enqueued_at), enqueued_at")
+            order_params = (now, now)
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            ids = [row[0] for row in self.conn.execute(
+                f"""SELECT id FROM recordings
+                    WHERE state IN ('{QUEUED}', '{FETCHING}', '{TRANSCRIBED}') AND lease_expires < ? {where}
+                    ORDER BY {order} LIMIT ?""",
+                (now, *params, *order_params, limit)
+            )]
+            if ids:
+                marks = ",".join("?" for _ in ids)
+                self.conn.execute(
+                    f"UPDATE recordings SET lease_owner = ?, lease_expires = ? WHERE id IN ({marks})",
+                    (owner, now + lease_sec, *ids)
+                )
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        if not ids:
+            return []
+        marks = ",".join("?" for _ in ids)
+        cur = self.conn.execute(
+            f"SELECT id, recording_url, meta, state, attempts, transcript_path FROM recordings WHERE id IN ({marks})", ids
+        )
+        # Hand them back in claim order
+        rank = {rec_id: i for i, rec_id in enumerate(ids)}
+        return sorted((
+            {"id": r[0], "recording_url": r[1], "meta": json.loads(r[2]), "state": r[3],
+             "attempts": r[4], "transcript_path": r[5]}
+            for r in cur
+        ), key=lambda rec: rank[rec["id"]])
+
+    def advance(self, rec_id, owner, state, **fields):
+        """Move a leased recording to a new state; returns False if the lease was lost"""
+        fields["state"] = state
+        fields["updated_at"] = time.time()
+        if state in (ANALYZED, FAILED):
+            fields["lease_owner"] = None
+        sets = ", ".join(f"{k} = ?" for k in fields)
+        cur = self.conn.execute(
+            f"UPDATE recordings SET {sets} WHERE id = ? AND lease_owner = ?",
+            (*fields.values(), rec_id, owner)
+        )
+        return cur.rowcount == 1
+
+    def fail_attempt(self, rec_id, owner, error, max_attempts=MAX_ATTEMPTS):
+        """Record a failed attempt; retry later or give up after max_attempts"""
+        row = self.conn.execute("SELECT attempts FROM recordings WHERE id = ?", (rec_id,)).fetchone()
+        attempts = (row[0] if row else 0) + 1
+        if attempts >= max_attempts:
+            return self.advance(rec_id, owner, FAILED, attempts=attempts, error=str(error)[:500])
+        cur = self.conn.execute(
+            "UPDATE recordings SET attempts = ?, error = ?, lease_owner = NULL, lease_expires = ?, updated_at = ? "
+            "WHERE id = ? AND lease_owner = ?",
+            (attempts, str(error)[:500], time.time() + RETRY_BACKOFF_SEC * attempts, time.time(), rec_id, owner)
+        )
+        return cur.rowcount == 1
+
+    def renew(self, rec_id, owner, lease_sec=LEASE_SEC):
+        """Extend a lease this owner still holds; returns False if it was lost"""
+        cur = self.conn.execute(
+            "UPDATE recordings SET lease_expires = ? WHERE id = ? AND lease_owner = ?",
+            (time.time() + lease_sec, rec_id, owner)
+        )
+        return cur.rowcount == 1
+
+    def get(self, rec_id):
+        row = self.conn.execute(
+            "SELECT state, transcript_path, result_path FROM recordings WHERE id = ?", (rec_id,)
+        ).fetchone()
+        return {"state": row[0], "transcript_path": row[1], "result_path": row[2]} if row else None
+
+    def retry_failed(self):
+        cur = self.conn.execute(
+            f"UPDATE recordings SET state = '{QUEUED}', attempts = 0, lease_expires = 0, error = NULL WHERE state = '{FAILED}'"
+        )
+        return cur.rowcount
+
+    def counts(self):
+        return dict(self.conn.execute("SELECT state, COUNT(*) FROM recordings GROUP BY state").fetchall())
+
+    def duplicate_count(self):
+        return self.conn.execute("SELECT COUNT(duplicate_of) FROM recordings").fetchone()[0]
+
+    def close(self):
+        self.conn.close()
+
+
+def load_input(path):
+    """Read a Convoso style CSV or a plain list of recording URLs"""
+    rows = []
+    with open(path, newline="") as f:
+        if path.endswith(".csv"):
+            for rec in csv.DictReader(f):
+                url = (rec.get("recording_url") or "").strip()
+                if not url:
+                    continue
+                meta = {
+                    "call_id": rec.get("call_id"),
+                    "agent_name": rec.get("agent_name"),
+                    "agent_id": rec.get("agent_id") or rec.get("agent_name"),
+                    "campaign": rec.get("campaign"),
+                    "disposition": rec.get("disposition"),
+                    "duration_sec": float(rec["duration_sec"]) if rec.get("duration_sec") else None,
+                    "started_at": rec.get("started_at"),
+                }
+                rows.append({"id": recording_id(url, rec.get("call_id")), "recording_url": url, "meta": meta})
+        else:
+            for line in f:
+                url = line.strip()
+                if url and not url.startswith("#"):
+                    rows.append({"id": recording_id(url), "recording_url": url, "meta": {}})
+    return rows
+
+
+class Worker:
+    """Claims recordings from the journal and drives them through the stages"""
+
+    def __init__(self, journal, worker_id=None, out_dir=OUT_DIR, batch=1, session=None, shard=None,
+                 fingerprints=None, adaptive=False, redact=None):
+        self.journal = journal
+        self.adaptive = adaptive
+        self.redact = os.getenv("BACKFILL_REDACT") == "1" if redact is None else redact
+        self.fingerprints = fingerprints
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        if shard:
+            self.worker_id += f"-shard{shard[0]}of{shard[1]}"
+        self.out_dir = out_dir
+        self.batch = batch
+        # One pooled HTTP session per worker
+        if session is None:
+            import requests
+            session = requests.Session()
+        self.session = session
+        self.claim_where = ""
+        self.claim_params = ()
+        if shard:
+            index, count = shard
+            self.claim_where = "AND shard_key % ? = ?"
+            self.claim_params = (count, index)
+        self.stats = {"transcribed": 0, "analyzed": 0, "preclassified": 0, "deduplicated": 0, "failed": 0,
+                      "redacted_spans": 0, "full_analyses": 0, "analysis_seconds": 0.0}
+        os.makedirs(os.path.join(out_dir, "transcripts"), exist_ok=True)
+        os.makedirs(os.path.join(out_dir, "results"), exist_ok=True)
+
+    def post_json(self, endpoint, url, payload, headers=None, params=None, work=None):
+        """POST a JSON body, recording latency, status and bytes for the metrics exporter.
+        `work` is the audio seconds behind the request, for the adaptive limiter's latency signal."""
+        if self.adaptive:
+            with concurrency.limiter(endpoint).slot() as slot:
+                slot.work = work
+                response = self._post(endpoint, url, payload, headers, params)
+                slot.status = response.status_code
+            return response
+        return self._post(endpoint, url, payload, headers, params)
+
+    def _post(self, endpoint, url, payload, headers, params):
+        body = json.dumps(payload).encode()
+        headers = dict(headers or {}, **{"Content-Type": "application/json"})
+        with metrics.track(endpoint) as record:
+            record.sent = len(body)
+            response = self.session.post(url, params=params, headers=headers, data=body, timeout=REQUEST_TIMEOUT_SEC)
+            record.status = response.status_code
+            record.received = len(response.content)
+        return response
+
+    def transcribe(self, rec):
+        headers = {"Authorization": f"Token {DEEPGRAM_API_KEY}"}
+        response = self.post_json("deepgram", DEEPGRAM_URL, {"url": rec["recording_url"]}, headers, DEEPGRAM_PARAMS,
+                                  work=rec["meta"].get("duration_sec"))
+        if response.status_code != 200:
+            raise RuntimeError(f"Deepgram {response.status_code}: {response.text[:200]}")
+        dg = response.json()
+        metrics.AUDIO_SECONDS.inc(dg.get("metadata", {}).get("duration") or 0)
+        return dg
+
+    def analyze(self, rec, dg):
+        payload = {"recording_url": rec["recording_url"], "meta": rec["meta"], "deepgram": analysis_payload(dg)}
+        work = dg.get("metadata", {}).get("duration") or rec["meta"].get("duration_sec")
+        response = self.post_json(ANALYZE_ENDPOINT, ANALYZE_URL, payload, work=work)
+        if response.status_code != 200:
+            raise RuntimeError(f"Analyze {response.status_code}: {response.text[:200]}")
+        return response.json()
+
+    def link_duplicate(self, rec):
+        """Reuse an already processed copy of this recording; returns True when fully handled"""
+        duration = rec["meta"].get("duration_sec")
+        original_id, score = self.fingerprints.check_and_add(rec["id"], rec["recording_url"], duration)
+        metrics.CACHE.inc(cache="fingerprint", result="hit" if original_id else "miss")
+        if not original_id:
+            return False
+        original = self.journal.get(original_id)
+        if not original:
+            return False
+
+        if original["state"] == ANALYZED and original["result_path"]:
+            with open(original["result_path"]) as f:
+                stored = json.load(f)
+            # Under --redact, a result analyzed by a run without it holds unredacted text
+            if not self.redact or stored.get("redacted"):
+                result_path = os.path.join(self.out_dir, "results", f"{rec['id']}.json")
+                linked = {"id": rec["id"], "meta": rec["meta"], "duplicate_of": original_id,
+                          "result": stored.get("result")}
+                if self.redact:
+                    linked["redacted"] = True
+                write_json(result_path, linked)
+                if self.journal.advance(rec["id"], self.worker_id, ANALYZED, result_path=result_path,
+                                        duplicate_of=original_id, error=None):
+                    self.stats["deduplicated"] += 1
+                    self.stats["analyzed"] += 1
+                    metrics.RECORDINGS.inc(outcome="deduplicated")
+                return True
+
+        transcript_path = original["transcript_path"]
+        if transcript_path and os.path.exists(transcript_path) and (
+                not self.redact or os.path.exists(spans_path(transcript_path))):
+            # Skip ASR; analysis still runs because the original has not finished it (or was not redacted)
+            if not self.journal.advance(rec["id"], self.worker_id, TRANSCRIBED,
+                                        transcript_path=transcript_path, duplicate_of=original_id):
+                return True
+            rec["state"] = TRANSCRIBED
+            rec["transcript_path"] = transcript_path
+            self.stats["deduplicated"] += 1
+        return False
+
+    def process(self, rec):
+        """Run one leased recording from its current state to analyzed"""
+        owner = self.worker_id
+        # Earlier records in a batch may have outlived this one's lease; another worker owns it now
+        if not self.journal.renew(rec["id"], owner):
+            return
+        if self.fingerprints and rec["state"] == QUEUED and self.link_duplicate(rec):
+            return
+        transcript_path = rec["transcript_path"] or os.path.join(self.out_dir, "transcripts", f"{rec['id']}.json")
+
+        if rec["state"] in (QUEUED, FETCHING) or not os.path.exists(transcript_path):
+            metrics.CACHE.inc(cache="transcript", result="miss")
+            if not self.journal.advance(rec["id"], owner, FETCHING):
+                return
+            dg = self.transcribe(rec)
+            if self.redact:
+                dg, spans = redact(dg)
+                write_json(spans_path(transcript_path), spans)
+                self.stats["redacted_spans"] += len(spans)
+            write_json(transcript_path, dg)
+            if not self.journal.advance(rec["id"], owner, TRANSCRIBED, transcript_path=transcript_path):
+                return
+            self.stats["transcribed"] += 1
+        else:
+            metrics.CACHE.inc(cache="transcript", result="hit")
+            with open(transcript_path) as f:
+                dg = json.load(f)
+            if self.redact and not os.path.exists(spans_path(transcript_path)):
+                # Cached by a run without --redact; the span map is written last, so a crash here redoes it
+                dg, spans = redact(dg)
+                write_json(transcript_path, dg)
+                write_json(spans_path(transcript_path), spans)
+                self.stats["redacted_spans"] += len(spans)
+
+        if not self.journal.renew(rec["id"], owner):
+            return
+        if not os.path.exists(timeline_path(transcript_path)):
+            write_timeline(timeline_path(transcript_path), build_timeline(dg))
+        classification = classify(dg)
+        if classification["route"] == ROUTE_MINIMAL:
+            result = minimal_result(classification, rec["meta"])
+            self.stats["preclassified"] += 1
+        else:
+            t0 = time.perf_counter()
+            result = self.analyze(rec, dg)
+            if self.redact:
+                check_redacted_source(result)
+            # What a pre-classified skip saves, measured rather than assumed
+            self.stats["full_analyses"] += 1
+            self.stats["analysis_seconds"] += analysis_seconds(result, time.perf_counter() - t0)
+
+        result_path = os.path.join(self.out_dir, "results", f"{rec['id']}.json")
+        stored = {"id": rec["id"], "meta": rec["meta"], "result": result}
+        if self.redact:
+            stored["redacted"] = True
+        write_json(result_path, stored)
+        if self.journal.advance(rec["id"], owner, ANALYZED, result_path=result_path, error=None):
+            self.stats["analyzed"] += 1
+            metrics.RECORDINGS.inc(outcome="preclassified" if classification["route"] == ROUTE_MINIMAL else "analyzed")
+
+    def run(self, max_idle=0):
+        """Process until the journal has nothing claimable left"""
+        idle = 0
+        while True:
+            recs = self.journal.claim(self.worker_id, self.batch, where=self.claim_where, params=self.claim_params)
+            if not recs:
+                # Leased or backed-off work may still come back
+                if idle >= max_idle:
+                    return self.stats
+                idle += 1
+                time.sleep(1)
+                continue
+            idle = 0
+            for rec in recs:
+                try:
+                    self.process(rec)
+                except Exception as e:
+                    self.stats["failed"] += 1
+                    self.journal.fail_attempt(rec["id"], self.worker_id, e)
+                    if rec["attempts"] + 1 >= MAX_ATTEMPTS:
+                        metrics.RECORDINGS.inc(outcome="failed")
+                    else:
+                        metrics.RETRIES.inc(stage=rec["state"])
+                    print(f"  [{rec['id']}] attempt {rec['attempts'] + 1} failed: {e}")
+
+
+def open_fingerprints(index_path):
+    from audio_fingerprint import FingerprintIndex
+
+    return FingerprintIndex(index_path) if index_path else None
+
+
+def start_metrics(worker_id, port=None, path=None):
+    """Expose this process's metrics over HTTP and/or a textfile; returns the textfile writer"""
+    metrics.REGISTRY.set_const_labels(worker=worker_id)
+    if port:
+        metrics.serve(port)
+    return metrics.TextfileWriter(path) if path else None
+
+
+def _shard_main(journal_path, out_dir, batch, shard, max_idle, index_path, stats_queue, metrics_port=None,
+                metrics_file=None):
+    """Entry point of one local shard process"""
+    journal = Journal(journal_path)
+    worker = Worker(journal, out_dir=out_dir, batch=batch, shard=shard, fingerprints=open_fingerprints(index_path))
+    # Each shard exports on its own port / file; series carry a worker label so they never collide
+    writer = start_metrics(worker.worker_id, metrics_port + shard[0] if metrics_port else None,
+                           metrics.shard_path(metrics_file, shard[0]) if metrics_file else None)
+    stats = worker.run(max_idle=max_idle)
+    if writer:
+        writer.stop()
+    journal.close()
+    stats_queue.put((shard[0], stats))
+
+
+SHARD_EXIT_GRACE_SEC = 2.0      # a dead shard's queued stats may still be in the pipe
+
+
+def run_sharded(journal_path, workers, out_dir=OUT_DIR, batch=1, max_idle=0, index_path=None, metrics_port=None,
+                metrics_file=None):
+    """Run `workers` local processes, one shard each, and sum their stats; dead shards are counted, not awaited"""
+    stats_queue = multiprocessing.Queue()
+    procs = [
+        multiprocessing.Process(target=_shard_main,
+                                args=(journal_path, out_dir, batch, (i, workers), max_idle, index_path, stats_queue,
+                                      metrics_port, metrics_file))
+        for i in range(workers)
+    ]
+    for proc in procs:
+        proc.start()
+    totals = {}
+    reported, failed, exited_at = set(), [], {}
+    while len(reported) + len(failed) < len(procs):
+        try:
+            index, stats = stats_queue.get(timeout=1.0)
+        except queue.Empty:
+            for i, proc in enumerate(procs):
+                if i in reported or i in failed or proc.is_alive():
+                    continue
+                exited_at.setdefault(i, time.time())
+                if time.time() - exited_at[i] > SHARD_EXIT_GRACE_SEC:
+                    failed.append(i)
+                    print(f"  shard {i}/{workers} exited with code {proc.exitcode} without reporting")
+            continue
+        reported.add(index)
+        for key, value in stats.items():
+            totals[key] = totals.get(key, 0) + value
+    for proc in procs:
+        proc.join(timeout=10)
+        if proc.is_alive():
+            proc.terminate()
+            proc.join()
+    totals["failed_shards"] = len(failed)
+    return totals
+
+
+def run_threaded(journal_path, threads, out_dir=OUT_DIR, batch=1, max_idle=0, index_path=None, adaptive=True,
+                 worker_id=None):
+    """Run `threads` workers in this process, each with its own journal connection, and sum their stats"""
+    base_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    results = []
+
+    def thread_main(i):
+        journal = Journal(journal_path)
+        worker = Worker(journal, f"{base_id}-t{i}", out_dir, batch, fingerprints=open_fingerprints(index_path),
+                        adaptive=adaptive)
+        results.append(worker.run(max_idle=max_idle))
+        journal.close()
+
+    pool = [threading.Thread(target=thread_main, args=(i,)) for i in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    totals = {}
+    for stats in results:
+        for key, value in stats.items():
+            totals[key] = totals.get(key, 0) + value
+    return totals
+
+
+def merge_results(out_dir=OUT_DIR, dest=None):
+    """Combine every shard's per-recording results into one JSONL file"""
+    dest = dest or os.path.join(out_dir, "results.jsonl")
+    count = 0
+    tmp = f"{dest}.tmp{os.getpid()}"
+    with open(tmp, "w") as out:
+        for path in sorted(glob.glob(os.path.join(out_dir, "results", "*.json"))):
+            with open(path) as f:
+                out.write(json.dumps(json.load(f)) + "\n")
+            count += 1
+    os.replace(tmp, dest)
+    return dest, count
+
+
+def write_json(path, data):
+    """Write JSON atomically so a crash never leaves a half-written checkpoint"""
+    tmp = f"{path}.tmp{os.getpid()}"
+    with open(tmp, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+BOOL_FLAGS = ("--redact", "--dedup", "--adaptive")
+
+
+def parse_args(args):
+    """(positional, {--opt: value}, {--flag}); boolean flags never take the next token"""
+    positional, opts, flags = [], {}, set()
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        if arg in BOOL_FLAGS:
+            flags.add(arg)
+            i += 1
+        elif arg.startswith("--"):
+            if i + 1 >= len(args):
+                raise SystemExit(f"{arg} needs a value")
+            opts[arg] = args[i + 1]
+            i += 2
+        else:
+            positional.append(arg)
+            i += 1
+    return positional, opts, flags
+
+
+def print_savings(stats):
+    """Pre-classifier savings priced at the mean measured full analysis"""
+    if stats.get("preclassified") and stats.get("full_analyses"):
+        per_call = stats["analysis_seconds"] / stats["full_analyses"]
+        print(f"Pre-classifier skipped {stats['preclassified']} calls, ~{stats['preclassified'] * per_call:.0f}s of "
+              f"analysis at the measured {per_call:.1f}s per call")
+
+
+def print_status(journal):
+    counts = journal.counts()
+    total = sum(counts.values())
+    print(f"Journal: {journal.path} ({total} recordings)")
+    for state in (QUEUED, FETCHING, TRANSCRIBED, ANALYZED, FAILED):
+        print(f"  {state:12} {counts.get(state, 0)}")
+    duplicates = journal.duplicate_count()
+    if duplicates:
+        print(f"  duplicates linked: {duplicates} ({duplicates / total:.1%} dedup rate)")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if not args or args[0] not in ("enqueue", "run", "merge", "status", "retry-failed"):
+        print(__doc__)
+        sys.exit(1)
+
+    command = args.pop(0)
+    positional, opts, flags = parse_args(args)
+
+    if "--schedule" in opts:
+        # Environment so --workers child processes pick it up too
+        os.environ["BACKFILL_SCHEDULE"] = opts["--schedule"]
+    if "--redact" in flags:
+        os.environ["BACKFILL_REDACT"] = "1"
+    journal = Journal(opts.get("--journal", JOURNAL_PATH))
+    metrics_port = int(opts["--metrics-port"]) if "--metrics-port" in opts else None
+    index_path = None
+    if "--dedup" in flags:
+        index_path = opts.get("--index", os.getenv("FINGERPRINT_INDEX", "fingerprints.db"))
+
+    if command == "enqueue":
+        total = 0
+        for path in positional:
+            rows = load_input(path)
+            added = journal.enqueue(rows)
+            total += added
+            print(f"{path}: {len(rows)} recordings, {added} new")
+        print_status(journal)
+    elif command == "run" and "--workers" in opts:
+        workers = int(opts["--workers"])
+        print(f"Starting {workers} shard workers")
+        t0 = time.time()
+        stats = run_sharded(journal.path, workers, opts.get("--out", OUT_DIR), int(opts.get("--batch", 1)),
+                            int(opts.get("--max-idle", 0)), index_path, metrics_port, opts.get("--metrics-file"))
+        print(f"{workers} workers done in {time.time() - t0:.1f}s: {stats}")
+        if stats["failed_shards"]:
+            print(f"[WARN] {stats['failed_shards']} shard(s) died; rerun once their leases expire ({LEASE_SEC}s)")
+        print_savings(stats)
+        print_status(journal)
+    elif command == "run" and "--threads" in opts:
+        threads = int(opts["--threads"])
+        adaptive = "--adaptive" in flags
+        print(f"Starting {threads} worker threads ({'adaptive' if adaptive else 'fixed'} concurrency)")
+        writer = start_metrics(opts.get("--worker-id") or socket.gethostname(), metrics_port, opts.get("--metrics-file"))
+        t0 = time.time()
+        stats = run_threaded(journal.path, threads, opts.get("--out", OUT_DIR), int(opts.get("--batch", 1)),
+                             int(opts.get("--max-idle", 0)), index_path, adaptive, opts.get("--worker-id"))
+        if writer:
+            writer.stop()
+        print(f"{threads} threads done in {time.time() - t0:.1f}s: {stats}")
+        print_savings(stats)
+        for name, lim in sorted(concurrency.limiters().items()):
+            print(f"  {name}: final in-flight limit {lim.limit:.1f}")
+        print_status(journal)
+    elif command == "run":
+        shard = None
+        if "--shard" in opts:
+            index, count = opts["--shard"].split("/")
+            shard = (int(index), int(count))
+        worker = Worker(journal, opts.get("--worker-id"), opts.get("--out", OUT_DIR), int(opts.get("--batch", 1)),
+                        shard=shard, fingerprints=open_fingerprints(index_path))
+        print(f"Worker {worker.worker_id} starting")
+        writer = start_metrics(worker.worker_id, metrics_port, opts.get("--metrics-file"))
+        t0 = time.time()
+        stats = worker.run(max_idle=int(opts.get("--max-idle", 0)))
+        if writer:
+            writer.stop()
+        print(f"Worker {worker.worker_id} done in {time.time() - t0:.1f}s: {stats}")
+        print_savings(stats)
+        print_status(journal)
+    elif command == "merge":
+        dest, count = merge_results(opts.get("--out", OUT_DIR))
+        print(f"Merged {count} results into {dest}")
+    elif command == "retry-failed":
+        print(f"Re-queued {journal.retry_failed()} failed recordings")
+    else:
+        print_status(journal)
+
+    journal.close()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Benchmark transcript compaction on cached calls.
+
+Compares the full transcript against the compacted one for every cached
+Deepgram / /api/analyze-simple JSON file: compaction latency, prompt tokens
+and estimated OpenAI cost for the two analysis passes. With --live (and
+OPENAI_API_KEY set) it also times a real Pass A style request for both
+transcripts.
+
+Usage:
+    python bench_compaction.py <file-or-dir> [...] [--budget 3000] [--live]
+"""
+import glob
+import json
+import os
+import sys
+import time
+
+from transcript_compaction import compact_result, estimate_tokens, format_transcript, utterances_from_deepgram, utterances_from_transcript
+
+# USD per 1M input tokens (simple-analysis.ts: Pass A gpt-4o-mini, Pass B gpt-4o)
+PRICE_PER_MTOK = {
+    "gpt-4o-mini": 0.15,
+    "gpt-4o": 2.50,
+}
+PASS_MODELS = ["gpt-4o-mini", "gpt-4o"]
+
+OPENAI_URL = "https://api.openai.com/v1/chat/completions"
+
+
+def find_calls(paths):
+    """Expand files and directories into a list of cached JSON files"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, "*.json"))))
+        else:
+            files.append(path)
+    return files
+
+
+def transcript_cost(tokens):
+    """Input cost in USD of sending a transcript through both passes"""
+    return sum(tokens * PRICE_PER_MTOK[m] / 1_000_000 for m in PASS_MODELS)
+
+
+def time_llm(transcript):
+    """Time one Pass A style completion against OpenAI"""
+    import requests
+
+    headers = {
+        "Authorization": f"Bearer {os.environ['OPENAI_API_KEY']}",
+        "Content-Type": "application/json"
+    }
+    body = {
+        "model": "gpt-4o-mini",
+        "temperature": 0.1,
+        "response_format": {"type": "json_object"},
+        "messages": [
+            {"role": "system", "content": "Extract money_mentions and objection_spans from this insurance sales call. Return JSON only."},
+            {"role": "user", "content": f"TRANSCRIPT:\n{transcript}"}
+        ]
+    }
+    t0 = time.perf_counter()
+    response = requests.post(OPENAI_URL, headers=headers, json=body, timeout=120)
+    elapsed = time.perf_counter() - t0
+    usage = response.json().get("usage", {}) if response.status_code == 200 else {}
+    return elapsed, usage.get("prompt_tokens")
+
+
+def bench_file(path, budget=None, live=False):
+    """Benchmark one cached call"""
+    with open(path) as f:
+        data = json.load(f)
+
+    if "results" in data:
+        full = format_transcript(utterances_from_deepgram(data))
+    else:
+        full = format_transcript(utterances_from_transcript(data.get("transcript", "")))
+
+    t0 = time.perf_counter()
+    compact, report = compact_result(data, max_tokens=budget)
+    compaction_ms = (time.perf_counter() - t0) * 1000
+
+    row = {
+        "file": os.path.basename(path),
+        "compaction_ms": compaction_ms,
+        "tokens_before": estimate_tokens(full),
+        "tokens_after": report["tokens_after"],
+        "cost_before": transcript_cost(estimate_tokens(full)),
+        "cost_after": transcript_cost(report["tokens_after"]),
+    }
+
+    if live:
+        row["llm_sec_before"], row["prompt_tokens_before"] = time_llm(full)
+        row["llm_sec_after"], row["prompt_tokens_after"] = time_llm(compact)
+
+    return row
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    budget = None
+    live = "--live" in args
+    if live:
+        args.remove("--live")
+        if not os.getenv("OPENAI_API_KEY"):
+            print("--live needs OPENAI_API_KEY")
+            sys.exit(1)
+    if "--budget" in args:
+        idx = args.index("--budget")
+        budget = int(args[idx + 1])
+        del args[idx:idx + 2]
+
+    files = find_calls(args or ["."])
+    if not files:
+        print("No cached calls found")
+        sys.exit(1)
+
+    print("COMPACTION BENCHMARK")
+    print("=" * 60)
+    print(f"Calls: {len(files)}  Budget: {budget or 'none'}  Live LLM: {'yes' if live else 'no'}")
+    print("-" * 60)
+
+    rows = []
+    for path in files:
+        try:
+            row = bench_file(path, budget, live)
+        except (ValueError, KeyError, AttributeError) as e:
+            print(f"  skip {path}: {e}")
+            continue
+        if not row["tokens_before"]:
+            continue
+        rows.append(row)
+        line = (f"{row['file']}: {row['tokens_before']} -> {row['tokens_after']} tokens, "
+                f"${row['cost_before']:.5f} -> ${row['cost_after']:.5f}, compaction {row['compaction_ms']:.1f}ms")
+        if live:
+            line += f", LLM {row['llm_sec_before']:.2f}s -> {row['llm_sec_after']:.2f}s"
+        print(line)
+
+    if not rows:
+        print("No transcripts found in the given files")
+        sys.exit(1)
+
+    tokens_before = sum(r["tokens_before"] for r in rows)
+    tokens_after = sum(r["tokens_after"] for r in rows)
+    cost_before = sum(r["cost_before"] for r in rows)
+    cost_after = sum(r["cost_after"] for r in rows)
+    compaction_ms = sum(r["compaction_ms"] for r in rows)
+
+    print("\n" + "=" * 60)
+    print("SUMMARY")
+    print("-" * 60)
+    print(f"Tokens:      {tokens_before} -> {tokens_after} ({100.0 * (tokens_before - tokens_after) / tokens_before:.1f}% saved)")
+    print(f"Input cost:  ${cost_before:.4f} -> ${cost_after:.4f} (per 1k calls: ${1000 * cost_before / len(rows):.2f} -> ${1000 * cost_after / len(rows):.2f})")
+    print(f"Compaction:  {compaction_ms / len(rows):.1f}ms per call")
+    if live:
+        llm_before = sum(r["llm_sec_before"] for r in rows) / len(rows)
+        llm_after = sum(r["llm_sec_after"] for r in rows) / len(rows)
+        print(f"LLM latency: {llm_before:.2f}s -> {llm_after:.2f}s mean per call")
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Scaling benchmark for the sharded backfill runner.
+
+For each worker count a fresh journal is filled with --calls synthetic
+recordings and drained by backfill_runner.run_sharded, so the real Worker
+pipeline runs in every shard: claim, Deepgram, pre-classifier, analysis and
+the state writes. Both upstreams are a local_stub.py instance in this process
+that answers after --latency seconds, so the numbers show how well shards
+overlap upstream waits and share the journal, not API speed.
+
+--mode cpu measures the post-processing instead: the stub answers at once and
+every recording's transcript is already cached (the journal row is
+TRANSCRIBED), so a run is pre-classifier, timeline, result writes and journal
+traffic only. Speedup and efficiency are against the single-process run.
+
+Every run is checked: each recording must end up analyzed with exactly one
+result file, and the stub must have seen one Deepgram request per recording
+in io mode (none transcribed twice by two shards) and none in cpu mode.
+
+Usage:
+    python bench_sharding.py [--mode io|cpu] [--calls 200] [--workers 1,2,4,8] [--latency 0.05] [--port 3994]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+PORT = int(dict(zip(sys.argv[1::2], sys.argv[2::2])).get("--port", 3994))
+# backfill_runner reads these at import time
+os.environ["DEEPGRAM_URL"] = f"http://127.0.0.1:{PORT}/v1/listen"
+os.environ["ANALYZE_URL"] = f"http://127.0.0.1:{PORT}/api/analyze-simple"
+
+import requests
+
+import local_stub
+from backfill_runner import ANALYZED, TRANSCRIBED, Journal, run_sharded
+
+CACHED_TRANSCRIPT = "new_call_response.json"
+
+
+def precache(journal, out_dir):
+    """Give every journaled recording a cached transcript and mark it TRANSCRIBED, as a resumed backfill would be"""
+    transcripts = os.path.join(out_dir, "transcripts")
+    os.makedirs(transcripts, exist_ok=True)
+    rows = []
+    for (rec_id,) in journal.conn.execute("SELECT id FROM recordings").fetchall():
+        path = os.path.join(transcripts, f"{rec_id}.json")
+        try:
+            os.link(CACHED_TRANSCRIPT, path)
+        except OSError:
+            shutil.copyfile(CACHED_TRANSCRIPT, path)
+        rows.append((TRANSCRIBED, path, rec_id))
+    journal.conn.executemany("UPDATE recordings SET state = ?, transcript_path = ? WHERE id = ?", rows)
+
+
+def run(calls, workers, root, cached=False):
+    """Drain a fresh journal of `calls` recordings with `workers` shards; returns (seconds, stats, journal counts, results)"""
+    journal_path = os.path.join(root, f"journal-{workers}.db")
+    out_dir = os.path.join(root, f"out-{workers}")
+    journal = Journal(journal_path)
+    journal.enqueue([{"id": f"bench{i:05d}", "recording_url": f"https://recordings.example/bench{i:05d}.mp3",
+                      "meta": {"call_id": f"bench{i:05d}", "duration_sec": 180.0}} for i in range(calls)])
+    if cached:
+        precache(journal, out_dir)
+    t0 = time.perf_counter()
+    stats = run_sharded(journal_path, workers, out_dir)
+    elapsed = time.perf_counter() - t0
+    counts = journal.counts()
+    journal.close()
+    results = len(os.listdir(os.path.join(out_dir, "results")))
+    return elapsed, stats, counts, results
+
+
+if __name__ == "__main__":
+    opts = dict(zip(sys.argv[1::2], sys.argv[2::2]))
+    calls = int(opts.get("--calls", 200))
+    cpus = os.cpu_count() or 1
+    worker_counts = [int(w) for w in opts.get("--workers", ",".join(str(1 << i) for i in range(6) if 1 << i <= 2 * cpus)).split(",")]
+    # Speedup is always against one process
+    if 1 not in worker_counts:
+        worker_counts.insert(0, 1)
+    worker_counts.sort()
+    mode = opts.get("--mode", "io")
+    if mode not in ("io", "cpu"):
+        print("--mode must be io or cpu")
+        sys.exit(2)
+    cached = mode == "cpu"
+    latency = float(opts.get("--latency", 0 if cached else 0.05))
+
+    server, _ = local_stub.serve(PORT, latency=latency)
+    stats_url = f"http://127.0.0.1:{PORT}/stats"
+    root = tempfile.mkdtemp(prefix="bench_sharding-")
+
+    print("SHARDED BACKFILL BENCHMARK")
+    print("=" * 60)
+    print(f"{calls} recordings per run, {mode} mode{' (transcripts cached)' if cached else ''}, "
+          f"stub latency {latency * 1000:.0f}ms per request, CPUs: {cpus}")
+    print("speedup and efficiency are against the 1-worker run")
+    print("-" * 60)
+    baseline = None
+    ok = True
+    try:
+        for workers in worker_counts:
+            before = requests.get(stats_url, timeout=5).json()["requests"].get("/v1/listen", 0)
+            elapsed, stats, counts, results = run(calls, workers, root, cached)
+            transcribed = requests.get(stats_url, timeout=5).json()["requests"].get("/v1/listen", 0) - before
+            throughput = calls / elapsed
+            baseline = baseline or throughput
+            problems = []
+            if counts.get(ANALYZED, 0) != calls:
+                problems.append(f"analyzed {counts.get(ANALYZED, 0)}/{calls}")
+            if results != calls:
+                problems.append(f"{results} result files")
+            if transcribed != (0 if cached else calls):
+                problems.append(f"{transcribed} Deepgram requests")
+            if stats.get("failed_shards"):
+                problems.append(f"{stats['failed_shards']} shards died")
+            ok = ok and not problems
+            print(f"{workers:3d} workers: {elapsed:6.2f}s  {throughput:7.1f} calls/s  "
+                  f"speedup {throughput / baseline:4.2f}x  efficiency {throughput / baseline / workers:4.0%}"
+                  f"{'  ' + ', '.join(problems) if problems else ''}")
+    finally:
+        server.shutdown()
+        server.server_close()
+        shutil.rmtree(root, ignore_errors=True)
+    sys.exit(0 if ok else 1)
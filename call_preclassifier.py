@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+"""
+Cheap pre-classifier for voicemail / no-contact calls.
+
+Runs over the Deepgram word stream right after ASR and decides whether a call
+is worth the full analysis (intelligence features + both LLM passes) or can be
+routed straight to a minimal result.
+
+Usage:
+    python call_preclassifier.py <file-or-dir> [...] [--results backfill_out/results]
+    python call_preclassifier.py <dir> --labels dispositions.csv [--tune]
+
+The labels file maps a cached response filename (or Deepgram request_id) to
+the Convoso disposition, as CSV "file,disposition" or a JSON object.
+
+Compute saved is only reported when there are measured full analyses to
+price a skip with: pass --results with a directory of analysis results
+(e.g. backfill_out/results), whose metadata.stages.timings_ms give the
+post-ASR stage times, or run through backfill_runner.py, which times its
+own analyze requests.
+"""
+import csv
+import glob
+import itertools
+import json
+import os
+import re
+import sys
+
+DEFAULT_THRESHOLDS = {
+    "min_words": 25,           # fewer words than this is dead air / instant hangup
+    "min_duration_sec": 30,    # short calls are hangups unless both sides talk a lot
+    "min_short_call_words": 60,
+    "min_speakers": 2,         # a one-sided call with no voicemail cue is still no-contact
+    "min_talk_ratio": 0.15,    # fraction of the call with somebody speaking
+    "max_one_sided_words": 120,
+}
+
+VOICEMAIL_RE = re.compile(
+    r"leave (?:a|your) (?:message|name)|at the (?:tone|beep)|after the (?:tone|beep)|"
+    r"(?:i'?m|i am|we'?re|we are|is) (?:currently )?(?:not available|unavailable) (?:to take|right now|at the moment)|"
+    r"voice ?mail|mailbox (?:is full|has not been set up)|"
+    r"record your message|when you(?:'ve| have) finished recording|"
+    r"the (?:person|party|number) you (?:are trying to reach|have dialed|called)|"
+    r"please try (?:again|your call again) later|has been disconnected|no longer in service",
+    re.IGNORECASE
+)
+
+# DNC requests, legal threats and cancellations are compliance evidence however short
+# the call; any of these sends it to full analysis
+CRITICAL_RE = re.compile(
+    r"do not call|don'?t (?:ever )?call|stop calling|quit calling|"
+    r"(?:take|remove|get) (?:me|my (?:name|number)) (?:off|from)|(?:put|add) me (?:on|to) (?:the|your) (?:do not call|dnc)|"
+    r"not interested|scam|lawyer|attorney|sue you|report (?:you|this)|cancel|refund",
+    re.IGNORECASE
+)
+
+# Convoso dispositions that mean nobody (or nothing) worth analysing was on the line
+TRIVIAL_DISPOSITIONS = {
+    "answering machine", "answering machine detected", "voicemail", "left voicemail",
+    "no answer", "dead air", "hang up", "hangup", "disconnected", "busy", "fax",
+    "wrong number", "drop", "dropped call", "amd",
+}
+
+# metadata.stages entries that run before the routing decision, so a skip does not save them
+PRE_ROUTE_STAGES = {"transcribe"}
+
+ROUTE_FULL = "full"
+ROUTE_MINIMAL = "minimal"
+FULL_LABELS = {"conversation", "compliance"}
+
+
+def get_words(result):
+    """Word list from a raw Deepgram response"""
+    channels = result.get("results", {}).get("channels", [])
+    if not channels:
+        return []
+    return channels[0].get("alternatives", [{}])[0].get("words", [])
+
+
+def extract_features(result):
+    """Compute the cheap features the classifier looks at"""
+    words = get_words(result)
+    duration = result.get("metadata", {}).get("duration") or (words[-1].get("end", 0) if words else 0)
+
+    speaker_words = {}
+    talk_time = 0.0
+    for w in words:
+        speaker = w.get("speaker")
+        if speaker is not None:
+            speaker_words[speaker] = speaker_words.get(speaker, 0) + 1
+        talk_time += max(0.0, w.get("end", 0) - w.get("start", 0))
+    # Without diarization the speaker features are unknown (None), not "one speaker"
+    diarized = bool(speaker_words)
+
+    # Only the opening is checked for voicemail greetings; critical phrases anywhere
+    opening = " ".join(w.get("word", "") for w in words[:80])
+    critical = CRITICAL_RE.search(" ".join(w.get("word", "") for w in words))
+
+    return {
+        "duration_sec": duration,
+        "word_count": len(words),
+        "speaker_count": sum(1 for n in speaker_words.values() if n >= 3) if diarized else None,
+        "max_speaker_share": max(speaker_words.values()) / len(words) if diarized else None,
+        "talk_ratio": talk_time / duration if duration else 0.0,
+        "voicemail_cue": bool(VOICEMAIL_RE.search(opening)),
+        "critical_phrase": critical.group(0).lower() if critical else None,
+    }
+
+
+def classify_features(features, thresholds=None):
+    """Return (label, reason) for a feature dict"""
+    t = dict(DEFAULT_THRESHOLDS, **(thresholds or {}))
+    one_sided = features["speaker_count"] is not None and features["speaker_count"] < t["min_speakers"]
+
+    # Before any length or speaker rule: a 15 word "stop calling me" is still evidence
+    if features.get("critical_phrase"):
+        return "compliance", f"critical phrase \"{features['critical_phrase']}\""
+    if features["voicemail_cue"] and one_sided:
+        return "voicemail", "voicemail greeting with a single speaker"
+    if features["word_count"] < t["min_words"]:
+        return "no_contact", f"only {features['word_count']} words"
+    if features["talk_ratio"] < t["min_talk_ratio"]:
+        return "no_contact", f"talk ratio {features['talk_ratio']:.2f}"
+    if features["duration_sec"] < t["min_duration_sec"] and features["word_count"] < t["min_short_call_words"]:
+        return "short_hangup", f"{features['duration_sec']:.0f}s call"
+    if one_sided and features["word_count"] < t["max_one_sided_words"]:
+        return "no_contact", "one-sided call"
+    return "conversation", "two-party conversation"
+
+
+def classify(result, thresholds=None):
+    """Classify a Deepgram response; route is ROUTE_FULL or ROUTE_MINIMAL"""
+    features = extract_features(result)
+    label, reason = classify_features(features, thresholds)
+    return {
+        "label": label,
+        "reason": reason,
+        "route": ROUTE_FULL if label in FULL_LABELS else ROUTE_MINIMAL,
+        "features": features,
+    }
+
+
+def minimal_result(classification, meta=None):
+    """Analysis-shaped result for calls that skip the expensive stages"""
+    meta = meta or {}
+    return {
+        "transcript": "",
+        "utterance_count": 0,
+        "duration": classification["features"]["duration_sec"],
+        "analysis": {
+            # Nobody was reached, which is not the same as a declined sale; the label says why
+            "outcome": None,
+            "monthly_premium": None,
+            "enrollment_fee": None,
+            "reason": classification["reason"],
+            "summary": f"Pre-classified as {classification['label']}; full analysis skipped.",
+            "customer_name": None,
+            "policy_details": {"carrier": None, "plan_type": None, "effective_date": None},
+            "red_flags": [],
+            "agent_name": meta.get("agent_name"),
+            "agent_id": meta.get("agent_id"),
+        },
+        "rebuttals": None,
+        "metadata": {
+            "model": "preclassifier-v1",
+            "preclassified": classification["label"],
+        },
+    }
+
+
+def analysis_seconds(result, elapsed=None):
+    """Post-routing compute of one full analysis: its stage timings, else the measured request time"""
+    timings = ((result or {}).get("metadata") or {}).get("stages", {}).get("timings_ms") or {}
+    if timings:
+        return sum(ms for stage, ms in timings.items() if stage not in PRE_ROUTE_STAGES) / 1000.0
+    return elapsed
+
+
+class SavingsTracker:
+    """Tally how many calls the pre-classifier skipped and, from measured analyses, the seconds saved"""
+
+    def __init__(self):
+        self.calls = 0
+        self.skipped = 0
+        self.audio_seconds_skipped = 0.0
+        self.by_label = {}
+        self.measured = 0
+        self.measured_seconds = 0.0
+
+    def record(self, classification):
+        self.calls += 1
+        label = classification["label"]
+        self.by_label[label] = self.by_label.get(label, 0) + 1
+        if classification["route"] == ROUTE_MINIMAL:
+            self.skipped += 1
+            self.audio_seconds_skipped += classification["features"]["duration_sec"]
+
+    def observe_analysis(self, seconds):
+        """Record the measured cost of a call that did get the full analysis"""
+        if seconds is not None:
+            self.measured += 1
+            self.measured_seconds += seconds
+
+    def compute_seconds_saved(self):
+        """Skipped calls times the mean measured analysis; None until something was measured"""
+        if not self.measured:
+            return None
+        return self.skipped * self.measured_seconds / self.measured
+
+    def summary(self):
+        saved = self.compute_seconds_saved()
+        return {
+            "calls": self.calls,
+            "skipped": self.skipped,
+            "skip_rate": self.skipped / self.calls if self.calls else 0.0,
+            "audio_seconds_skipped": round(self.audio_seconds_skipped, 1),
+            "compute_seconds_saved": None if saved is None else round(saved, 1),
+            "measured_analyses": self.measured,
+            "by_label": dict(self.by_label),
+        }
+
+
+def load_labels(path):
+    """Load file/request_id -> disposition labels from CSV or JSON"""
+    if path.endswith(".json"):
+        with open(path) as f:
+            return {k: str(v) for k, v in json.load(f).items()}
+    labels = {}
+    with open(path, newline="") as f:
+        for row in csv.reader(f):
+            if len(row) >= 2 and row[0] and not row[0].startswith("#"):
+                labels[row[0].strip()] = row[1].strip()
+    return labels
+
+
+def is_trivial_disposition(disposition):
+    return disposition.strip().lower() in TRIVIAL_DISPOSITIONS
+
+
+def evaluate(samples, thresholds=None):
+    """Score thresholds against labelled samples of (features, disposition)"""
+    stats = {"tp": 0, "fp": 0, "tn": 0, "fn": 0}
+    for features, disposition in samples:
+        skipped = classify_features(features, thresholds)[0] not in FULL_LABELS
+        trivial = is_trivial_disposition(disposition)
+        if skipped and trivial:
+            stats["tp"] += 1
+        elif skipped:
+            stats["fp"] += 1
+        elif trivial:
+            stats["fn"] += 1
+        else:
+            stats["tn"] += 1
+    total = len(samples) or 1
+    stats["accuracy"] = (stats["tp"] + stats["tn"]) / total
+    stats["skip_recall"] = stats["tp"] / (stats["tp"] + stats["fn"]) if stats["tp"] + stats["fn"] else 0.0
+    return stats
+
+
+def tune(samples, max_false_skips=0):
+    """Grid-search thresholds; never skip more real conversations than max_false_skips"""
+    grid = {
+        "min_words": [10, 25, 40],
+        "min_duration_sec": [15, 30, 45],
+        "min_talk_ratio": [0.05, 0.15, 0.25],
+        "max_one_sided_words": [60, 120, 200],
+    }
+    best = None
+    keys = list(grid)
+    for values in itertools.product(*(grid[k] for k in keys)):
+        thresholds = dict(zip(keys, values))
+        stats = evaluate(samples, thresholds)
+        if stats["fp"] > max_false_skips:
+            continue
+        score = (stats["skip_recall"], stats["accuracy"])
+        if best is None or score > best[0]:
+            best = (score, thresholds, stats)
+    return (best[1], best[2]) if best else (None, None)
+
+
+def find_calls(paths):
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, "*.json"))))
+        else:
+            files.append(path)
+    return files
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    labels_path = None
+    do_tune = "--tune" in args
+    if do_tune:
+        args.remove("--tune")
+    if "--labels" in args:
+        idx = args.index("--labels")
+        labels_path = args[idx + 1]
+        del args[idx:idx + 2]
+    results_dir = None
+    if "--results" in args:
+        idx = args.index("--results")
+        results_dir = args[idx + 1]
+        del args[idx:idx + 2]
+
+    files = find_calls(args)
+    if not files:
+        print(__doc__)
+        sys.exit(1)
+
+    labels = load_labels(labels_path) if labels_path else {}
+    tracker = SavingsTracker()
+    for path in find_calls([results_dir] if results_dir else []):
+        with open(path) as f:
+            data = json.load(f)
+        result = data.get("result", data)
+        if not (result.get("metadata") or {}).get("preclassified"):
+            tracker.observe_analysis(analysis_seconds(result))
+    samples = []
+
+    print("CALL PRE-CLASSIFIER")
+    print("=" * 60)
+    for path in files:
+        with open(path) as f:
+            result = json.load(f)
+        if "results" not in result:
+            continue
+        classification = classify(result)
+        tracker.record(classification)
+        feats = classification["features"]
+        print(f"[{classification['route'].upper():7}] {os.path.basename(path)}: {classification['label']} "
+              f"({classification['reason']}; {feats['word_count']} words, "
+              f"{'?' if feats['speaker_count'] is None else feats['speaker_count']} speakers, "
+              f"talk {feats['talk_ratio']:.0%})")
+
+        request_id = result.get("metadata", {}).get("request_id")
+        disposition = labels.get(os.path.basename(path)) or labels.get(request_id)
+        if disposition:
+            samples.append((feats, disposition))
+
+    s = tracker.summary()
+    print("\n" + "=" * 60)
+    print("SAVINGS")
+    print("-" * 60)
+    print(f"Calls: {s['calls']}  Skipped: {s['skipped']} ({s['skip_rate']:.0%})")
+    print(f"Audio seconds routed to minimal result: {s['audio_seconds_skipped']}")
+    if s["compute_seconds_saved"] is None:
+        print("Compute seconds saved: not measured (pass --results <analysis results dir>)")
+    else:
+        print(f"Compute seconds saved: {s['compute_seconds_saved']} "
+              f"(mean of {s['measured_analyses']} measured analyses)")
+    print(f"By label: {s['by_label']}")
+
+    if samples:
+        stats = evaluate(samples)
+        print("\n" + "=" * 60)
+        print(f"AGAINST LABELS ({len(samples)} calls)")
+        print("-" * 60)
+        print(f"Default thresholds: accuracy {stats['accuracy']:.1%}, skip recall {stats['skip_recall']:.1%}, "
+              f"false skips {stats['fp']}")
+        if do_tune:
+            thresholds, best = tune(samples)
+            if thresholds:
+                print(f"Tuned thresholds: {thresholds}")
+                print(f"  accuracy {best['accuracy']:.1%}, skip recall {best['skip_recall']:.1%}, false skips {best['fp']}")
+            else:
+                print("No threshold set avoids skipping real conversations")
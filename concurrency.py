@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Adaptive (AIMD) concurrency limits for upstream calls.
+
+Each upstream (deepgram, analyze-simple, ...) gets a limiter that decides how
+many requests may be in flight. It learns from every completed request:
+
+    success, latency near baseline  -> additive increase (+1 per window of completions)
+    429 / 5xx / timeout             -> multiplicative decrease (limit * 0.5)
+    latency >= baseline * tolerance -> multiplicative decrease (limit * 0.9), the queue is building
+
+Transcription and analysis time grow with the recording, so raw latency
+says more about the job mix than about queueing. The latency signal is
+latency per unit of work: the caller sets `.work` on the slot (audio
+seconds for deepgram and analyze). A slot without work only feeds the
+429/5xx signal, so one limiter never mixes sized and unsized samples.
+
+The baseline is the minimum of a slowly decaying average of that signal,
+so it tracks the upstream's unloaded rate; at most one decrease is applied
+per typical request time so a burst of failures does not collapse the
+limit to the floor. Limits, in-flight counts and decreases are exported
+through metrics.py.
+
+    from concurrency import limiter
+    with limiter("deepgram").slot() as slot:
+        slot.work = duration_sec
+        response = session.post(...)
+        slot.status = response.status_code
+
+Benchmark against fixed concurrency with local_stub.py's capacity limit:
+
+    python concurrency.py bench [--capacity 8] [--requests 600] [--fixed 2,8,32] [--threads 64]
+"""
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+import metrics
+
+MIN_LIMIT = 1
+MAX_LIMIT = 64
+INITIAL_LIMIT = 4
+BACKOFF = 0.5               # on 429 / 5xx / errors
+GRADIENT_BACKOFF = 0.9      # on latency growth
+TOLERANCE = 2.0             # latency / baseline that counts as queueing
+SMOOTHING = 0.2             # short-term latency EWMA weight
+BASELINE_DECAY = 0.01       # how fast the baseline may drift up
+
+LIMIT = metrics.Gauge(metrics.REGISTRY, "callai_concurrency_limit", "Adaptive in-flight limit", ("upstream",))
+LIMIT_IN_FLIGHT = metrics.Gauge(metrics.REGISTRY, "callai_concurrency_in_flight",
+                                "Requests holding an adaptive slot", ("upstream",))
+LIMIT_DECREASES = metrics.Counter(metrics.REGISTRY, "callai_concurrency_decreases",
+                                  "Multiplicative decreases by cause", ("upstream", "reason"))
+LIMIT_WAIT = metrics.Histogram(metrics.REGISTRY, "callai_concurrency_wait_seconds", "Time spent waiting for a slot",
+                               ("upstream",), buckets=(0.001, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0))
+
+
+def is_overload(status):
+    """429 and 5xx mean back off; other statuses are the caller's problem, not load"""
+    return status in ("error", "timeout") or (isinstance(status, int) and (status == 429 or status >= 500))
+
+
+class Slot:
+    __slots__ = ("status", "work")
+
+    def __init__(self):
+        self.status = "error"
+        self.work = None
+
+
+class AIMDLimiter:
+    def __init__(self, name, initial=INITIAL_LIMIT, min_limit=MIN_LIMIT, max_limit=MAX_LIMIT, backoff=BACKOFF,
+                 tolerance=TOLERANCE):
+        self.name = name
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.tolerance = tolerance
+        self.in_flight = 0
+        self.latency = None         # short-term EWMA of seconds per unit of work
+        self.baseline = None        # unloaded seconds per unit of work
+        self.rtt = None             # EWMA of raw latency, spaces out decreases
+        self.last_decrease = 0.0
+        self.cond = threading.Condition()
+        self._export()
+
+    def _export(self):
+        LIMIT.set(int(self.limit), upstream=self.name)
+        LIMIT_IN_FLIGHT.set(self.in_flight, upstream=self.name)
+
+    def acquire(self, timeout=None):
+        t0 = time.perf_counter()
+        with self.cond:
+            while self.in_flight >= int(self.limit):
+                if not self.cond.wait(timeout):
+                    raise TimeoutError(f"no {self.name} slot within {timeout}s")
+            self.in_flight += 1
+            self._export()
+        LIMIT_WAIT.observe(time.perf_counter() - t0, upstream=self.name)
+
+    def release(self, latency, status, work=None):
+        with self.cond:
+            self.in_flight -= 1
+            now = time.monotonic()
+            if is_overload(status):
+                self._decrease(now, self.backoff, "throttled" if status == 429 else "error")
+            else:
+                self.rtt = latency if self.rtt is None else self.rtt + SMOOTHING * (latency - self.rtt)
+                queueing = False
+                if work and work > 0:
+                    rate = latency / work
+                    self.latency = rate if self.latency is None else self.latency + SMOOTHING * (rate - self.latency)
+                    if self.baseline is None or self.latency < self.baseline:
+                        self.baseline = self.latency
+                    else:
+                        self.baseline += BASELINE_DECAY * (self.latency - self.baseline)
+                    queueing = self.latency >= self.baseline * self.tolerance
+                if queueing:
+                    self._decrease(now, GRADIENT_BACKOFF, "latency")
+                elif self.in_flight + 1 >= int(self.limit):
+                    # Only grow when the limit is what held us back
+                    self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+            self._export()
+            self.cond.notify_all()
+
+    def _decrease(self, now, factor, reason):
+        # One decrease per typical request time (at least 100ms) so a burst of failures counts once
+        if now - self.last_decrease < max(0.1, self.rtt or 0):
+            return
+        self.last_decrease = now
+        self.limit = max(self.min_limit, self.limit * factor)
+        LIMIT_DECREASES.inc(upstream=self.name, reason=reason)
+
+    @contextmanager
+    def slot(self, timeout=None):
+        """Hold one in-flight slot; set `.status` to the HTTP status and `.work` to the request size"""
+        self.acquire(timeout)
+        slot = Slot()
+        t0 = time.perf_counter()
+        try:
+            yield slot
+        finally:
+            self.release(time.perf_counter() - t0, slot.status, slot.work)
+
+
+class FixedLimiter(AIMDLimiter):
+    """Constant limit with the same interface, for baselines"""
+
+    def release(self, latency, status, work=None):
+        with self.cond:
+            self.in_flight -= 1
+            self._export()
+            self.cond.notify_all()
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def limiter(name, **kwargs):
+    """Process-wide limiter for an upstream, created on first use"""
+    with _limiters_lock:
+        if name not in _limiters:
+            _limiters[name] = AIMDLimiter(name, **kwargs)
+        return _limiters[name]
+
+
+def limiters():
+    with _limiters_lock:
+        return dict(_limiters)
+
+
+def run_load(url, lim, requests_total, threads, timeout=30):
+    """Send `requests_total` POSTs through `lim` from `threads` threads; returns (status, latency) rows"""
+    import requests
+    from concurrent.futures import ThreadPoolExecutor
+
+    local = threading.local()
+    rows = []
+    rows_lock = threading.Lock()
+    samples = []
+    counter = iter(range(requests_total))
+    counter_lock = threading.Lock()
+
+    def worker():
+        local.session = requests.Session()
+        while True:
+            with counter_lock:
+                if next(counter, None) is None:
+                    return
+            with lim.slot() as slot:
+                slot.work = 1.0  # every stub request is the same size
+                start = time.perf_counter()
+                try:
+                    response = local.session.post(url, json={"recording_url": "http://stub/a.mp3"}, timeout=timeout)
+                    slot.status = response.status_code
+                except requests.RequestException:
+                    slot.status = "error"
+                elapsed = time.perf_counter() - start
+            with rows_lock:
+                rows.append((slot.status, elapsed))
+
+    def sampler(stop):
+        while not stop.wait(0.1):
+            samples.append(lim.limit)
+
+    stop = threading.Event()
+    threading.Thread(target=sampler, args=(stop,), daemon=True).start()
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        for _ in range(threads):
+            pool.submit(worker)
+    stop.set()
+    return rows, time.perf_counter() - t0, samples
+
+
+def bench(capacity=8, requests_total=600, fixed=(2, 8, 32), threads=64, latency=0.05, port=3994):
+    import local_stub
+
+    server, _ = local_stub.serve(port, latency=latency, capacity=capacity)
+    url = f"http://127.0.0.1:{port}/api/analyze-simple"
+    print("ADAPTIVE CONCURRENCY BENCH")
+    print("=" * 60)
+    print(f"Stub capacity {capacity} concurrent, {latency * 1000:.0f}ms service time, {requests_total} requests\n")
+    print(f"{'limiter':12s} {'ok/s':>7s} {'errors':>7s} {'err %':>6s} {'p50 ms':>8s} {'p95 ms':>8s} {'limit':>11s}")
+    try:
+        cases = [(f"fixed {n}", FixedLimiter(f"fixed{n}", initial=n, max_limit=n)) for n in fixed]
+        cases.append(("aimd", AIMDLimiter("bench", max_limit=threads)))
+        for label, lim in cases:
+            rows, wall, samples = run_load(url, lim, requests_total, threads)
+            ok = sorted(t for status, t in rows if status == 200)
+            errors = len(rows) - len(ok)
+            p50 = ok[len(ok) // 2] * 1000 if ok else 0
+            p95 = ok[min(len(ok) - 1, int(len(ok) * 0.95))] * 1000 if ok else 0
+            spread = f"{min(samples):.0f}-{max(samples):.0f}" if samples else f"{lim.limit:.0f}"
+            print(f"{label:12s} {len(ok) / wall:7.1f} {errors:7d} {errors / len(rows):6.1%} {p50:8.1f} {p95:8.1f} "
+                  f"{spread:>11s}")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if not args or args[0] != "bench":
+        print(__doc__)
+        sys.exit(1)
+    opts = dict(zip(args[1::2], args[2::2]))
+    bench(capacity=int(opts.get("--capacity", 8)), requests_total=int(opts.get("--requests", 600)),
+          fixed=tuple(int(n) for n in opts.get("--fixed", "2,8,32").split(",")),
+          threads=int(opts.get("--threads", 64)), latency=float(opts.get("--latency", 0.05)))
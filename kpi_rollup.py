@@ -0,0 +1,416 @@
+#!/usr/bin/env python3
+"""
+Incremental KPI rollup store.
+
+Python counterpart to computeKPIRollup / the kpi-daily, kpi-weekly and rollup
+cron routes, but incremental: every analyzed call is folded into one row per
+(agent, campaign, day) holding mergeable summaries, so any date range can be
+answered from the rollup rows without rescanning calls.
+
+Each row keeps counts and sums plus log-bucketed (HDR style) histograms for
+talk time, silence and hold, which merge by adding bucket counts. Calls
+without talk_metrics (pre-classified minimal results) count towards calls
+and outcomes but stay out of the talk/silence figures, and hold is only
+recorded for results that carry a hold duration.
+
+Calls without a started_at (or date) go to the "undated" day rather than the
+day they were analyzed, so a backfill never lands history in today's rows.
+Date ranges leave them out; query --from undated --to undated shows them.
+
+Ingest is idempotent: each call id is recorded in kpi_ingested in the same
+transaction as its rollup rows, so re-ingesting a cumulative results
+directory only folds in the new calls.
+
+Usage:
+    python kpi_rollup.py ingest <result-file-or-dir> [...] [--db kpi_rollups.db]
+    python kpi_rollup.py query --from 2025-09-01 --to 2025-09-30 [--agent A] [--campaign C] [--by agent|campaign|day] [--db ...]
+"""
+import glob
+import hashlib
+import json
+import math
+import os
+import sqlite3
+import struct
+import sys
+from datetime import date, datetime, timedelta
+
+DB_PATH = os.getenv("KPI_ROLLUP_DB", "kpi_rollups.db")
+UNDATED = "undated"
+
+# Histogram resolution: ~2% relative error, values below 0.1s share bucket 0
+HIST_MIN = 0.1
+HIST_GROWTH = 1.02
+
+SUM_FIELDS = [
+    "calls", "sales", "callbacks", "no_sales",
+    "talk_agent_sec", "talk_customer_sec", "silence_sec", "hold_sec",
+    "interrupts", "premium_sum", "premium_calls", "enrollment_fee_sum", "duration_sec", "talk_calls",
+]
+HIST_FIELDS = ["talk", "silence", "hold"]
+
+
+class LogHistogram:
+    """Mergeable log-bucketed histogram with bounded relative error"""
+
+    __slots__ = ("buckets", "count", "total", "min", "max")
+
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    @staticmethod
+    def bucket_for(value):
+        if value < HIST_MIN:
+            return 0
+        return 1 + int(math.log(value / HIST_MIN) / math.log(HIST_GROWTH))
+
+    @staticmethod
+    def bucket_value(bucket):
+        if bucket == 0:
+            return 0.0
+        # Midpoint of the bucket in log space
+        return HIST_MIN * HIST_GROWTH ** (bucket - 0.5)
+
+    def add(self, value, n=1):
+        b = self.bucket_for(value)
+        self.buckets[b] = self.buckets.get(b, 0) + n
+        self.count += n
+        self.total += value * n
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def merge(self, other):
+        for b, n in other.buckets.items():
+            self.buckets[b] = self.buckets.get(b, 0) + n
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def quantile(self, q):
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = 0
+        for b in sorted(self.buckets):
+            seen += self.buckets[b]
+            if seen > rank:
+                return min(max(self.bucket_value(b), self.min), self.max)
+        return self.max
+
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def to_bytes(self):
+        header = struct.pack("<Iddd", self.count, self.total,
+                             self.min if self.count else 0.0, self.max if self.count else 0.0)
+        body = b"".join(struct.pack("<HI", b, n) for b, n in sorted(self.buckets.items()))
+        return header + body
+
+    @classmethod
+    def from_bytes(cls, blob):
+        h = cls()
+        if not blob:
+            return h
+        h.count, h.total, h.min, h.max = struct.unpack_from("<Iddd", blob, 0)
+        if not h.count:
+            h.min, h.max = math.inf, -math.inf
+        offset = struct.calcsize("<Iddd")
+        for b, n in struct.iter_unpack("<HI", blob[offset:]):
+            h.buckets[b] = n
+        return h
+
+
+def call_id(result, meta=None):
+    """Stable id of an analyzed call: the Convoso call_id / runner id, else a hash of the result"""
+    meta = meta or result.get("meta") or {}
+    inner = result.get("result", result)
+    found = meta.get("call_id") or result.get("id") or (inner.get("metadata") or {}).get("deepgram_request_id")
+    if found:
+        return str(found)
+    return "sha1:" + hashlib.sha1(json.dumps(inner, sort_keys=True).encode()).hexdigest()
+
+
+def hold_seconds(result, talk):
+    """Hold duration when the result actually measured one, else None"""
+    hold = result.get("hold") or {}
+    for value in (hold.get("hold_time_sec"), hold.get("total_sec"), talk.get("hold_time_sec")):
+        if isinstance(value, (int, float)):
+            return float(value)
+    # /api/analyze always sends hold_duration_sec: 0; only trust it when a hold was detected
+    if hold.get("hold_detected") and isinstance(hold.get("hold_duration_sec"), (int, float)):
+        return float(hold["hold_duration_sec"])
+    return None
+
+
+def call_metrics(result, meta=None):
+    """Flatten one analyzed call into the numbers the rollup folds in"""
+    meta = dict(meta or result.get("meta") or {})
+    result = result.get("result", result)
+    analysis = result.get("analysis", {}) or {}
+    metadata = result.get("metadata", {}) or {}
+    talk = result.get("talk_metrics") or None
+
+    outcome = analysis.get("outcome")
+    if isinstance(outcome, dict):
+        # /api/analyze legacy shape
+        outcome = outcome.get("sale_status")
+        outcome = "no_sale" if outcome == "none" else outcome
+
+    # Analysis time is not call time; undated calls get their own bucket
+    when = meta.get("started_at") or meta.get("date")
+    premium = analysis.get("monthly_premium")
+    fee = analysis.get("enrollment_fee")
+
+    return {
+        "agent": str(meta.get("agent_id") or meta.get("agent_name") or analysis.get("agent_id") or metadata.get("agent_name") or "unknown"),
+        "campaign": str(meta.get("campaign") or "unknown"),
+        "day": str(when)[:10] if when else UNDATED,
+        "outcome": outcome,
+        "has_talk": talk is not None,
+        "talk_agent_sec": float((talk or {}).get("talk_time_agent_sec") or 0),
+        "talk_customer_sec": float((talk or {}).get("talk_time_customer_sec") or 0),
+        "silence_sec": float((talk or {}).get("silence_time_sec") or 0),
+        "hold_sec": hold_seconds(result, talk or {}),
+        "interrupts": int((talk or {}).get("interrupt_count") or 0),
+        "premium": float(premium) if isinstance(premium, (int, float)) else None,
+        "enrollment_fee": float(fee) if isinstance(fee, (int, float)) else None,
+        "duration_sec": float(result.get("duration") or meta.get("duration_sec") or 0),
+    }
+
+
+class Rollup:
+    """One (agent, campaign, day) summary"""
+
+    def __init__(self):
+        self.sums = dict.fromkeys(SUM_FIELDS, 0.0)
+        self.hists = {name: LogHistogram() for name in HIST_FIELDS}
+
+    def fold(self, m):
+        s = self.sums
+        s["calls"] += 1
+        if m["outcome"] == "sale":
+            s["sales"] += 1
+        elif m["outcome"] == "callback":
+            s["callbacks"] += 1
+        else:
+            s["no_sales"] += 1
+        s["duration_sec"] += m["duration_sec"]
+        if m["premium"] is not None:
+            s["premium_sum"] += m["premium"]
+            s["premium_calls"] += 1
+        if m["enrollment_fee"] is not None:
+            s["enrollment_fee_sum"] += m["enrollment_fee"]
+        # Missing talk_metrics / hold are unknown, not zero; zeros would drag the percentiles down
+        if m["has_talk"]:
+            s["talk_calls"] += 1
+            for key in ("talk_agent_sec", "talk_customer_sec", "silence_sec", "interrupts"):
+                s[key] += m[key]
+            self.hists["talk"].add(m["talk_agent_sec"] + m["talk_customer_sec"])
+            self.hists["silence"].add(m["silence_sec"])
+        if m["hold_sec"] is not None:
+            s["hold_sec"] += m["hold_sec"]
+            self.hists["hold"].add(m["hold_sec"])
+
+    def merge(self, other):
+        for key in SUM_FIELDS:
+            self.sums[key] += other.sums[key]
+        for name in HIST_FIELDS:
+            self.hists[name].merge(other.hists[name])
+        return self
+
+    def summary(self):
+        s = self.sums
+        calls = s["calls"] or 1
+        out = {
+            "calls": int(s["calls"]),
+            "sales": int(s["sales"]),
+            "callbacks": int(s["callbacks"]),
+            "conversion_rate": round(s["sales"] / calls, 4),
+            "avg_premium": round(s["premium_sum"] / s["premium_calls"], 2) if s["premium_calls"] else None,
+            "avg_talk_ratio_agent": round(s["talk_agent_sec"] / (s["talk_agent_sec"] + s["talk_customer_sec"]), 3)
+            if s["talk_agent_sec"] + s["talk_customer_sec"] else None,
+            "interrupts_per_call": round(s["interrupts"] / s["talk_calls"], 2) if s["talk_calls"] else None,
+            "total_duration_sec": round(s["duration_sec"], 1),
+        }
+        for name in HIST_FIELDS:
+            h = self.hists[name]
+            out[f"{name}_sec"] = {
+                "mean": round(h.mean(), 1) if h.count else None,
+                "p50": round(h.quantile(0.5), 1) if h.count else None,
+                "p90": round(h.quantile(0.9), 1) if h.count else None,
+                "p99": round(h.quantile(0.99), 1) if h.count else None,
+            }
+        return out
+
+
+class RollupStore:
+    """SQLite-backed store of per (agent, campaign, day) rollups"""
+
+    def __init__(self, path=DB_PATH):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        cols = ", ".join(f"{f} REAL NOT NULL DEFAULT 0" for f in SUM_FIELDS)
+        hists = ", ".join(f"hist_{h} BLOB" for h in HIST_FIELDS)
+        self.conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS kpi_rollups (
+                agent TEXT NOT NULL,
+                campaign TEXT NOT NULL,
+                day TEXT NOT NULL,
+                {cols},
+                {hists},
+                PRIMARY KEY (day, agent, campaign)
+            )
+        """)
+        # Stores created before talk_calls existed
+        existing = [row[1] for row in self.conn.execute("PRAGMA table_info(kpi_rollups)")]
+        for field in SUM_FIELDS:
+            if field not in existing:
+                self.conn.execute(f"ALTER TABLE kpi_rollups ADD COLUMN {field} REAL NOT NULL DEFAULT 0")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS kpi_ingested (call_id TEXT PRIMARY KEY, day TEXT NOT NULL)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_kpi_rollups_agent ON kpi_rollups(agent, day)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_kpi_rollups_campaign ON kpi_rollups(campaign, day)")
+        self.conn.commit()
+        # Dirty rollups and their call ids waiting for flush(); keeps folding O(1) per call
+        self.pending = {}
+        self.pending_ids = {}
+        self.undated = 0            # calls folded into the UNDATED day by this store
+
+    def _load(self, key):
+        row = self.conn.execute(
+            f"SELECT {', '.join(SUM_FIELDS)}, {', '.join('hist_' + h for h in HIST_FIELDS)} "
+            "FROM kpi_rollups WHERE agent = ? AND campaign = ? AND day = ?", key
+        ).fetchone()
+        rollup = Rollup()
+        if row:
+            rollup.sums = dict(zip(SUM_FIELDS, row[:len(SUM_FIELDS)]))
+            for name, blob in zip(HIST_FIELDS, row[len(SUM_FIELDS):]):
+                rollup.hists[name] = LogHistogram.from_bytes(blob)
+        return rollup
+
+    def add_call(self, result, meta=None):
+        """Fold one analyzed call into its rollup row; returns False if it was already ingested"""
+        cid = call_id(result, meta)
+        if cid in self.pending_ids or self.conn.execute(
+                "SELECT 1 FROM kpi_ingested WHERE call_id = ?", (cid,)).fetchone():
+            return False
+        m = call_metrics(result, meta)
+        key = (m["agent"], m["campaign"], m["day"])
+        rollup = self.pending.get(key)
+        if rollup is None:
+            rollup = self.pending[key] = self._load(key)
+        rollup.fold(m)
+        self.pending_ids[cid] = m["day"]
+        if m["day"] == UNDATED:
+            self.undated += 1
+        return True
+
+    def flush(self):
+        """Write dirty rollups in one transaction"""
+        if not self.pending:
+            return 0
+        placeholders = ", ".join("?" for _ in range(3 + len(SUM_FIELDS) + len(HIST_FIELDS)))
+        columns = ", ".join(["agent", "campaign", "day"] + SUM_FIELDS + ["hist_" + h for h in HIST_FIELDS])
+        rows = [
+            key + tuple(r.sums[f] for f in SUM_FIELDS) + tuple(r.hists[h].to_bytes() for h in HIST_FIELDS)
+            for key, r in self.pending.items()
+        ]
+        with self.conn:
+            self.conn.executemany(f"INSERT OR REPLACE INTO kpi_rollups ({columns}) VALUES ({placeholders})", rows)
+            self.conn.executemany("INSERT INTO kpi_ingested (call_id, day) VALUES (?, ?)", self.pending_ids.items())
+        count = len(rows)
+        self.pending.clear()
+        self.pending_ids.clear()
+        return count
+
+    def query(self, start, end, agent=None, campaign=None, group_by=None):
+        """Merge rollups for [start, end] (ISO dates); group_by is agent, campaign, day or None"""
+        self.flush()
+        sql = (f"SELECT agent, campaign, day, {', '.join(SUM_FIELDS)}, {', '.join('hist_' + h for h in HIST_FIELDS)} "
+               "FROM kpi_rollups WHERE day >= ? AND day <= ?")
+        params = [str(start), str(end)]
+        if UNDATED not in (str(start), str(end)):
+            sql += " AND day != ?"
+            params.append(UNDATED)
+        if agent:
+            sql += " AND agent = ?"
+            params.append(agent)
+        if campaign:
+            sql += " AND campaign = ?"
+            params.append(campaign)
+
+        groups = {}
+        key_index = {"agent": 0, "campaign": 1, "day": 2}.get(group_by)
+        for row in self.conn.execute(sql, params):
+            r = Rollup()
+            r.sums = dict(zip(SUM_FIELDS, row[3:3 + len(SUM_FIELDS)]))
+            for name, blob in zip(HIST_FIELDS, row[3 + len(SUM_FIELDS):]):
+                r.hists[name] = LogHistogram.from_bytes(blob)
+            group = row[key_index] if key_index is not None else "all"
+            if group in groups:
+                groups[group].merge(r)
+            else:
+                groups[group] = r
+        return {g: r.summary() for g, r in sorted(groups.items())}
+
+    def close(self):
+        self.flush()
+        self.conn.close()
+
+
+def iter_result_files(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            yield from sorted(glob.glob(os.path.join(path, "*.json")))
+        else:
+            yield path
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    db = DB_PATH
+    if "--db" in args:
+        idx = args.index("--db")
+        db = args[idx + 1]
+        del args[idx:idx + 2]
+
+    if not args or args[0] not in ("ingest", "query"):
+        print(__doc__)
+        sys.exit(1)
+
+    store = RollupStore(db)
+
+    if args[0] == "ingest":
+        count = skipped = 0
+        for path in iter_result_files(args[1:]):
+            with open(path) as f:
+                data = json.load(f)
+            if "analysis" not in data.get("result", data):
+                continue
+            if store.add_call(data):
+                count += 1
+            else:
+                skipped += 1
+        rows = store.flush()
+        print(f"Folded {count} calls into {rows} rollup rows ({db}), {skipped} already ingested")
+        if store.undated:
+            print(f"  {store.undated} calls have no started_at; they are under day '{UNDATED}', outside date ranges")
+    else:
+        opts = dict(zip(args[1::2], args[2::2]))
+        end = opts.get("--to", date.today().isoformat())
+        start = opts.get("--from", end if end == UNDATED else (date.fromisoformat(end) - timedelta(days=30)).isoformat())
+        t0 = datetime.now()
+        groups = store.query(start, end, agent=opts.get("--agent"), campaign=opts.get("--campaign"), group_by=opts.get("--by"))
+        elapsed = (datetime.now() - t0).total_seconds() * 1000
+        print(f"KPI ROLLUP {start} .. {end} ({elapsed:.1f}ms)")
+        print("=" * 60)
+        for group, summary in groups.items():
+            print(f"{group}: {json.dumps(summary)}")
+
+    store.close()
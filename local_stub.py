@@ -0,0 +1,429 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for Deepgram and the analysis API.
+
+Serves cached responses so the Python batch tools can be exercised without
+spending ASR/LLM credits:
+
+    POST /v1/listen          -> new_call_response.json
+    POST /api/analyze-simple -> simple_analysis_full_output.json
+    POST /api/analyze        -> full_api_response.json
+    POST /api/analyze-v2     -> {success, data, metadata} built from simple_analysis_full_output.json
+    POST /v1/chat/completions -> OpenAI-style completion whose JSON content is picked by the json_schema name
+    POST /api/webhooks/convoso-calls, convoso-calls-immediate, convoso-leads
+                             -> {"ok": true}, with the routes' auth and required-field checks
+    GET  /api/jobs/progress?id=<call>|job=<batch>
+                             -> SSE progress stream, fed by POST /stub/progress {"id"|"job", "status", "detail"}
+
+Usage:
+    python local_stub.py [--port 3999] [--latency 0.2] [--fail-rate 0.0] [--webhook-tokens agt_a,agt_b]
+                         [--progress-mode push|poll] [--capacity 8]
+
+Webhook routes accept any agt_ token in X-Agency-Token unless --webhook-tokens
+restricts them to a list.
+
+--capacity simulates an upstream quota: at most N Deepgram/analyze requests
+are served at once, others queue for up to CAPACITY_QUEUE_FACTOR service
+times and then get 429, so latency grows before errors start.
+
+The progress route either fans published events out to every subscriber
+(push, like src/lib/progress-feed.ts) or has each subscriber re-read the
+status once a second (poll, the old route); /stats counts the simulated
+database queries either way, and counts analysis requests that carried
+their own Deepgram response (so the real route would skip ASR).
+
+/api/analyze-simple and /api/analyze-v2 report a per-stage split of
+--latency (metadata.stages, data.timing) and token counts estimated from the
+cached transcript, so analyze_compare.py --stub can check its parsing.
+
+/v1/chat/completions stands in for an OpenAI-compatible server. The reply
+is fixed per response_format: the white card schemas (WhiteCard,
+Pass3WhiteCard, CallAnalysis) get the cached analysis, Mentions,
+Pass1Extraction and plain json_object get its mentions table, Rebuttals gets
+no rebuttals, and any other schema gets the empty value of that schema. A
+dev server with OPENAI_BASE_URL=http://localhost:3999/v1 then answers the
+same for every run, so analyze_compare.py --base sees fixed LLM output.
+
+Then point the tools at it:
+    DEEPGRAM_URL=http://localhost:3999/v1/listen ANALYZE_URL=http://localhost:3999/api/analyze-simple
+
+or a dev server's ASR (src/lib/asr-nova2.ts), so its analysis routes run for
+real on the cached call:
+    DEEPGRAM_BASE_URL=http://localhost:3999 npm run dev
+    DEEPGRAM_BASE_URL=http://localhost:3999 OPENAI_BASE_URL=http://localhost:3999/v1 npm run dev   # no LLM either
+"""
+import json
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+ROUTES = {
+    "/v1/listen": "new_call_response.json",
+    "/api/analyze-simple": "simple_analysis_full_output.json",
+    "/api/analyze": "full_api_response.json",
+}
+
+# Stage name -> share of --latency on the analysis routes, in rough production proportions
+TWO_PASS_STAGES = (("transcribe", 12.0), ("pass_a", 6.0), ("rebuttals", 3.0), ("pass_b", 9.0))
+V2_STAGES = (("deepgram_ms", 12.0), ("openai_pass1_ms", 6.0), ("openai_pass2_ms", 5.0), ("compliance_ms", 1.0),
+             ("openai_pass3_ms", 9.0))
+
+CAPACITY_QUEUE_FACTOR = 2.0
+
+CHAT_ROUTE = "/v1/chat/completions"
+# json_schema name -> what the reply holds, from simple_analysis_full_output.json
+CHAT_FIXTURES = {
+    "WhiteCard": "analysis",
+    "Pass3WhiteCard": "analysis",
+    "CallAnalysis": "analysis",
+    "Mentions": "mentions_table",
+    "Pass1Extraction": "mentions_table",
+    "json_object": "mentions_table",
+    "Rebuttals": "rebuttals",
+}
+
+PROGRESS_ROUTE = "/api/jobs/progress"
+PROGRESS_POLL_SEC = 1.0
+PROGRESS_MAX_SEC = 600
+PROGRESS_TERMINAL = {"done", "error", "complete", "failed"}
+
+WEBHOOK_ROUTES = {
+    "/api/webhooks/convoso-calls",
+    "/api/webhooks/convoso-calls-immediate",
+    "/api/webhooks/convoso-leads",
+}
+
+
+def split_ms(latency, stages):
+    total = sum(weight for _, weight in stages)
+    return {name: round(latency * 1000 * weight / total) for name, weight in stages}
+
+
+def estimate_tokens(value):
+    # ~4 characters per token is close enough for comparing paths
+    return len(value if isinstance(value, str) else json.dumps(value)) // 4
+
+
+def analysis_bodies(simple, latency):
+    """Shape the cached two-pass analysis into what /api/analyze-simple and /api/analyze-v2 return"""
+    transcript = simple.get("transcript") or ""
+    mentions, analysis = simple.get("mentions_table") or {}, simple.get("analysis") or {}
+    pass_a = {"input": estimate_tokens(transcript), "output": estimate_tokens(mentions)}
+    pass_b = {"input": pass_a["input"] + pass_a["output"], "output": estimate_tokens(analysis)}
+    stages = {"status": {name: "miss" for name, _ in TWO_PASS_STAGES}, "timings_ms": split_ms(latency, TWO_PASS_STAGES),
+              "tokens": {"pass_a": pass_a, "pass_b": pass_b}}
+    metadata = dict(simple.get("metadata") or {}, stages=stages, transcript_source="asr")
+
+    two_pass = dict(simple, metadata=metadata)
+
+    timing = split_ms(latency, V2_STAGES)
+    timing["total_ms"] = sum(timing.values())
+    tokens = {"pass1_input": pass_a["input"], "pass1_output": pass_a["output"],
+              "pass2_input": pass_a["input"], "pass2_output": pass_a["output"] // 2,
+              "pass3_input": pass_b["input"], "pass3_output": pass_b["output"]}
+    tokens["total_input"] = tokens["pass1_input"] + tokens["pass2_input"] + tokens["pass3_input"]
+    tokens["total_output"] = tokens["pass1_output"] + tokens["pass2_output"] + tokens["pass3_output"]
+    data = dict(analysis, transcript=transcript, deepgram_summary=simple.get("deepgram_summary"),
+                pass1_extraction=mentions, timing=timing, tokens=tokens, duration_ms=timing["total_ms"],
+                analysis_version="v2_3pass_sequential")
+    v2 = {"success": True, "data": data,
+          "metadata": {"analysis_version": "v2_3pass_sequential", "duration_ms": timing["total_ms"]}}
+    return {"/api/analyze-simple": two_pass, "/api/analyze-v2": v2}
+
+
+def schema_default(schema):
+    """Smallest value that fits a JSON schema: required keys only, empty strings and lists, zeros"""
+    if "enum" in schema:
+        return schema["enum"][0]
+    for key in ("anyOf", "oneOf"):
+        if schema.get(key):
+            return schema_default(schema[key][0])
+    kind = schema.get("type")
+    if isinstance(kind, list):
+        kind = "null" if "null" in kind else kind[0]
+    if kind == "object":
+        properties = schema.get("properties") or {}
+        return {name: schema_default(properties.get(name, {})) for name in schema.get("required", properties)}
+    return {"array": [], "string": "", "number": 0, "integer": 0, "boolean": False}.get(kind)
+
+
+def chat_completion(simple, request):
+    """OpenAI chat completion answering `request` with the fixture its response_format asks for"""
+    response_format = request.get("response_format") or {}
+    schema = response_format.get("json_schema") or {}
+    fixture = CHAT_FIXTURES.get(schema.get("name") or response_format.get("type"))
+    if fixture == "rebuttals":
+        content = {"used": [], "missed": []}
+    elif fixture:
+        content = simple.get(fixture) or {}
+    else:
+        content = schema_default(schema.get("schema") or {})
+    content = json.dumps(content)
+    prompt = estimate_tokens(request.get("messages") or [])
+    completion = estimate_tokens(content)
+    return {"id": "chatcmpl-stub", "object": "chat.completion", "created": 0, "model": request.get("model"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": prompt, "completion_tokens": completion,
+                      "total_tokens": prompt + completion}}
+
+
+class StubState:
+    """Shared knobs and counters for the stub server"""
+
+    def __init__(self, latency=0.2, fail_rate=0.0, webhook_tokens=None, progress_mode="push", capacity=None):
+        self.latency = latency
+        self.slots = threading.BoundedSemaphore(capacity) if capacity else None
+        self.fail_rate = fail_rate
+        self.webhook_tokens = set(webhook_tokens) if webhook_tokens else None
+        self.progress_mode = progress_mode
+        self.lock = threading.Lock()
+        self.requests = {}
+        self.progress = {}          # channel -> latest event (the "database" row)
+        self.subscribers = {}       # channel -> set of queues (push mode)
+        self.db_queries = 0
+        self.bodies = {}
+        for route, filename in ROUTES.items():
+            with open(os.path.join(HERE, filename), "rb") as f:
+                self.bodies[route] = f.read()
+        # /api/analyze keeps serving full_api_response.json as is; other tools read that shape
+        shaped = analysis_bodies(json.loads(self.bodies["/api/analyze-simple"]), latency)
+        for route, body in shaped.items():
+            self.bodies[route] = json.dumps(body).encode()
+        # Source of the chat completion fixtures
+        self.simple = json.loads(self.bodies["/api/analyze-simple"])
+        # What the two-pass route reports when the caller sent its own Deepgram response
+        simple = json.loads(self.bodies["/api/analyze-simple"])
+        simple["metadata"] = dict(simple["metadata"], transcript_source="request")
+        self.supplied_bodies = {"/api/analyze-simple": json.dumps(simple).encode()}
+
+    def count(self, route):
+        with self.lock:
+            self.requests[route] = self.requests.get(route, 0) + 1
+
+    def read_progress(self, channel, query=True):
+        """Current status; `query` counts it as a database read"""
+        with self.lock:
+            if query:
+                self.db_queries += 1
+            return self.progress.get(channel)
+
+    def publish(self, channel, status, detail=None):
+        event = {"status": status, "detail": detail, "ts": time.time() * 1000}
+        with self.lock:
+            self.progress[channel] = event
+            if self.progress_mode == "push":
+                self.db_queries += 1        # the single NOTIFY
+                for q in self.subscribers.get(channel, ()):
+                    q.put(event)
+        return event
+
+    def subscribe(self, channel):
+        """Returns (queue, first) where first means nobody was watching the channel yet"""
+        q = queue.Queue()
+        with self.lock:
+            subs = self.subscribers.setdefault(channel, set())
+            first = not subs
+            subs.add(q)
+        return q, first
+
+    def unsubscribe(self, channel, q):
+        with self.lock:
+            subs = self.subscribers.get(channel)
+            if subs:
+                subs.discard(q)
+                if not subs:
+                    del self.subscribers[channel]
+
+
+def make_handler(state):
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True      # headers and body go out as separate writes
+
+        def log_message(self, format, *args):
+            pass
+
+        def send_json(self, status, body):
+            if not isinstance(body, bytes):
+                body = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/stats":
+                with state.lock:
+                    subscribers = sum(len(subs) for subs in state.subscribers.values())
+                    self.send_json(200, {"requests": dict(state.requests), "db_queries": state.db_queries,
+                                         "progress_mode": state.progress_mode, "subscribers": subscribers})
+            elif self.path.startswith(PROGRESS_ROUTE):
+                state.count(PROGRESS_ROUTE)
+                self.progress_stream()
+            else:
+                self.send_json(404, {"error": "not found"})
+
+        def progress_stream(self):
+            params = parse_qs(urlsplit(self.path).query)
+            if "id" in params:
+                channel = f"call-{params['id'][0]}"
+            elif "job" in params:
+                channel = f"job-{params['job'][0]}"
+            else:
+                self.send_json(400, {"error": "Missing call ID"})
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            self.close_connection = True
+
+            def send(event):
+                self.wfile.write(f"data: {json.dumps(event)}\n\n".encode())
+                self.wfile.flush()
+                return event["status"] in PROGRESS_TERMINAL
+
+            deadline = time.time() + PROGRESS_MAX_SEC
+            try:
+                if state.progress_mode == "poll":
+                    last = None
+                    while time.time() < deadline:
+                        event = state.read_progress(channel)
+                        if event is not None and event is not last:
+                            last = event
+                            if send(event):
+                                return
+                        time.sleep(PROGRESS_POLL_SEC)
+                    return
+                q, first = state.subscribe(channel)
+                try:
+                    # Only the first subscriber seeds from the database; later ones get the feed's snapshot
+                    event = state.read_progress(channel, query=first)
+                    if event is not None and send(event):
+                        return
+                    while time.time() < deadline:
+                        try:
+                            event = q.get(timeout=15)
+                        except queue.Empty:
+                            self.wfile.write(b": keepalive\n\n")
+                            self.wfile.flush()
+                            continue
+                        if send(event):
+                            return
+                finally:
+                    state.unsubscribe(channel, q)
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+        def webhook(self, route, raw):
+            """Mirror the webhook routes: token auth (except -immediate), then required fields"""
+            if route != "/api/webhooks/convoso-calls-immediate":
+                token = self.headers.get("X-Agency-Token") or ""
+                if not token.startswith("agt_") or (state.webhook_tokens is not None and token not in state.webhook_tokens):
+                    self.send_json(401, {"ok": False, "error": "Invalid or inactive webhook token"})
+                    return
+            try:
+                body = json.loads(raw or b"{}")
+            except ValueError:
+                self.send_json(500, {"ok": False, "error": "Invalid JSON"})
+                return
+            if route.endswith("convoso-leads"):
+                if not (body.get("lead_id") or body.get("phone_number") or body.get("email")):
+                    self.send_json(400, {"ok": False, "error": "Missing required fields"})
+                    return
+            elif not (body.get("agent_name") and body.get("disposition") and body.get("duration") is not None):
+                self.send_json(400, {"ok": False, "error": "Missing required fields: agent_name, disposition, duration"})
+                return
+            self.send_json(200, {"ok": True})
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            raw = self.rfile.read(length) if length else b""
+
+            route = self.path.split("?", 1)[0]
+            if route == "/stub/progress":
+                body = json.loads(raw or b"{}")
+                channel = f"job-{body['job']}" if "job" in body else f"call-{body['id']}"
+                self.send_json(200, state.publish(channel, body["status"], body.get("detail")))
+                return
+            if route in WEBHOOK_ROUTES:
+                state.count(route)
+                time.sleep(state.latency)
+                self.webhook(route, raw)
+                return
+            if route == CHAT_ROUTE:
+                body = json.dumps(chat_completion(state.simple, json.loads(raw or b"{}"))).encode()
+            elif route not in state.bodies:
+                self.send_json(404, {"error": "not found"})
+                return
+            else:
+                body = state.bodies[route]
+
+            state.count(route)
+            if route.startswith("/api/analyze") and raw and json.loads(raw).get("deepgram"):
+                # The caller sent its transcript, so the real route would not run ASR again
+                state.count(f"{route} (transcript supplied)")
+                body = state.supplied_bodies.get(route, body)
+            if state.slots is not None:
+                if not state.slots.acquire(timeout=max(0.01, state.latency * CAPACITY_QUEUE_FACTOR)):
+                    self.send_json(429, {"error": "rate_limit_exceeded"})
+                    return
+                try:
+                    time.sleep(state.latency)
+                finally:
+                    state.slots.release()
+            else:
+                time.sleep(state.latency)
+
+            if state.fail_rate and random.random() < state.fail_rate:
+                self.send_json(503, {"error": "stub failure"})
+                return
+
+            self.send_json(200, body)
+
+    return StubHandler
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 512     # hundreds of SSE subscribers connect at once
+
+
+def serve(port=3999, latency=0.2, fail_rate=0.0, webhook_tokens=None, progress_mode="push", capacity=None):
+    """Start the stub in a background thread; returns (server, state)"""
+    state = StubState(latency, fail_rate, webhook_tokens, progress_mode, capacity)
+    server = StubServer(("127.0.0.1", port), make_handler(state))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state
+
+
+if __name__ == "__main__":
+    opts = dict(zip(sys.argv[1::2], sys.argv[2::2]))
+    port = int(opts.get("--port", 3999))
+    tokens = opts["--webhook-tokens"].split(",") if "--webhook-tokens" in opts else None
+    server, state = serve(port, float(opts.get("--latency", 0.2)), float(opts.get("--fail-rate", 0.0)), tokens,
+                          opts.get("--progress-mode", "push"),
+                          int(opts["--capacity"]) if "--capacity" in opts else None)
+
+    print(f"Local stub listening on http://127.0.0.1:{port}")
+    for route, filename in ROUTES.items():
+        print(f"  POST {route} -> {filename}")
+    print("  POST /api/analyze-v2")
+    print(f"  POST {CHAT_ROUTE}")
+    for route in sorted(WEBHOOK_ROUTES):
+        print(f"  POST {route}")
+    print(f"  GET  {PROGRESS_ROUTE} ({state.progress_mode})")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Minimal OpenMetrics / Prometheus exporter for the batch clients.
+
+Counters, gauges and histograms live in an in-process registry; recording a
+sample is a dict lookup and an addition under a lock, so it is safe to call
+on every request. The registry can be scraped over HTTP (serve) or written
+periodically to a node_exporter textfile-collector file (TextfileWriter).
+
+    from metrics import REGISTRY, track
+    with track("deepgram"):
+        response = session.post(...)
+
+Usage (inspect what a running exporter serves):
+    python metrics.py scrape [http://127.0.0.1:9464/metrics]
+"""
+import bisect
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+
+def _label_str(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def _fmt(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, registry, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.lock = registry.lock
+        self.values = {}
+        registry.register(self)
+
+    def _key(self, labels):
+        return tuple(labels.get(name, "") for name in self.labels)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self.values.get(self._key(labels), 0)
+
+    def samples(self, const):
+        for key, value in self.values.items():
+            yield f"{self.name}_total{_label_str(self.labels, key, const)} {_fmt(value)}"
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def __init__(self, registry, name, help_text, labels=(), fn=None):
+        super().__init__(registry, name, help_text, labels)
+        self.fn = fn        # computed at scrape time when given
+
+    def set(self, value, **labels):
+        with self.lock:
+            self.values[self._key(labels)] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def samples(self, const):
+        if self.fn is not None:
+            yield f"{self.name}{_label_str((), (), const)} {_fmt(self.fn())}"
+            return
+        for key, value in self.values.items():
+            yield f"{self.name}{_label_str(self.labels, key, const)} {_fmt(value)}"
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, registry, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(registry, name, help_text, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            state = self.values.get(key)
+            if state is None:
+                state = self.values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def samples(self, const):
+        for key, (counts, total, count) in self.values.items():
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = (("le", _fmt(float(bound))),)
+                yield f"{self.name}_bucket{_label_str(self.labels, key, tuple(const) + le)} {cumulative}"
+            yield f"{self.name}_sum{_label_str(self.labels, key, const)} {_fmt(total)}"
+            yield f"{self.name}_count{_label_str(self.labels, key, const)} {count}"
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.metrics = []
+        self.const_labels = ()
+
+    def register(self, metric):
+        self.metrics.append(metric)
+
+    def set_const_labels(self, **labels):
+        """Labels added to every series, e.g. worker="shard1" when several processes export"""
+        self.const_labels = tuple(labels.items())
+
+    def render(self, openmetrics=True):
+        """OpenMetrics exposition, or the classic Prometheus text format the textfile collector reads"""
+        lines = []
+        with self.lock:
+            for metric in self.metrics:
+                family = metric.name if openmetrics or metric.kind != "counter" else f"{metric.name}_total"
+                lines.append(f"# HELP {family} {metric.help}")
+                lines.append(f"# TYPE {family} {metric.kind}")
+                lines.extend(metric.samples(self.const_labels))
+        if openmetrics:
+            lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+STARTED_AT = time.time()
+
+IN_FLIGHT = Gauge(REGISTRY, "callai_requests_in_flight", "Upstream requests currently in flight", ("endpoint",))
+LATENCY = Histogram(REGISTRY, "callai_request_duration_seconds", "Upstream request latency", ("endpoint",))
+REQUESTS = Counter(REGISTRY, "callai_requests", "Upstream requests by status", ("endpoint", "status"))
+BYTES_DOWN = Counter(REGISTRY, "callai_downloaded_bytes", "Response bytes received", ("endpoint",))
+BYTES_UP = Counter(REGISTRY, "callai_uploaded_bytes", "Request bytes sent", ("endpoint",))
+RETRIES = Counter(REGISTRY, "callai_retries", "Failed attempts scheduled for retry", ("stage",))
+CACHE = Counter(REGISTRY, "callai_cache_lookups", "Transcript cache lookups", ("cache", "result"))
+AUDIO_SECONDS = Counter(REGISTRY, "callai_audio_seconds", "Seconds of audio transcribed")
+RECORDINGS = Counter(REGISTRY, "callai_recordings", "Recordings finished by outcome", ("outcome",))
+
+
+def _cache_hit_ratio():
+    hits = sum(v for k, v in CACHE.values.items() if k[1] == "hit")
+    total = sum(CACHE.values.values())
+    return hits / total if total else 0.0
+
+
+def _audio_rate():
+    elapsed = time.time() - STARTED_AT
+    return sum(AUDIO_SECONDS.values.values()) / elapsed if elapsed > 0 else 0.0
+
+
+Gauge(REGISTRY, "callai_cache_hit_ratio", "Cache hits / lookups since start", fn=_cache_hit_ratio)
+Gauge(REGISTRY, "callai_audio_seconds_per_wall_second", "Audio seconds transcribed per wall second since start",
+      fn=_audio_rate)
+
+
+class RequestRecord:
+    __slots__ = ("status", "sent", "received")
+
+    def __init__(self):
+        self.status = "error"
+        self.sent = 0
+        self.received = 0
+
+
+@contextmanager
+def track(endpoint):
+    """Time one upstream request; the caller may set `.status`, `.sent` and `.received` on the yielded record"""
+    record = RequestRecord()
+    IN_FLIGHT.inc(endpoint=endpoint)
+    t0 = time.perf_counter()
+    try:
+        yield record
+    finally:
+        LATENCY.observe(time.perf_counter() - t0, endpoint=endpoint)
+        IN_FLIGHT.dec(endpoint=endpoint)
+        REQUESTS.inc(endpoint=endpoint, status=str(record.status))
+        if record.sent:
+            BYTES_UP.inc(record.sent, endpoint=endpoint)
+        if record.received:
+            BYTES_DOWN.inc(record.received, endpoint=endpoint)
+
+
+def serve(port=9464, registry=REGISTRY, host="127.0.0.1"):
+    """Expose /metrics on a background thread; returns the server"""
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class TextfileWriter:
+    """Rewrite a textfile-collector .prom file every `interval` seconds (atomically)"""
+
+    def __init__(self, path, interval=15, registry=REGISTRY):
+        self.path = path
+        self.interval = interval
+        self.registry = registry
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+        self.thread.start()
+
+    def write(self):
+        tmp = f"{self.path}.tmp{os.getpid()}"
+        with open(tmp, "w") as f:
+            f.write(self.registry.render(openmetrics=False))
+        os.replace(tmp, self.path)
+
+    def _loop(self):
+        while not self.stopped.wait(self.interval):
+            self.write()
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+        self.write()
+
+
+def shard_path(path, index):
+    """backfill.prom -> backfill-shard2.prom, so each process writes its own file"""
+    root, ext = os.path.splitext(path)
+    return f"{root}-shard{index}{ext or '.prom'}"
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if not args or args[0] != "scrape":
+        print(__doc__)
+        sys.exit(1)
+    from urllib.request import urlopen
+
+    url = args[1] if len(args) > 1 else "http://127.0.0.1:9464/metrics"
+    with urlopen(url, timeout=10) as response:
+        sys.stdout.write(response.read().decode())
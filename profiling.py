@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Profiling hooks for the Python analysis tools.
+
+Decorate a function with @profiled and it is timed whenever profiling is on:
+wall and CPU time per call, optional tracemalloc peak per stage, and
+self-time per call stack in collapsed ("folded") form that flamegraph.pl,
+speedscope and inferno accept. cProfile can run alongside for a pstats dump.
+When profiling is off the wrapper costs one attribute check per call.
+
+Switch it on with the ANALYSIS_PROFILE environment variable (a comma list of
+timers, memory, cprofile, or "all"); the report is printed at exit and
+analysis.folded / analysis.prof are written to ANALYSIS_PROFILE_DIR:
+
+    ANALYSIS_PROFILE=timers,memory python test_deepgram_optimized.py
+
+or profile the analysis functions of test_deepgram_optimized.py over a batch
+of cached Deepgram responses without calling the API:
+
+    python profiling.py <cached-dir-or-files ...> [--repeat 20] [--memory]
+                        [--cprofile analysis.prof] [--collapsed analysis.folded]
+"""
+import atexit
+import contextlib
+import cProfile
+import functools
+import glob
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+PROFILE_ENV = os.getenv("ANALYSIS_PROFILE", "")
+PROFILE_DIR = os.getenv("ANALYSIS_PROFILE_DIR", ".")
+MODES = ("timers", "memory", "cprofile")
+
+
+class _State:
+    def __init__(self):
+        self.enabled = False
+        self.memory = False
+        self.profiler = None
+        self.stack = []
+        self.stats = {}         # name -> {"calls", "wall", "cpu", "max_wall", "peak_bytes"}
+        self.collapsed = {}     # "outer;inner" -> self time in microseconds
+
+
+_state = _State()
+
+
+def enable(modes=("timers",), report_at_exit=False):
+    """Turn profiling on; modes is any of timers, memory, cprofile (or "all")"""
+    modes = set(MODES) if "all" in modes else set(modes)
+    _state.enabled = True
+    if "memory" in modes and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        _state.memory = True
+    if "cprofile" in modes and _state.profiler is None:
+        _state.profiler = cProfile.Profile()
+        _state.profiler.enable()
+    if report_at_exit:
+        atexit.register(_report_at_exit)
+
+
+def disable():
+    _state.enabled = False
+    if _state.profiler is not None:
+        _state.profiler.disable()
+    if _state.memory:
+        tracemalloc.stop()
+        _state.memory = False
+
+
+def reset():
+    _state.stats = {}
+    _state.collapsed = {}
+    _state.stack = []
+
+
+def _enter(label):
+    frame = [label, 0.0, 0]             # name, time spent in profiled children, memory baseline
+    _state.stack.append(frame)
+    if _state.memory:
+        frame[2] = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+    return frame, time.perf_counter(), time.process_time()
+
+
+def _exit(token):
+    frame, wall0, cpu0 = token
+    wall = time.perf_counter() - wall0
+    cpu = time.process_time() - cpu0
+    stack_key = ";".join(f[0] for f in _state.stack)
+    _state.stack.pop()
+    if _state.stack:
+        _state.stack[-1][1] += wall
+    _state.collapsed[stack_key] = _state.collapsed.get(stack_key, 0) + int((wall - frame[1]) * 1e6)
+
+    s = _state.stats.get(frame[0])
+    if s is None:
+        s = _state.stats[frame[0]] = {"calls": 0, "wall": 0.0, "cpu": 0.0, "max_wall": 0.0, "peak_bytes": 0}
+    s["calls"] += 1
+    s["wall"] += wall
+    s["cpu"] += cpu
+    s["max_wall"] = max(s["max_wall"], wall)
+    if _state.memory:
+        # Peak is since this stage started; a nested stage resets it, so outer peaks are lower bounds
+        s["peak_bytes"] = max(s["peak_bytes"], tracemalloc.get_traced_memory()[1] - frame[2])
+
+
+def profiled(fn=None, name=None):
+    """Decorator recording wall/CPU time (and peak memory) for each call of `fn`"""
+    if fn is None:
+        return functools.partial(profiled, name=name)
+    label = name or fn.__name__
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not _state.enabled:
+            return fn(*args, **kwargs)
+        token = _enter(label)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _exit(token)
+
+    return wrapper
+
+
+@contextlib.contextmanager
+def stage(name):
+    """Profile an arbitrary block as if it were a decorated function"""
+    if not _state.enabled:
+        yield
+        return
+    token = _enter(name)
+    try:
+        yield
+    finally:
+        _exit(token)
+
+
+def stats():
+    return {name: dict(s) for name, s in _state.stats.items()}
+
+
+def write_collapsed(path):
+    """Folded stacks ("a;b;c <microseconds>") for flamegraph tools"""
+    with open(path, "w") as f:
+        for key, micros in sorted(_state.collapsed.items()):
+            if micros > 0:
+                f.write(f"{key} {micros}\n")
+
+
+def write_pstats(path):
+    if _state.profiler is None:
+        return False
+    _state.profiler.disable()
+    _state.profiler.dump_stats(path)
+    return True
+
+
+def report(out=None):
+    """Print per-function timing, sorted by total wall time"""
+    out = out or sys.stderr
+    if not _state.stats:
+        return
+    memory = any(s["peak_bytes"] for s in _state.stats.values())
+    print("\nPROFILE", file=out)
+    print("-" * 60, file=out)
+    header = f"{'function':34s} {'calls':>7s} {'wall ms':>10s} {'cpu ms':>10s} {'mean ms':>9s} {'max ms':>9s}"
+    print(header + (f" {'peak KB':>9s}" if memory else ""), file=out)
+    for name, s in sorted(_state.stats.items(), key=lambda item: -item[1]["wall"]):
+        line = (f"{name:34s} {s['calls']:7d} {s['wall'] * 1000:10.1f} {s['cpu'] * 1000:10.1f} "
+                f"{s['wall'] * 1000 / s['calls']:9.3f} {s['max_wall'] * 1000:9.3f}")
+        print(line + (f" {s['peak_bytes'] / 1024:9.1f}" if memory else ""), file=out)
+
+
+def _report_at_exit():
+    report()
+    if _state.collapsed:
+        path = os.path.join(PROFILE_DIR, "analysis.folded")
+        write_collapsed(path)
+        print(f"Collapsed stacks written to {path}", file=sys.stderr)
+    path = os.path.join(PROFILE_DIR, "analysis.prof")
+    if write_pstats(path):
+        print(f"pstats written to {path}", file=sys.stderr)
+
+
+if PROFILE_ENV:
+    enable(PROFILE_ENV.split(","), report_at_exit=True)
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    opts = {}
+    for flag in ("--repeat", "--cprofile", "--collapsed"):
+        if flag in args:
+            idx = args.index(flag)
+            opts[flag] = args[idx + 1]
+            del args[idx:idx + 2]
+    modes = ["timers"]
+    if "--memory" in args:
+        args.remove("--memory")
+        modes.append("memory")
+    if "--cprofile" in opts:
+        modes.append("cprofile")
+
+    files = []
+    for path in args or ["new_call_response.json"]:
+        files.extend(sorted(glob.glob(os.path.join(path, "*.json"))) if os.path.isdir(path) else [path])
+    results = []
+    for path in files:
+        with open(path) as f:
+            data = json.load(f)
+        data = data.get("result", data)
+        if "results" in data:
+            results.append(data)
+    if not results:
+        print("No cached Deepgram responses found")
+        sys.exit(1)
+
+    # Run against the imported module so state is shared with the decorated functions
+    import profiling
+    import test_deepgram_optimized as analysis
+
+    stages = [analysis.analyze_optimized_features, analysis.analyze_search_hits,
+              analysis.analyze_conversation_dynamics, analysis.show_enriched_transcript]
+    repeat = int(opts.get("--repeat", 20))
+
+    profiling.enable(modes)
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for _ in range(repeat):
+            for result in results:
+                for fn in stages:
+                    fn(result)
+    profiling.disable()
+
+    print("ANALYSIS PROFILE")
+    print("=" * 60)
+    print(f"{len(results)} cached calls x {repeat} repetitions")
+    profiling.report(sys.stdout)
+    if "--cprofile" in opts and profiling.write_pstats(opts["--cprofile"]):
+        print(f"\npstats written to {opts['--cprofile']} (python -m pstats {opts['--cprofile']})")
+    if "--collapsed" in opts:
+        profiling.write_collapsed(opts["--collapsed"])
+        print(f"Collapsed stacks written to {opts['--collapsed']} (flamegraph.pl {opts['--collapsed']} > flame.svg)")
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Async consumer for the /api/jobs/progress SSE feed.
+
+Watches any number of calls (or batch jobs) over one event loop and prints
+each status change with its delivery latency (receive time minus the
+publish "ts" the feed stamps on every event):
+
+    python progress_consumer.py watch <call_id ...> [--job <batch_id>] [--base http://localhost:3000]
+
+The bench command measures fan-out against local_stub.py: N subscribers
+spread over a set of calls, a publisher walking each call through the
+pipeline statuses, once with per-subscriber polling (the old route) and once
+with push fan-out. It reports simulated DB queries per minute and delivery
+latency:
+
+    python progress_consumer.py bench [--subscribers 200] [--calls 20] [--step 0.5]
+"""
+import asyncio
+import json
+import os
+import ssl
+import sys
+import time
+from urllib.parse import urlsplit
+
+BASE_URL = os.getenv("APP_URL", "http://localhost:3000")
+PROGRESS_PATH = "/api/jobs/progress"
+TERMINAL = {"done", "error", "complete", "failed", "timeout"}
+PIPELINE = ["queued", "transcribing", "embedding", "analyzing", "done"]
+
+
+async def stream_events(url, headers=None):
+    """Yield parsed `data:` payloads from an SSE endpoint"""
+    parts = urlsplit(url)
+    secure = parts.scheme == "https"
+    port = parts.port or (443 if secure else 80)
+    reader, writer = await asyncio.open_connection(parts.hostname, port,
+                                                   ssl=ssl.create_default_context() if secure else None)
+    path = parts.path + (f"?{parts.query}" if parts.query else "")
+    lines = [f"GET {path} HTTP/1.1", f"Host: {parts.netloc}", "Accept: text/event-stream",
+             "Cache-Control: no-cache", "Connection: close"]
+    lines.extend(f"{k}: {v}" for k, v in (headers or {}).items())
+    writer.write(("\r\n".join(lines) + "\r\n\r\n").encode())
+    await writer.drain()
+
+    try:
+        status_line = await reader.readline()
+        if b" 200 " not in status_line:
+            raise RuntimeError(f"{url}: {status_line.decode().strip()}")
+        chunked = False
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            if line.lower().startswith(b"transfer-encoding:") and b"chunked" in line.lower():
+                chunked = True
+
+        buffer = b""
+        data = []
+        while True:
+            if chunked:
+                size_line = await reader.readline()
+                if not size_line:
+                    return
+                size = int(size_line.strip() or b"0", 16)
+                if size == 0:
+                    return
+                chunk = await reader.readexactly(size + 2)
+                buffer += chunk[:-2]
+            else:
+                chunk = await reader.read(65536)
+                if not chunk:
+                    return
+                buffer += chunk
+            while b"\n" in buffer:
+                line, buffer = buffer.split(b"\n", 1)
+                line = line.rstrip(b"\r")
+                if not line:
+                    if data:
+                        yield json.loads(b"\n".join(data))
+                        data = []
+                elif line.startswith(b"data:"):
+                    data.append(line[5:].strip())
+    finally:
+        writer.close()
+
+
+async def watch(base, channel_params, on_event, headers=None):
+    """Follow one call/job until a terminal status; on_event(params, event, latency_ms)"""
+    url = f"{base.rstrip('/')}{PROGRESS_PATH}?{channel_params}"
+    async for event in stream_events(url, headers):
+        latency = time.time() * 1000 - event["ts"] if "ts" in event else None
+        on_event(channel_params, event, latency)
+        if event.get("status") in TERMINAL:
+            return
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def run_bench(mode, subscribers, calls, step, port):
+    import requests
+    import local_stub
+
+    server, state = local_stub.serve(port, latency=0, progress_mode=mode)
+    base = f"http://127.0.0.1:{port}"
+    latencies = []
+    session = requests.Session()
+    for n in range(calls):
+        session.post(f"{base}/stub/progress", json={"id": f"bench{n}", "status": "queued"})
+
+    def record(params, event, latency):
+        if latency is not None and event["status"] != "queued":
+            latencies.append(latency)
+
+    queries0 = state.db_queries
+    t0 = time.time()
+    watchers = [asyncio.create_task(watch(base, f"id=bench{i % calls}", record)) for i in range(subscribers)]
+    deadline = time.time() + 10
+    while mode == "push" and sum(len(s) for s in state.subscribers.values()) < subscribers and time.time() < deadline:
+        await asyncio.sleep(0.05)
+    await asyncio.sleep(step)
+
+    loop = asyncio.get_running_loop()
+    for status in PIPELINE[1:]:
+        for n in range(calls):
+            await loop.run_in_executor(None, lambda n=n: session.post(
+                f"{base}/stub/progress", json={"id": f"bench{n}", "status": status}))
+        await asyncio.sleep(step)
+    await asyncio.wait_for(asyncio.gather(*watchers), timeout=30)
+    elapsed = time.time() - t0
+    queries = state.db_queries - queries0
+    server.shutdown()
+    server.server_close()
+    return {"mode": mode, "events": len(latencies), "elapsed": elapsed, "queries": queries,
+            "queries_per_min": queries / elapsed * 60, "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95), "max": max(latencies) if latencies else 0.0}
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    opts = {}
+    for flag in ("--base", "--job", "--subscribers", "--calls", "--step", "--port"):
+        while flag in args:
+            idx = args.index(flag)
+            opts.setdefault(flag, []).append(args[idx + 1])
+            del args[idx:idx + 2]
+
+    if not args or args[0] not in ("watch", "bench"):
+        print(__doc__)
+        sys.exit(1)
+
+    if args[0] == "watch":
+        channels = [f"id={call_id}" for call_id in args[1:]] + [f"job={job}" for job in opts.get("--job", [])]
+        if not channels:
+            print("Nothing to watch: pass call IDs and/or --job <batch_id>")
+            sys.exit(1)
+        base = opts.get("--base", [BASE_URL])[0]
+
+        def show(params, event, latency):
+            lag = f"{latency:7.1f} ms" if latency is not None else "      -   "
+            print(f"{params:40s} {lag}  {event.get('status')}  {json.dumps(event.get('detail') or '')[:80]}")
+
+        async def main():
+            results = await asyncio.gather(*(watch(base, c, show) for c in channels), return_exceptions=True)
+            for channel, result in zip(channels, results):
+                if isinstance(result, Exception):
+                    print(f"{channel}: {result}")
+
+        asyncio.run(main())
+        sys.exit(0)
+
+    subscribers = int(opts.get("--subscribers", ["200"])[0])
+    calls = int(opts.get("--calls", ["20"])[0])
+    step = float(opts.get("--step", ["0.5"])[0])
+    port = int(opts.get("--port", ["3995"])[0])
+
+    print("PROGRESS FAN-OUT BENCH")
+    print("=" * 60)
+    print(f"{subscribers} subscribers over {calls} calls, status change every {step}s\n")
+    print(f"{'mode':6s} {'events':>7s} {'queries':>8s} {'q/min':>9s} {'p50 ms':>8s} {'p95 ms':>8s} {'max ms':>8s}")
+    for mode in ("poll", "push"):
+        r = asyncio.run(run_bench(mode, subscribers, calls, step, port))
+        print(f"{r['mode']:6s} {r['events']:7d} {r['queries']:8d} {r['queries_per_min']:9.0f} "
+              f"{r['p50']:8.1f} {r['p95']:8.1f} {r['max']:8.1f}")
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Priority + shortest-expected-job-first scheduling for recording queues.
+
+Recordings used to be processed in arrival order, so one 40 minute call held
+a worker while dozens of 30 second calls queued behind it, and compliance
+calls waited behind routine ones. Jobs are now ordered by:
+
+    1. priority class   0 = compliance (DNC / compliance campaigns, queue priority >= HIGH_PRIORITY),
+                        1 = routine
+    2. aged cost        expected processing seconds - AGING_RATE * seconds waited
+    3. arrival time
+
+Expected cost comes from the Convoso duration_sec (JOB_OVERHEAD_SEC plus
+SEC_PER_AUDIO_SEC per audio second; DEFAULT_DURATION_SEC when unknown).
+Aging lowers a waiting job's cost over time, so a long call eventually beats
+fresh short ones, and a routine job waiting CLASS_PROMOTE_SEC is promoted a
+class, so a steady stream of compliance calls cannot starve it either.
+
+The same ordering is used by get_next_transcription_job()
+(supabase/migrations/20251019_transcription_queue_scheduling.sql), the
+recording cron routes (src/lib/queue-schedule.ts) and backfill_runner.py's
+journal claims. Keep the constants in step.
+
+Simulation against FIFO on a recorded arrival trace (a Convoso CSV with
+duration_sec, started_at/ended_at, campaign, disposition; a recording
+arrives when its call ends) or on a synthetic one:
+
+    python queue_scheduler.py simulate [--trace calls.csv] [--calls 3000] [--workers 4] [--load 0.85]
+                                       [--aging 0.1] [--seed 7] [--save-trace trace.csv]
+"""
+import csv
+import math
+import os
+import random
+import re
+import sys
+from datetime import datetime, timedelta
+
+CLASS_COMPLIANCE = 0
+CLASS_ROUTINE = 1
+
+JOB_OVERHEAD_SEC = 6.0          # download, queue hops, analysis round trip
+SEC_PER_AUDIO_SEC = 0.12        # ASR + analysis time per second of audio
+DEFAULT_DURATION_SEC = 300      # unknown duration: assume an average 5 minute call
+AGING_RATE = 0.1                # expected seconds forgiven per second waited
+CLASS_PROMOTE_SEC = 900         # routine jobs waiting this long compete as compliance
+HIGH_PRIORITY = 10              # transcription_queue.priority that counts as compliance (10 high, 100 urgent)
+
+COMPLIANCE_PATTERN = re.compile(r"\b(dnc|do[ _-]?not[ _-]?call|compliance|tcpa)\b", re.I)
+COMPLIANCE_CAMPAIGNS = {c.strip().lower() for c in os.getenv("COMPLIANCE_CAMPAIGNS", "").split(",") if c.strip()}
+
+POLICIES = ("fifo", "priority", "sjf", "aged")
+
+
+def priority_class(meta):
+    """0 for DNC-flagged or compliance campaigns and explicitly high priority jobs, else 1"""
+    if (meta.get("priority") or 0) >= HIGH_PRIORITY:
+        return CLASS_COMPLIANCE
+    campaign = (meta.get("campaign") or "").strip()
+    if campaign.lower() in COMPLIANCE_CAMPAIGNS or COMPLIANCE_PATTERN.search(campaign):
+        return CLASS_COMPLIANCE
+    if COMPLIANCE_PATTERN.search(meta.get("disposition") or "") or meta.get("dnc"):
+        return CLASS_COMPLIANCE
+    return CLASS_ROUTINE
+
+
+def expected_seconds(duration_sec):
+    """Expected processing time for a call of `duration_sec` audio seconds"""
+    if not duration_sec or duration_sec <= 0:
+        duration_sec = DEFAULT_DURATION_SEC
+    return JOB_OVERHEAD_SEC + SEC_PER_AUDIO_SEC * float(duration_sec)
+
+
+def schedule_key(cls, expected, waited, arrival, policy="aged", aging=AGING_RATE):
+    """Sort key for a waiting job; the smallest key runs next"""
+    if policy == "fifo":
+        return (arrival,)
+    if policy == "priority":
+        return (cls, arrival)
+    effective = max(CLASS_COMPLIANCE, cls - int(waited // CLASS_PROMOTE_SEC)) if policy == "aged" else cls
+    cost = expected - aging * waited if policy == "aged" else expected
+    return (effective, cost, arrival)
+
+
+def parse_time(value):
+    value = (value or "").strip()
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).replace(tzinfo=None)
+    except ValueError:
+        return None
+
+
+def load_trace(path):
+    """Arrival trace from a Convoso style CSV: one job per call, arriving when the call ends"""
+    jobs = []
+    with open(path, newline="") as f:
+        for rec in csv.DictReader(f):
+            duration = float(rec["duration_sec"]) if rec.get("duration_sec") else None
+            started = parse_time(rec.get("started_at"))
+            ended = parse_time(rec.get("ended_at")) or (started + timedelta(seconds=duration or 0) if started else None)
+            if ended is None:
+                continue
+            jobs.append({"call_id": rec.get("call_id"), "campaign": rec.get("campaign"),
+                         "disposition": rec.get("disposition"), "duration_sec": duration, "ended": ended})
+    if not jobs:
+        return []
+    t0 = min(job["ended"] for job in jobs)
+    for job in jobs:
+        job["arrival"] = (job.pop("ended") - t0).total_seconds()
+    return sorted(jobs, key=lambda job: job["arrival"])
+
+
+def synthesize(calls, workers, load=0.85, seed=7, compliance_share=0.15, bulk_share=0.1):
+    """
+    Dialer-shaped trace: mostly short calls, some 3-8 minute pitches and a tail
+    of 20-45 minute enrollments, Poisson arrivals sized to `load` utilization
+    plus periodic bulk-upload drops
+    """
+    rng = random.Random(seed)
+    durations = []
+    for _ in range(calls):
+        roll = rng.random()
+        if roll < 0.6:
+            durations.append(round(min(120, rng.lognormvariate(math.log(40), 0.5))))
+        elif roll < 0.9:
+            durations.append(rng.randint(180, 480))
+        else:
+            durations.append(rng.randint(1200, 2700))
+    mean_service = sum(expected_seconds(d) for d in durations) / calls
+    span = calls * mean_service / (load * workers)
+
+    jobs = []
+    t = 0.0
+    bulk = int(calls * bulk_share)
+    drop_size = 50
+    rate = (calls - bulk) / span
+    drops = [span * (i + 1) / (bulk // drop_size + 1) for i in range(bulk // drop_size)]
+    for i, duration in enumerate(durations):
+        if i < calls - bulk:
+            t += rng.expovariate(rate)
+            arrival = t
+        else:
+            arrival = drops[min(len(drops) - 1, (i - (calls - bulk)) // drop_size)] if drops else t
+        compliance = rng.random() < compliance_share
+        jobs.append({
+            "call_id": f"SIM-{i:05d}",
+            "campaign": "Medicare DNC Recheck" if compliance and rng.random() < 0.5 else "Open Enrollment",
+            "disposition": "DNC" if compliance else rng.choice(["SALE", "NOT_INTERESTED", "CALLBACK", "NO_ANSWER"]),
+            "duration_sec": duration,
+            "arrival": arrival,
+        })
+    return sorted(jobs, key=lambda job: job["arrival"])
+
+
+def save_trace(jobs, path, epoch=datetime(2025, 1, 6, 9, 0, 0)):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["call_id", "campaign", "disposition", "duration_sec", "started_at", "ended_at"])
+        for job in jobs:
+            ended = epoch + timedelta(seconds=job["arrival"])
+            started = ended - timedelta(seconds=job["duration_sec"] or 0)
+            writer.writerow([job["call_id"], job["campaign"], job["disposition"], job["duration_sec"],
+                             started.isoformat(sep=" ", timespec="seconds"), ended.isoformat(sep=" ", timespec="seconds")])
+
+
+def service_times(jobs, seed=7):
+    """Actual processing seconds: the expected cost with lognormal noise, fixed per trace"""
+    rng = random.Random(seed + 1)
+    return [expected_seconds(job["duration_sec"]) * rng.lognormvariate(0, 0.3) for job in jobs]
+
+
+def simulate(jobs, service, policy, workers, aging=AGING_RATE):
+    """Discrete-event run of `workers` servers; returns time-to-result per job"""
+    classes = [priority_class(job) for job in jobs]
+    expected = [expected_seconds(job["duration_sec"]) for job in jobs]
+    free_at = [0.0] * workers
+    done = [0.0] * len(jobs)
+    pending = []
+    nxt = 0
+    while nxt < len(jobs) or pending:
+        worker = min(range(workers), key=free_at.__getitem__)
+        now = free_at[worker]
+        if not pending:
+            now = max(now, jobs[nxt]["arrival"])
+        while nxt < len(jobs) and jobs[nxt]["arrival"] <= now:
+            pending.append(nxt)
+            nxt += 1
+        pick = min(pending, key=lambda i: schedule_key(classes[i], expected[i], now - jobs[i]["arrival"],
+                                                       jobs[i]["arrival"], policy, aging))
+        pending.remove(pick)
+        free_at[worker] = now + service[pick]
+        done[pick] = free_at[worker] - jobs[pick]["arrival"]
+    return done
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def report(jobs, workers, aging=AGING_RATE, seed=7):
+    service = service_times(jobs, seed)
+    groups = {
+        "all": list(range(len(jobs))),
+        "compliance": [i for i, job in enumerate(jobs) if priority_class(job) == CLASS_COMPLIANCE],
+        "short <2m": [i for i, job in enumerate(jobs) if (job["duration_sec"] or DEFAULT_DURATION_SEC) < 120],
+        "long >=20m": [i for i, job in enumerate(jobs) if (job["duration_sec"] or DEFAULT_DURATION_SEC) >= 1200],
+    }
+    span = max(job["arrival"] for job in jobs) or 1
+    print(f"{len(jobs)} jobs over {span / 3600:.1f}h, {workers} workers, "
+          f"utilization {sum(service) / (workers * span):.0%}, aging {aging}/s, promote after {CLASS_PROMOTE_SEC}s")
+    print("  " + ", ".join(f"{name}: {len(idx)}" for name, idx in groups.items()))
+    print()
+    print(f"{'policy':9s} {'group':11s} {'mean s':>9s} {'p95 s':>9s} {'max s':>9s} {'mean vs fifo':>13s} "
+          f"{'p95 vs fifo':>12s}")
+    baseline = {}
+    for policy in POLICIES:
+        ttr = simulate(jobs, service, policy, workers, aging)
+        for name, idx in groups.items():
+            if not idx:
+                continue
+            values = [ttr[i] for i in idx]
+            mean, p95 = sum(values) / len(values), percentile(values, 95)
+            if policy == "fifo":
+                baseline[name] = (mean, p95)
+            base_mean, base_p95 = baseline[name]
+            print(f"{policy:9s} {name:11s} {mean:9.1f} {p95:9.1f} {max(values):9.1f} "
+                  f"{mean / base_mean:12.2f}x {p95 / base_p95:11.2f}x")
+        print()
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if not args or args[0] != "simulate":
+        print(__doc__)
+        sys.exit(1)
+    opts = dict(zip(args[1::2], args[2::2]))
+    workers = int(opts.get("--workers", 4))
+    seed = int(opts.get("--seed", 7))
+    aging = float(opts.get("--aging", AGING_RATE))
+
+    if "--trace" in opts:
+        jobs = load_trace(opts["--trace"])
+        print(f"Trace {opts['--trace']}")
+    else:
+        jobs = synthesize(int(opts.get("--calls", 3000)), workers, float(opts.get("--load", 0.85)), seed)
+        print("Synthetic trace")
+    if not jobs:
+        print("No jobs with arrival times in trace")
+        sys.exit(1)
+    if "--save-trace" in opts:
+        save_trace(jobs, opts["--save-trace"])
+        print(f"Saved trace to {opts['--save-trace']}")
+
+    print("QUEUE SCHEDULING SIMULATION")
+    print("=" * 60)
+    report(jobs, workers, aging, seed)
@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""
+Indexed local SQLite store for analyzed calls.
+
+test_simple_analysis.py and the backfill runner leave one JSON file per call;
+answering anything across calls meant loading every file. This keeps the
+white-card fields in a normalized, indexed schema (calls + red_flags) with
+batched upserts in WAL mode and a small query API:
+
+    store = ResultsStore("results.db")
+    store.find(outcome="sale", post_dated=True, premium_min=200,
+               date_from="2025-09-15", date_to="2025-09-21")
+
+Usage:
+    python results_store.py ingest <file-dir-or-jsonl> [...] [--db results.db]
+    python results_store.py query [--outcome sale] [--agent A] [--campaign C] [--carrier X]
+                                  [--from 2025-09-01] [--to 2025-09-30] [--premium-min 200]
+                                  [--premium-max 500] [--post-dated] [--limit 20] [--db results.db]
+    python results_store.py bench [--calls 100000]
+"""
+import glob
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+DB_PATH = os.getenv("RESULTS_DB", "results.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS calls (
+    id TEXT PRIMARY KEY,
+    agent_id TEXT,
+    agent_name TEXT,
+    campaign TEXT,
+    call_date TEXT,
+    started_at TEXT,
+    duration_sec REAL,
+    disposition TEXT,
+    outcome TEXT,
+    monthly_premium REAL,
+    enrollment_fee REAL,
+    customer_name TEXT,
+    carrier TEXT,
+    plan_type TEXT,
+    effective_date TEXT,
+    post_dated INTEGER NOT NULL DEFAULT 0,
+    reason TEXT,
+    summary TEXT,
+    analyzed_at TEXT
+);
+CREATE TABLE IF NOT EXISTS red_flags (
+    call_id TEXT NOT NULL REFERENCES calls(id) ON DELETE CASCADE,
+    flag TEXT NOT NULL,
+    PRIMARY KEY (call_id, flag)
+);
+CREATE INDEX IF NOT EXISTS idx_calls_agent ON calls(agent_id, call_date);
+CREATE INDEX IF NOT EXISTS idx_calls_campaign ON calls(campaign, call_date);
+CREATE INDEX IF NOT EXISTS idx_calls_outcome ON calls(outcome, call_date, monthly_premium);
+CREATE INDEX IF NOT EXISTS idx_calls_date ON calls(call_date);
+CREATE INDEX IF NOT EXISTS idx_calls_carrier ON calls(carrier, call_date);
+CREATE INDEX IF NOT EXISTS idx_calls_premium ON calls(monthly_premium);
+CREATE INDEX IF NOT EXISTS idx_calls_post_dated ON calls(post_dated, outcome, call_date) WHERE post_dated = 1;
+CREATE INDEX IF NOT EXISTS idx_red_flags_flag ON red_flags(flag);
+"""
+
+CALL_COLUMNS = [
+    "id", "agent_id", "agent_name", "campaign", "call_date", "started_at", "duration_sec", "disposition",
+    "outcome", "monthly_premium", "enrollment_fee", "customer_name", "carrier", "plan_type", "effective_date",
+    "post_dated", "reason", "summary", "analyzed_at",
+]
+
+
+def number_or_none(value):
+    return float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else None
+
+
+# /api/analyze (legacy card) outcome.sale_status -> analysis outcome
+LEGACY_OUTCOMES = {"sale": "sale", "post_date": "sale", "callback": "callback", "none": "no_sale"}
+
+
+def record_from_result(data, call_id=None):
+    """Normalize a runner result ({"id","meta","result"}), a bare /api/analyze-simple response or a legacy
+    /api/analyze card. call_date comes from the call's own start time only; without one it stays NULL
+    rather than borrowing the analysis time."""
+    meta = data.get("meta") or {}
+    result = data.get("result", data)
+    analysis = result.get("analysis") or {}
+    metadata = result.get("metadata") or {}
+    policy = analysis.get("policy_details") or {}
+    mentions = result.get("mentions_table") or {}
+
+    outcome = analysis.get("outcome")
+    legacy_outcome = result.get("outcome") if isinstance(result.get("outcome"), dict) else {}
+    pricing = (result.get("facts") or {}).get("pricing") or {}
+    contact = result.get("contact_guess") or {}
+    if not analysis and legacy_outcome:
+        # Older /api/analyze responses carry only the legacy card
+        outcome = LEGACY_OUTCOMES.get(legacy_outcome.get("sale_status"))
+        analysis = {
+            "monthly_premium": pricing.get("premium_amount") if pricing.get("premium_unit") in (None, "monthly") else None,
+            "enrollment_fee": pricing.get("signup_fee"),
+            "customer_name": " ".join(filter(None, (contact.get("first_name"), contact.get("last_name")))) or None,
+            "reason": result.get("reason_primary"),
+        }
+
+    post_dated = legacy_outcome.get("sale_status") == "post_date" or bool(legacy_outcome.get("post_date_iso")) or any(
+        m.get("kind") == "post_date" for m in mentions.get("date_mentions") or []
+    )
+
+    started_at = meta.get("started_at")
+    rec_id = call_id or data.get("id") or meta.get("call_id") or metadata.get("deepgram_request_id")
+    if not rec_id:
+        raise ValueError("result has no id, call_id or deepgram_request_id")
+
+    return {
+        "id": str(rec_id),
+        "agent_id": meta.get("agent_id") or analysis.get("agent_id"),
+        "agent_name": meta.get("agent_name") or analysis.get("agent_name") or metadata.get("agent_name"),
+        "campaign": meta.get("campaign"),
+        "call_date": str(started_at)[:10] if started_at else None,
+        "started_at": started_at,
+        "duration_sec": number_or_none(result.get("duration")) or number_or_none(meta.get("duration_sec")),
+        "disposition": meta.get("disposition"),
+        "outcome": outcome,
+        "monthly_premium": number_or_none(analysis.get("monthly_premium")),
+        "enrollment_fee": number_or_none(analysis.get("enrollment_fee")),
+        "customer_name": analysis.get("customer_name"),
+        "carrier": policy.get("carrier"),
+        "plan_type": policy.get("plan_type"),
+        "effective_date": policy.get("effective_date"),
+        "post_dated": 1 if post_dated else 0,
+        "reason": analysis.get("reason"),
+        "summary": analysis.get("summary"),
+        "analyzed_at": metadata.get("processed_at"),
+        "red_flags": list(analysis.get("red_flags") or []),
+    }
+
+
+class ResultsStore:
+    """SQLite-backed, indexed store of analyzed calls"""
+
+    def __init__(self, path=DB_PATH):
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self.conn.executescript(SCHEMA)
+
+    def upsert_many(self, records, batch_size=5000):
+        """Insert or update records in batched transactions; returns the count written"""
+        columns = ", ".join(CALL_COLUMNS)
+        marks = ", ".join("?" for _ in CALL_COLUMNS)
+        updates = ", ".join(f"{c} = excluded.{c}" for c in CALL_COLUMNS if c != "id")
+        sql = f"INSERT INTO calls ({columns}) VALUES ({marks}) ON CONFLICT(id) DO UPDATE SET {updates}"
+
+        written = 0
+        batch = []
+
+        def flush():
+            with self.conn:
+                self.conn.executemany(sql, ([r.get(c) for c in CALL_COLUMNS] for r in batch))
+                ids = [(r["id"],) for r in batch]
+                self.conn.executemany("DELETE FROM red_flags WHERE call_id = ?", ids)
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO red_flags (call_id, flag) VALUES (?, ?)",
+                    ((r["id"], flag) for r in batch for flag in r.get("red_flags", []))
+                )
+
+        for record in records:
+            batch.append(record)
+            if len(batch) >= batch_size:
+                flush()
+                written += len(batch)
+                batch = []
+        if batch:
+            flush()
+            written += len(batch)
+        return written
+
+    def find(self, outcome=None, agent=None, campaign=None, carrier=None, date_from=None, date_to=None,
+             premium_min=None, premium_max=None, post_dated=None, red_flag=None, limit=100, order="call_date DESC"):
+        """Query calls by any combination of indexed fields; returns a list of dicts"""
+        clauses = []
+        params = []
+        for column, value in (("outcome", outcome), ("agent_id", agent), ("campaign", campaign), ("carrier", carrier)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if date_from:
+            clauses.append("call_date >= ?")
+            params.append(str(date_from))
+        if date_to:
+            clauses.append("call_date <= ?")
+            params.append(str(date_to))
+        if premium_min is not None:
+            clauses.append("monthly_premium >= ?")
+            params.append(premium_min)
+        if premium_max is not None:
+            clauses.append("monthly_premium <= ?")
+            params.append(premium_max)
+        if post_dated is not None:
+            clauses.append("post_dated = ?")
+            params.append(1 if post_dated else 0)
+        if red_flag:
+            clauses.append("id IN (SELECT call_id FROM red_flags WHERE flag = ?)")
+            params.append(red_flag)
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        sql = f"SELECT * FROM calls {where} ORDER BY {order} LIMIT ?"
+        params.append(limit)
+        return [dict(row) for row in self.conn.execute(sql, params)]
+
+    def count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM calls").fetchone()[0]
+
+    def close(self):
+        self.conn.close()
+
+
+def iter_results(paths):
+    """Yield result dicts from JSON files, directories of them, or JSONL files; unreadable ones are skipped"""
+    for path in paths:
+        files = sorted(glob.glob(os.path.join(path, "*.json"))) if os.path.isdir(path) else [path]
+        for file_path in files:
+            with open(file_path) as f:
+                if file_path.endswith(".jsonl"):
+                    for number, line in enumerate(f, 1):
+                        if not line.strip():
+                            continue
+                        try:
+                            data = json.loads(line)
+                        except ValueError as e:
+                            print(f"  skipping {file_path}:{number}: {e}")
+                            continue
+                        yield data, None
+                else:
+                    try:
+                        data = json.load(f)
+                    except ValueError as e:
+                        print(f"  skipping {file_path}: {e}")
+                        continue
+                    yield data, os.path.splitext(os.path.basename(file_path))[0]
+
+
+def synthetic_records(n, seed=7):
+    """Deterministic fake calls for the benchmark"""
+    rng = random.Random(seed)
+    carriers = ["Aetna", "Ambetter", "Anthem", "Cigna", "Humana", "Molina", "Paramount", "United", None]
+    start = date(2025, 1, 1)
+    for i in range(n):
+        day = start + timedelta(days=rng.randrange(270))
+        outcome = rng.choices(["sale", "no_sale", "callback"], [0.2, 0.65, 0.15])[0]
+        yield {
+            "id": f"call-{i}",
+            "agent_id": f"agent-{rng.randrange(150)}",
+            "agent_name": None,
+            "campaign": f"campaign-{rng.randrange(12)}",
+            "call_date": day.isoformat(),
+            "started_at": f"{day.isoformat()}T{rng.randrange(8, 20):02d}:00:00",
+            "duration_sec": rng.uniform(20, 2400),
+            "disposition": None,
+            "outcome": outcome,
+            "monthly_premium": round(rng.uniform(80, 900), 2) if outcome == "sale" else None,
+            "enrollment_fee": rng.choice([27.5, 50.0, 99.0, 125.0]) if outcome == "sale" else None,
+            "customer_name": None,
+            "carrier": rng.choice(carriers),
+            "plan_type": None,
+            "effective_date": None,
+            "post_dated": 1 if outcome == "sale" and rng.random() < 0.3 else 0,
+            "reason": "",
+            "summary": "",
+            "analyzed_at": None,
+            "red_flags": ["dnc_request"] if rng.random() < 0.02 else [],
+        }
+
+
+def bench(n):
+    path = os.path.join(tempfile.mkdtemp(), "bench_results.db")
+    store = ResultsStore(path)
+
+    t0 = time.perf_counter()
+    store.upsert_many(synthetic_records(n))
+    load_sec = time.perf_counter() - t0
+    print(f"Upserted {n} calls in {load_sec:.2f}s ({n / load_sec:,.0f}/s)")
+
+    week_end = date(2025, 9, 21)
+    queries = {
+        "post-dated sales > $200/mo last week": dict(outcome="sale", post_dated=True, premium_min=200,
+                                                    date_from=week_end - timedelta(days=6), date_to=week_end),
+        "one agent, one month": dict(agent="agent-17", date_from="2025-06-01", date_to="2025-06-30"),
+        "carrier + premium range": dict(carrier="Humana", premium_min=300, premium_max=500),
+        "red flag dnc_request": dict(red_flag="dnc_request"),
+    }
+    for name, kwargs in queries.items():
+        runs = []
+        for _ in range(5):
+            t0 = time.perf_counter()
+            rows = store.find(**kwargs)
+            runs.append((time.perf_counter() - t0) * 1000)
+        print(f"  {name}: {len(rows)} rows, best {min(runs):.2f}ms")
+    store.close()
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if not args or args[0] not in ("ingest", "query", "bench"):
+        print(__doc__)
+        sys.exit(1)
+
+    command = args.pop(0)
+    flags = {"--post-dated"}
+    opts = {}
+    positional = []
+    i = 0
+    while i < len(args):
+        if args[i] in flags:
+            opts[args[i]] = True
+            i += 1
+        elif args[i].startswith("--"):
+            opts[args[i]] = args[i + 1]
+            i += 2
+        else:
+            positional.append(args[i])
+            i += 1
+
+    if command == "bench":
+        print("RESULTS STORE BENCHMARK")
+        print("=" * 60)
+        bench(int(opts.get("--calls", 100000)))
+        sys.exit(0)
+
+    store = ResultsStore(opts.get("--db", DB_PATH))
+    if command == "ingest":
+        records = []
+        skipped = 0
+        for data, file_id in iter_results(positional):
+            try:
+                records.append(record_from_result(data, call_id=None if "id" in data else file_id))
+            except (ValueError, AttributeError):
+                skipped += 1
+        written = store.upsert_many(records)
+        undated = sum(1 for r in records if not r["call_date"])
+        print(f"Upserted {written} calls ({skipped} skipped); store now holds {store.count()}")
+        if undated:
+            print(f"  {undated} calls have no started_at, so no call_date; date filters will not match them")
+    else:
+        t0 = time.perf_counter()
+        rows = store.find(
+            outcome=opts.get("--outcome"), agent=opts.get("--agent"), campaign=opts.get("--campaign"),
+            carrier=opts.get("--carrier"), date_from=opts.get("--from"), date_to=opts.get("--to"),
+            premium_min=float(opts["--premium-min"]) if "--premium-min" in opts else None,
+            premium_max=float(opts["--premium-max"]) if "--premium-max" in opts else None,
+            post_dated=True if "--post-dated" in opts else None, limit=int(opts.get("--limit", 20)),
+        )
+        elapsed = (time.perf_counter() - t0) * 1000
+        for row in rows:
+            premium = f"${row['monthly_premium']:.2f}" if row["monthly_premium"] is not None else "-"
+            print(f"{row['call_date']} {row['id']} {row['agent_id'] or '-'} {row['outcome']} {premium} {row['carrier'] or '-'}")
+        print(f"{len(rows)} rows in {elapsed:.1f}ms")
+    store.close()
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Bucketed sentiment / intent timelines per call.
+
+Deepgram returns a sentiment and sentiment_score on every word (and a
+"sentiments" block that the older scripts looked up as "sentiment"). This
+folds the word scores into fixed-width time buckets (5s by default) of mean
+sentiment, overall and per speaker, plus per-speaker intent counts, and
+stores them as a small packed file next to the call:
+
+    <call>.json  ->  <call>.timeline   (a few KB: float32 arrays + intent counts)
+
+Dashboards and cross-call comparisons then read a few hundred floats instead
+of re-parsing every word.
+
+Usage:
+    python sentiment_timeline.py build <cached-dir-or-files ...> [--bucket 5]
+    python sentiment_timeline.py show <call.timeline>
+    python sentiment_timeline.py compare <timelines-or-dirs ...>
+"""
+import glob
+import json
+import math
+import os
+import struct
+import sys
+from array import array
+
+BUCKET_SEC = 5.0
+MAGIC = b"SNTL"
+VERSION = 1
+# magic, version, bucket_ms, bucket count, speaker count, intents JSON length
+HEADER = struct.Struct("<4sHIIHI")
+SPARK = " ▁▂▃▄▅▆▇█"
+
+
+def get_words(result):
+    channels = result.get("results", {}).get("channels", [])
+    return channels[0].get("alternatives", [{}])[0].get("words", []) if channels else []
+
+
+def build_timeline(result, bucket_sec=BUCKET_SEC):
+    """Fold word-level sentiment into time buckets; returns a timeline dict"""
+    words = get_words(result)
+    duration = result.get("metadata", {}).get("duration") or (words[-1].get("end", 0) if words else 0)
+    n = max(1, int(math.ceil(duration / bucket_sec)))
+    speakers = sorted({w.get("speaker", 0) for w in words}) or [0]
+    speaker_index = {s: i for i, s in enumerate(speakers)}
+
+    sums = [0.0] * n
+    counts = [0] * n
+    speaker_sums = [[0.0] * n for _ in speakers]
+    speaker_counts = [[0] * n for _ in speakers]
+    for w in words:
+        score = w.get("sentiment_score")
+        if score is None:
+            continue
+        b = min(n - 1, int(w.get("start", 0) / bucket_sec))
+        s = speaker_index[w.get("speaker", 0)]
+        sums[b] += score
+        counts[b] += 1
+        speaker_sums[s][b] += score
+        speaker_counts[s][b] += 1
+
+    def means(total, count):
+        return array("f", (t / c if c else float("nan") for t, c in zip(total, count)))
+
+    # Intent segments reference word indexes; attribute each to the speaker with most words in it
+    results = result.get("results", {})
+    intents = {}
+    for seg in results.get("intents", {}).get("segments", []):
+        seg_words = words[seg.get("start_word", 0):seg.get("end_word", 0) + 1]
+        if not seg_words:
+            continue
+        tally = {}
+        for w in seg_words:
+            tally[w.get("speaker", 0)] = tally.get(w.get("speaker", 0), 0) + 1
+        speaker = max(tally, key=tally.get)
+        for intent in seg.get("intents", []):
+            per_speaker = intents.setdefault(intent.get("intent", "unknown"), [0] * len(speakers))
+            per_speaker[speaker_index[speaker]] += 1
+
+    return {
+        "bucket_sec": bucket_sec,
+        "speakers": speakers,
+        "sentiment": means(sums, counts),
+        "speaker_sentiment": [means(t, c) for t, c in zip(speaker_sums, speaker_counts)],
+        "word_counts": array("H", (min(c, 65535) for c in counts)),
+        "intents": intents,
+    }
+
+
+def pack_timeline(timeline):
+    """Serialize to: header | speakers (int16) | sentiment | per-speaker sentiment | word counts | intents JSON"""
+    n = len(timeline["sentiment"])
+    intents_json = json.dumps({"speakers": timeline["speakers"], "intents": timeline["intents"]}).encode()
+    parts = [
+        HEADER.pack(MAGIC, VERSION, int(timeline["bucket_sec"] * 1000), n, len(timeline["speakers"]), len(intents_json)),
+        array("h", timeline["speakers"]).tobytes(),
+        timeline["sentiment"].tobytes(),
+    ]
+    parts.extend(series.tobytes() for series in timeline["speaker_sentiment"])
+    parts.append(timeline["word_counts"].tobytes())
+    parts.append(intents_json)
+    if sys.byteorder != "little":
+        raise RuntimeError("timeline files are little-endian")
+    return b"".join(parts)
+
+
+def unpack_timeline(data):
+    magic, version, bucket_ms, n, n_speakers, json_len = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("not a sentiment timeline file")
+    offset = HEADER.size
+    if len(data) != offset + 2 * n_speakers + 4 * n * (1 + n_speakers) + 2 * n + json_len:
+        raise ValueError("truncated or corrupt sentiment timeline file")
+
+    def take(typecode, count):
+        nonlocal offset
+        values = array(typecode)
+        size = values.itemsize * count
+        values.frombytes(data[offset:offset + size])
+        offset += size
+        return values
+
+    speakers = list(take("h", n_speakers))
+    sentiment = take("f", n)
+    speaker_sentiment = [take("f", n) for _ in range(n_speakers)]
+    word_counts = take("H", n)
+    extra = json.loads(data[offset:offset + json_len])
+    return {
+        "bucket_sec": bucket_ms / 1000.0,
+        "speakers": speakers,
+        "sentiment": sentiment,
+        "speaker_sentiment": speaker_sentiment,
+        "word_counts": word_counts,
+        "intents": extra["intents"],
+    }
+
+
+def timeline_path(call_path):
+    return os.path.splitext(call_path)[0] + ".timeline"
+
+
+def write_timeline(path, timeline):
+    tmp = f"{path}.tmp{os.getpid()}"
+    with open(tmp, "wb") as f:
+        f.write(pack_timeline(timeline))
+    os.replace(tmp, path)
+
+
+def load_timeline(path):
+    with open(path, "rb") as f:
+        return unpack_timeline(f.read())
+
+
+def sparkline(values, lo=-1.0, hi=1.0):
+    out = []
+    for v in values:
+        if v != v:      # NaN: no words in this bucket
+            out.append("·")
+        else:
+            out.append(SPARK[int(round((min(hi, max(lo, v)) - lo) / (hi - lo) * (len(SPARK) - 1)))])
+    return "".join(out)
+
+
+def summarize(timeline):
+    values = [v for v in timeline["sentiment"] if v == v]
+    if not values:
+        return None
+    third = max(1, len(values) // 3)
+    lowest = min(range(len(timeline["sentiment"])),
+                 key=lambda i: timeline["sentiment"][i] if timeline["sentiment"][i] == timeline["sentiment"][i] else 9)
+    return {
+        "mean": sum(values) / len(values),
+        "opening": sum(values[:third]) / third,
+        "closing": sum(values[-third:]) / third,
+        "lowest": timeline["sentiment"][lowest],
+        "lowest_at": lowest * timeline["bucket_sec"],
+    }
+
+
+def expand(paths, pattern):
+    files = []
+    for path in paths:
+        files.extend(sorted(glob.glob(os.path.join(path, pattern))) if os.path.isdir(path) else [path])
+    return files
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    bucket = BUCKET_SEC
+    if "--bucket" in args:
+        idx = args.index("--bucket")
+        bucket = float(args[idx + 1])
+        del args[idx:idx + 2]
+
+    if len(args) < 2 or args[0] not in ("build", "show", "compare"):
+        print(__doc__)
+        sys.exit(1)
+
+    if args[0] == "build":
+        built = 0
+        for path in expand(args[1:], "*.json"):
+            with open(path) as f:
+                data = json.load(f)
+            result = data.get("result", data)
+            if not get_words(result):
+                continue
+            dest = timeline_path(path)
+            write_timeline(dest, build_timeline(result, bucket))
+            built += 1
+            print(f"{dest}: {os.path.getsize(dest)} bytes (source {os.path.getsize(path)} bytes)")
+        print(f"Built {built} timelines")
+    elif args[0] == "show":
+        tl = load_timeline(args[1])
+        print(f"{len(tl['sentiment'])} buckets of {tl['bucket_sec']:.0f}s")
+        print(f"  all       {sparkline(tl['sentiment'])}")
+        for speaker, series in zip(tl["speakers"], tl["speaker_sentiment"]):
+            print(f"  speaker {speaker} {sparkline(series)}")
+        s = summarize(tl)
+        if s:
+            print(f"Mean {s['mean']:+.2f}  opening {s['opening']:+.2f}  closing {s['closing']:+.2f}  "
+                  f"lowest {s['lowest']:+.2f} at {s['lowest_at']:.0f}s")
+        if tl["intents"]:
+            print("Intents by speaker:")
+            for intent, counts in sorted(tl["intents"].items(), key=lambda item: -sum(item[1])):
+                per = ", ".join(f"{sp}: {c}" for sp, c in zip(tl["speakers"], counts) if c)
+                print(f"  {intent} ({per})")
+    else:
+        print(f"{'call':40s} {'mean':>6s} {'open':>6s} {'close':>6s} {'lowest':>7s} {'at':>6s}")
+        for path in expand(args[1:], "*.timeline"):
+            s = summarize(load_timeline(path))
+            if s:
+                name = os.path.basename(path)[:-len(".timeline")]
+                print(f"{name[:40]:40s} {s['mean']:+6.2f} {s['opening']:+6.2f} {s['closing']:+6.2f} "
+                      f"{s['lowest']:+7.2f} {s['lowest_at']:5.0f}s")
@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+"""
+Settings tuning client: sweep analysis settings over a cached corpus.
+
+/api/analyze memoizes each pipeline stage on its upstream stage keys plus only
+the settings sections it reads (src/lib/stage-cache.ts), so changing
+rebuttal.windowMs recomputes the rebuttal stage and nothing else. This mirrors
+that stage graph locally over cached Deepgram responses, with deterministic
+stand-ins for the LLM passes, and runs every combination of the swept values
+twice: memoized, and as full re-runs. The report shows per-variant results
+and how many stages (and modeled upstream seconds) the memoization saved.
+
+    stage         keyed on        settings actually read
+    transcribe    asr             asr
+    pass_a        -               -
+    rebuttals     rebuttal        rebuttal.windowMs
+    pass_b        -               -
+    money         money           money.premiumHundredsIfUnder (carrier prices)
+    talk_metrics  interrupt       - (talk-metrics.ts uses fixed thresholds)
+
+Settings the pipeline never reads (UNREAD_SETTINGS) cannot be swept; the
+stand-ins mirror the fixed rules production applies instead.
+
+Usage:
+    python settings_sweep.py <cached-dir-or-files ...> --sweep rebuttal.windowMs=15000,30000,60000
+                             [--sweep money.premiumHundredsIfUnder=20,50]
+
+    # the same sweep against a running /api/analyze for one recording
+    python settings_sweep.py --remote http://localhost:3000/api/analyze --url <recording_url> --sweep ...
+"""
+import copy
+import glob
+import hashlib
+import itertools
+import json
+import os
+import re
+import sys
+import time
+
+from transcript_compaction import MONEY_RE, OBJECTION_RE, utterances_from_deepgram
+
+# Mirrors DEFAULTS in src/config/asr-analysis.ts (keywords omitted)
+DEFAULTS = {
+    "asr": {"model": "nova-2-phonecall", "utt_split": 1.1, "diarize": True, "utterances": True,
+            "smart_format": True, "punctuate": True, "numerals": True, "paragraphs": True,
+            "detect_entities": True},
+    "money": {"premiumHundredsIfUnder": 50, "feeHundredsIfUnder": 20, "priceCarrierWindowMs": 15000},
+    "rebuttal": {"windowMs": 30000},
+    "interrupt": {"maxGapMs": 300, "prevMinDurMs": 1500},
+}
+
+# name -> (settings sections read, upstream stages); order is a valid topological order
+STAGES = [
+    ("transcribe", ("asr",), ()),
+    ("pass_a", (), ("transcribe",)),
+    ("rebuttals", ("rebuttal",), ("pass_a",)),
+    ("pass_b", (), ("pass_a",)),
+    ("money", ("money",), ("pass_a", "pass_b")),
+    ("talk_metrics", ("interrupt",), ("transcribe",)),
+]
+
+# Rough upstream seconds per stage in production (Deepgram, gpt-4o-mini, rebuttal classifier, gpt-4o)
+STAGE_SECONDS = {"transcribe": 12.0, "pass_a": 6.0, "rebuttals": 3.0, "pass_b": 9.0, "money": 0.0,
+                 "talk_metrics": 0.0}
+
+# Present in the settings schema but not read anywhere in src/lib
+UNREAD_SETTINGS = {
+    "money.feeHundredsIfUnder": "normalizeMoney() uses a fixed fee rule (x100 under $10)",
+    "money.priceCarrierWindowMs": "carrier prices are taken from the carrier mention's own quote",
+    "interrupt.maxGapMs": "talk-metrics.ts counts overlaps with fixed thresholds",
+    "interrupt.prevMinDurMs": "talk-metrics.ts counts overlaps with fixed thresholds",
+}
+
+DOLLAR_RE = re.compile(r"\$\s*(\d+(?:\.\d{1,2})?)")
+FEE_RE = re.compile(r"enrollment|activation", re.IGNORECASE)
+CARRIER_RE = re.compile(r"\b(aetna|ambetter|anthem|blue cross|cigna|humana|molina|oscar|united ?health\w*)\b",
+                        re.IGNORECASE)
+# money-normalizer.ts rules 1 and 2, and talk-metrics.ts interrupt thresholds
+PREMIUM_HUNDREDS_UNDER = 50
+FEE_HUNDREDS_UNDER = 10
+MIN_INTERRUPT_MS = 300
+MIN_OVERLAP_MS = 150
+
+
+def stage_key(stage, deps):
+    digest = hashlib.sha256(json.dumps(deps, sort_keys=True).encode()).hexdigest()[:32]
+    return f"{stage}:{digest}"
+
+
+def merge_settings(overrides):
+    settings = copy.deepcopy(DEFAULTS)
+    for path, value in overrides.items():
+        section, field = path.split(".", 1)
+        settings.setdefault(section, {})[field] = value
+    return settings
+
+
+# Stage stand-ins. `up` maps upstream stage name -> its output.
+
+def run_transcribe(call, settings, up):
+    # The corpus is already transcribed; a changed asr section would mean a new Deepgram request
+    return [{"speaker": "agent" if u["speaker"] == 0 else "customer", "startMs": int(u["start"] * 1000),
+             "endMs": int(u["end"] * 1000), "text": u["text"]} for u in utterances_from_deepgram(call)]
+
+
+def run_pass_a(call, settings, up):
+    segments = up["transcribe"]
+    money, objections, carriers = [], [], []
+    for seg in segments:
+        if CARRIER_RE.search(seg["text"]):
+            carriers.append({"carrier": CARRIER_RE.search(seg["text"]).group(0), "quote": seg["text"][:200]})
+        if MONEY_RE.search(seg["text"]):
+            for m in DOLLAR_RE.finditer(seg["text"]):
+                hint = "enrollment_fee" if FEE_RE.search(seg["text"]) else "monthly_premium"
+                money.append({"field_hint": hint, "value_raw": m.group(0), "quote": seg["text"][:160],
+                              "speaker": seg["speaker"], "timestamp_ms": seg["startMs"]})
+        if seg["speaker"] == "customer":
+            m = OBJECTION_RE.search(seg["text"])
+            if m:
+                objections.append({"stall_type": m.group(0).lower(), "quote": seg["text"][:200],
+                                   "startMs": seg["startMs"], "endMs": seg["endMs"]})
+    return {"money_mentions": money, "objection_spans": objections, "carrier_mentions": carriers}
+
+
+def run_rebuttals(call, settings, up):
+    segments = up["transcribe"]
+    window = settings["rebuttal"]["windowMs"]
+    used, missed = [], []
+    for obj in up["pass_a"]["objection_spans"]:
+        reply = [s for s in segments if s["speaker"] == "agent" and obj["endMs"] <= s["startMs"] <= obj["endMs"] + window]
+        (used if reply else missed).append(obj["stall_type"])
+    return {"used": used, "missed": missed}
+
+
+def run_pass_b(call, settings, up):
+    analysis = {"monthly_premium": None, "enrollment_fee": None}
+    for mention in up["pass_a"]["money_mentions"]:
+        if mention["speaker"] != "agent":
+            continue
+        field = "enrollment_fee" if mention["field_hint"] == "enrollment_fee" else "monthly_premium"
+        analysis[field] = float(DOLLAR_RE.search(mention["value_raw"]).group(1))   # latest agent mention wins
+    return analysis
+
+
+def run_money(call, settings, up):
+    # normalizeAnalysisMoney: fixed rules for the card, premiumHundredsIfUnder only for carrier quotes
+    analysis = dict(up["pass_b"])
+    if analysis["monthly_premium"] is not None and analysis["monthly_premium"] < PREMIUM_HUNDREDS_UNDER:
+        analysis["monthly_premium"] *= 100
+    if analysis["enrollment_fee"] is not None and analysis["enrollment_fee"] < FEE_HUNDREDS_UNDER:
+        analysis["enrollment_fee"] *= 100
+    analysis["carrier_prices_normalized"] = sum(
+        1 for mention in up["pass_a"]["carrier_mentions"]
+        if DOLLAR_RE.search(mention["quote"])
+        and float(DOLLAR_RE.search(mention["quote"]).group(1)) < settings["money"]["premiumHundredsIfUnder"]
+    )
+    return analysis
+
+
+def run_talk_metrics(call, settings, up):
+    # talk-metrics.ts: a segment that starts inside the other speaker's turn and overlaps it long enough
+    segments = up["transcribe"]
+    count = 0
+    for seg in segments:
+        if seg["endMs"] - seg["startMs"] < MIN_INTERRUPT_MS:
+            continue
+        for other in segments:
+            if (other["speaker"] != seg["speaker"] and other["startMs"] <= seg["startMs"] < other["endMs"]
+                    and min(seg["endMs"], other["endMs"]) - seg["startMs"] >= MIN_OVERLAP_MS):
+                count += 1
+                break
+    return {"interrupt_count": count}
+
+
+STAGE_FNS = {"transcribe": run_transcribe, "pass_a": run_pass_a, "rebuttals": run_rebuttals,
+             "pass_b": run_pass_b, "money": run_money, "talk_metrics": run_talk_metrics}
+
+
+class StageCache:
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+        self.spent_seconds = 0.0
+
+    def analyze(self, call_id, call, settings):
+        keys, outputs = {}, {}
+        for name, sections, upstream in STAGES:
+            deps = {"call": call_id, "settings": {s: settings[s] for s in sections},
+                    "upstream": {u: keys[u] for u in upstream}}
+            keys[name] = key = stage_key(name, deps)
+            if self.enabled and key in self.entries:
+                self.hits += 1
+                outputs[name] = self.entries[key]
+                continue
+            self.misses += 1
+            self.spent_seconds += STAGE_SECONDS[name]
+            # rebuttals reads segments too; they are covered by the pass_a key
+            up = {u: outputs[u] for u in upstream}
+            if name == "rebuttals":
+                up["transcribe"] = outputs["transcribe"]
+            outputs[name] = STAGE_FNS[name](call, settings, up)
+            if self.enabled:
+                self.entries[key] = outputs[name]
+        return outputs
+
+
+def parse_sweeps(specs):
+    grid = []
+    for spec in specs:
+        path, values = spec.split("=", 1)
+        if "." not in path or path.split(".")[0] not in DEFAULTS:
+            raise ValueError(f"sweep must be section.field=v1,v2 with section in {', '.join(DEFAULTS)}: {spec}")
+        if path in UNREAD_SETTINGS:
+            raise ValueError(f"{path} is not read by the analysis pipeline ({UNREAD_SETTINGS[path]})")
+        grid.append((path, [json.loads(v) for v in values.split(",")]))
+    return grid
+
+
+def variants(grid):
+    paths = [path for path, _ in grid]
+    for combo in itertools.product(*(values for _, values in grid)):
+        yield dict(zip(paths, combo))
+
+
+def label(overrides):
+    return " ".join(f"{path.split('.', 1)[1]}={value}" for path, value in overrides.items())
+
+
+def load_corpus(paths):
+    calls = []
+    for path in paths:
+        files = sorted(glob.glob(os.path.join(path, "*.json"))) if os.path.isdir(path) else [path]
+        for file_path in files:
+            with open(file_path) as f:
+                data = json.load(f)
+            result = data.get("result", data)
+            if result.get("results", {}).get("utterances"):
+                calls.append((os.path.splitext(os.path.basename(file_path))[0], result))
+    return calls
+
+
+def sweep(calls, grid, memoize=True):
+    cache = StageCache(enabled=memoize)
+    rows = []
+    t0 = time.perf_counter()
+    for overrides in variants(grid):
+        settings = merge_settings(overrides)
+        used = missed = interrupts = premiums = carrier_prices = 0
+        for call_id, call in calls:
+            out = cache.analyze(call_id, call, settings)
+            used += len(out["rebuttals"]["used"])
+            missed += len(out["rebuttals"]["missed"])
+            interrupts += out["talk_metrics"]["interrupt_count"]
+            premiums += out["money"]["monthly_premium"] is not None
+            carrier_prices += out["money"]["carrier_prices_normalized"]
+        rows.append((overrides, {"addressed": used / (used + missed) if used + missed else None,
+                                 "interrupts": interrupts / len(calls), "premiums": premiums,
+                                 "carrier_prices": carrier_prices}))
+    return rows, cache, time.perf_counter() - t0
+
+
+def sweep_remote(endpoint, recording_url, grid):
+    import requests
+
+    session = requests.Session()
+    for overrides in variants(grid):
+        settings = merge_settings(overrides)
+        payload = {"recording_url": recording_url,
+                   "settings": {section: settings[section] for section in {p.split(".")[0] for p in overrides}}}
+        t0 = time.perf_counter()
+        response = session.post(endpoint, json=payload, timeout=300)
+        elapsed = time.perf_counter() - t0
+        body = response.json() if response.ok else {}
+        stages = (body.get("metadata") or {}).get("stages", {}).get("status", {})
+        status = " ".join(f"{name}={state}" for name, state in stages.items()) or f"HTTP {response.status_code}"
+        print(f"{label(overrides):40s} {elapsed:7.2f}s  {status}")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    specs = []
+    while "--sweep" in args:
+        idx = args.index("--sweep")
+        specs.append(args[idx + 1])
+        del args[idx:idx + 2]
+    opts = {}
+    for flag in ("--remote", "--url"):
+        if flag in args:
+            idx = args.index(flag)
+            opts[flag] = args[idx + 1]
+            del args[idx:idx + 2]
+
+    if not specs or not (args or "--remote" in opts):
+        print(__doc__)
+        sys.exit(1)
+    try:
+        grid = parse_sweeps(specs)
+    except ValueError as e:
+        print(e)
+        sys.exit(1)
+
+    if "--remote" in opts:
+        if "--url" not in opts:
+            print("--remote needs --url <recording_url>")
+            sys.exit(1)
+        sweep_remote(opts["--remote"], opts["--url"], grid)
+        sys.exit(0)
+
+    calls = load_corpus(args)
+    if not calls:
+        print("No cached Deepgram responses with utterances found")
+        sys.exit(1)
+
+    rows, memo, memo_wall = sweep(calls, grid, memoize=True)
+    _, full, full_wall = sweep(calls, grid, memoize=False)
+
+    print("SETTINGS SWEEP")
+    print("=" * 60)
+    print(f"{len(rows)} variants x {len(calls)} cached calls\n")
+    width = max(len("variant"), *(len(label(o)) for o, _ in rows))
+    print(f"{'variant':{width}s} {'addressed':>9s} {'intr/call':>9s} {'premiums':>8s} {'carrier x100':>12s}")
+    for overrides, r in rows:
+        addressed = f"{r['addressed']:.0%}" if r["addressed"] is not None else "-"
+        print(f"{label(overrides):{width}s} {addressed:>9s} {r['interrupts']:9.2f} {r['premiums']:8d} "
+              f"{r['carrier_prices']:12d}")
+
+    print("\nMEMOIZATION")
+    print("-" * 60)
+    print(f"Stages executed: {memo.misses} memoized vs {full.misses} full re-runs "
+          f"({memo.hits} served from cache)")
+    print(f"Modeled upstream time: {memo.spent_seconds / 60:.1f} min vs {full.spent_seconds / 60:.1f} min "
+          f"({full.spent_seconds / memo.spent_seconds if memo.spent_seconds else 0:.1f}x faster)")
+    print(f"Local compute: {memo_wall * 1000:.1f} ms vs {full_wall * 1000:.1f} ms")
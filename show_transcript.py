@@ -3,6 +3,8 @@ import json
 import requests
 import sys
 
+from transcript_export import export_segments, segments_from_result
+
 url = 'http://localhost:3007/api/analyze'
 payload = {
     "recording_url": "https://admin-dt.convoso.com/play-recording-public/JTdCJTIyYWNjb3VudF9pZCUyMiUzQTEwMzgzMyUyQyUyMnVfaWQlMjIlM0ElMjJkejZxZjNxYm93cHE1MzgwZnE1N2hyamV2MHk3c3BzdyUyMiU3RA==?rlt=NBGIOmIsrZdg/ij12A4673bVaGSr3u603VQy3cqsef8",
@@ -27,32 +29,12 @@ print(f"Full response saved to full_api_response.json")
 
 # Try to extract segments from debug
 if 'debug' in data and 'segments' in data['debug']:
-    segments = data['debug']['segments']
+    segments = segments_from_result(data)
     print(f"\n=== FULL TRANSCRIPT ({len(segments)} segments) ===\n")
 
-    for i, seg in enumerate(segments):
-        time_ms = seg.get('startMs', 0)
-        time_sec = int(time_ms / 1000) if time_ms else 0
-        mins = time_sec // 60
-        secs = time_sec % 60
-
-        speaker = seg.get('speaker', '?')
-        text = seg.get('text', '')
-
-        print(f"{i+1}. [{mins:02d}:{secs:02d}] {speaker}: {text}")
-
-    # Save transcript to text file
+    # One pass over the segments feeds both stdout and the text file
     with open('full_transcript.txt', 'w') as f:
-        for i, seg in enumerate(segments):
-            time_ms = seg.get('startMs', 0)
-            time_sec = int(time_ms / 1000) if time_ms else 0
-            mins = time_sec // 60
-            secs = time_sec % 60
-
-            speaker = seg.get('speaker', '?')
-            text = seg.get('text', '')
-
-            f.write(f"{i+1}. [{mins:02d}:{secs:02d}] {speaker}: {text}\n")
+        export_segments(segments, [(sys.stdout, "txt"), (f, "txt")])
 
     print("\nTranscript saved to full_transcript.txt")
 else:
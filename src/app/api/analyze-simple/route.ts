@@ -8,7 +8,7 @@ export const maxDuration = 60; // Maximum allowed on Vercel Pro
 
 export async function POST(request: NextRequest) {
   try {
-    const { recording_url, meta } = await request.json();
+    const { recording_url, meta, no_cache, deepgram } = await request.json();
 
     if (!recording_url) {
       return NextResponse.json({ error: 'Recording URL required' }, { status: 400 });
@@ -19,7 +19,9 @@ export async function POST(request: NextRequest) {
     // Use unified analysis with backward compatibility
     const result = await analyzeCallUnified(recording_url, meta, {
       includeScores: false,  // Don't include legacy scores by default
-      skipRebuttals: false   // Include rebuttals
+      skipRebuttals: false,  // Include rebuttals
+      force: no_cache === true,  // Recompute memoized stages, e.g. for benchmarks
+      deepgram  // Optional Deepgram response from a caller that already transcribed
     });
 
     console.log('[Analyze Simple] Complete:', {
@@ -46,7 +46,9 @@ export async function POST(req: NextRequest) {
     const result = await analyzeCallUnified(recording_url, meta, {
       includeScores: true,  // Include backward compatibility scores for existing UI
       skipRebuttals: false,  // Include full rebuttals analysis
-      settings  // Pass settings to analysis
+      settings,  // Pass settings to analysis
+      force: raw.no_cache === true,  // Stages are memoized per settings section unless asked not to
+      deepgram: raw.deepgram  // Optional Deepgram response from a caller that already transcribed
     });
 
     console.log('=== ANALYSIS COMPLETE ===');
@@ -56,6 +58,7 @@ export async function POST(req: NextRequest) {
     console.log('Rebuttals addressed:', result.rebuttals?.used?.length || 0);
     console.log('Rebuttals missed:', result.rebuttals?.missed?.length || 0);
     console.log('Immediate responses:', result.rebuttals?.immediate?.length || 0);
+    console.log('Stages:', (result.metadata as any)?.stages?.status);
 
     // Transform the result to match the expected format of the old system
     const finalJson = {
@@ -15,12 +15,14 @@ import { analyzeCallV2 } from '@/lib/unified-analysis-v2';
 import { logInfo, logError } from '@/lib/log';
 import { createClient } from '@/lib/supabase/server';
 import { db } from '@/server/db';
+import { publishCallStatus } from '@/lib/progress-feed';
 
 export const runtime = 'nodejs';
 export const maxDuration = 300; // 5 minutes
 
 export async function POST(request: NextRequest) {
   const supabase = await createClient();
+  let callId: string | null = null;  // for the error event once the request is valid
 
   try {
     const body = await request.json();
@@ -45,6 +47,8 @@ export async function POST(request: NextRequest) {
       call_id,
       audio_url: audioUrl
     });
+    callId = call_id;
+    await publishCallStatus(call_id, 'analyzing', { stage: 'v2_3pass' });
 
     // Run 3-pass analysis
     const result = await analyzeCallV2(audioUrl, { ...meta, call_id }, undefined);
@@ -213,6 +217,7 @@ export async function POST(request: NextRequest) {
     ]);
 
     logInfo({ event_type: 'analysis_saved', call_id });
+    await publishCallStatus(call_id, 'done', { model: 'v2_3pass_sequential', qa_score: qaScore });
 
     // 5. SAVE METADATA → calls.metadata JSONB field
     await db.none(`
@@ -264,6 +269,7 @@ export async function POST(request: NextRequest) {
     logError('analyze_and_save_v2_error', error, {
       error_message: error.message
     });
+    if (callId) await publishCallStatus(callId, 'error', { error: error.message });
 
     return NextResponse.json(
       {
@@ -1,6 +1,7 @@
 import { NextRequest, NextResponse } from 'next/server';
 import { db } from '@/server/db';
 import { logInfo, logError } from '@/lib/log';
+import { scheduleOrderSql } from '@/lib/queue-schedule';
 
 export const dynamic = 'force-dynamic';
 
@@ -145,16 +146,24 @@ export async function GET(req: NextRequest) {
   try {
     // Get pending recordings that are scheduled for processing
     // Max 50 records, attempts < 12, and scheduled_for <= NOW()
+    // Compliance calls first, then shortest expected transcription with aging (see queue-schedule.ts)
     const pending = await db.manyOrNone(`
-      SELECT id, call_id, lead_id, attempts, retry_phase,
-             call_started_at, call_ended_at, estimated_end_time
-      FROM pending_recordings
-      WHERE attempts < 12
-        AND (scheduled_for IS NULL OR scheduled_for <= NOW())
-        AND processed_at IS NULL
+      SELECT pr.id, pr.call_id, pr.lead_id, pr.attempts, pr.retry_phase,
+             pr.call_started_at, pr.call_ended_at, pr.estimated_end_time
+      FROM pending_recordings pr
+      LEFT JOIN calls c ON c.call_id = pr.call_id
+      WHERE pr.attempts < 12
+        AND (pr.scheduled_for IS NULL OR pr.scheduled_for <= NOW())
+        AND pr.processed_at IS NULL
       ORDER BY
-        CASE WHEN call_ended_at IS NOT NULL THEN 0 ELSE 1 END,  -- Prioritize completed calls
-        scheduled_for ASC NULLS FIRST
+        CASE WHEN pr.call_ended_at IS NOT NULL THEN 0 ELSE 1 END,  -- Prioritize completed calls
+        ${scheduleOrderSql({
+          campaign: 'c.campaign',
+          disposition: 'c.disposition',
+          durationSec: 'c.duration_sec',
+          waitingSince: 'pr.created_at'
+        })},
+        pr.scheduled_for ASC NULLS FIRST
       LIMIT 50
     `);
 
@@ -1,6 +1,7 @@
 import { NextRequest, NextResponse } from 'next/server';
 import { db } from '@/server/db';
 import { logInfo, logError } from '@/lib/log';
+import { CLASS_COMPLIANCE } from '@/lib/queue-schedule';
 
 export const dynamic = 'force-dynamic';
 
@@ -19,7 +20,7 @@ export async function GET(req: NextRequest) {
     const maxJobs = 5;
 
     for (let i = 0; i < maxJobs; i++) {
-      // Get next job from queue
+      // Get next job from queue: compliance class first, then shortest aged expected cost
       const job = await db.oneOrNone(`
         SELECT * FROM get_next_transcription_job()
       `);
@@ -37,6 +38,8 @@ export async function GET(req: NextRequest) {
           queue_id: job.queue_id,
           call_id: job.call_id,
           priority: job.priority,
+          priority_class: job.priority_class === CLASS_COMPLIANCE ? 'compliance' : 'routine',
+          expected_sec: job.expected_sec,
           attempt: job.attempts
         });
 
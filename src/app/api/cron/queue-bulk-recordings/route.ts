@@ -1,6 +1,7 @@
 import { NextRequest, NextResponse } from 'next/server';
 import { db } from '@/server/db';
 import { logInfo, logError } from '@/lib/log';
+import { scheduleOrderSql } from '@/lib/queue-schedule';
 
 export const dynamic = 'force-dynamic';
 
@@ -8,6 +9,7 @@ export async function GET(req: NextRequest) {
   try {
     // Find bulk uploaded calls without recordings that aren't already queued
     // This runs as a cron job to catch any that were missed
+    // Compliance calls and short calls are queued first when more than 100 are waiting
     const callsToQueue = await db.manyOrNone(`
       SELECT
         c.call_id,
@@ -25,6 +27,14 @@ export async function GET(req: NextRequest) {
         AND pr.id IS NULL
         AND (c.lead_id IS NOT NULL OR c.call_id IS NOT NULL)
         AND c.created_at > NOW() - INTERVAL '7 days'
+      ORDER BY
+        ${scheduleOrderSql({
+          campaign: 'c.campaign',
+          disposition: 'c.disposition',
+          durationSec: 'c.duration_sec',
+          waitingSince: 'c.created_at'
+        })},
+        c.created_at ASC
       LIMIT 100
     `);
 
@@ -5,6 +5,7 @@ import { ANALYSIS_SYSTEM, userPrompt } from '@/server/lib/prompts';
 import { alert } from '@/server/lib/alerts';
 import { withinCancelWindow } from '@/server/lib/biz';
 import { withRateLimit } from '@/lib/rate-limit';
+import { publishCallStatus } from '@/lib/progress-feed';
 
 export const dynamic = 'force-dynamic';
 
@@ -55,6 +56,8 @@ async function handler(req: NextRequest) {
     return NextResponse.json({ ok: false, error: 'ultra_short_call' });
   }
 
+  await publishCallStatus(callId, 'analyzing', { stage: 'starting' });
+
   // Use translated text if available, otherwise original
   const textToAnalyze = row.translated_text || row.text;
 
@@ -93,6 +96,7 @@ async function handler(req: NextRequest) {
       qualityCheck.classification,
       `Call filtered: ${qualityCheck.reason}`
     ]);
+    await publishCallStatus(callId, 'done', { filtered: true, classification: qualityCheck.classification });
 
     return NextResponse.json({
       ok: true,
@@ -167,6 +171,7 @@ async function handler(req: NextRequest) {
 
       await db.none(`insert into call_events(call_id,type,payload) values($1,'rejection_analyzed',$2)`,
         [callId, rejectionAnalysis]);
+      await publishCallStatus(callId, 'done', { model: 'rejection-analyzer', qa_score: simplifiedAnalysis.qa_score });
 
       return NextResponse.json({
         ok: true,
@@ -277,6 +282,7 @@ async function handler(req: NextRequest) {
   if (!j || !isValid) {
     await db.none(`insert into call_events(call_id,type,payload) values($1,'analysis_failed',$2)`,
       [callId, { error: 'Schema validation failed', hint: j ? 'Invalid structure' : 'No response', logged: shouldLog }]);
+    await publishCallStatus(callId, 'error', { error: 'Analysis failed schema validation' });
     return NextResponse.json({
       ok: false,
       error: 'schema_invalid',
@@ -304,6 +310,7 @@ async function handler(req: NextRequest) {
   `, [callId, riskEasy]);
 
   await db.none(`insert into call_events(call_id,type,payload) values($1,'analyzed',$2)`, [callId, j]);
+  await publishCallStatus(callId, 'done', { model, qa_score: j.qa_score });
   
   // Generate embedding if not exists
   try {
@@ -2,6 +2,7 @@ import { NextRequest, NextResponse } from 'next/server';
 import { db } from '@/server/db';
 import { sleep } from '@/server/lib/retry';
 import { logInfo } from '@/lib/log';
+import { publishJobProgress } from '@/lib/progress-feed';
 
 export const dynamic = 'force-dynamic';
 
@@ -78,6 +79,7 @@ export async function GET(req: NextRequest) {
         SET posted = $2, completed = $3, failed = $4, updated_at = NOW()
         WHERE batch_id = $1
       `, [newBatchId, posted, completed, failed]);
+      await publishJobProgress(newBatchId, 'processing', { total: scanned, scanned, posted, completed, failed });
 
       logInfo({
         event_type: 'batch_transcription_queued',
@@ -102,6 +104,7 @@ export async function GET(req: NextRequest) {
         SET failed = $2, updated_at = NOW()
         WHERE batch_id = $1
       `, [newBatchId, failed]);
+      await publishJobProgress(newBatchId, 'processing', { total: scanned, scanned, posted, completed, failed });
     }
   }
 
@@ -111,6 +114,7 @@ export async function GET(req: NextRequest) {
     SET status = 'complete', updated_at = NOW()
     WHERE batch_id = $1
   `, [newBatchId]);
+  await publishJobProgress(newBatchId, 'complete', { total: scanned, scanned, posted, completed, failed });
 
   return NextResponse.json({
     ok: true,
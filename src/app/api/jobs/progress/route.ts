@@ -1,123 +1,171 @@
 import { NextRequest, NextResponse } from 'next/server';
 import { db } from '@/server/db';
+import { ProgressFeed, callChannel, jobChannel, progressFlags, type ProgressEvent } from '@/lib/progress-feed';
 
 export const dynamic = 'force-dynamic';
 
+const MAX_STREAM_MS = 10 * 60 * 1000;  // pipeline stages push updates, so streams can stay open
+const KEEPALIVE_MS = 15000;
+
 // SSE helper to format messages
 function formatSSE(data: any): string {
   return `data: ${JSON.stringify(data)}\n\n`;
 }
 
+// One query to seed a call channel the first time anyone on this instance watches it
+async function loadCallStatus(callId: string) {
+  return db.oneOrNone(`
+    SELECT
+      c.id,
+      c.disposition,
+      CASE
+        WHEN a.call_id IS NOT NULL THEN 'done'
+        WHEN e.call_id IS NOT NULL THEN 'analyzing'
+        WHEN t.call_id IS NOT NULL THEN 'embedding'
+        WHEN c.recording_url IS NOT NULL THEN 'transcribing'
+        ELSE 'queued'
+      END as status,
+      t.call_id IS NOT NULL as has_transcript,
+      e.call_id IS NOT NULL as has_embedding,
+      a.call_id IS NOT NULL as has_analysis
+    FROM calls c
+    LEFT JOIN transcripts t ON t.call_id = c.id
+    LEFT JOIN transcript_embeddings e ON e.call_id = c.id
+    LEFT JOIN analyses a ON a.call_id = c.id
+    WHERE c.id = $1
+  `, [callId]);
+}
+
+async function loadJobStatus(jobId: string) {
+  return db.oneOrNone(`
+    SELECT batch_id, total, scanned, posted, completed, failed, status
+    FROM batch_progress
+    WHERE batch_id = $1
+  `, [jobId]);
+}
+
+// Channel state as the feed holds it; seeds the channel and backs the keepalive recheck
+function channelLoader(callId: string | null, jobId: string | null) {
+  return async () => {
+    if (jobId) {
+      const row = await loadJobStatus(jobId);
+      if (!row) return null;
+      // Same detail shape the batch route publishes
+      const { total, scanned, posted, completed, failed } = row;
+      return { status: row.status, detail: { total, scanned, posted, completed, failed } };
+    }
+    const call = await loadCallStatus(callId!);
+    if (!call) return null;
+    return {
+      status: call.status,
+      detail: {
+        has_transcript: call.has_transcript,
+        has_embedding: call.has_embedding,
+        has_analysis: call.has_analysis
+      }
+    };
+  };
+}
+
+function isTerminal(event: ProgressEvent, job: boolean) {
+  return job ? event.status === 'complete' || event.status === 'failed' : event.status === 'done' || event.status === 'error';
+}
+
+// GET /api/jobs/progress?id=<call_id> or ?job=<batch_id>
 export async function GET(req: NextRequest) {
   const callId = req.nextUrl.searchParams.get('id');
-  
-  if (!callId) {
+  const jobId = req.nextUrl.searchParams.get('job');
+
+  if (!callId && !jobId) {
     return NextResponse.json({ error: 'Missing call ID' }, { status: 400 });
   }
 
-  // Create a TransformStream for SSE
-  const encoder = new TextEncoder();
-  const stream = new TransformStream();
-  const writer = stream.writable.getWriter();
+  const job = !callId;
+  const channel = job ? jobChannel(jobId!) : callChannel(callId!);
 
-  // Start the SSE response
-  const response = new Response(stream.readable, {
-    headers: {
-      'Content-Type': 'text/event-stream',
-      'Cache-Control': 'no-cache',
-      'Connection': 'keep-alive',
-    },
-  });
+  const loader = channelLoader(callId, jobId);
 
-  // Poll for updates in the background
-  (async () => {
+  // Current state: from the feed if this instance has seen the channel, else one DB read
+  let initial = ProgressFeed.snapshot(channel);
+  if (!initial) {
     try {
-      let lastStatus = '';
-      let retries = 0;
-      const maxRetries = 60; // 60 seconds max
-
-      while (retries < maxRetries) {
-        // Get current call status
-        const call = await db.oneOrNone(`
-          SELECT 
-            c.id,
-            c.disposition,
-            CASE 
-              WHEN a.call_id IS NOT NULL THEN 'done'
-              WHEN e.call_id IS NOT NULL THEN 'analyzing'
-              WHEN t.call_id IS NOT NULL THEN 'embedding'
-              WHEN c.recording_url IS NOT NULL THEN 'transcribing'
-              ELSE 'queued'
-            END as status,
-            t.call_id IS NOT NULL as has_transcript,
-            e.call_id IS NOT NULL as has_embedding,
-            a.call_id IS NOT NULL as has_analysis
-          FROM calls c
-          LEFT JOIN transcripts t ON t.call_id = c.id
-          LEFT JOIN transcript_embeddings e ON e.call_id = c.id
-          LEFT JOIN analyses a ON a.call_id = c.id
-          WHERE c.id = $1
-        `, [callId]);
-
-        if (!call) {
-          await writer.write(encoder.encode(formatSSE({
-            status: 'error',
-            message: 'Call not found'
-          })));
-          break;
-        }
+      const current = await loader();
+      if (current) initial = ProgressFeed.seed(channel, current.status, current.detail);
+    } catch (error) {
+      console.error('[SSE] Error:', error);
+      return NextResponse.json({ error: 'Internal server error' }, { status: 500 });
+    }
+  }
 
-        // Send update if status changed
-        if (call.status !== lastStatus) {
-          await writer.write(encoder.encode(formatSSE({
-            status: call.status,
-            progress: {
-              queued: ['queued', 'transcribing', 'embedding', 'analyzing', 'done'].includes(call.status),
-              transcribing: ['transcribing', 'embedding', 'analyzing', 'done'].includes(call.status),
-              embedding: ['embedding', 'analyzing', 'done'].includes(call.status),
-              analyzing: ['analyzing', 'done'].includes(call.status),
-              done: call.status === 'done'
-            },
-            has_transcript: call.has_transcript,
-            has_embedding: call.has_embedding,
-            has_analysis: call.has_analysis
-          })));
-          
-          lastStatus = call.status;
-          
-          // If done, send final message and close
-          if (call.status === 'done') {
-            await writer.write(encoder.encode(formatSSE({
-              status: 'complete',
-              message: 'Processing complete'
-            })));
-            break;
-          }
+  const encoder = new TextEncoder();
+  let cleanup = () => {};
+
+  const stream = new ReadableStream({
+    start(controller) {
+      let closed = false;
+      const send = (data: any) => {
+        if (!closed) controller.enqueue(encoder.encode(formatSSE(data)));
+      };
+      const close = () => {
+        if (closed) return;
+        closed = true;
+        cleanup();
+        controller.close();
+      };
+      const sendEvent = (event: ProgressEvent) => {
+        send({
+          status: event.status,
+          progress: job ? event.detail : progressFlags(event.status),
+          ...(job ? {} : event.detail || {}),
+          seq: event.seq,
+          ts: event.ts
+        });
+        if (isTerminal(event, job)) {
+          send(event.status === 'done' || event.status === 'complete'
+            ? { status: 'complete', message: 'Processing complete' }
+            : { status: 'error', message: event.detail?.error || 'Processing failed' });
+          close();
         }
+      };
 
-        // Wait 1 second before next check
-        await new Promise(resolve => setTimeout(resolve, 1000));
-        retries++;
+      if (!initial) {
+        send({ status: 'error', message: job ? 'Job not found' : 'Call not found' });
+        close();
+        return;
       }
 
-      // Send timeout message if max retries reached
-      if (retries >= maxRetries) {
-        await writer.write(encoder.encode(formatSSE({
-          status: 'timeout',
-          message: 'Progress check timed out after 60 seconds'
-        })));
-      }
+      const unsubscribe = ProgressFeed.subscribe(channel, sendEvent, loader);
+      const keepAlive = setInterval(() => {
+        if (closed) return;
+        controller.enqueue(encoder.encode(': keepalive\n\n'));
+        // Catches writers that don't publish and events lost while LISTEN was down
+        ProgressFeed.recheck(channel).catch(error => console.error('[SSE] Recheck failed:', error));
+      }, KEEPALIVE_MS);
+      const timeout = setTimeout(() => {
+        send({ status: 'timeout', message: `Progress stream closed after ${MAX_STREAM_MS / 60000} minutes` });
+        close();
+      }, MAX_STREAM_MS);
+      cleanup = () => {
+        unsubscribe();
+        clearInterval(keepAlive);
+        clearTimeout(timeout);
+      };
+      req.signal.addEventListener('abort', close);
 
-    } catch (error) {
-      console.error('[SSE] Error:', error);
-      await writer.write(encoder.encode(formatSSE({
-        status: 'error',
-        message: 'Internal server error'
-      })));
-    } finally {
-      await writer.close();
+      sendEvent(initial);
+    },
+
+    cancel() {
+      cleanup();
     }
-  })();
+  });
 
-  return response;
-}
\ No newline at end of file
+  return new Response(stream, {
+    headers: {
+      'Content-Type': 'text/event-stream',
+      'Cache-Control': 'no-cache, no-transform',
+      'Connection': 'keep-alive',
+      'X-Accel-Buffering': 'no',
+    },
+  });
+}
@@ -3,7 +3,7 @@ import { db } from '@/server/db';
 import { transcribe, translateToEnglish } from '@/server/asr';
 import { ensureEmbedding } from '@/server/embeddings';
 import { truncatePayload } from '@/server/lib/retry';
-import { SSEManager } from '@/lib/sse';
+import { publishCallStatus } from '@/lib/progress-feed';
 import { withRateLimit } from '@/lib/rate-limit';
 
 export const dynamic = 'force-dynamic';
@@ -50,7 +50,7 @@ async function handler(req: NextRequest) {
 
   try {
     // Send SSE update: transcribing
-    SSEManager.sendStatus(callId, 'transcribing', { engine: 'starting' });
+    await publishCallStatus(callId, 'transcribing', { engine: 'starting' });
     
     // Use new ASR service layer
     const result = await transcribe(url);
@@ -97,6 +97,7 @@ async function handler(req: NextRequest) {
       }]);
 
     // Generate embedding for search
+    await publishCallStatus(callId, 'embedding');
     let embeddingCreated = false;
     try {
       await ensureEmbedding(callId);
@@ -125,7 +126,7 @@ async function handler(req: NextRequest) {
       // For compliance-only customers, skip expensive full analysis
       // Instead, automatically extract post-close segment and analyze compliance
       try {
-        SSEManager.sendStatus(callId, 'analyzing', { stage: 'compliance_only' });
+        await publishCallStatus(callId, 'analyzing', { stage: 'compliance_only' });
 
         const { extractPostCloseSegment, analyzeCompliance } = await import('@/lib/post-close-analysis');
 
@@ -187,7 +188,7 @@ async function handler(req: NextRequest) {
       // Full analysis for regular customers
       try {
         // Send SSE update: analyzing
-        SSEManager.sendStatus(callId, 'analyzing', { stage: 'starting' });
+        await publishCallStatus(callId, 'analyzing', { stage: 'starting' });
 
         const analyzeResp = await fetch(`${process.env.APP_URL}/api/jobs/analyze`, {
           method: 'POST',
@@ -215,7 +216,7 @@ async function handler(req: NextRequest) {
     }
 
     // Send final SSE status
-    SSEManager.sendStatus(callId, 'done', { 
+    await publishCallStatus(callId, 'done', { 
       transcribed: true, 
       analyzed: analyzeOk,
       engine: result.engine,
@@ -231,6 +232,7 @@ async function handler(req: NextRequest) {
       ...analyzeData
     });
   } catch (error: any) {
+    await publishCallStatus(callId, 'error', { error: error.message });
     await db.none(`insert into call_events(call_id, type, payload) values($1, 'transcribe_error', $2)`, 
       [callId, truncatePayload({ 
         error: error.message,
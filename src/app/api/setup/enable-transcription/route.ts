@@ -1,5 +1,6 @@
 import { NextRequest, NextResponse } from 'next/server';
 import { db } from '@/server/db';
+import { SCHEDULING_SQL } from '@/lib/queue-schedule';
 
 export async function GET(req: NextRequest) {
   try {
@@ -82,44 +83,10 @@ export async function GET(req: NextRequest) {
       $$ LANGUAGE plpgsql
     `);
 
-    // Create get_next_transcription_job function
-    await db.none(`
-      CREATE OR REPLACE FUNCTION get_next_transcription_job()
-      RETURNS TABLE (
-        queue_id INTEGER,
-        call_id UUID,
-        recording_url TEXT,
-        priority INTEGER,
-        attempts INTEGER
-      ) AS $$
-      BEGIN
-        RETURN QUERY
-        UPDATE transcription_queue tq
-        SET
-          status = 'processing',
-          started_at = NOW(),
-          attempts = tq.attempts + 1
-        FROM (
-          SELECT id
-          FROM transcription_queue
-          WHERE status = 'pending'
-            AND transcription_queue.attempts < 3
-          ORDER BY
-            transcription_queue.priority DESC,
-            transcription_queue.created_at ASC
-          LIMIT 1
-          FOR UPDATE SKIP LOCKED
-        ) next_job
-        WHERE tq.id = next_job.id
-        RETURNING
-          tq.id as queue_id,
-          tq.call_id,
-          tq.recording_url,
-          tq.priority,
-          tq.attempts;
-      END;
-      $$ LANGUAGE plpgsql
-    `);
+    // Scheduler functions and get_next_transcription_job (priority class, aged shortest job first)
+    for (const statement of SCHEDULING_SQL) {
+      await db.none(statement);
+    }
 
     // Create complete_transcription_job function
     await db.none(`
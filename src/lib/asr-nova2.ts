@@ -55,7 +55,10 @@ export type EnrichedTranscript = {
   };
 };
 
-const dg = createClient(process.env.DEEPGRAM_API_KEY!);
+// DEEPGRAM_BASE_URL sends ASR elsewhere, e.g. local_stub.py for benchmarks (OPENAI_BASE_URL does the same for the LLM)
+const dg = createClient(process.env.DEEPGRAM_API_KEY!, process.env.DEEPGRAM_BASE_URL
+  ? { global: { fetch: { options: { url: process.env.DEEPGRAM_BASE_URL } } } }
+  : {});
 
 // Price correction mappings
 const PRICE_CORRECTIONS: Record<string, string> = {
@@ -281,7 +284,16 @@ export async function transcribeFromUrl(mp3Url: string, overrides?: AsrOverrides
     throw new Error(`Deepgram error: ${resp?.error || 'No result returned'}`);
   }
 
-  const results = resp?.result?.results;
+  return enrichDeepgramResult(resp.result);
+}
+
+/**
+ * Segments, entities and metrics from a Deepgram prerecorded result, either
+ * the SDK's `result` or a response a batch tool already fetched and cached
+ */
+export function enrichDeepgramResult(result: any): EnrichedTranscript {
+  const results = result?.results;
+  const channels = results?.channels || [];
   const uts = results?.utterances ?? [];
 
   console.log('=== SEGMENT CONVERSION ===');
@@ -289,7 +301,7 @@ export async function transcribeFromUrl(mp3Url: string, overrides?: AsrOverrides
 
   if (!uts.length) {
     console.error('NO UTTERANCES FOUND IN DEEPGRAM RESPONSE');
-    console.log('Full response structure:', JSON.stringify(resp?.result?.results, null, 2).substring(0, 1000));
+    console.log('Full response structure:', JSON.stringify(results, null, 2)?.substring(0, 1000));
   }
 
   // Process segments with price fixing
@@ -602,11 +614,8 @@ function calculateSalesMetrics(keyPhrases: KeyPhrase[], segments: Segment[]): En
   return metrics;
 }
 
-// Wrapper function for simple-analysis.ts compatibility
-export async function transcribeBulk(audioUrl: string, overrides?: AsrOverrides) {
-  const enriched = await transcribeFromUrl(audioUrl, overrides);
-
-  // Return simplified format for simple-analysis
+// Simplified format for simple-analysis
+function toBulk(enriched: EnrichedTranscript, requestId: string | null = null) {
   return {
     segments: enriched.segments,
     entities: enriched.entities || [],
@@ -615,6 +624,23 @@ export async function transcribeBulk(audioUrl: string, overrides?: AsrOverrides)
     ).join('\n\n'),
     summary: null, // Summary is not available in keyPhrases
     duration: enriched.conversationMetrics?.totalDuration || 0,
-    requestId: null // We don't have this in the new format
+    requestId
   };
-}
\ No newline at end of file
+}
+
+// Wrapper function for simple-analysis.ts compatibility
+export async function transcribeBulk(audioUrl: string, overrides?: AsrOverrides) {
+  return toBulk(await transcribeFromUrl(audioUrl, overrides));
+}
+
+/**
+ * Same shape as transcribeBulk, from a Deepgram response the caller already has
+ * (backfill_runner.py transcribes, pre-classifies and redacts before analysis)
+ */
+export function transcribeCached(deepgram: any) {
+  const result = deepgram?.result ?? deepgram;
+  if (!result?.results?.utterances) {
+    throw new Error('Cached Deepgram response has no utterances');
+  }
+  return toBulk(enrichDeepgramResult(result), result.metadata?.request_id ?? null);
+}
@@ -0,0 +1,283 @@
+/**
+ * Shared progress change feed.
+ *
+ * Pipeline stages publish status changes here instead of subscribers polling
+ * the database. Each event is fanned out in-process through SSEManager and
+ * broadcast to other instances with a single Postgres NOTIFY; every instance
+ * holds one LISTEN connection no matter how many SSE subscribers it serves.
+ * The last event per channel is kept so late subscribers start from the
+ * current state without a query.
+ *
+ * Not every writer publishes (admin tools, crons and scripts write transcripts
+ * and analyses directly) and NOTIFYs sent while the LISTEN connection is down
+ * are lost, so subscribers may register a loader: watched channels are
+ * re-read from the database at most once per RECHECK_MS, and all of them
+ * right after the LISTEN connection is re-established.
+ */
+
+import pg from 'pg';
+import crypto from 'crypto';
+import { SSEManager } from './sse';
+
+const PG_CHANNEL = 'progress_feed';
+const INSTANCE_ID = crypto.randomBytes(6).toString('hex');
+const MAX_SNAPSHOTS = 5000;
+const RECHECK_MS = 30000;
+const RECONNECT_MIN_MS = 1000;
+const RECONNECT_MAX_MS = 30000;
+
+export type ProgressStatus = 'queued' | 'transcribing' | 'embedding' | 'analyzing' | 'done' | 'error';
+
+export const STATUS_ORDER: ProgressStatus[] = ['queued', 'transcribing', 'embedding', 'analyzing', 'done'];
+
+export type ProgressEvent = {
+  channel: string;
+  status: ProgressStatus | string;
+  detail?: any;
+  seq: number;
+  ts: number;  // publish time in epoch ms, for delivery latency
+};
+
+export type ProgressLoader = () => Promise<{ status: string; detail?: any } | null>;
+
+export const callChannel = (callId: string) => `call-${callId}`;
+export const jobChannel = (jobId: string) => `job-${jobId}`;
+
+/**
+ * Progress flags as the progress route has always reported them
+ */
+export function progressFlags(status: string) {
+  const reached = STATUS_ORDER.indexOf(status as ProgressStatus);
+  return {
+    queued: reached >= 0,
+    transcribing: reached >= 1,
+    embedding: reached >= 2,
+    analyzing: reached >= 3,
+    done: status === 'done'
+  };
+}
+
+class Feed {
+  private snapshots = new Map<string, ProgressEvent>();
+  private listeners = new Map<string, Set<(event: ProgressEvent) => void>>();
+  private loaders = new Map<string, ProgressLoader>();
+  private checked = new Map<string, number>();
+  private listener: pg.Client | null = null;
+  private listening: Promise<void> | null = null;
+  private reconnectTimer: ReturnType<typeof setTimeout> | null = null;
+  private reconnectDelay = RECONNECT_MIN_MS;
+  private dropped = false;
+  private seq = 0;
+  private counters = { published: 0, notified: 0, received: 0, delivered: 0, db_queries: 0, rechecks: 0, recheck_updates: 0, reconnects: 0 };
+
+  private deliver(event: ProgressEvent) {
+    this.snapshots.delete(event.channel);
+    this.snapshots.set(event.channel, event);
+    while (this.snapshots.size > MAX_SNAPSHOTS) {
+      this.snapshots.delete(this.snapshots.keys().next().value as string);
+    }
+    // Raw stream controllers registered with SSEManager, then callback subscribers
+    this.counters.delivered += SSEManager.connectionCount(event.channel);
+    SSEManager.sendEvent(event.channel, 'message', event);
+    for (const listener of this.listeners.get(event.channel) || []) {
+      this.counters.delivered++;
+      try {
+        listener(event);
+      } catch (error) {
+        console.error('[ProgressFeed] Listener failed:', error);
+      }
+    }
+  }
+
+  /**
+   * Call `listener` for every event on `channel`; returns an unsubscribe function.
+   * `loader` reads the channel's current state from the database for recheck().
+   */
+  subscribe(channel: string, listener: (event: ProgressEvent) => void, loader?: ProgressLoader) {
+    this.ensureListening();
+    if (!this.listeners.has(channel)) this.listeners.set(channel, new Set());
+    this.listeners.get(channel)!.add(listener);
+    if (loader) this.loaders.set(channel, loader);
+    return () => {
+      const set = this.listeners.get(channel);
+      if (!set) return;
+      set.delete(listener);
+      if (set.size === 0) {
+        this.listeners.delete(channel);
+        this.loaders.delete(channel);
+        this.checked.delete(channel);
+      }
+    };
+  }
+
+  /**
+   * Re-read a watched channel from the database and deliver it if it moved on
+   * from the snapshot. At most one read per channel per RECHECK_MS unless forced,
+   * however many subscribers call this on their keepalive.
+   */
+  async recheck(channel: string, force = false) {
+    const loader = this.loaders.get(channel);
+    if (!loader) return;
+    const now = Date.now();
+    if (!force && now - (this.checked.get(channel) || 0) < RECHECK_MS) return;
+    this.checked.set(channel, now);
+
+    this.counters.rechecks++;
+    this.counters.db_queries++;
+    const current = await loader();
+    if (!current) return;
+    const snapshot = this.snapshots.get(channel);
+    if (snapshot && !advanced(snapshot, current)) return;
+    this.counters.recheck_updates++;
+    // Local only: every instance rechecks its own subscribers
+    this.deliver({ channel, status: current.status, detail: current.detail, seq: ++this.seq, ts: Date.now() });
+  }
+
+  /**
+   * Publish a status change; one NOTIFY per event regardless of subscriber count
+   */
+  async publish(channel: string, status: ProgressStatus | string, detail?: any) {
+    const event: ProgressEvent = { channel, status, detail, seq: ++this.seq, ts: Date.now() };
+    this.counters.published++;
+    this.deliver(event);
+
+    if (!process.env.DATABASE_URL) return;
+    try {
+      const { db } = await import('@/server/db');
+      await db.none('SELECT pg_notify($1, $2)', [PG_CHANNEL, JSON.stringify({ origin: INSTANCE_ID, event })]);
+      this.counters.notified++;
+      this.counters.db_queries++;
+    } catch (error) {
+      // Local subscribers already have the event; other instances catch up on their next snapshot
+      console.error('[ProgressFeed] NOTIFY failed:', error);
+    }
+  }
+
+  /**
+   * Open this instance's single LISTEN connection (idempotent)
+   */
+  ensureListening(): Promise<void> {
+    if (this.listening || !process.env.DATABASE_URL) return this.listening || Promise.resolve();
+
+    this.listening = (async () => {
+      const client = new pg.Client({
+        connectionString: process.env.DATABASE_URL,
+        ssl: process.env.DATABASE_URL!.includes('supabase') ? { rejectUnauthorized: false } : undefined
+      });
+      client.on('notification', msg => {
+        if (msg.channel !== PG_CHANNEL || !msg.payload) return;
+        try {
+          const { origin, event } = JSON.parse(msg.payload);
+          if (origin === INSTANCE_ID) return;  // already delivered locally
+          this.counters.received++;
+          this.deliver(event);
+        } catch (error) {
+          console.error('[ProgressFeed] Bad notification payload:', error);
+        }
+      });
+      const lost = (reason: string) => {
+        if (this.listener !== client) return;
+        console.error('[ProgressFeed] LISTEN connection lost:', reason);
+        this.listener = null;
+        this.listening = null;
+        this.dropped = true;
+        client.end().catch(() => {});
+        this.scheduleReconnect();
+      };
+      client.on('error', error => lost(error.message));
+      client.on('end', () => lost('connection ended'));
+      await client.connect();
+      await client.query(`LISTEN ${PG_CHANNEL}`);
+      this.listener = client;
+      this.reconnectDelay = RECONNECT_MIN_MS;
+      if (this.dropped) {
+        this.dropped = false;
+        this.resync();
+      }
+    })().catch(error => {
+      console.error('[ProgressFeed] Could not LISTEN:', error.message);
+      this.listening = null;
+      this.dropped = true;
+      this.scheduleReconnect();
+    });
+    return this.listening;
+  }
+
+  /**
+   * Retry LISTEN with backoff while anyone is subscribed; otherwise the next
+   * subscribe reconnects
+   */
+  private scheduleReconnect() {
+    if (this.reconnectTimer || (this.listeners.size === 0 && SSEManager.totalConnections() === 0)) return;
+    const delay = this.reconnectDelay;
+    this.reconnectDelay = Math.min(this.reconnectDelay * 2, RECONNECT_MAX_MS);
+    this.reconnectTimer = setTimeout(() => {
+      this.reconnectTimer = null;
+      this.counters.reconnects++;
+      this.ensureListening();
+    }, delay);
+  }
+
+  /**
+   * After a LISTEN outage: snapshots may have missed events, so drop the
+   * unwatched ones and re-read the watched ones
+   */
+  private resync() {
+    for (const channel of Array.from(this.snapshots.keys())) {
+      if (!this.listeners.has(channel)) this.snapshots.delete(channel);
+    }
+    for (const channel of Array.from(this.loaders.keys())) {
+      this.recheck(channel, true).catch(error => {
+        console.error('[ProgressFeed] Recheck failed:', error.message);
+      });
+    }
+  }
+
+  snapshot(channel: string): ProgressEvent | null {
+    return this.snapshots.get(channel) || null;
+  }
+
+  /**
+   * Seed a channel from a one-off database read (first subscriber only)
+   */
+  seed(channel: string, status: string, detail?: any): ProgressEvent {
+    this.counters.db_queries++;
+    const event: ProgressEvent = { channel, status, detail, seq: 0, ts: Date.now() };
+    if (!this.snapshots.has(channel)) this.snapshots.set(channel, event);
+    return this.snapshots.get(channel)!;
+  }
+
+  stats() {
+    return {
+      instance: INSTANCE_ID,
+      listening: !!this.listener,
+      channels: this.snapshots.size,
+      subscribers: SSEManager.totalConnections() +
+        Array.from(this.listeners.values()).reduce((n, set) => n + set.size, 0),
+      ...this.counters
+    };
+  }
+}
+
+/**
+ * Whether a database read is further along than the snapshot. Call statuses
+ * only move forward through STATUS_ORDER (a stale read must not undo a pushed
+ * event); anything else, like batch counts, is compared as-is.
+ */
+function advanced(snapshot: ProgressEvent, current: { status: string; detail?: any }) {
+  const was = STATUS_ORDER.indexOf(snapshot.status as ProgressStatus);
+  const now = STATUS_ORDER.indexOf(current.status as ProgressStatus);
+  if (was >= 0 && now >= 0) return now > was;
+  return snapshot.status !== current.status ||
+    JSON.stringify(snapshot.detail ?? null) !== JSON.stringify(current.detail ?? null);
+}
+
+export const ProgressFeed = new Feed();
+
+export function publishCallStatus(callId: string, status: ProgressStatus, detail?: any) {
+  return ProgressFeed.publish(callChannel(callId), status, detail);
+}
+
+export function publishJobProgress(jobId: string, status: string, detail?: any) {
+  return ProgressFeed.publish(jobChannel(jobId), status, detail);
+}
@@ -0,0 +1,144 @@
+/**
+ * Queue ordering for recording work: priority class, then shortest expected
+ * job first with aging.
+ *
+ * Compliance calls (DNC dispositions, compliance campaigns, anything listed in
+ * transcription_priority_campaigns) and queue jobs with priority >= HIGH_PRIORITY
+ * run ahead of routine ones; within a class
+ * the job with the smallest expected processing time minus AGING_RATE per
+ * second waited goes first, so short calls are not stuck behind 40 minute
+ * ones and long calls still get their turn. Routine jobs waiting
+ * CLASS_PROMOTE_SEC compete as compliance.
+ *
+ * get_next_transcription_job() applies the same order in SQL
+ * (supabase/migrations/20251019_transcription_queue_scheduling.sql, or
+ * SCHEDULING_SQL from the setup routes); queue_scheduler.py simulates it
+ * against FIFO.
+ */
+
+export const CLASS_COMPLIANCE = 0;
+export const CLASS_ROUTINE = 1;
+
+// Expected cost (6s + 0.12s per audio second, 300s when unknown) lives in
+// transcription_expected_seconds() so the cron routes and the queue agree
+export const AGING_RATE = 0.1;
+export const CLASS_PROMOTE_SEC = 900;
+// transcription_queue.priority (0 normal, 10 high, 100 urgent) that runs as compliance
+export const HIGH_PRIORITY = 10;
+
+/**
+ * ORDER BY terms for a query over `calls` rows.
+ * Column expressions are SQL, e.g. scheduleOrderSql({ campaign: 'c.campaign', ... });
+ * pass `priority` for transcription_queue rows so high priority jobs join the compliance class
+ */
+export function scheduleOrderSql(cols: {
+  campaign: string;
+  disposition: string;
+  durationSec: string;
+  waitingSince: string;
+  priority?: string;
+}) {
+  const waited = `EXTRACT(EPOCH FROM (NOW() - ${cols.waitingSince}))`;
+  const cls = cols.priority
+    ? `transcription_job_class(${cols.campaign}, ${cols.disposition}, ${cols.priority})`
+    : `transcription_priority_class(${cols.campaign}, ${cols.disposition})`;
+  const terms = [
+    `GREATEST(0, ${cls} - FLOOR(${waited} / ${CLASS_PROMOTE_SEC}))`,
+    `transcription_expected_seconds(${cols.durationSec}) - ${AGING_RATE} * ${waited}`,
+  ];
+  if (cols.priority) terms.push(`${cols.priority} DESC`);
+  return terms.join(',\n        ');
+}
+
+/**
+ * Statements that install the scheduler functions and the scheduled
+ * get_next_transcription_job(), for the setup routes; same as the migration
+ */
+export const SCHEDULING_SQL = [
+  `CREATE TABLE IF NOT EXISTS transcription_priority_campaigns (
+    campaign TEXT PRIMARY KEY,
+    priority_class SMALLINT NOT NULL DEFAULT 0,
+    created_at TIMESTAMPTZ DEFAULT NOW()
+  )`,
+  `CREATE OR REPLACE FUNCTION transcription_priority_class(
+    p_campaign TEXT,
+    p_disposition TEXT
+  ) RETURNS SMALLINT AS $$
+    SELECT COALESCE(
+      (SELECT priority_class FROM transcription_priority_campaigns WHERE campaign = p_campaign),
+      CASE
+        WHEN p_campaign ~* '\\m(dnc|do[ _-]?not[ _-]?call|compliance|tcpa)\\M' THEN ${CLASS_COMPLIANCE}
+        WHEN p_disposition ~* '\\m(dnc|do[ _-]?not[ _-]?call|compliance|tcpa)\\M' THEN ${CLASS_COMPLIANCE}
+        ELSE ${CLASS_ROUTINE}
+      END
+    )::SMALLINT;
+  $$ LANGUAGE sql STABLE`,
+  `CREATE OR REPLACE FUNCTION transcription_job_class(
+    p_campaign TEXT,
+    p_disposition TEXT,
+    p_priority INTEGER
+  ) RETURNS SMALLINT AS $$
+    SELECT CASE
+      WHEN COALESCE(p_priority, 0) >= ${HIGH_PRIORITY} THEN ${CLASS_COMPLIANCE}::SMALLINT
+      ELSE transcription_priority_class(p_campaign, p_disposition)
+    END;
+  $$ LANGUAGE sql STABLE`,
+  `CREATE OR REPLACE FUNCTION transcription_expected_seconds(p_duration_sec INTEGER)
+  RETURNS DOUBLE PRECISION AS $$
+    SELECT 6.0 + 0.12 * COALESCE(NULLIF(GREATEST(p_duration_sec, 0), 0), 300);
+  $$ LANGUAGE sql IMMUTABLE`,
+  `CREATE INDEX IF NOT EXISTS idx_transcription_queue_pending
+    ON transcription_queue(created_at)
+    WHERE status = 'pending' AND attempts < 3`,
+  // Return type differs from the pre-scheduling function, so drop first
+  `DROP FUNCTION IF EXISTS get_next_transcription_job()`,
+  `CREATE FUNCTION get_next_transcription_job()
+  RETURNS TABLE (
+    queue_id INTEGER,
+    call_id UUID,
+    recording_url TEXT,
+    priority INTEGER,
+    attempts INTEGER,
+    priority_class SMALLINT,
+    expected_sec DOUBLE PRECISION
+  ) AS $$
+  BEGIN
+    RETURN QUERY
+    UPDATE transcription_queue tq
+    SET
+      status = 'processing',
+      started_at = NOW(),
+      attempts = tq.attempts + 1
+    FROM (
+      SELECT
+        q.id,
+        transcription_job_class(c.campaign, c.disposition, q.priority) as cls,
+        transcription_expected_seconds(COALESCE(q.duration_sec, c.duration_sec)) as expected
+      FROM transcription_queue q
+      LEFT JOIN calls c ON c.id = q.call_id
+      WHERE q.status = 'pending'
+        AND q.attempts < 3
+      ORDER BY
+        ${scheduleOrderSql({
+          campaign: 'c.campaign',
+          disposition: 'c.disposition',
+          durationSec: 'COALESCE(q.duration_sec, c.duration_sec)',
+          waitingSince: 'q.created_at',
+          priority: 'q.priority'
+        })},
+        q.created_at ASC
+      LIMIT 1
+      FOR UPDATE OF q SKIP LOCKED
+    ) next_job
+    WHERE tq.id = next_job.id
+    RETURNING
+      tq.id as queue_id,
+      tq.call_id as call_id,
+      tq.recording_url as recording_url,
+      tq.priority as priority,
+      tq.attempts as attempts,
+      next_job.cls as priority_class,
+      next_job.expected as expected_sec;
+  END;
+  $$ LANGUAGE plpgsql`
+];
@@ -2,9 +2,10 @@ import OpenAI from "openai";
 import { buildAgentSnippetsAroundObjections, classifyRebuttals, buildImmediateReplies, type Segment, type ObjectionSpan } from "./rebuttals";
 import { computeTalkMetrics } from "./talk-metrics";
 import { normalizeMoney, parseMoneyValue, type MoneyContext } from "./money-normalizer";
-import { transcribeBulk, type Entity, type AsrOverrides } from "./asr-nova2";
+import { transcribeBulk, transcribeCached, type Entity, type AsrOverrides } from "./asr-nova2";
 import type { Settings } from "@/config/asr-analysis";
 import { DEFAULTS } from "@/config/asr-analysis";
+import { StageRun } from "./stage-cache";
 
 const openai = new OpenAI({ apiKey: process.env.OPENAI_API_KEY! });
 
@@ -225,12 +226,21 @@ const whiteCardSchema = {
   }
 };
 
-export async function analyzeCallSimple(audioUrl: string, meta?: any, settings?: Settings) {
+export async function analyzeCallSimple(
+  audioUrl: string,
+  meta?: any,
+  settings?: Settings,
+  options?: { force?: boolean; deepgram?: any }
+) {
   // Use provided settings or fall back to defaults
   const config = settings || DEFAULTS;
 
   console.log('Settings being used:', config);
 
+  // Every stage is memoized on its upstream stage keys plus only the settings
+  // fields it reads, so a settings tweak recomputes just the affected stages
+  const run = new StageRun(options?.force);
+
   // Step 1: Get transcript from Deepgram with diarization and entity detection
   console.log('Getting transcript from Deepgram with enhanced features...');
 
@@ -248,7 +258,17 @@ export async function analyzeCallSimple(audioUrl: string, meta?: any, settings?:
     keywords: config.asr.keywords
   };
 
-  const enrichedResult = await transcribeBulk(audioUrl, asrOverrides);
+  // A caller that already transcribed sends the Deepgram response, so ASR is not paid twice.
+  // Keyed on its transcript text, so a redacted copy never reuses an unredacted entry.
+  const cached = options?.deepgram?.result ?? options?.deepgram;
+  const enrichedResult = cached
+    ? await run.run('transcribe', {
+        audioUrl,
+        deepgram: cached.metadata?.request_id ?? null,
+        transcript: cached.results?.channels?.[0]?.alternatives?.[0]?.transcript ?? null
+      }, () => transcribeCached(cached))
+    : await run.run('transcribe', { audioUrl, asr: asrOverrides },
+        () => transcribeBulk(audioUrl, asrOverrides));
 
   // Extract segments for rebuttals and metrics
   const segments: Segment[] = enrichedResult.segments;
@@ -263,7 +283,7 @@ export async function analyzeCallSimple(audioUrl: string, meta?: any, settings?:
     transcript: s.text
   }));
 
-  console.log(`Transcript ready: ${segments.length} utterances, ${entities.length} entities detected`);
+  console.log(`Transcript ready: ${segments.length} utterances, ${entities.length} entities detected (${run.status.transcribe})`);
   if (enrichedResult.summary) {
     console.log(`Deepgram summary: ${enrichedResult.summary}`);
   }
@@ -271,134 +291,110 @@ export async function analyzeCallSimple(audioUrl: string, meta?: any, settings?:
   // Step 2: Pass A - Extract mentions with entity augmentation
   console.log('Running Pass A: Extracting mentions...');
 
-  // Build entities context for Pass A
-  const entitiesContext = entities.map(e =>
-    `[${e.label}] "${e.value}" at ${e.startMs}ms (${e.speaker || 'unknown'})`
-  ).join('\n');
-
-  const passAResponse = await openai.chat.completions.create({
-    model: "gpt-4o-mini",
-    messages: [
-      { role: "system", content: passAPrompt },
-      {
-        role: "user",
-        content: `CALL_META:\n- call_started_at_iso: ${new Date().toISOString()}\n- tz: America/New_York\n\nDEEPGRAM_ENTITIES:\n${entitiesContext || '(none detected)'}\n\nTRANSCRIPT:\n${formattedTranscript}`
-      }
-    ],
-    temperature: 0.1,
-    response_format: { type: "json_object" }
-  });
+  const mentionsTable = await run.run('pass_a', { transcribe: run.keys.transcribe }, async () => {
+    // Build entities context for Pass A
+    const entitiesContext = entities.map(e =>
+      `[${e.label}] "${e.value}" at ${e.startMs}ms (${e.speaker || 'unknown'})`
+    ).join('\n');
+
+    const passAResponse = await openai.chat.completions.create({
+      model: "gpt-4o-mini",
+      messages: [
+        { role: "system", content: passAPrompt },
+        {
+          role: "user",
+          content: `CALL_META:\n- call_started_at_iso: ${new Date().toISOString()}\n- tz: America/New_York\n\nDEEPGRAM_ENTITIES:\n${entitiesContext || '(none detected)'}\n\nTRANSCRIPT:\n${formattedTranscript}`
+        }
+      ],
+      temperature: 0.1,
+      response_format: { type: "json_object" }
+    });
 
-  const mentionsTable = JSON.parse(passAResponse.choices[0].message.content || "{}");
+    run.countTokens('pass_a', passAResponse.usage);
+    const table = JSON.parse(passAResponse.choices[0].message.content || "{}");
 
-  // Augment mentions with Deepgram entities
-  augmentMentionsWithEntities(mentionsTable, entities);
+    // Augment mentions with Deepgram entities
+    augmentMentionsWithEntities(table, entities);
 
-  // Add timestamps to all mentions using position-to-timestamp mapping
-  addTimestampsToMentions(mentionsTable, segments, formattedTranscript);
+    // Add timestamps to all mentions using position-to-timestamp mapping
+    addTimestampsToMentions(table, segments, formattedTranscript);
+    return table;
+  });
 
-  console.log(`Pass A complete: ${mentionsTable.money_mentions?.length || 0} money mentions (${entities.filter(e => e.label === 'money').length} from entities), ${mentionsTable.objection_spans?.length || 0} objections found`);
+  console.log(`Pass A complete: ${mentionsTable.money_mentions?.length || 0} money mentions (${entities.filter(e => e.label === 'money').length} from entities), ${mentionsTable.objection_spans?.length || 0} objections found (${run.status.pass_a})`);
 
   // Step 2b: Run rebuttals detection if objections exist
-  let rebuttals = null;
-  let immediate: any[] = [];
-  if (mentionsTable.objection_spans?.length > 0) {
+  const { rebuttals, immediate } = await run.run('rebuttals', {
+    pass_a: run.keys.pass_a,
+    windowMs: config.rebuttal.windowMs
+  }, async () => {
+    if (!(mentionsTable.objection_spans?.length > 0)) {
+      return { rebuttals: null, immediate: [] as any[] };
+    }
     console.log('Running rebuttals detection...');
     const objectionSpans: ObjectionSpan[] = mentionsTable.objection_spans;
 
     // Get immediate replies (deterministic, no LLM)
-    immediate = buildImmediateReplies(segments, objectionSpans, 15000);
+    const replies = buildImmediateReplies(segments, objectionSpans, 15000);
 
     // Get classified rebuttals (LLM)
-    const items = buildAgentSnippetsAroundObjections(segments, objectionSpans);
-    rebuttals = await classifyRebuttals(items);
-    console.log(`Rebuttals classified: ${rebuttals?.used?.length || 0} addressed, ${rebuttals?.missed?.length || 0} missed`);
-  }
+    const items = buildAgentSnippetsAroundObjections(segments, objectionSpans, config.rebuttal.windowMs);
+    const classified = await classifyRebuttals(items);
+    console.log(`Rebuttals classified: ${classified?.used?.length || 0} addressed, ${classified?.missed?.length || 0} missed`);
+    return { rebuttals: classified, immediate: replies };
+  });
 
   // Step 3: Pass B - Generate final white card
   console.log('Running Pass B: Generating final white card...');
 
-  const passBResponse = await openai.chat.completions.create({
-    model: "gpt-4o",
-    messages: [
-      { role: "system", content: passBPrompt },
-      {
-        role: "user",
-        content: `CALL_META:\n- call_started_at_iso: ${new Date().toISOString()}\n- tz: America/New_York\n\nMENTIONS_TABLE:\n${JSON.stringify(mentionsTable, null, 2)}\n\nTRANSCRIPT:\n${formattedTranscript}`
-      }
-    ],
-    temperature: 0.1,
-    response_format: {
-      type: "json_schema",
-      json_schema: {
-        name: "WhiteCard",
-        schema: whiteCardSchema,
-        strict: true
+  const passBAnalysis = await run.run('pass_b', { pass_a: run.keys.pass_a }, async () => {
+    const passBResponse = await openai.chat.completions.create({
+      model: "gpt-4o",
+      messages: [
+        { role: "system", content: passBPrompt },
+        {
+          role: "user",
+          content: `CALL_META:\n- call_started_at_iso: ${new Date().toISOString()}\n- tz: America/New_York\n\nMENTIONS_TABLE:\n${JSON.stringify(mentionsTable, null, 2)}\n\nTRANSCRIPT:\n${formattedTranscript}`
+        }
+      ],
+      temperature: 0.1,
+      response_format: {
+        type: "json_schema",
+        json_schema: {
+          name: "WhiteCard",
+          schema: whiteCardSchema,
+          strict: true
+        }
       }
-    }
-  });
+    });
 
-  const analysis = JSON.parse(passBResponse.choices[0].message.content || "{}");
+    run.countTokens('pass_b', passBResponse.usage);
+    return JSON.parse(passBResponse.choices[0].message.content || "{}");
+  });
 
   // Step 3b: Apply deterministic money normalization
   // Store both raw and normalized values for auditing
-  const rawMonthlyPremium = analysis.monthly_premium;
-  const rawEnrollmentFee = analysis.enrollment_fee;
-
-  if (mentionsTable.money_mentions?.length > 0) {
-    // Find the most recent/relevant money mentions for each field
-    const premiumMention = mentionsTable.money_mentions.find((m: any) =>
-      m.field_hint === 'monthly_premium' || m.field_hint === 'first_month_bill'
-    );
-    const enrollmentMention = mentionsTable.money_mentions.find((m: any) =>
-      m.field_hint === 'enrollment_fee'
-    );
-
-    // Apply normalization if we have values to normalize
-    if (analysis.monthly_premium !== null && premiumMention) {
-      const context: MoneyContext = premiumMention.field_hint === 'monthly_premium' ? 'monthly_premium' : 'first_month_bill';
-      analysis.monthly_premium = normalizeMoney(
-        analysis.monthly_premium,
-        context,
-        premiumMention.quote || premiumMention.value_raw
-      );
-    }
-
-    if (analysis.enrollment_fee !== null && enrollmentMention) {
-      analysis.enrollment_fee = normalizeMoney(
-        analysis.enrollment_fee,
-        'enrollment_fee',
-        enrollmentMention.quote || enrollmentMention.value_raw
-      );
-    }
-  }
-
-  // Also normalize prices found in carrier mentions
-  if (mentionsTable.carrier_mentions?.length > 0) {
-    mentionsTable.carrier_mentions = mentionsTable.carrier_mentions.map((carrier: any) => {
-      const quote = carrier.quote || '';
-      // Look for price patterns in carrier quotes
-      const priceMatch = quote.match(/\$(\d+(?:\.\d{2})?)/);
-      if (priceMatch) {
-        const rawPrice = parseFloat(priceMatch[1]);
-        // Apply same normalization rules as monthly premium for carrier prices
-        if (rawPrice < 50) {
-          const normalizedPrice = rawPrice * 100;
-          // Update the quote with normalized price
-          carrier.normalized_quote = quote.replace(priceMatch[0], `$${normalizedPrice.toFixed(2)}`);
-          carrier.price_normalized = true;
-          carrier.raw_price = rawPrice;
-          carrier.normalized_price = normalizedPrice;
-        }
-      }
-      return carrier;
-    });
+  const rawMonthlyPremium = passBAnalysis.monthly_premium;
+  const rawEnrollmentFee = passBAnalysis.enrollment_fee;
+
+  const { analysis, carrierMentions } = await run.run('money', {
+    pass_a: run.keys.pass_a,
+    pass_b: run.keys.pass_b,
+    premiumHundredsIfUnder: config.money.premiumHundredsIfUnder
+  }, () => normalizeAnalysisMoney(passBAnalysis, mentionsTable, config.money.premiumHundredsIfUnder));
+  if (carrierMentions) {
+    mentionsTable.carrier_mentions = carrierMentions;
   }
 
   // Compute deterministic talk metrics from diarized segments
-  const talk_metrics = segments && segments.length > 0
+  // computeTalkMetrics reads no settings, so the interrupt thresholds are not part of its key
+  const talk_metrics = await run.run('talk_metrics', {
+    transcribe: run.keys.transcribe
+  }, () => segments && segments.length > 0
     ? computeTalkMetrics(segments)
-    : { talk_time_agent_sec: 0, talk_time_customer_sec: 0, silence_time_sec: 0, interrupt_count: 0 };
+    : { talk_time_agent_sec: 0, talk_time_customer_sec: 0, silence_time_sec: 0, interrupt_count: 0 });
+
+  console.log('Stage cache:', run.status);
 
   // Prepare entities summary
   const entitiesSummary = summarizeEntities(entities);
@@ -439,6 +435,8 @@ export async function analyzeCallSimple(audioUrl: string, meta?: any, settings?:
       processed_at: new Date().toISOString(),
       agent_name: meta?.agent_name || null,
       agent_id: meta?.agent_id || null,
+      stages: run.summary(),  // Which stages were recomputed vs. served from the stage cache
+      transcript_source: cached ? 'request' : 'asr',  // 'request': the caller's Deepgram response was used
       normalization_applied: {
         monthly_premium: rawMonthlyPremium !== analysis.monthly_premium ? {
           raw: rawMonthlyPremium,
@@ -453,6 +451,64 @@ export async function analyzeCallSimple(audioUrl: string, meta?: any, settings?:
   };
 }
 
+/**
+ * Deterministic money normalization over the Pass B white card and Pass A carrier mentions
+ */
+function normalizeAnalysisMoney(analysis: any, mentionsTable: any, carrierHundredsIfUnder: number) {
+  if (mentionsTable.money_mentions?.length > 0) {
+    // Find the most recent/relevant money mentions for each field
+    const premiumMention = mentionsTable.money_mentions.find((m: any) =>
+      m.field_hint === 'monthly_premium' || m.field_hint === 'first_month_bill'
+    );
+    const enrollmentMention = mentionsTable.money_mentions.find((m: any) =>
+      m.field_hint === 'enrollment_fee'
+    );
+
+    // Apply normalization if we have values to normalize
+    if (analysis.monthly_premium !== null && premiumMention) {
+      const context: MoneyContext = premiumMention.field_hint === 'monthly_premium' ? 'monthly_premium' : 'first_month_bill';
+      analysis.monthly_premium = normalizeMoney(
+        analysis.monthly_premium,
+        context,
+        premiumMention.quote || premiumMention.value_raw
+      );
+    }
+
+    if (analysis.enrollment_fee !== null && enrollmentMention) {
+      analysis.enrollment_fee = normalizeMoney(
+        analysis.enrollment_fee,
+        'enrollment_fee',
+        enrollmentMention.quote || enrollmentMention.value_raw
+      );
+    }
+  }
+
+  // Also normalize prices found in carrier mentions
+  let carrierMentions = null;
+  if (mentionsTable.carrier_mentions?.length > 0) {
+    carrierMentions = mentionsTable.carrier_mentions.map((carrier: any) => {
+      const quote = carrier.quote || '';
+      // Look for price patterns in carrier quotes
+      const priceMatch = quote.match(/\$(\d+(?:\.\d{2})?)/);
+      if (priceMatch) {
+        const rawPrice = parseFloat(priceMatch[1]);
+        // Apply same normalization rules as monthly premium for carrier prices
+        if (rawPrice < carrierHundredsIfUnder) {
+          const normalizedPrice = rawPrice * 100;
+          // Update the quote with normalized price
+          carrier.normalized_quote = quote.replace(priceMatch[0], `$${normalizedPrice.toFixed(2)}`);
+          carrier.price_normalized = true;
+          carrier.raw_price = rawPrice;
+          carrier.normalized_price = normalizedPrice;
+        }
+      }
+      return carrier;
+    });
+  }
+
+  return { analysis, carrierMentions };
+}
+
 /**
  * Convert character position to timestamp using segments
  */
@@ -37,7 +37,17 @@ export class SSEManager {
     }
   }
 
-  static sendStatus(callId: string, status: 'queued' | 'transcribing' | 'analyzing' | 'done' | 'error', detail?: any) {
+  static connectionCount(callId: string) {
+    return this.connections.get(callId)?.size || 0;
+  }
+
+  static totalConnections() {
+    let total = 0;
+    for (const controllers of this.connections.values()) total += controllers.size;
+    return total;
+  }
+
+  static sendStatus(callId: string, status: 'queued' | 'transcribing' | 'embedding' | 'analyzing' | 'done' | 'error', detail?: any) {
     this.sendEvent(callId, 'status', { status, detail, timestamp: new Date().toISOString() });
   }
 }
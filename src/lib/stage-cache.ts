@@ -0,0 +1,120 @@
+/**
+ * Stage-level memoization for the analysis pipeline.
+ *
+ * Each stage is keyed on a hash of its upstream stage keys plus only the
+ * settings sections it reads, so re-running /api/analyze with a different
+ * rebuttal.windowMs reuses the transcript and both LLM passes and recomputes
+ * just the rebuttal stage. Entries live in process memory (per serverless
+ * instance) with an LRU cap on both entry count and serialized size, and a
+ * TTL. A transcribe entry for a long call can run to megabytes, so the byte
+ * cap is what bounds memory; a value larger than a quarter of it is not
+ * cached at all.
+ */
+
+import crypto from 'crypto';
+
+export type StageStatus = 'hit' | 'miss';
+
+type Entry = { value: any; expires: number; bytes: number };
+
+const MAX_ENTRIES = Number(process.env.STAGE_CACHE_MAX_ENTRIES || 500);
+const MAX_BYTES = Number(process.env.STAGE_CACHE_MAX_BYTES || 64 * 1024 * 1024);
+const TTL_MS = Number(process.env.STAGE_CACHE_TTL_MS || 6 * 60 * 60 * 1000);
+const ENABLED = process.env.STAGE_CACHE !== 'off';
+
+const entries = new Map<string, Entry>();
+let totalBytes = 0;
+
+function remove(key: string) {
+  const entry = entries.get(key);
+  if (entry) {
+    totalBytes -= entry.bytes;
+    entries.delete(key);
+  }
+}
+
+// Sorted-key JSON so {a,b} and {b,a} hash the same
+function stableStringify(value: any): string {
+  if (value === null || typeof value !== 'object') return JSON.stringify(value) ?? 'null';
+  if (Array.isArray(value)) return `[${value.map(stableStringify).join(',')}]`;
+  const keys = Object.keys(value).filter(k => value[k] !== undefined).sort();
+  return `{${keys.map(k => `${JSON.stringify(k)}:${stableStringify(value[k])}`).join(',')}}`;
+}
+
+export function stageKey(stage: string, deps: Record<string, any>): string {
+  const digest = crypto.createHash('sha256').update(stableStringify(deps)).digest('hex').slice(0, 32);
+  return `${stage}:${digest}`;
+}
+
+/**
+ * Tracks the stage keys and hit/miss status of one analysis run
+ */
+export class StageRun {
+  readonly keys: Record<string, string> = {};
+  readonly status: Record<string, StageStatus> = {};
+  readonly timings: Record<string, number> = {};
+  readonly tokens: Record<string, { input: number; output: number }> = {};
+
+  constructor(private readonly force = false) {}
+
+  /**
+   * Run `fn` unless a result for the same stage inputs is cached.
+   * Values are cloned on the way in and out so callers may mutate them.
+   */
+  async run<T>(stage: string, deps: Record<string, any>, fn: () => Promise<T> | T): Promise<T> {
+    const key = stageKey(stage, deps);
+    this.keys[stage] = key;
+    const started = Date.now();
+
+    const cached = ENABLED && !this.force ? entries.get(key) : undefined;
+    if (cached && cached.expires > Date.now()) {
+      // Refresh LRU position
+      entries.delete(key);
+      entries.set(key, cached);
+      this.status[stage] = 'hit';
+      this.timings[stage] = Date.now() - started;
+      return structuredClone(cached.value);
+    }
+
+    const value = await fn();
+    if (ENABLED) {
+      remove(key);
+      // UTF-16 string length as a cheap proxy for the retained size
+      const bytes = 2 * (JSON.stringify(value)?.length ?? 0);
+      if (bytes <= MAX_BYTES / 4) {
+        entries.set(key, { value: structuredClone(value), expires: Date.now() + TTL_MS, bytes });
+        totalBytes += bytes;
+        while (entries.size > MAX_ENTRIES || totalBytes > MAX_BYTES) {
+          remove(entries.keys().next().value as string);
+        }
+      }
+    }
+    this.status[stage] = 'miss';
+    this.timings[stage] = Date.now() - started;
+    return value;
+  }
+
+  /**
+   * Record LLM usage for a stage; cache hits spend nothing and stay absent
+   */
+  countTokens(stage: string, usage?: { prompt_tokens?: number; completion_tokens?: number } | null) {
+    this.tokens[stage] = { input: usage?.prompt_tokens || 0, output: usage?.completion_tokens || 0 };
+  }
+
+  summary() {
+    return { status: this.status, timings_ms: this.timings, tokens: this.tokens, keys: this.keys };
+  }
+}
+
+export function clearStageCache() {
+  entries.clear();
+  totalBytes = 0;
+}
+
+export function stageCacheSize() {
+  return entries.size;
+}
+
+export function stageCacheBytes() {
+  return totalBytes;
+}
@@ -102,10 +102,15 @@ export async function analyzeCallUnified(
     includeScores?: boolean;  // Include QA scores for backward compatibility
     skipRebuttals?: boolean;  // Option to skip rebuttals if not needed
     settings?: any;  // Settings from config/asr-analysis
+    force?: boolean;  // Bypass the stage cache and recompute every stage
+    deepgram?: any;  // Deepgram response the caller already has; skips server-side ASR
   }
 ): Promise<UnifiedAnalysisResult> {
   // Call the simple-analysis function with settings
-  const simpleResult = await analyzeCallSimple(audioUrl, meta, options?.settings);
+  const simpleResult = await analyzeCallSimple(audioUrl, meta, options?.settings, {
+    force: options?.force,
+    deepgram: options?.deepgram
+  });
 
   // Build unified result
   const result: UnifiedAnalysisResult = {
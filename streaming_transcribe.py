@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+Real-time streaming transcription with live critical-phrase alerts.
+
+Streams audio to the live websocket variant of /v1/listen at wall-clock
+speed, consumes interim and final results as they arrive, and runs the same
+event classification as analyze_search_hits on every final segment, so a
+"do not call" or "declined" is flagged while the call is still going. The
+last few words of the previous final are kept, so a phrase the endpointer
+split across two finals still matches.
+
+Alert latency is measured from the moment the phrase was spoken (audio
+offset of its last word, mapped to wall clock) to the moment the alert fires.
+
+Usage:
+    python streaming_transcribe.py call.wav                       # stream a WAV file
+    arecord -f S16_LE -r 16000 | python streaming_transcribe.py - --sample-rate 16000
+    python streaming_transcribe.py --replay-server [--port 8765] [--speed 1.0]
+    python streaming_transcribe.py call.wav --url ws://localhost:8765/v1/listen
+
+--replay-server starts a local stand-in that replays the word timings in
+new_call_response.json at wall-clock speed. --speed N replays N times faster
+for quick functional checks; latency figures are only meaningful at 1.0.
+"""
+import asyncio
+import json
+import os
+import re
+import sys
+import time
+import wave
+from urllib.parse import urlencode
+
+import websockets
+
+from test_deepgram_optimized import SEARCH_PHRASES, classify_search_event
+
+DEEPGRAM_WS_URL = os.getenv("DEEPGRAM_WS_URL", "wss://api.deepgram.com/v1/listen")
+DEEPGRAM_API_KEY = os.getenv("DEEPGRAM_API_KEY", "")
+
+STREAM_PARAMS = {
+    "model": "nova-3",
+    "encoding": "linear16",
+    "channels": 1,
+    "interim_results": "true",
+    "diarize": "true",
+    "punctuate": "true",
+    "smart_format": "true",
+    "endpointing": 300,
+}
+
+FRAME_MS = 100
+ALERT_PRIORITIES = ("HIGH", "CRITICAL")
+# Enough words of the previous final to complete any phrase that starts there
+TAIL_WORDS = max(len(phrase.split()) for phrase in SEARCH_PHRASES) - 1
+
+
+def normalize(word):
+    return re.sub(r"[^a-z0-9' ]", "", word.lower())
+
+
+def find_phrases(words, phrases=SEARCH_PHRASES, min_end=0):
+    """Find phrases ending at or after words[min_end]; yields (phrase, first_word, last_word)"""
+    tokens = [normalize(w.get("word", "")) for w in words]
+    for phrase in phrases:
+        parts = phrase.split()
+        for i in range(max(0, min_end - len(parts) + 1), len(tokens) - len(parts) + 1):
+            if tokens[i:i + len(parts)] == parts:
+                yield phrase, words[i], words[i + len(parts) - 1]
+
+
+class AlertTracker:
+    """Turns final segments into alerts and records alert latency"""
+
+    def __init__(self, stream_start):
+        self.stream_start = stream_start
+        self.alerts = []
+        self.latencies = []
+        self.finals = 0
+        self.interims = 0
+        self.tail = []
+
+    def on_final(self, words, now=None):
+        now = now or time.time()
+        self.finals += 1
+        # Carry the previous final's tail across the boundary when the same speaker continues
+        tail = self.tail if words and self.tail and self.tail[-1].get("speaker") == words[0].get("speaker") else []
+        window = tail + list(words)
+        self.tail = window[-TAIL_WORDS:] if TAIL_WORDS else []
+        for phrase, first, last in find_phrases(window, min_end=len(tail)):
+            event_type, priority = classify_search_event(phrase)
+            spoken_at = self.stream_start + last.get("end", 0)
+            latency = now - spoken_at
+            self.latencies.append(latency)
+            alert = {
+                "event_type": event_type,
+                "priority": priority,
+                "phrase": phrase,
+                "audio_time": first.get("start", 0),
+                "speaker": first.get("speaker", "unknown"),
+                "latency_sec": latency,
+            }
+            self.alerts.append(alert)
+            if priority in ALERT_PRIORITIES:
+                print(f"  ALERT [{priority}] {event_type} at {alert['audio_time']:.1f}s "
+                      f"(Speaker {alert['speaker']}) \"{phrase}\" latency {latency * 1000:.0f}ms")
+
+    def summary(self):
+        lat = sorted(self.latencies)
+
+        def pct(q):
+            return lat[min(len(lat) - 1, int(q * len(lat)))] * 1000 if lat else None
+
+        return {
+            "interim_results": self.interims,
+            "final_segments": self.finals,
+            "alerts": len(self.alerts),
+            "latency_ms_p50": pct(0.5),
+            "latency_ms_p95": pct(0.95),
+            "latency_ms_max": lat[-1] * 1000 if lat else None,
+        }
+
+
+def frame_rate(source, sample_rate=None):
+    """Sample rate of the input; checks the WAV format before the stream opens"""
+    if source == "-":
+        return sample_rate or 16000
+    with wave.open(source, "rb") as wav:
+        if wav.getsampwidth() != 2 or wav.getnchannels() != 1:
+            raise ValueError("WAV input must be 16-bit mono (ffmpeg -i in.mp3 -ac 1 -ar 16000 out.wav)")
+        return wav.getframerate()
+
+
+def iter_frames(source, sample_rate=None):
+    """Yield (pcm_bytes, sample_rate) frames of FRAME_MS from a WAV file or raw stdin"""
+    if source == "-":
+        rate = sample_rate or 16000
+        frame_bytes = rate * 2 * FRAME_MS // 1000
+        stream = sys.stdin.buffer
+        while True:
+            chunk = stream.read(frame_bytes)
+            if not chunk:
+                return
+            yield chunk, rate
+    else:
+        with wave.open(source, "rb") as wav:
+            rate = wav.getframerate()
+            frames = rate * FRAME_MS // 1000
+            while True:
+                chunk = wav.readframes(frames)
+                if not chunk:
+                    return
+                yield chunk, rate
+
+
+async def connect(url, headers):
+    """Open a websocket across websockets library versions"""
+    try:
+        return await websockets.connect(url, additional_headers=headers, max_size=None)
+    except TypeError:
+        return await websockets.connect(url, extra_headers=headers, max_size=None)
+
+
+async def stream_file(source, url=DEEPGRAM_WS_URL, sample_rate=None):
+    """Stream audio in real time and print alerts as final segments arrive"""
+    frames = iter_frames(source, sample_rate)
+    rate = frame_rate(source, sample_rate)
+    params = dict(STREAM_PARAMS, sample_rate=rate)
+    headers = {"Authorization": f"Token {DEEPGRAM_API_KEY}"}
+    ws = await connect(f"{url}?{urlencode(params)}", headers)
+
+    tracker = AlertTracker(time.time())
+
+    async def sender():
+        # Pace frames against the wall clock so the stream behaves like a live call. Reads
+        # (stdin blocks until the next frame is captured) run in a thread so the receiver
+        # keeps handling results meanwhile
+        loop = asyncio.get_running_loop()
+        sent_sec = 0.0
+        while True:
+            frame = await loop.run_in_executor(None, next, frames, None)
+            if frame is None:
+                break
+            chunk = frame[0]
+            delay = tracker.stream_start + sent_sec - time.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await ws.send(chunk)
+            sent_sec += len(chunk) / (rate * 2)
+        await ws.send(json.dumps({"type": "CloseStream"}))
+
+    async def receiver():
+        async for message in ws:
+            data = json.loads(message)
+            if data.get("type") != "Results":
+                continue
+            alt = data.get("channel", {}).get("alternatives", [{}])[0]
+            if data.get("is_final"):
+                if alt.get("transcript"):
+                    words = alt.get("words", [])
+                    speaker = words[0].get("speaker", "?") if words else "?"
+                    print(f"[{data.get('start', 0):6.1f}s] Speaker {speaker}: {alt['transcript']}")
+                    tracker.on_final(words)
+            else:
+                tracker.interims += 1
+
+    send_task = asyncio.ensure_future(sender())
+    try:
+        await receiver()
+    finally:
+        send_task.cancel()
+        await ws.close()
+    return tracker
+
+
+async def replay_handler(ws, path=None, response_path="new_call_response.json", speed=1.0):
+    """Stand-in for the live endpoint: replay cached word timings at wall-clock speed"""
+    with open(response_path) as f:
+        result = json.load(f)
+    utterances = result.get("results", {}).get("utterances", [])
+    start = time.time()
+
+    async def drain():
+        # Audio is accepted and discarded; CloseStream ends the session early
+        async for message in ws:
+            if isinstance(message, str) and "CloseStream" in message:
+                return
+
+    drain_task = asyncio.ensure_future(drain())
+
+    async def wait_until(audio_sec):
+        delay = start + audio_sec / speed - time.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def results(words, is_final):
+        return json.dumps({
+            "type": "Results",
+            "is_final": is_final,
+            "speech_final": is_final,
+            "start": words[0]["start"],
+            "duration": words[-1]["end"] - words[0]["start"],
+            "channel": {"alternatives": [{
+                "transcript": " ".join(w.get("punctuated_word", w["word"]) for w in words),
+                "words": words,
+            }]},
+        })
+
+    try:
+        for utt in utterances:
+            words = utt.get("words", [])
+            for i in range(2, len(words), 3):
+                await wait_until(words[i]["end"])
+                await ws.send(results(words[:i + 1], False))
+            if words:
+                await wait_until(words[-1]["end"])
+                await ws.send(results(words, True))
+            if drain_task.done():
+                break
+    finally:
+        drain_task.cancel()
+        await ws.close()
+
+
+async def serve_replay(port=8765, response_path="new_call_response.json", speed=1.0):
+    async def handler(ws, path=None):
+        await replay_handler(ws, path, response_path, speed)
+
+    async with websockets.serve(handler, "127.0.0.1", port, max_size=None):
+        print(f"Replay stand-in on ws://127.0.0.1:{port}/v1/listen ({response_path}, {speed}x)")
+        await asyncio.Future()
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    opts = {}
+    for flag in ("--url", "--sample-rate", "--port", "--speed", "--response"):
+        if flag in args:
+            idx = args.index(flag)
+            opts[flag] = args[idx + 1]
+            del args[idx:idx + 2]
+
+    if "--replay-server" in args:
+        asyncio.run(serve_replay(int(opts.get("--port", 8765)), opts.get("--response", "new_call_response.json"),
+                                 float(opts.get("--speed", 1.0))))
+        sys.exit(0)
+
+    if not args:
+        print(__doc__)
+        sys.exit(1)
+
+    print("STREAMING TRANSCRIPTION")
+    print("=" * 60)
+    rate = int(opts["--sample-rate"]) if "--sample-rate" in opts else None
+    tracker = asyncio.run(stream_file(args[0], opts.get("--url", DEEPGRAM_WS_URL), rate))
+
+    summary = tracker.summary()
+    print("\n" + "=" * 60)
+    print("STREAM SUMMARY")
+    print("-" * 60)
+    print(f"Interim results: {summary['interim_results']}  Final segments: {summary['final_segments']}")
+    print(f"Alerts: {summary['alerts']}")
+    if summary["latency_ms_p50"] is not None:
+        print(f"Alert latency: p50 {summary['latency_ms_p50']:.0f}ms  p95 {summary['latency_ms_p95']:.0f}ms  "
+              f"max {summary['latency_ms_max']:.0f}ms")
@@ -0,0 +1,114 @@
+-- Migration: Priority classes + shortest-expected-job-first for the transcription queue
+-- Created: 2025-10-19
+-- Purpose: Stop long calls and routine campaigns from holding up short and compliance calls
+--
+-- Jobs are dequeued by:
+--   1. priority class: 0 = compliance (DNC disposition / compliance campaign, or a queue
+--      priority of 10 (high) and up), 1 = routine; a routine job waiting 15 minutes
+--      competes as compliance
+--   2. aged cost: expected processing seconds (6s + 0.12s per audio second, 300s audio when
+--      duration_sec is unknown) minus 0.1s per second waited, so long calls are not starved
+--   3. queue priority, then created_at
+-- Constants mirror queue_scheduler.py and src/lib/queue-schedule.ts.
+
+-- Campaigns that always get the compliance class, on top of the name / disposition match
+CREATE TABLE IF NOT EXISTS transcription_priority_campaigns (
+  campaign TEXT PRIMARY KEY,
+  priority_class SMALLINT NOT NULL DEFAULT 0,
+  created_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE OR REPLACE FUNCTION transcription_priority_class(
+  p_campaign TEXT,
+  p_disposition TEXT
+) RETURNS SMALLINT AS $$
+  SELECT COALESCE(
+    (SELECT priority_class FROM transcription_priority_campaigns WHERE campaign = p_campaign),
+    CASE
+      WHEN p_campaign ~* '\m(dnc|do[ _-]?not[ _-]?call|compliance|tcpa)\M' THEN 0
+      WHEN p_disposition ~* '\m(dnc|do[ _-]?not[ _-]?call|compliance|tcpa)\M' THEN 0
+      ELSE 1
+    END
+  )::SMALLINT;
+$$ LANGUAGE sql STABLE;
+
+-- Class of a queued job: explicitly high priority jobs run with the compliance class
+CREATE OR REPLACE FUNCTION transcription_job_class(
+  p_campaign TEXT,
+  p_disposition TEXT,
+  p_priority INTEGER
+) RETURNS SMALLINT AS $$
+  SELECT CASE
+    WHEN COALESCE(p_priority, 0) >= 10 THEN 0::SMALLINT
+    ELSE transcription_priority_class(p_campaign, p_disposition)
+  END;
+$$ LANGUAGE sql STABLE;
+
+CREATE OR REPLACE FUNCTION transcription_expected_seconds(p_duration_sec INTEGER)
+RETURNS DOUBLE PRECISION AS $$
+  SELECT 6.0 + 0.12 * COALESCE(NULLIF(GREATEST(p_duration_sec, 0), 0), 300);
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Pending scan no longer follows (priority, created_at); keep a narrow index for the WHERE
+CREATE INDEX IF NOT EXISTS idx_transcription_queue_pending
+  ON transcription_queue(created_at)
+  WHERE status = 'pending' AND attempts < 3;
+
+-- Return type changes (priority_class, expected_sec), so drop first
+DROP FUNCTION IF EXISTS get_next_transcription_job();
+
+CREATE OR REPLACE FUNCTION get_next_transcription_job()
+RETURNS TABLE (
+  queue_id INTEGER,
+  call_id UUID,
+  recording_url TEXT,
+  priority INTEGER,
+  attempts INTEGER,
+  priority_class SMALLINT,
+  expected_sec DOUBLE PRECISION
+) AS $$
+BEGIN
+  RETURN QUERY
+  UPDATE transcription_queue tq
+  SET
+    status = 'processing',
+    started_at = NOW(),
+    attempts = tq.attempts + 1
+  FROM (
+    SELECT
+      q.id,
+      transcription_job_class(c.campaign, c.disposition, q.priority) as cls,
+      transcription_expected_seconds(COALESCE(q.duration_sec, c.duration_sec)) as expected
+    FROM transcription_queue q
+    LEFT JOIN calls c ON c.id = q.call_id
+    WHERE q.status = 'pending'
+      AND q.attempts < 3 -- Max 3 attempts
+    ORDER BY
+      GREATEST(0, transcription_job_class(c.campaign, c.disposition, q.priority)
+        - FLOOR(EXTRACT(EPOCH FROM (NOW() - q.created_at)) / 900)),
+      transcription_expected_seconds(COALESCE(q.duration_sec, c.duration_sec))
+        - 0.1 * EXTRACT(EPOCH FROM (NOW() - q.created_at)),
+      q.priority DESC,
+      q.created_at ASC
+    LIMIT 1
+    FOR UPDATE OF q SKIP LOCKED -- Prevent race conditions
+  ) next_job
+  WHERE tq.id = next_job.id
+  RETURNING
+    tq.id as queue_id,
+    tq.call_id as call_id,
+    tq.recording_url as recording_url,
+    tq.priority as priority,
+    tq.attempts as attempts,
+    next_job.cls as priority_class,
+    next_job.expected as expected_sec;
+END;
+$$ LANGUAGE plpgsql;
+
+GRANT EXECUTE ON FUNCTION get_next_transcription_job TO authenticated;
+GRANT EXECUTE ON FUNCTION transcription_priority_class TO authenticated;
+GRANT EXECUTE ON FUNCTION transcription_job_class TO authenticated;
+GRANT SELECT ON transcription_priority_campaigns TO authenticated;
+
+COMMENT ON TABLE transcription_priority_campaigns IS 'Campaigns whose recordings are transcribed ahead of routine calls';
+COMMENT ON FUNCTION get_next_transcription_job IS 'Claims the next job: compliance class first, then shortest aged expected cost';
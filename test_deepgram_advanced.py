@@ -4,6 +4,8 @@ import sys
 import os
 from datetime import datetime
 
+from sentiment_timeline import build_timeline, sparkline
+
 # Get API key from environment or set directly
 API_KEY = os.getenv("DEEPGRAM_API_KEY", "YOUR_DEEPGRAM_API_KEY")
 
@@ -102,7 +104,7 @@ def analyze_features(result):
     features_found["Speaker Turns"] = len(utterances)
 
     # Sentiment analysis
-    sentiment = result.get("results", {}).get("sentiment", {})
+    sentiment = result.get("results", {}).get("sentiments") or result.get("results", {}).get("sentiment", {})
     sentiment_segments = sentiment.get("segments", [])
     features_found["Sentiment Segments"] = len(sentiment_segments)
 
@@ -142,7 +144,7 @@ def print_insights(result):
     print("-" * 40)
 
     # Overall sentiment
-    sentiment = result.get("results", {}).get("sentiment", {})
+    sentiment = result.get("results", {}).get("sentiments") or result.get("results", {}).get("sentiment", {})
     if sentiment:
         avg = sentiment.get("average", {})
         if avg:
@@ -166,6 +168,12 @@ def print_insights(result):
             print(f"   😟 Most Negative ({most_negative.get('sentiment_score', 0):.2f}):")
             print(f"      \"{most_negative.get('text', '')[:100]}...\"")
 
+    # Word-level sentiment bucketed over the call
+    timeline = build_timeline(result)
+    if any(v == v for v in timeline["sentiment"]):
+        print(f"\n📉 SENTIMENT TIMELINE ({timeline['bucket_sec']:.0f}s buckets):")
+        print(f"   {sparkline(timeline['sentiment'])}")
+
     # Intents detected
     intents = result.get("results", {}).get("intents", {})
     intent_segments = intents.get("segments", [])
@@ -3,8 +3,15 @@ import json
 import sys
 from datetime import datetime
 
+from profiling import profiled
+from transcript_redaction import redact, summarize
+
 API_KEY = "ad6028587d6133caa78db69adb0e65b4adbcb3a9"
 
+# Acoustic search anchors - CRITICAL BUSINESS PHRASES
+SEARCH_PHRASES = ["do not call", "call me back", "talk to my wife", "charge on", "post date", "declined", "insufficient funds", "cancel", "refund", "not interested"]
+
+@profiled
 def test_optimized_nova3():
     """Test with optimized Nova-3 parameters for insurance calls"""
 
@@ -34,12 +41,11 @@ def test_optimized_nova3():
         "custom_intent": ["do not call", "buy now", "talk to my wife", "charge on", "need to think", "call back later", "not interested", "ready to enroll"],
         "custom_intent_mode": "extended",
 
-        # Entities + redaction
+        # Entities (PII redaction runs locally on the response, see transcript_redaction.py)
         "detect_entities": "true",
-        "redact": "pci",  # Can only redact one type at a time or use array format
 
         # Acoustic search anchors - CRITICAL BUSINESS PHRASES
-        "search": ["do not call", "call me back", "talk to my wife", "charge on", "post date", "declined", "insufficient funds", "cancel", "refund", "not interested"],
+        "search": SEARCH_PHRASES,
 
         # Domain boosting for insurance (nova-3 uses keyterm)
         "keyterm": ["Medicare Part B", "deductible", "copay", "PPO", "HMO", "Medigap", "premium", "enrollment fee", "effective date", "pre-existing"]
@@ -70,7 +76,9 @@ def test_optimized_nova3():
         print(response.text)
         return None
 
-    result = response.json()
+    # Card numbers, SSNs, bank numbers and DOBs in one local pass instead of redact=pci
+    result, spans = redact(response.json())
+    print(f"Redacted {len(spans)} PII spans locally: {summarize(spans)}")
 
     # Save full response
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -96,6 +104,7 @@ def test_optimized_nova3():
 
     return result
 
+@profiled
 def analyze_optimized_features(result):
     """Check what optimized features detected"""
 
@@ -144,7 +153,7 @@ def analyze_optimized_features(result):
 
         # Count redacted items
         words = channels[0].get("alternatives", [{}])[0].get("words", [])
-        redacted_count = sum(1 for w in words if "[redacted]" in w.get("word", "").lower())
+        redacted_count = sum(1 for w in words if w.get("word", "").startswith("["))
 
         print(f"\n✓ Entities Extracted: {len(entities)} total")
         print(f"✓ Redacted Items: {redacted_count} PII elements")
@@ -159,6 +168,23 @@ def analyze_optimized_features(result):
         for label, count in sorted(entity_types.items(), key=lambda x: x[1], reverse=True)[:5]:
             print(f"    - {label}: {count}")
 
+def classify_search_event(query):
+    """Map a search phrase to its (event_type, priority)"""
+
+    if query in ["do not call", "cancel", "not interested"]:
+        return "DNC_REQUEST", "HIGH"
+    elif query in ["call me back", "call back later"]:
+        return "CALLBACK_REQUEST", "HIGH"
+    elif query in ["talk to my wife", "talk to my husband"]:
+        return "SPOUSE_APPROVAL_NEEDED", "MEDIUM"
+    elif query in ["post date", "charge on"]:
+        return "SCHEDULED_PAYMENT", "HIGH"
+    elif query in ["declined", "insufficient funds"]:
+        return "PAYMENT_ISSUE", "CRITICAL"
+    else:
+        return "OTHER", "LOW"
+
+@profiled
 def analyze_search_hits(result):
     """Map search hits to business events"""
 
@@ -188,29 +214,13 @@ def analyze_search_hits(result):
             speaker = nearest_utt.get("speaker", "unknown") if nearest_utt else "unknown"
 
             # Categorize the event
-            if query in ["do not call", "cancel", "not interested"]:
-                event_type = "DNC_REQUEST"
-                priority = "HIGH"
-            elif query in ["call me back", "call back later"]:
-                event_type = "CALLBACK_REQUEST"
-                priority = "HIGH"
-            elif query in ["talk to my wife", "talk to my husband"]:
-                event_type = "SPOUSE_APPROVAL_NEEDED"
-                priority = "MEDIUM"
-            elif query in ["post date", "charge on"]:
-                event_type = "SCHEDULED_PAYMENT"
-                priority = "HIGH"
-            elif query in ["declined", "insufficient funds"]:
-                event_type = "PAYMENT_ISSUE"
-                priority = "CRITICAL"
-            else:
-                event_type = "OTHER"
-                priority = "LOW"
+            event_type, priority = classify_search_event(query)
 
             if priority in ["HIGH", "CRITICAL"]:
                 print(f"[{priority}] {event_type} at {start_time:.1f}s (Speaker {speaker})")
                 print(f"  \"{snippet}\"")
 
+@profiled
 def analyze_conversation_dynamics(result):
     """Compute gaps and overlaps for conversation flow"""
 
@@ -257,6 +267,7 @@ def analyze_conversation_dynamics(result):
     for intr in interruptions[:3]:
         print(f"  [{intr['time']:.1f}s] {intr['interrupter']} interrupted {intr['interrupted']}")
 
+@profiled
 def show_enriched_transcript(result):
     """Show transcript with inline entities and annotations"""
 
@@ -53,7 +53,7 @@ def check_features(result):
     features = {
         "Utterances": "utterances" in result.get("results", {}),
         "Speaker Diarization": any("speaker" in w for w in result.get("results", {}).get("channels", [{}])[0].get("alternatives", [{}])[0].get("words", [])),
-        "Sentiment": "sentiment" in result.get("results", {}),
+        "Sentiment": "sentiments" in result.get("results", {}) or "sentiment" in result.get("results", {}),
         "Intents": "intents" in result.get("results", {}),
         "Entities": "entities" in result.get("results", {}).get("channels", [{}])[0].get("alternatives", [{}])[0],
         "Topics": "topics" in result.get("results", {}),
@@ -100,8 +100,8 @@ def print_sample_output(result):
         for label, values in list(entity_types.items())[:5]:
             print(f"   {label}: {', '.join(values[:3])}")
 
-    # Sample sentiment
-    sentiment = result.get("results", {}).get("sentiment", {})
+    # Sample sentiment (Deepgram returns it under "sentiments")
+    sentiment = result.get("results", {}).get("sentiments") or result.get("results", {}).get("sentiment", {})
     if sentiment:
         avg = sentiment.get("average", {})
         if avg:
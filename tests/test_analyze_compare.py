@@ -0,0 +1,90 @@
+import json
+import os
+
+import pytest
+import requests
+
+import local_stub
+from analyze_compare import agreement, extract, normalize
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load(name):
+    with open(os.path.join(ROOT, name)) as f:
+        return json.load(f)
+
+
+@pytest.fixture(scope="module")
+def bodies():
+    shaped = local_stub.analysis_bodies(load("simple_analysis_full_output.json"), 0.2)
+    return {"analyze": load("full_api_response.json"), "analyze-simple": shaped["/api/analyze-simple"],
+            "analyze-v2": shaped["/api/analyze-v2"]}
+
+
+def row(endpoint, call_id, fields, status=200):
+    return {"endpoint": endpoint, "call_id": call_id, "round": 0, "status": status, "fields": fields}
+
+
+def test_extract_reads_each_route_shape(bodies):
+    card = {"outcome": "sale", "monthly_premium": 510.56, "enrollment_fee": 27.5, "customer_name": "Lisa Stanton"}
+    assert extract("analyze-simple", bodies["analyze-simple"]) == card
+    assert extract("analyze-v2", bodies["analyze-v2"]) == card
+    # The cached /api/analyze response only has the legacy card
+    assert extract("analyze", bodies["analyze"]) == {"outcome": "sale", "monthly_premium": None,
+                                                     "enrollment_fee": 1, "customer_name": None}
+
+
+@pytest.mark.parametrize("field, value, expected", [
+    ("monthly_premium", "510.556", 510.56),
+    ("monthly_premium", 510, 510.0),
+    ("enrollment_fee", "n/a", None),
+    ("enrollment_fee", "", None),
+    ("customer_name", "  Lisa   STANTON ", "lisa stanton"),
+    ("outcome", None, None),
+])
+def test_normalize(field, value, expected):
+    assert normalize(field, value) == expected
+
+
+def test_agreement_counts_pairs_and_lists_disagreements(bodies):
+    rows = []
+    for call_id in ("c1", "c2"):
+        for endpoint, body in bodies.items():
+            rows.append(row(endpoint, call_id, extract(endpoint, body)))
+    # A failed request is left out of every pair it would be in
+    rows.append(row("analyze-v2", "c3", {}, status=500))
+    rows.append(row("analyze-simple", "c3", {"outcome": "sale"}))
+    counts, diffs = agreement(rows)
+
+    assert counts[("analyze-simple", "analyze-v2")] == {field: [2, 2] for field in counts[("analyze-simple",
+                                                                                           "analyze-v2")]}
+    assert counts[("analyze", "analyze-simple")] == {"outcome": [2, 2], "monthly_premium": [0, 2],
+                                                     "enrollment_fee": [0, 2], "customer_name": [0, 2]}
+    assert len(diffs) == 12
+    assert ("c1", "enrollment_fee", "analyze", 1, "analyze-simple", 27.5) in diffs
+
+
+def test_stub_chat_completions_answer_from_fixtures():
+    server, state = local_stub.serve(0, latency=0)
+    url = f"http://127.0.0.1:{server.server_address[1]}/v1/chat/completions"
+    try:
+        def content(response_format):
+            response = requests.post(url, json={"model": "gpt-4o", "messages": [{"role": "user", "content": "hi"}],
+                                                "response_format": response_format}, timeout=5)
+            body = response.json()
+            assert body["usage"]["total_tokens"] > 0
+            return json.loads(body["choices"][0]["message"]["content"])
+
+        simple = load("simple_analysis_full_output.json")
+        assert content({"type": "json_schema", "json_schema": {"name": "WhiteCard", "schema": {}}}) == simple["analysis"]
+        assert content({"type": "json_object"}) == simple["mentions_table"]
+        schema = {"type": "object", "required": ["greeting", "score", "flags", "tone"], "properties": {
+            "greeting": {"type": "string"}, "score": {"type": ["number", "null"]},
+            "flags": {"type": "array", "items": {"type": "string"}}, "tone": {"enum": ["calm", "rushed"]}}}
+        assert content({"type": "json_schema", "json_schema": {"name": "Pass2Analysis", "schema": schema}}) == {
+            "greeting": "", "score": None, "flags": [], "tone": "calm"}
+        assert state.requests["/v1/chat/completions"] == 3
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from audio_fingerprint import SAMPLE_RATE, FingerprintIndex, hash_peaks, spectral_peaks
+
+
+def speech_like(seconds, seed):
+    """Short gliding tones at random times over a noise floor"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    x = 0.02 * rng.standard_normal(len(t))
+    for _ in range(int(seconds * 4)):
+        start, length, freq = rng.uniform(0, seconds), rng.uniform(0.1, 0.4), rng.uniform(150, 3000)
+        mask = (t >= start) & (t < start + length)
+        x[mask] += np.sin(2 * np.pi * (freq + rng.uniform(-200, 200) * (t[mask] - start)) * t[mask]) * np.hanning(mask.sum())
+    return x.astype(np.float32)
+
+
+def fp(samples, duration=60.0):
+    return {"duration": duration, "hashes": hash_peaks(spectral_peaks(samples))}
+
+
+@pytest.fixture
+def index(tmp_path):
+    idx = FingerprintIndex(str(tmp_path / "fp.db"))
+    idx.add("orig", fp(speech_like(20, 1)))
+    yield idx
+    idx.close()
+
+
+def test_reencoded_or_shifted_copy_matches(index):
+    audio = speech_like(20, 1)
+    shifted = np.concatenate([np.zeros(int(0.37 * SAMPLE_RATE), np.float32), audio])[:len(audio)]
+    reencoded = (np.convolve(audio, np.ones(3) / 3, mode="same") * 0.8).astype(np.float32)
+    assert index.match(fp(shifted))[0] == "orig"
+    assert index.match(fp(reencoded))[0] == "orig"
+
+
+def test_unrelated_recording_does_not_match(index):
+    assert index.match(fp(speech_like(20, 2))) == (None, 0.0)
+
+
+def test_shared_greeting_alone_does_not_match(index):
+    audio = np.concatenate([speech_like(20, 1)[:16 * SAMPLE_RATE], speech_like(4, 3)])
+    assert index.match(fp(audio))[0] is None
+
+
+def test_unknown_or_different_duration_does_not_match(index):
+    audio = speech_like(20, 1)
+    assert index.match(fp(audio, duration=None))[0] is None
+    assert index.match(fp(audio, duration=90.0))[0] is None
@@ -0,0 +1,64 @@
+import shutil
+import subprocess
+import sys
+import wave
+
+import pytest
+
+import audio_preprocess
+from audio_preprocess import OffsetMap, preprocess, remap_words
+
+# Stands in for ffmpeg: a lot of stderr first, then 1s tone, 10s silence, 1s tone, 3s silence as 8 kHz s16le
+FAKE_DECODER = """
+import sys
+import numpy as np
+sys.stderr.write("[mp3 @ 0x1] invalid frame header\\n" * 40000)
+sys.stderr.flush()
+tone = (np.sin(np.arange(8000) * 0.3) * 8000).astype("<i2").tobytes()
+silence = bytes(2 * 8000)
+sys.stdout.buffer.write(tone + silence * 10 + tone + silence * 3)
+"""
+
+
+def test_remap_moves_words_utterances_and_paragraphs():
+    # 2s of leading silence were trimmed and a 3s gap at processed 5s was collapsed to 1s
+    offsets = OffsetMap([(0.0, 2.0), (5.0, 7.0), (6.0, 10.0)])
+    result = {"results": {
+        "channels": [{"alternatives": [{
+            "words": [{"word": "hi", "start": 1.0, "end": 1.5}, {"word": "bye", "start": 6.5, "end": 7.0}],
+            "paragraphs": {"paragraphs": [{"start": 1.0, "end": 7.0, "sentences": [
+                {"text": "Hi.", "start": 1.0, "end": 1.5}, {"text": "Bye.", "start": 6.5, "end": 7.0}]}]},
+        }]}],
+        "utterances": [{"start": 6.5, "end": 7.0, "words": [{"word": "bye", "start": 6.5, "end": 7.0}]}],
+    }}
+    remap_words(result, offsets)
+    alt = result["results"]["channels"][0]["alternatives"][0]
+    assert [(w["start"], w["end"]) for w in alt["words"]] == [(3.0, 3.5), (10.5, 11.0)]
+    paragraph = alt["paragraphs"]["paragraphs"][0]
+    assert (paragraph["start"], paragraph["end"]) == (3.0, 11.0)
+    assert [(s["start"], s["end"]) for s in paragraph["sentences"]] == [(3.0, 3.5), (10.5, 11.0)]
+    assert result["results"]["utterances"][0]["start"] == 10.5
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="needs ffmpeg")
+def test_ffmpeg_failure_raises(tmp_path):
+    dest = tmp_path / "out.wav"
+    with pytest.raises(RuntimeError, match="ffmpeg failed"):
+        preprocess(str(tmp_path / "missing.mp3"), str(dest))
+    assert not dest.exists()
+
+
+def test_noisy_decoder_and_long_silence(tmp_path, monkeypatch):
+    monkeypatch.setattr(audio_preprocess, "decode_stream", lambda source, rate, stderr: subprocess.Popen(
+        [sys.executable, "-c", FAKE_DECODER], stdout=subprocess.PIPE, stderr=stderr))
+    dest = tmp_path / "out.wav"
+    offsets, stats = preprocess("fake.mp3", str(dest), rate=8000)
+    assert stats["original_sec"] == pytest.approx(15.0)
+    # 1s + the 10s gap collapsed to 0.6s + 1s + 0.24s of trailing pad
+    assert stats["processed_sec"] == pytest.approx(2.84)
+    with wave.open(str(dest)) as f:
+        assert f.getnframes() == round(2.84 * 8000)
+    assert offsets.to_original(0.5) == pytest.approx(0.5)
+    assert offsets.to_original(1.1) == pytest.approx(1.1)
+    assert offsets.to_original(1.6) == pytest.approx(11.0)
+    assert offsets.to_original(2.7) == pytest.approx(12.1)
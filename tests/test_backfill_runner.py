@@ -0,0 +1,187 @@
+import json
+import os
+
+import pytest
+
+import backfill_runner
+from backfill_runner import ANALYZED, Journal, Worker, analysis_payload, parse_args
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class NoNetwork:
+    def post(self, *args, **kwargs):
+        raise AssertionError("no request expected")
+
+
+class FakeResponse:
+    def __init__(self, body):
+        self.status_code = 200
+        self.content = json.dumps(body).encode()
+        self.text = self.content.decode()
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class CannedUpstreams:
+    """Deepgram answers with the cached call; the analysis reports `transcript_source`"""
+
+    def __init__(self, transcript_source):
+        with open(os.path.join(ROOT, "new_call_response.json")) as f:
+            self.dg = json.load(f)
+        self.transcript_source = transcript_source
+        self.analyzed = []
+
+    def post(self, url, params=None, headers=None, data=None, timeout=None):
+        if params:
+            return FakeResponse(self.dg)
+        self.analyzed.append(json.loads(data))
+        return FakeResponse({"analysis": {"outcome": "sale"}, "metadata": {"transcript_source": self.transcript_source}})
+
+
+@pytest.fixture
+def journal(tmp_path, monkeypatch):
+    monkeypatch.setenv("BACKFILL_SCHEDULE", "fifo")
+    j = Journal(str(tmp_path / "journal.db"))
+    j.enqueue([{"id": f"r{i}", "recording_url": f"https://example.com/{i}.mp3", "meta": {}} for i in range(3)])
+    yield j
+    j.close()
+
+
+def test_claim_leases_and_skips_leased(journal):
+    first = journal.claim("w1", 2)
+    assert [r["id"] for r in first] == ["r0", "r1"]
+    assert [r["id"] for r in journal.claim("w2", 5)] == ["r2"]
+    assert journal.claim("w3", 5) == []
+
+
+def test_lost_lease_stops_advance_and_renew(journal):
+    rec = journal.claim("w1", 1)[0]
+    journal.conn.execute("UPDATE recordings SET lease_owner = 'w2' WHERE id = ?", (rec["id"],))
+    assert not journal.renew(rec["id"], "w1")
+    assert not journal.advance(rec["id"], "w1", ANALYZED)
+
+
+def test_worker_drops_recording_whose_lease_was_taken(journal, tmp_path):
+    rec = journal.claim("w1", 1)[0]
+    journal.conn.execute("UPDATE recordings SET lease_owner = 'w2' WHERE id = ?", (rec["id"],))
+    worker = Worker(journal, "w1", str(tmp_path / "out"), session=NoNetwork())
+    worker.process(rec)     # would raise if it transcribed
+    assert worker.stats["transcribed"] == 0
+
+
+def test_aging_survives_retries(tmp_path, monkeypatch):
+    monkeypatch.setenv("BACKFILL_SCHEDULE", "aged")
+    j = Journal(str(tmp_path / "aged.db"))
+    j.enqueue([{"id": "long", "recording_url": "https://example.com/long.mp3", "meta": {"duration_sec": 2400.0}}])
+    j.conn.execute("UPDATE recordings SET enqueued_at = enqueued_at - 2000")
+    rec = j.claim("w1", 1)[0]
+    assert j.fail_attempt(rec["id"], "w1", "timeout")
+    j.conn.execute("UPDATE recordings SET lease_expires = 0")
+    j.enqueue([{"id": "short", "recording_url": "https://example.com/short.mp3", "meta": {"duration_sec": 30.0}}])
+    # Waited past CLASS_PROMOTE_SEC since enqueue, even though the retry just touched it
+    assert j.claim("w1", 1)[0]["id"] == "long"
+    j.close()
+
+
+def test_redacted_run_refuses_analysis_that_retranscribed(journal, tmp_path):
+    out = tmp_path / "out"
+    rec = journal.claim("w1", 1)[0]
+    upstreams = CannedUpstreams("asr")
+    worker = Worker(journal, "w1", str(out), session=upstreams, redact=True)
+    with pytest.raises(RuntimeError, match="transcript_source"):
+        worker.process(rec)
+    assert not os.path.exists(out / "results" / f"{rec['id']}.json")
+    # The analysis was only ever sent the redacted transcript
+    sent = upstreams.analyzed[0]["deepgram"]["results"]["channels"][0]["alternatives"][0]["transcript"]
+    assert "[CREDIT_CARD]" in sent
+
+
+def test_redacted_run_stores_analysis_of_the_sent_transcript(journal, tmp_path):
+    out = tmp_path / "out"
+    rec = journal.claim("w1", 1)[0]
+    worker = Worker(journal, "w1", str(out), session=CannedUpstreams("request"), redact=True)
+    worker.process(rec)
+    assert worker.stats["analyzed"] == 1
+    assert worker.stats["redacted_spans"] > 0
+
+
+class SameRecording:
+    """Fingerprint index that calls every recording a copy of `original_id`"""
+
+    def __init__(self, original_id):
+        self.original_id = original_id
+
+    def check_and_add(self, rec_id, url, duration):
+        return (self.original_id, 1.0) if rec_id != self.original_id else (None, 0.0)
+
+
+def sent_transcript(upstreams):
+    return upstreams.analyzed[-1]["deepgram"]["results"]["channels"][0]["alternatives"][0]["transcript"]
+
+
+def test_redacted_run_redacts_a_transcript_cached_without_redaction(journal, tmp_path):
+    out = tmp_path / "out"
+    rec = journal.claim("w1", 1)[0]
+    # A run without --redact got as far as caching the transcript
+    Worker(journal, "w1", str(out), session=CannedUpstreams("request")).process(rec)
+    journal.conn.execute("UPDATE recordings SET state = 'transcribed', lease_owner = 'w1', lease_expires = ? "
+                         "WHERE id = ?", (2e9, rec["id"]))
+    rec = dict(rec, state="transcribed", transcript_path=str(out / "transcripts" / f"{rec['id']}.json"))
+    upstreams = CannedUpstreams("request")
+    worker = Worker(journal, "w1", str(out), session=upstreams, redact=True)
+    worker.process(rec)
+    assert worker.stats["transcribed"] == 0 and worker.stats["redacted_spans"] > 0
+    assert "[CREDIT_CARD]" in sent_transcript(upstreams)
+    assert "[CREDIT_CARD]" in (out / "transcripts" / f"{rec['id']}.json").read_text()
+    assert (out / "transcripts" / f"{rec['id']}.spans.json").exists()
+
+
+def test_redacted_run_does_not_reuse_an_unredacted_duplicate(journal, tmp_path):
+    out = tmp_path / "out"
+    first, second = journal.claim("w1", 2)
+    Worker(journal, "w1", str(out), session=CannedUpstreams("request")).process(first)
+    upstreams = CannedUpstreams("request")
+    worker = Worker(journal, "w1", str(out), session=upstreams, fingerprints=SameRecording(first["id"]),
+                    redact=True)
+    worker.process(second)
+    assert worker.stats["deduplicated"] == 0 and worker.stats["transcribed"] == 1
+    assert "[CREDIT_CARD]" in sent_transcript(upstreams)
+    # A redacted original is reused
+    third = journal.claim("w1", 1)[0]
+    worker.fingerprints = SameRecording(second["id"])
+    worker.process(third)
+    assert worker.stats["deduplicated"] == 1 and worker.stats["transcribed"] == 1
+    assert json.loads((out / "results" / f"{third['id']}.json").read_text())["redacted"]
+
+
+def test_parse_args_boolean_flags_do_not_eat_values():
+    positional, opts, flags = parse_args(["--dedup", "calls.csv", "--journal", "j.db", "--redact", "more.csv"])
+    assert positional == ["calls.csv", "more.csv"]
+    assert opts == {"--journal": "j.db"}
+    assert flags == {"--dedup", "--redact"}
+
+
+def test_analysis_payload_keeps_what_the_analysis_reads():
+    with open(os.path.join(os.path.dirname(__file__), "..", "new_call_response.json")) as f:
+        dg = json.load(f)
+    payload = analysis_payload(dg)
+    assert len(json.dumps(payload)) < len(json.dumps(dg)) / 4
+    assert payload["metadata"]["request_id"] == dg["metadata"]["request_id"]
+    utt = payload["results"]["utterances"][0]
+    assert set(utt) == {"start", "end", "speaker", "confidence", "transcript"}
+    alt = payload["results"]["channels"][0]["alternatives"][0]
+    assert len(alt["words"]) == len(dg["results"]["channels"][0]["alternatives"][0]["words"])
+
+
+def _dying_shard(journal_path, out_dir, batch, shard, max_idle, index_path, stats_queue, *args):
+    if shard[0] == 1:
+        os._exit(3)
+    stats_queue.put((shard[0], {"analyzed": 2}))
+
+
+def test_run_sharded_returns_when_a_shard_dies(tmp_path, monkeypatch):
+    monkeypatch.setattr(backfill_runner, "_shard_main", _dying_shard)
+    stats = backfill_runner.run_sharded(str(tmp_path / "journal.db"), 2, str(tmp_path / "out"))
+    assert stats == {"analyzed": 2, "failed_shards": 1}
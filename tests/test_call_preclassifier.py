@@ -0,0 +1,66 @@
+from call_preclassifier import SavingsTracker, analysis_seconds, classify, extract_features, minimal_result
+
+
+def deepgram(words, duration=None):
+    result = {"results": {"channels": [{"alternatives": [{"words": words}]}]}}
+    if duration is not None:
+        result["metadata"] = {"duration": duration}
+    return result
+
+
+def spoken(text, speaker=None, start=0.0, step=0.4):
+    words = []
+    for i, word in enumerate(text.split()):
+        w = {"word": word, "start": start + i * step, "end": start + i * step + step * 0.9}
+        if speaker is not None:
+            w["speaker"] = speaker
+        words.append(w)
+    return words
+
+
+def test_missing_speaker_is_unknown_not_one_sided():
+    words = spoken("hello this is mark from the enrollment center calling about your health plan " * 4)
+    features = extract_features(deepgram(words, 60))
+    assert features["speaker_count"] is None
+    assert classify(deepgram(words, 60))["route"] == "full"
+
+
+def test_diarized_one_sided_short_call_is_minimal():
+    words = spoken("hello this is mark from the enrollment center calling about your health plan " * 4, speaker=0)
+    assert classify(deepgram(words, 60))["label"] == "no_contact"
+
+
+def test_voicemail_greeting_needs_context():
+    greeting = spoken("hi you've reached sam i'm not available right now please leave a message after the tone "
+                      "and i will call you back as soon as i can thanks", speaker=0)
+    assert classify(deepgram(greeting, 12))["label"] == "voicemail"
+    live = spoken("that plan is not available in your state", speaker=0)
+    live += spoken("oh okay what else do you have then for me and my wife", speaker=1, start=4)
+    assert not extract_features(deepgram(live))["voicemail_cue"]
+
+
+def test_short_call_with_dnc_phrase_gets_full_analysis():
+    words = spoken("hello is this john", speaker=0)
+    words += spoken("stop calling me put me on your do not call list", speaker=1, start=2)
+    classification = classify(deepgram(words, 8))
+    assert classification["label"] == "compliance"
+    assert classification["route"] == "full"
+
+
+def test_minimal_result_does_not_invent_an_outcome():
+    classification = classify(deepgram(spoken("hello hello", speaker=0), 5))
+    result = minimal_result(classification, {"agent_name": "A"})
+    assert result["analysis"]["outcome"] is None
+    assert result["metadata"]["preclassified"] == classification["label"]
+
+
+def test_savings_come_from_measured_analyses():
+    tracker = SavingsTracker()
+    tracker.record(classify(deepgram(spoken("hello", speaker=0), 3)))
+    assert tracker.compute_seconds_saved() is None
+    result = {"metadata": {"stages": {"timings_ms": {"transcribe": 9000, "pass_a": 3000, "pass_b": 5000}}}}
+    assert analysis_seconds(result, 20.0) == 8.0
+    assert analysis_seconds({}, 20.0) == 20.0
+    tracker.observe_analysis(8.0)
+    tracker.observe_analysis(12.0)
+    assert tracker.compute_seconds_saved() == 10.0
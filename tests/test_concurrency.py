@@ -0,0 +1,38 @@
+from concurrency import AIMDLimiter
+
+
+def drive(lim, samples):
+    """Feed (latency, work) completions with the limit always saturated"""
+    for latency, work in samples:
+        lim.acquire()
+        lim.in_flight = int(lim.limit)
+        lim.release(latency, 200, work)
+        lim.in_flight = 0
+
+
+def test_long_recordings_at_a_steady_rate_are_not_queueing():
+    lim = AIMDLimiter("test-steady", initial=4)
+    # 30s and 600s calls, both at 0.05s of service per audio second
+    drive(lim, [(0.05 * sec, sec) for sec in [30, 30, 30, 600, 600, 30, 600, 600, 600, 30] * 5])
+    assert lim.limit > 4
+
+
+def test_latency_growth_per_audio_second_backs_off():
+    lim = AIMDLimiter("test-queueing", initial=8)
+    lim.rtt = 0.0  # allow a decrease per sample
+    drive(lim, [(0.05 * 60, 60)] * 5)
+    before = lim.limit
+    lim.last_decrease = 0.0
+    drive(lim, [(0.5 * 60, 60)] * 5)
+    assert lim.limit < before
+
+
+def test_unsized_requests_only_back_off_on_errors():
+    lim = AIMDLimiter("test-unsized", initial=4)
+    drive(lim, [(0.1, None)] * 5 + [(5.0, None)] * 20)
+    assert lim.limit > 4
+    assert lim.baseline is None
+    before = lim.limit
+    lim.acquire()
+    lim.release(0.1, 429)
+    assert lim.limit == before * 0.5
@@ -0,0 +1,66 @@
+import pytest
+
+from kpi_rollup import LogHistogram, RollupStore
+
+
+def result(call_id, outcome="sale", talk=True, premium=100.0, day="2025-09-02"):
+    body = {"analysis": {"outcome": outcome, "monthly_premium": premium, "enrollment_fee": None}, "duration": 300}
+    if talk:
+        body["talk_metrics"] = {"talk_time_agent_sec": 120, "talk_time_customer_sec": 80, "silence_time_sec": 20,
+                                "interrupt_count": 2}
+    return {"id": call_id, "meta": {"agent_name": "A", "campaign": "C", "started_at": day}, "result": body}
+
+
+@pytest.fixture
+def store(tmp_path):
+    s = RollupStore(str(tmp_path / "kpi.db"))
+    yield s
+    s.close()
+
+
+def test_histogram_roundtrip_and_merge():
+    a, b = LogHistogram(), LogHistogram()
+    for v in range(1, 101):
+        (a if v % 2 else b).add(float(v))
+    merged = LogHistogram.from_bytes(a.to_bytes()).merge(LogHistogram.from_bytes(b.to_bytes()))
+    assert merged.count == 100
+    assert merged.quantile(0.5) == pytest.approx(50, rel=0.03)
+    assert merged.quantile(0.99) == pytest.approx(99, rel=0.03)
+
+
+def test_reingest_is_idempotent(store):
+    assert store.add_call(result("c1"))
+    assert not store.add_call(result("c1"))
+    store.flush()
+    assert not store.add_call(result("c1"))
+    assert store.add_call(result("c2", outcome="no_sale"))
+    summary = store.query("2025-09-01", "2025-09-30")["all"]
+    assert summary["calls"] == 2
+    assert summary["sales"] == 1
+
+
+def test_calls_without_talk_metrics_stay_out_of_talk_figures(store):
+    store.add_call(result("c1"))
+    store.add_call(result("c2", outcome=None, talk=False, premium=None))
+    summary = store.query("2025-09-01", "2025-09-30")["all"]
+    assert summary["calls"] == 2
+    assert summary["talk_sec"]["p50"] == pytest.approx(200, rel=0.03)
+    assert summary["interrupts_per_call"] == 2
+    assert summary["hold_sec"]["mean"] is None
+
+
+def test_query_groups_by_day(store):
+    store.add_call(result("c1", day="2025-09-02"))
+    store.add_call(result("c2", day="2025-09-03"))
+    assert list(store.query("2025-09-01", "2025-09-30", group_by="day")) == ["2025-09-02", "2025-09-03"]
+
+
+def test_undated_calls_stay_out_of_date_ranges(store):
+    undated = result("c1", day=None)
+    undated["result"]["metadata"] = {"processed_at": "2025-09-02T10:00:00Z"}
+    store.add_call(undated)
+    store.add_call(result("c2"))
+    assert store.undated == 1
+    assert store.query("2025-09-01", "2025-09-30")["all"]["calls"] == 1
+    assert store.query("2000-01-01", "9999-12-31")["all"]["calls"] == 1
+    assert store.query("undated", "undated")["all"]["calls"] == 1
@@ -0,0 +1,35 @@
+import json
+import os
+
+from results_store import ResultsStore, iter_results, record_from_result
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_malformed_files_are_skipped(tmp_path):
+    (tmp_path / "good.json").write_text(json.dumps({"id": "a"}))
+    (tmp_path / "bad.json").write_text("Expecting value: line 1 column 1 (char 0)\n")
+    (tmp_path / "lines.jsonl").write_text('{"id": "b"}\nnot json\n')
+    found = list(iter_results([str(tmp_path), str(tmp_path / "lines.jsonl")]))
+    assert [data["id"] for data, _ in found] == ["a", "b"]
+
+
+def test_legacy_analyze_card_keeps_outcome():
+    with open(os.path.join(ROOT, "test_response.json")) as f:
+        record = record_from_result(json.load(f), call_id="legacy-1")
+    assert record["outcome"] == "sale"
+    assert record["post_dated"] == 1
+    assert record["monthly_premium"] == 83.0
+
+
+def test_call_date_only_from_started_at(tmp_path):
+    result = {"analysis": {"outcome": "no_sale"}, "metadata": {"processed_at": "2025-10-01T12:00:00Z"}}
+    undated = record_from_result({"id": "x", "meta": {}, "result": result})
+    dated = record_from_result({"id": "y", "meta": {"started_at": "2025-09-15T10:00:00"}, "result": result})
+    assert undated["call_date"] is None and undated["analyzed_at"] == "2025-10-01T12:00:00Z"
+    assert dated["call_date"] == "2025-09-15"
+
+    store = ResultsStore(str(tmp_path / "results.db"))
+    store.upsert_many([undated, dated])
+    assert [r["id"] for r in store.find(date_from="2025-09-01")] == ["y"]
+    store.close()
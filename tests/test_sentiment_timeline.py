@@ -0,0 +1,47 @@
+import json
+import math
+import os
+
+import pytest
+
+from sentiment_timeline import build_timeline, pack_timeline, unpack_timeline
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def same(a, b):
+    return all((math.isnan(x) and math.isnan(y)) or x == y for x, y in zip(a, b)) and len(a) == len(b)
+
+
+@pytest.fixture(scope="module")
+def timeline():
+    with open(os.path.join(ROOT, "new_call_response.json")) as f:
+        return build_timeline(json.load(f))
+
+
+def test_round_trip_keeps_every_series(timeline):
+    back = unpack_timeline(pack_timeline(timeline))
+    assert back["bucket_sec"] == timeline["bucket_sec"]
+    assert back["speakers"] == timeline["speakers"]
+    assert same(back["sentiment"], timeline["sentiment"])
+    assert all(same(a, b) for a, b in zip(back["speaker_sentiment"], timeline["speaker_sentiment"]))
+    assert list(back["word_counts"]) == list(timeline["word_counts"])
+    assert back["intents"] == timeline["intents"]
+
+
+def test_empty_buckets_survive_as_nan():
+    words = [{"word": "hi", "start": 0.1, "end": 0.3, "speaker": 1, "sentiment_score": 0.5},
+             {"word": "bye", "start": 12.0, "end": 12.4, "speaker": 1, "sentiment_score": -0.25}]
+    result = {"metadata": {"duration": 15.0}, "results": {"channels": [{"alternatives": [{"words": words}]}]}}
+    back = unpack_timeline(pack_timeline(build_timeline(result)))
+    assert back["speakers"] == [1]
+    assert back["sentiment"][0] == 0.5 and math.isnan(back["sentiment"][1]) and back["sentiment"][2] == -0.25
+    assert list(back["word_counts"]) == [1, 0, 1]
+
+
+def test_rejects_foreign_and_truncated_data(timeline):
+    data = pack_timeline(timeline)
+    with pytest.raises(ValueError):
+        unpack_timeline(b"XXXX" + data[4:])
+    with pytest.raises(ValueError):
+        unpack_timeline(data[:-10])
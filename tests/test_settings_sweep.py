@@ -0,0 +1,24 @@
+import json
+import os
+
+import pytest
+
+from settings_sweep import UNREAD_SETTINGS, parse_sweeps, sweep
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.mark.parametrize("path", sorted(UNREAD_SETTINGS))
+def test_unread_settings_cannot_be_swept(path):
+    with pytest.raises(ValueError, match="not read"):
+        parse_sweeps([f"{path}=1,2"])
+
+
+def test_memoized_sweep_recomputes_only_affected_stages():
+    with open(os.path.join(ROOT, "new_call_response.json")) as f:
+        calls = [("call", json.load(f))]
+    grid = parse_sweeps(["rebuttal.windowMs=15000,30000,60000"])
+    _, memo, _ = sweep(calls, grid)
+    _, full, _ = sweep(calls, grid, memoize=False)
+    # Six stages once, then only rebuttals for each further variant
+    assert memo.misses == 6 + 2 and full.misses == 18
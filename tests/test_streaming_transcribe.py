@@ -0,0 +1,55 @@
+import asyncio
+import wave
+
+import pytest
+
+websockets = pytest.importorskip("websockets")
+
+from streaming_transcribe import AlertTracker, find_phrases, serve_replay, stream_file
+
+
+def words(text, speaker=0, start=0.0):
+    return [{"word": w, "start": start + i * 0.3, "end": start + i * 0.3 + 0.25, "speaker": speaker}
+            for i, w in enumerate(text.split())]
+
+
+def test_find_phrases_respects_min_end():
+    ws = words("please do not call me again")
+    assert [p for p, _, _ in find_phrases(ws)] == ["do not call"]
+    assert list(find_phrases(ws, min_end=4)) == []
+
+
+def test_phrase_split_across_finals_alerts_once():
+    tracker = AlertTracker(0.0)
+    tracker.on_final(words("okay so please do"), now=10.0)
+    tracker.on_final(words("not call me again", start=2.0), now=10.0)
+    tracker.on_final(words("thanks bye", start=4.0), now=10.0)
+    assert [a["phrase"] for a in tracker.alerts] == ["do not call"]
+    assert tracker.alerts[0]["audio_time"] == pytest.approx(0.9)
+
+
+def test_tail_not_joined_across_speakers():
+    tracker = AlertTracker(0.0)
+    tracker.on_final(words("i said do", speaker=0), now=5.0)
+    tracker.on_final(words("not call now", speaker=1, start=2.0), now=5.0)
+    assert tracker.alerts == []
+
+
+def test_stream_against_replay_server(tmp_path):
+    path = str(tmp_path / "silence.wav")
+    with wave.open(path, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(8000)
+        wav.writeframes(b"\0\0" * 8000)
+
+    async def main():
+        server = asyncio.ensure_future(serve_replay(8799, speed=200.0))
+        await asyncio.sleep(0.3)
+        try:
+            return await stream_file(path, "ws://127.0.0.1:8799/v1/listen")
+        finally:
+            server.cancel()
+
+    tracker = asyncio.run(main())
+    assert tracker.finals > 0
@@ -0,0 +1,63 @@
+from transcript_compaction import collapse_hold, compact_utterances, is_hold, strip_fillers, truncate_to_budget
+
+
+def utt(text, speaker=0, start=None, end=None):
+    return {"speaker": speaker, "start": start, "end": end, "text": text}
+
+
+def test_strip_fillers_removes_fillers_and_stutters():
+    assert strip_fillers("Um, it's it's fine, we we can do it") == "It's fine, we can do it"
+    assert strip_fillers("I- I think so") == "I think so"
+
+
+def test_strip_fillers_keeps_meaningful_phrases():
+    assert strip_fillers("Do you know your Medicare number?") == "Do you know your Medicare number?"
+    assert strip_fillers("the ER visit copay is $50") == "The ER visit copay is $50"
+    assert strip_fillers("I mean what I say") == "I mean what I say"
+
+
+def test_strip_fillers_removes_set_off_discourse_markers():
+    assert strip_fillers("I mean, it's a good plan") == "It's a good plan"
+    assert strip_fillers("it's, you know, a good plan") == "It's a good plan"
+    assert strip_fillers("It's covered, you know. Any questions?") == "It's covered. Any questions?"
+
+
+def test_strip_fillers_keeps_repeated_digits():
+    assert strip_fillers("my number is five five five one two one two") == "My number is five five five one two one two"
+    assert strip_fillers("that's $5 5 a day") == "That's $5 5 a day"
+    assert strip_fillers("it's 100 100 percent") == "It's 100 100 percent"
+
+
+def test_is_hold_needs_every_sentence_to_be_boilerplate():
+    assert is_hold("This call may be recorded for quality assurance.")
+    assert is_hold("For English, press one. Para español, oprima dos.")
+    assert is_hold("♪ ♪")
+    assert not is_hold("I can press one button for you")
+    assert not is_hold("Thank you for holding, I found your plan.")
+
+
+def test_collapse_hold_keeps_money_and_objections():
+    work = [utt("This call may be recorded. Your premium is $89 a month.", 0, 0, 5),
+            utt("Please hold.", 0, 5, 8),
+            utt("Your call is important to us.", 0, 8, 20),
+            utt("This call may be recorded, and I'm not interested.", 1, 20, 24)]
+    out = collapse_hold(work)
+    assert [u["text"] for u in out] == [work[0]["text"], "[HOLD/IVR 15s]", work[3]["text"]]
+
+
+def test_truncate_keeps_money_spans_and_neighbours():
+    work = [utt(f"Filler sentence number {i} about nothing much") for i in range(30)]
+    work[15] = utt("The monthly premium is $89")
+    kept, dropped = truncate_to_budget(work, 60)
+    texts = [u["text"] for u in kept]
+    assert dropped > 0
+    assert "The monthly premium is $89" in texts
+    assert work[14]["text"] in texts and work[16]["text"] in texts
+
+
+def test_compact_reports_savings():
+    work = [utt("Um, hello there", 0, 0, 1), utt("how are you today", 0, 1.5, 2), utt("Fine.", 1, 3, 4)]
+    transcript, report = compact_utterances(work)
+    assert transcript == "Speaker 0: Hello there How are you today\n\nSpeaker 1: Fine.\n\n"
+    assert report["merged"] == 1
+    assert report["tokens_after"] < report["tokens_before"]
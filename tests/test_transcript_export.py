@@ -0,0 +1,60 @@
+import io
+import json
+import tarfile
+import zipfile
+
+import pytest
+
+from transcript_export import export
+
+
+def call(i):
+    return {"id": f"c{i}", "results": {"utterances": [
+        {"start": 0.5, "end": 2.0, "speaker": 0, "transcript": f"hello caller {i}"},
+        {"start": 2.5, "end": 4.0, "speaker": 1, "transcript": "hi there"}]}}
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+@pytest.mark.parametrize("kind", ["tar.gz", "zip"])
+def test_archive_export_reads_every_member_once(tmp_path, kind, workers):
+    path = tmp_path / f"calls.{kind}"
+    if kind == "zip":
+        with zipfile.ZipFile(path, "w") as archive:
+            for i in range(70):
+                archive.writestr(f"calls/c{i}.json", json.dumps(call(i)))
+    else:
+        with tarfile.open(path, "w:gz") as archive:
+            for i in range(70):
+                data = json.dumps(call(i)).encode()
+                info = tarfile.TarInfo(f"calls/c{i}.json")
+                info.size = len(data)
+                archive.addfile(info, io.BytesIO(data))
+
+    out = tmp_path / "out"
+    totals = export([str(path)], str(out), ("srt", "jsonl"), workers=workers, batch=8)
+    assert totals["calls"] == 70 and totals["segments"] == 140
+    assert (out / "c69.srt").read_text().startswith("1\n00:00:00,500 --> 00:00:02,000\nSpeaker 0: hello caller 69")
+
+
+def test_names_are_sanitised_unique_and_bad_calls_skipped(tmp_path):
+    calls = tmp_path / "march.jsonl"
+    no_id = {"results": {"utterances": [{"start": 0, "end": 1, "speaker": 0, "transcript": "no id"}]}}
+    calls.write_text("\n".join([
+        json.dumps(dict(call(1), id="../../etc/c1")),
+        json.dumps(call(1)),
+        "{not json",
+        json.dumps(no_id),
+        json.dumps(["not", "a", "call"]),
+    ]) + "\n")
+    other = tmp_path / "april.jsonl"
+    other.write_text(json.dumps(no_id) + "\n")
+
+    out = tmp_path / "out"
+    totals = export([str(calls), str(other)], str(out), ("txt",), workers=1)
+    assert totals["calls"] == 4 and totals["skipped"] == 2 and totals["renamed"] == 0
+    assert sorted(p.name for p in out.iterdir()) == ["_.._etc_c1.txt", "april-line1.txt", "c1.txt", "march-line4.txt"]
+
+    # Exporting again never overwrites; every call gets a suffixed name
+    totals = export([str(calls)], str(out), ("txt",), workers=1)
+    assert totals["renamed"] == 3
+    assert (out / "c1-2.txt").read_text().endswith("Speaker 1: hi there\n")
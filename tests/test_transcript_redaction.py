@@ -0,0 +1,63 @@
+import pytest
+
+from transcript_redaction import find_spans, redact
+
+
+def words(text):
+    return [{"word": t.lower().strip(".,?"), "punctuated_word": t, "start": i * 0.5, "end": i * 0.5 + 0.4,
+             "speaker": 0} for i, t in enumerate(text.split())]
+
+
+def labels(text):
+    ws = words(text)
+    return [(s["label"], " ".join(w["punctuated_word"] for w in ws[s["start_word"]:s["end_word"]]))
+            for s in find_spans(ws)]
+
+
+def test_card_digits_split_across_words_and_backchannel():
+    assert labels("my card number is 4031 Mhmm. 6312 Mhmm. 5397 Mhmm. 0245. thank you") == [
+        ("CREDIT_CARD", "4031 Mhmm. 6312 Mhmm. 5397 Mhmm. 0245.")]
+
+
+def test_spoken_digits_with_double():
+    assert labels("card ending in four double one two please") == [("CREDIT_CARD", "four double one two")]
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("my social is one two three four five six seven eight nine okay", ("SSN", "one two three four five six "
+                                                                              "seven eight nine")),
+    ("it's 123-45-6789 sir", ("SSN", "123-45-6789")),
+    ("the routing number is 021000021 on the check", ("ROUTING_NUMBER", "021000021")),
+    ("and the checking account number is 12345678 great", ("ACCOUNT_NUMBER", "12345678")),
+    ("I was born August 21st 1960 so", ("DOB", "August 21st 1960")),
+    ("date of birth is 08/21/1960 correct", ("DOB", "08/21/1960")),
+])
+def test_labelled_numbers(text, expected):
+    assert labels(text) == [expected]
+
+
+@pytest.mark.parametrize("text", [
+    # Money read out right after a bank keyword
+    "we draft it from your checking account the premium is 1450 a month",
+    "from the savings account that's 125000 dollars total",
+    "the checking account gets $ 250000 back",
+    "from savings it's 98 per month",
+    # Phone numbers without a keyword before them
+    "sure it's 555-867-5309 anytime",
+    "sure it's (555) 867-5309 anytime",
+])
+def test_amounts_and_unlabelled_phone_numbers_are_kept(text):
+    assert labels(text) == []
+
+
+def test_redact_rewrites_transcript_and_keeps_word_timing():
+    ws = words("my card number is 4031 6312 5397 0245 thanks")
+    result = {"results": {"channels": [{"alternatives": [{
+        "transcript": " ".join(w["punctuated_word"] for w in ws), "words": ws}]}]}}
+    out, spans = redact(result)
+    alt = out["results"]["channels"][0]["alternatives"][0]
+    assert alt["transcript"] == "my card number is [CREDIT_CARD] thanks"
+    assert [(w["start"], w["end"]) for w in alt["words"]] == [(w["start"], w["end"]) for w in ws]
+    assert spans[0]["label"] == "CREDIT_CARD" and "value" not in spans[0]
+    # The cached response itself is left alone
+    assert result["results"]["channels"][0]["alternatives"][0]["words"][4]["word"] == "4031"
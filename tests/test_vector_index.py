@@ -0,0 +1,21 @@
+import numpy as np
+
+from vector_index import UPCAST_ROWS, VectorIndex, normalize, write_index
+
+
+def test_int8_scan_matches_float32(tmp_path):
+    rng = np.random.default_rng(0)
+    count = 2 * UPCAST_ROWS + 123
+    vectors = normalize(rng.standard_normal((count, 64)).astype(np.float32))
+    metas = [{"row": i} for i in range(count)]
+    write_index(str(tmp_path / "f32"), vectors, metas, "hash")
+    write_index(str(tmp_path / "i8"), vectors, metas, "hash", int8=True)
+
+    queries = vectors[[5, UPCAST_ROWS + 7, count - 1]]
+    flat, quantized = VectorIndex(str(tmp_path / "f32")), VectorIndex(str(tmp_path / "i8"))
+    f_scores, f_rows = flat.search_vectors(queries, k=5)
+    q_scores, q_rows = quantized.search_vectors(queries, k=5)
+    assert list(q_rows[:, 0]) == [5, UPCAST_ROWS + 7, count - 1]
+    assert np.allclose(q_scores, f_scores, atol=0.02)
+    flat.close()
+    quantized.close()
@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""
+Transcript compaction before LLM analysis.
+
+Shrinks the speaker-labelled transcript that /api/analyze-simple ships to the
+model: merges consecutive same-speaker utterances, strips filler words,
+collapses hold music / IVR boilerplate and, when a token budget is given,
+drops low-value utterances first while always keeping money and objection
+spans (plus their neighbours).
+
+Usage:
+    python transcript_compaction.py new_call_response.json [more.json ...] [--budget 3000]
+"""
+import json
+import re
+import sys
+
+# Rough OpenAI tokenizer ratio for English call transcripts
+CHARS_PER_TOKEN = 4.0
+
+# Merge same-speaker utterances separated by less than this (seconds)
+MERGE_GAP_SEC = 2.0
+
+# Sounds only; "er" is left alone because it is also "ER" (the emergency room)
+FILLER_RE = re.compile(
+    r"(?<![\w'])(?:um+|uh+|uhm+|erm+|ah+|hmm+|mm+|mhm+|uh-huh)(?![\w'])[,.]?\s*",
+    re.IGNORECASE
+)
+
+# "you know" / "i mean" are only discourse markers when set off by commas or
+# opening a clause with one ("I mean, ..."); "do you know your number" is a question
+DISCOURSE = r"(?:you know|i mean)"
+DISCOURSE_RES = (
+    (re.compile(r"(?:^|(?<=[.?!;]\s))" + DISCOURSE + r",\s*", re.IGNORECASE), ""),
+    (re.compile(r",\s*" + DISCOURSE + r",\s*", re.IGNORECASE), " "),
+    (re.compile(r",\s*" + DISCOURSE + r"(?=[.?!;]|$)", re.IGNORECASE), ""),
+)
+
+# "it's it's" / "we we" stutters produced by filler_words=true transcripts. Only
+# function words restart like this; repeated numerals and spoken digits ("five
+# five five", "$5 5") are data and must survive.
+STUTTER_WORDS = (
+    "i", "i'm", "i'll", "i've", "it", "it's", "we", "we're", "we'll", "you", "you're", "he", "she", "they",
+    "they're", "my", "your", "our", "the", "a", "an", "and", "but", "so", "or", "if", "to", "of", "in", "on",
+    "for", "with", "is", "was", "are", "do", "does", "did", "can", "what", "how", "just", "like", "well",
+)
+STUTTER_RE = re.compile(
+    r"\b(" + "|".join(re.escape(w) for w in sorted(STUTTER_WORDS, key=len, reverse=True)) + r")"
+    r"(?:(?:[,.]|\s*-)?\s+\1\b)+(?!')",
+    re.IGNORECASE
+)
+
+# Each pattern must open a sentence (after an optional "For English," style
+# lead-in); an utterance is hold/IVR only when every sentence in it is
+HOLD_PATTERNS = [
+    r"please (?:continue to )?hold",
+    r"your call is (?:very )?important",
+    r"(?:this|your) call (?:may|will) be (?:monitored|recorded)",
+    r"for quality (?:assurance|and training)",
+    r"press (?:one|two|three|four|five|six|seven|eight|nine|zero|\d)",
+    r"para español",
+    r"all of our (?:agents|representatives) are (?:currently )?(?:busy|assisting)",
+    r"the next available (?:agent|representative)",
+    r"leave a message after the (?:tone|beep)",
+]
+HOLD_LEAD_IN = r"(?:(?:thank you|thanks)(?: for (?:calling|holding|waiting))?[,.!]?\s+|(?:to|for|if) [^,.?!]{1,40},\s*)?"
+HOLD_RE = re.compile(r"^\W*" + HOLD_LEAD_IN + "(?:" + "|".join(HOLD_PATTERNS) + r")\b", re.IGNORECASE)
+MUSIC_RE = re.compile(r"^[\s♪♫.,-]*$")
+SENTENCE_SPLIT_RE = re.compile(r"(?<=[.?!])\s+")
+
+MONEY_RE = re.compile(
+    r"\$\s*\d|\d+\s*(?:dollars|bucks|cents)|\b(?:premium|per month|a month|monthly|enrollment fee|"
+    r"activation fee|first month|deductible|copay|out of pocket|charge|payment|card)\b",
+    re.IGNORECASE
+)
+
+# Mirrors the STALLS lexicon in src/lib/rebuttal-lexicon.ts
+OBJECTION_RE = re.compile(
+    r"too (?:much|high|expensive)|can'?t afford|(?:ask|talk to) (?:my|the) (?:wife|husband|spouse|partner)|"
+    r"think about it|call me back|another time|not interested|do not call|don'?t call|scam|"
+    r"already (?:have|got)|declined|insufficient|cancel|refund",
+    re.IGNORECASE
+)
+
+ACK_RE = re.compile(
+    r"^(?:okay|ok|yeah|yes|yep|no|nope|right|alright|all right|sure|gotcha|i see|mhm|uh-huh|awesome|"
+    r"perfect|great|cool|got it|i hear you|thank you|thanks)[\s.,!?]*$",
+    re.IGNORECASE
+)
+
+# Utterance priorities used by budget truncation (higher survives longer)
+PRIORITY_KEEP = 3
+PRIORITY_CONTEXT = 2
+PRIORITY_NORMAL = 1
+PRIORITY_ACK = 0
+
+
+def estimate_tokens(text):
+    """Estimate the token count of a prompt string"""
+    if not text:
+        return 0
+    return int(len(text) / CHARS_PER_TOKEN + 0.5)
+
+
+def utterances_from_deepgram(result):
+    """Pull speaker/time/text utterances out of a raw Deepgram response"""
+    utterances = []
+    for utt in result.get("results", {}).get("utterances", []):
+        utterances.append({
+            "speaker": utt.get("speaker", 0),
+            "start": utt.get("start", 0),
+            "end": utt.get("end", 0),
+            "text": utt.get("transcript", "")
+        })
+    return utterances
+
+
+def utterances_from_transcript(transcript):
+    """Parse the "Speaker N: text" blocks returned by /api/analyze-simple"""
+    utterances = []
+    for block in transcript.split("\n"):
+        block = block.strip()
+        if not block:
+            continue
+        match = re.match(r"Speaker (\w+):\s*(.*)", block)
+        if match:
+            utterances.append({"speaker": match.group(1), "start": None, "end": None, "text": match.group(2)})
+        elif utterances:
+            utterances[-1]["text"] += " " + block
+    return utterances
+
+
+def format_transcript(utterances):
+    """Render utterances in the same layout simple-analysis.ts sends to the model"""
+    return "".join(f"Speaker {u['speaker']}: {u['text']}\n\n" for u in utterances)
+
+
+def merge_same_speaker(utterances, max_gap=MERGE_GAP_SEC):
+    """Merge consecutive utterances from the same speaker"""
+    merged = []
+    for utt in utterances:
+        prev = merged[-1] if merged else None
+        close_enough = (
+            prev is not None and
+            (prev["end"] is None or utt["start"] is None or utt["start"] - prev["end"] <= max_gap)
+        )
+        markers = prev is not None and (prev.get("marker") or utt.get("marker"))
+        if prev is not None and prev["speaker"] == utt["speaker"] and close_enough and not markers:
+            prev["text"] = f"{prev['text']} {utt['text']}".strip()
+            prev["end"] = utt["end"]
+        else:
+            merged.append(dict(utt))
+    return merged
+
+
+def strip_fillers(text):
+    """Remove filler words and stuttered repeats from one utterance"""
+    text = FILLER_RE.sub("", text)
+    for pattern, replacement in DISCOURSE_RES:
+        text = pattern.sub(replacement, text)
+    text = STUTTER_RE.sub(r"\1", text)
+    text = re.sub(r"\s{2,}", " ", text).strip()
+    # Re-capitalise if we stripped a leading "Um, ..."
+    return text[:1].upper() + text[1:] if text else text
+
+
+def is_hold(text):
+    """True when the utterance is nothing but hold music or IVR boilerplate"""
+    if MUSIC_RE.match(text):
+        return True
+    # Money and objection spans are kept even if an IVR line shares the utterance
+    if MONEY_RE.search(text) or OBJECTION_RE.search(text):
+        return False
+    return all(HOLD_RE.match(sentence) for sentence in SENTENCE_SPLIT_RE.split(text.strip()) if sentence)
+
+
+def collapse_hold(utterances):
+    """Replace runs of hold music / IVR boilerplate with a single marker"""
+    collapsed = []
+    run = []
+
+    def flush():
+        if not run:
+            return
+        start = run[0]["start"]
+        end = run[-1]["end"]
+        if start is not None and end is not None:
+            label = f"[HOLD/IVR {int(end - start)}s]"
+        else:
+            label = f"[HOLD/IVR x{len(run)}]"
+        collapsed.append({"speaker": run[0]["speaker"], "start": start, "end": end, "text": label, "marker": True})
+        run.clear()
+
+    for utt in utterances:
+        if is_hold(utt["text"]):
+            run.append(utt)
+        else:
+            flush()
+            collapsed.append(utt)
+    flush()
+    return collapsed
+
+
+def prioritize(utterances, context=1):
+    """Assign a truncation priority to every utterance"""
+    priorities = []
+    for utt in utterances:
+        text = utt["text"]
+        if utt.get("marker"):
+            priorities.append(PRIORITY_CONTEXT)
+        elif MONEY_RE.search(text) or OBJECTION_RE.search(text):
+            priorities.append(PRIORITY_KEEP)
+        elif ACK_RE.match(text) or len(text) < 12:
+            priorities.append(PRIORITY_ACK)
+        else:
+            priorities.append(PRIORITY_NORMAL)
+
+    # Neighbours of key spans are needed to make sense of them
+    for i, p in enumerate(list(priorities)):
+        if p != PRIORITY_KEEP:
+            continue
+        for j in range(max(0, i - context), min(len(priorities), i + context + 1)):
+            if priorities[j] < PRIORITY_CONTEXT:
+                priorities[j] = PRIORITY_CONTEXT
+    return priorities
+
+
+def truncate_to_budget(utterances, max_tokens, context=1):
+    """Drop low-priority utterances until the transcript fits max_tokens"""
+    priorities = prioritize(utterances, context)
+    costs = [estimate_tokens(f"Speaker {u['speaker']}: {u['text']}\n\n") for u in utterances]
+    total = sum(costs)
+    dropped = set()
+
+    if total > max_tokens:
+        # Lowest priority first; within a priority drop from the middle of the call
+        # outwards so the opening and close survive longest
+        middle = len(utterances) / 2
+        order = sorted(
+            (i for i, p in enumerate(priorities) if p < PRIORITY_KEEP),
+            key=lambda i: (priorities[i], abs(i - middle))
+        )
+        for i in order:
+            if total <= max_tokens:
+                break
+            dropped.add(i)
+            total -= costs[i]
+
+    kept = []
+    gap = 0
+    for i, utt in enumerate(utterances):
+        if i in dropped:
+            gap += 1
+            continue
+        if gap:
+            kept.append({"speaker": "-", "start": None, "end": None, "text": f"[... {gap} utterances omitted ...]", "marker": True})
+            gap = 0
+        kept.append(utt)
+    if gap:
+        kept.append({"speaker": "-", "start": None, "end": None, "text": f"[... {gap} utterances omitted ...]", "marker": True})
+    return kept, len(dropped)
+
+
+def compact_utterances(utterances, max_tokens=None, merge_gap=MERGE_GAP_SEC, context=1):
+    """Run the full compaction stage and return (transcript, report)"""
+    before = format_transcript(utterances)
+
+    work = [dict(u, text=strip_fillers(u["text"])) for u in utterances]
+    fillers_removed = sum(len(a["text"]) - len(b["text"]) for a, b in zip(utterances, work))
+    work = [u for u in work if u["text"]]
+
+    work = collapse_hold(work)
+    hold_blocks = sum(1 for u in work if u.get("marker"))
+
+    before_merge = len(work)
+    work = merge_same_speaker(work, merge_gap)
+    merged = before_merge - len(work)
+
+    dropped = 0
+    if max_tokens:
+        work, dropped = truncate_to_budget(work, max_tokens, context)
+
+    after = format_transcript(work)
+    tokens_before = estimate_tokens(before)
+    tokens_after = estimate_tokens(after)
+
+    report = {
+        "utterances_before": len(utterances),
+        "utterances_after": len(work),
+        "merged": merged,
+        "hold_blocks": hold_blocks,
+        "filler_chars_removed": fillers_removed,
+        "dropped": dropped,
+        "chars_before": len(before),
+        "chars_after": len(after),
+        "tokens_before": tokens_before,
+        "tokens_after": tokens_after,
+        "tokens_saved": tokens_before - tokens_after,
+        "savings_pct": round(100.0 * (tokens_before - tokens_after) / tokens_before, 1) if tokens_before else 0.0
+    }
+    return after, report
+
+
+def compact_result(data, max_tokens=None):
+    """Compact either a raw Deepgram response or an /api/analyze-simple response"""
+    if "results" in data:
+        utterances = utterances_from_deepgram(data)
+    else:
+        utterances = utterances_from_transcript(data.get("transcript", ""))
+    return compact_utterances(utterances, max_tokens=max_tokens)
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    budget = None
+    if "--budget" in args:
+        idx = args.index("--budget")
+        budget = int(args[idx + 1])
+        del args[idx:idx + 2]
+
+    if not args:
+        print(__doc__)
+        sys.exit(1)
+
+    print("TRANSCRIPT COMPACTION")
+    print("=" * 60)
+    total_before = 0
+    total_after = 0
+    for path in args:
+        with open(path) as f:
+            data = json.load(f)
+        _, report = compact_result(data, max_tokens=budget)
+        total_before += report["tokens_before"]
+        total_after += report["tokens_after"]
+        print(f"{path}:")
+        print(f"  Utterances: {report['utterances_before']} -> {report['utterances_after']} "
+              f"(merged {report['merged']}, hold/IVR blocks {report['hold_blocks']}, dropped {report['dropped']})")
+        print(f"  Tokens: {report['tokens_before']} -> {report['tokens_after']} "
+              f"(saved {report['tokens_saved']}, {report['savings_pct']}%)")
+
+    if len(args) > 1 and total_before:
+        print("-" * 60)
+        print(f"TOTAL: {total_before} -> {total_after} tokens "
+              f"({100.0 * (total_before - total_after) / total_before:.1f}% saved)")
@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+Bulk transcript exporter: plain text, SRT, WebVTT and JSONL in one pass.
+
+Takes result files, directories of them, JSONL files (backfill_runner.py
+merge output) or .zip/.tar(.gz) archives, and writes every requested format
+for each call while walking its segments once. Timestamps are computed once
+per segment, output goes through large write buffers, and calls are spread
+over a process pool so a month-sized export is limited by the disk rather
+than by formatting. Tar archives are read once, front to back, by the
+coordinator (tar has no index, so reopening per member is quadratic); zip
+members are read by the workers, which open each archive once.
+
+Understands /api/analyze responses (debug.segments), raw Deepgram responses
+(results.utterances, e.g. backfill_out/transcripts) and /api/analyze-simple
+results ("Speaker N: text" transcripts, which carry no timing).
+
+Output files are named after the call id, reduced to letters, digits, "."
+"-" and "_". Existing files are never overwritten: a name already taken,
+by another call in the run or by an earlier export, gets a -2, -3, ...
+suffix. Calls that are not valid JSON are skipped and counted.
+
+Usage:
+    python transcript_export.py <file-dir-jsonl-or-archive ...> [--out transcripts_export]
+                                [--formats txt,srt,vtt,jsonl] [--workers 4]
+"""
+import glob
+import itertools
+import json
+import os
+import re
+import sys
+import tarfile
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from transcript_compaction import utterances_from_transcript
+
+OUT_DIR = "transcripts_export"
+WRITE_BUFFER = 1 << 20
+DEFAULT_CUE_MS = 2000     # cue length when a segment has no end time and nothing follows it
+IN_FLIGHT_PER_WORKER = 4  # batches queued per pool worker; tasks are produced lazily
+UNSAFE_RE = re.compile(r"[^\w.-]+")
+
+_zip_archives = {}        # per process: path -> open ZipFile
+
+
+def clock(ms, sep):
+    """HH:MM:SS<sep>mmm as used by SRT (",") and WebVTT (".")"""
+    secs, ms = divmod(int(ms), 1000)
+    mins, secs = divmod(secs, 60)
+    hours, mins = divmod(mins, 60)
+    return f"{hours:02d}:{mins:02d}:{secs:02d}{sep}{ms:03d}"
+
+
+def segments_from_result(data):
+    """Normalize any supported result shape into segments with start_ms/end_ms/speaker/text"""
+    result = data.get("result", data)
+    raw = []
+    if "debug" in result and result["debug"].get("segments"):
+        for seg in result["debug"]["segments"]:
+            raw.append((seg.get("startMs"), seg.get("endMs"), seg.get("speaker", "?"), seg.get("text", "")))
+    elif "results" in result:
+        for utt in result["results"].get("utterances", []):
+            raw.append((utt.get("start", 0) * 1000, utt.get("end", 0) * 1000,
+                        f"Speaker {utt.get('speaker', '?')}", utt.get("transcript", "")))
+    elif isinstance(result.get("transcript"), str):
+        for utt in utterances_from_transcript(result["transcript"]):
+            raw.append((None, None, f"Speaker {utt['speaker']}", utt["text"]))
+
+    segments = []
+    for i, (start, end, speaker, text) in enumerate(raw):
+        start = start or 0
+        if not end:
+            following = raw[i + 1][0] if i + 1 < len(raw) else None
+            end = following if following and following > start else start + DEFAULT_CUE_MS
+        segments.append({"start_ms": int(start), "end_ms": int(end), "speaker": speaker, "text": text})
+    return segments
+
+
+def txt_line(i, seg, call_id):
+    secs = seg["start_ms"] // 1000
+    return f"{i + 1}. [{secs // 60:02d}:{secs % 60:02d}] {seg['speaker']}: {seg['text']}\n"
+
+
+def srt_line(i, seg, call_id):
+    return f"{i + 1}\n{seg['_srt_start']} --> {seg['_srt_end']}\n{seg['speaker']}: {seg['text']}\n\n"
+
+
+def vtt_line(i, seg, call_id):
+    return f"{seg['_vtt_start']} --> {seg['_vtt_end']}\n<v {seg['speaker']}>{seg['text']}\n\n"
+
+
+def jsonl_line(i, seg, call_id):
+    return json.dumps({"call_id": call_id, "index": i, "speaker": seg["speaker"], "start_ms": seg["start_ms"],
+                       "end_ms": seg["end_ms"], "text": seg["text"]}) + "\n"
+
+
+# name -> (extension, header, line formatter)
+FORMATS = {
+    "txt": ("txt", "", txt_line),
+    "srt": ("srt", "", srt_line),
+    "vtt": ("vtt", "WEBVTT\n\n", vtt_line),
+    "jsonl": ("jsonl", "", jsonl_line),
+}
+
+
+def export_segments(segments, outputs, call_id=None):
+    """Write segments to several (stream, format) outputs in a single pass"""
+    need_srt = any(fmt == "srt" for _, fmt in outputs)
+    need_vtt = any(fmt == "vtt" for _, fmt in outputs)
+    for stream, fmt in outputs:
+        stream.write(FORMATS[fmt][1])
+    for i, seg in enumerate(segments):
+        if need_srt:
+            seg["_srt_start"], seg["_srt_end"] = clock(seg["start_ms"], ","), clock(seg["end_ms"], ",")
+        if need_vtt:
+            seg["_vtt_start"], seg["_vtt_end"] = clock(seg["start_ms"], "."), clock(seg["end_ms"], ".")
+        for stream, fmt in outputs:
+            stream.write(FORMATS[fmt][2](i, seg, call_id))
+
+
+def call_id_for(data, fallback):
+    result = data.get("result", data)
+    return str(data.get("id") or (data.get("meta") or {}).get("call_id")
+               or result.get("metadata", {}).get("request_id") or fallback)
+
+
+def safe_name(call_id):
+    """Call id as a file name: no path separators, no leading dots"""
+    return UNSAFE_RE.sub("_", call_id).lstrip(".")[:200] or "call"
+
+
+def stem(path):
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def open_outputs(out_dir, name, formats):
+    """Open one file per format under a base name nobody has used yet; returns (base name, [(stream, format)])"""
+    for n in itertools.count(1):
+        base = name if n == 1 else f"{name}-{n}"
+        first = os.path.join(out_dir, f"{base}.{FORMATS[formats[0]][0]}")
+        try:
+            # Exclusive create claims the name, also against other pool workers
+            stream = open(first, "x", buffering=WRITE_BUFFER)
+        except FileExistsError:
+            continue
+        return base, [(stream, formats[0])] + [
+            (open(os.path.join(out_dir, f"{base}.{FORMATS[fmt][0]}"), "w", buffering=WRITE_BUFFER), fmt)
+            for fmt in formats[1:]]
+
+
+def task_label(task):
+    if task[0] == "line":
+        return f"{task[3]}:{task[2]}"
+    if task[0] == "zip":
+        return f"{task[1]}:{task[2]}"
+    return task[1] if task[0] == "file" else task[2]
+
+
+def load_task(task):
+    """Read one call; tasks are ("file", path), ("line", text, n, path), ("zip", archive, member) or
+    ("member", bytes, member) for tar members the coordinator already read"""
+    kind = task[0]
+    if kind == "file":
+        with open(task[1]) as f:
+            return json.load(f), stem(task[1])
+    if kind == "line":
+        return json.loads(task[1]), f"{stem(task[3])}-line{task[2]}"
+    if kind == "zip":
+        if task[1] not in _zip_archives:
+            _zip_archives[task[1]] = zipfile.ZipFile(task[1])
+        return json.loads(_zip_archives[task[1]].read(task[2])), stem(task[2])
+    return json.loads(task[1]), stem(task[2])
+
+
+def export_task(task, out_dir, formats):
+    """Worker: export one call to every format; returns (segments, bytes written, renamed), segments None if
+    the call could not be read"""
+    try:
+        data, fallback = load_task(task)
+        segments = segments_from_result(data)
+        call_id = call_id_for(data, fallback)
+    except (ValueError, AttributeError) as e:
+        print(f"  skipping {task_label(task)}: {e}")
+        return None, 0, False
+    if not segments:
+        return 0, 0, False
+    name = safe_name(call_id)
+    base, streams = open_outputs(out_dir, name, formats)
+    try:
+        export_segments(segments, streams, call_id)
+    finally:
+        written = 0
+        for stream, _ in streams:
+            written += stream.tell()
+            stream.close()
+    return len(segments), written, base != name
+
+
+def export_batch(tasks, out_dir, formats):
+    return [export_task(task, out_dir, formats) for task in tasks]
+
+
+def iter_tasks(paths):
+    """Expand inputs into per-call tasks without parsing the calls themselves"""
+    for path in paths:
+        if os.path.isdir(path):
+            for file_path in sorted(glob.glob(os.path.join(path, "*.json"))):
+                yield ("file", file_path)
+        elif path.endswith(".jsonl"):
+            with open(path) as f:
+                for n, line in enumerate(f, 1):
+                    if line.strip():
+                        yield ("line", line, n, path)
+        elif zipfile.is_zipfile(path):
+            with zipfile.ZipFile(path) as archive:
+                for name in archive.namelist():
+                    if name.endswith(".json"):
+                        yield ("zip", path, name)
+        elif tarfile.is_tarfile(path):
+            # Stream mode: one sequential pass, also through gzip/bz2/xz
+            with tarfile.open(path, "r|*") as archive:
+                for member in archive:
+                    if member.isfile() and member.name.endswith(".json"):
+                        yield ("member", archive.extractfile(member).read(), member.name)
+        else:
+            yield ("file", path)
+
+
+def export(paths, out_dir=OUT_DIR, formats=("txt", "srt", "vtt", "jsonl"), workers=None, batch=32):
+    """Export every call under `paths`; returns totals"""
+    os.makedirs(out_dir, exist_ok=True)
+    totals = {"calls": 0, "segments": 0, "bytes": 0, "skipped": 0, "renamed": 0}
+
+    def batches():
+        chunk = []
+        for task in iter_tasks(paths):
+            chunk.append(task)
+            if len(chunk) >= batch:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def add(results):
+        for segments, written, renamed in results:
+            if segments is None:
+                totals["skipped"] += 1
+            elif segments:
+                totals["renamed"] += renamed
+                totals["calls"] += 1
+                totals["segments"] += segments
+                totals["bytes"] += written
+
+    chunks = batches()
+    first = [chunk for chunk in (next(chunks, None), next(chunks, None)) if chunk]
+    if workers == 1 or len(first) <= 1:
+        for chunk in itertools.chain(first, chunks):
+            add(export_batch(chunk, out_dir, formats))
+        return totals
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Bounded submission keeps streamed tar members from piling up in memory
+        pending = deque()
+        for chunk in itertools.chain(first, chunks):
+            pending.append(pool.submit(export_batch, chunk, out_dir, formats))
+            if len(pending) >= workers * IN_FLIGHT_PER_WORKER:
+                add(pending.popleft().result())
+        while pending:
+            add(pending.popleft().result())
+    return totals
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    opts = {}
+    for flag in ("--out", "--formats", "--workers"):
+        if flag in args:
+            idx = args.index(flag)
+            opts[flag] = args[idx + 1]
+            del args[idx:idx + 2]
+
+    if not args:
+        print(__doc__)
+        sys.exit(1)
+
+    formats = opts.get("--formats", "txt,srt,vtt,jsonl").split(",")
+    unknown = [f for f in formats if f not in FORMATS]
+    if unknown:
+        print(f"Unknown format(s): {', '.join(unknown)}; choose from {', '.join(FORMATS)}")
+        sys.exit(1)
+
+    out_dir = opts.get("--out", OUT_DIR)
+    workers = int(opts["--workers"]) if "--workers" in opts else None
+    wall0, cpu0 = time.perf_counter(), time.process_time()
+    totals = export(args, out_dir, formats, workers)
+    wall = time.perf_counter() - wall0
+    cpu = time.process_time() - cpu0
+
+    print(f"Exported {totals['calls']} calls, {totals['segments']} segments, "
+          f"{totals['bytes'] / 1e6:.1f} MB ({', '.join(formats)}) to {out_dir}/")
+    if totals["skipped"] or totals["renamed"]:
+        print(f"  {totals['skipped']} unreadable calls skipped, {totals['renamed']} renamed to avoid a name collision")
+    print(f"{wall:.2f}s wall, {totals['calls'] / wall if wall else 0:.0f} calls/s, "
+          f"{totals['bytes'] / 1e6 / wall if wall else 0:.1f} MB/s (coordinator CPU {cpu:.2f}s)")
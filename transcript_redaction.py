@@ -0,0 +1,520 @@
+#!/usr/bin/env python3
+"""
+Offline PII redaction over cached Deepgram responses.
+
+Deepgram's redact= option only takes one redaction type per request, so a
+differently redacted copy used to mean paying for another transcription.
+This runs over the cached words array and entity spans instead, in one pass:
+
+  - digit runs are assembled across words, so "4031 Mhmm. 6312 Mhmm. 5397
+    Mhmm. 0245." or "four one one one ..." is seen as one 16 digit number
+    (spoken digits, "oh", "double"/"triple" and backchannel fillers between
+    groups are understood)
+  - each run is labelled by length, checksum (Luhn for cards, ABA for routing
+    numbers) and the nearest keyword in the preceding words ("card",
+    "expiration", "security code", "social", "routing", "account", "born");
+    a run right before "dollars" or "a month" is an amount, not an account
+  - month-name dates and numeric dates after a birth keyword become DOB
+  - Deepgram's own PII entity spans (CREDIT_CARD, CVV, DOB, ...) are merged in
+
+Redacted words keep their index and timing (word becomes "[CREDIT_CARD]"), so
+start_word / end_word references in entities, intents and sentiments stay
+valid; the transcript, paragraphs, utterances and segment texts are rewritten
+to match. The span map records label, word range, time range, speaker and
+source for every redaction, never the original value.
+
+Usage:
+    python transcript_redaction.py redact <cached.json ...> [--out redacted_dir] [--labels CREDIT_CARD,SSN,...]
+    python transcript_redaction.py spans <cached.json>
+    python transcript_redaction.py bench <cached.json ...> [--words 1000000]
+"""
+import json
+import os
+import re
+import sys
+import time
+from bisect import bisect_left
+
+DEFAULT_LABELS = {
+    "CREDIT_CARD", "CARD_EXPIRATION", "CVV", "SSN", "ROUTING_NUMBER", "ACCOUNT_NUMBER", "DOB",
+    "HEALTHCARE_NUMBER", "PASSPORT_NUMBER", "DRIVER_LICENSE", "NUMBER",
+}
+
+# Deepgram entity labels -> ours; anything unlisted is not PII for this purpose
+ENTITY_LABELS = {
+    "CREDIT_CARD": "CREDIT_CARD",
+    "CREDIT_CARD_EXPIRATION": "CARD_EXPIRATION",
+    "CVV": "CVV",
+    "SSN": "SSN",
+    "ROUTING_NUMBER": "ROUTING_NUMBER",
+    "BANK_ACCOUNT": "ACCOUNT_NUMBER",
+    "ACCOUNT_NUMBER": "ACCOUNT_NUMBER",
+    "DOB": "DOB",
+    "HEALTHCARE_NUMBER": "HEALTHCARE_NUMBER",
+    "PASSPORT_NUMBER": "PASSPORT_NUMBER",
+    "DRIVER_LICENSE": "DRIVER_LICENSE",
+    "NUMERICAL_PII": "NUMBER",
+    "PHONE_NUMBER": "PHONE_NUMBER",
+}
+
+# Which label wins when spans overlap: a specific pattern label, then Deepgram's, then the generic ones
+LABEL_RANK = {label: rank for rank, label in enumerate([
+    "CREDIT_CARD", "SSN", "ROUTING_NUMBER", "ACCOUNT_NUMBER", "CVV", "CARD_EXPIRATION", "DOB",
+    "HEALTHCARE_NUMBER", "PASSPORT_NUMBER", "DRIVER_LICENSE", "NUMBER", "PHONE_NUMBER",
+])}
+
+CONTEXT_WORDS = 15          # keyword lookback for labelling a run
+MAX_FILLER_GAP = 2          # filler words allowed between digit groups of one run
+
+SPOKEN_DIGITS = {
+    "zero": "0", "oh": "0", "o": "0", "one": "1", "two": "2", "three": "3", "four": "4",
+    "five": "5", "six": "6", "seven": "7", "eight": "8", "nine": "9",
+}
+REPEATS = {"double": 2, "triple": 3}
+FILLERS = {
+    "mhmm", "mm-hmm", "mm", "hmm", "uh", "um", "uh-huh", "okay", "ok", "yeah", "yep", "yes", "right",
+    "dash", "hyphen", "slash", "and", "then", "space",
+}
+MONTHS = {
+    "january", "february", "march", "april", "may", "june", "july", "august", "september", "october",
+    "november", "december", "jan", "feb", "mar", "apr", "jun", "jul", "aug", "sep", "sept", "oct", "nov", "dec",
+}
+
+NUMERIC_TOKEN_RE = re.compile(r"^[(#]?\d[\d\-/.)]*$")
+DATE_TOKEN_RE = re.compile(r"^\d{1,2}[/-]\d{1,2}(?:[/-]\d{2,4})?$|^\d{1,2}/\d{4}$")
+DAY_RE = re.compile(r"^(?:[12]?\d|3[01])(?:st|nd|rd|th)?$")
+YEAR_RE = re.compile(r"^(?:19|20)\d\d$")
+PHONE_SHAPE_RE = re.compile(r"^\(\d{3}\)$|^\d{3}-\d{4}$|^\d{3}-\d{3}-\d{4}$")
+SSN_SHAPE_RE = re.compile(r"^\d{3}-\d{2}-\d{4}$")
+MONEY_AFTER_RE = re.compile(r"^(?:dollars?|bucks|cents?|per month|a month|monthly|per year|a year)\b")
+PUNCT_RE = re.compile(r"[.,?!;:]+$")
+DIGIT_STARTS = set("0123456789(#")
+
+CONTEXT = [
+    ("CVV", re.compile(r"\b(?:cvv|cvc|security code|(?:three|four|3|4) digit|back of the card)\b")),
+    ("CARD_EXPIRATION", re.compile(r"\b(?:expir\w*|exp|expires|valid thru)\b")),
+    ("CREDIT_CARD", re.compile(r"\b(?:card|visa|master ?card|amex|american express|discover|debit|credit)\b")),
+    ("SSN", re.compile(r"\b(?:social|ssn|socials)\b")),
+    ("ROUTING_NUMBER", re.compile(r"\b(?:routing|aba|transit)\b")),
+    ("ACCOUNT_NUMBER", re.compile(r"\b(?:account|checking|savings|acct)\b")),
+    ("DOB", re.compile(r"\b(?:born|birth|birthday|dob|birthdate)\b")),
+    ("PHONE_NUMBER", re.compile(r"\b(?:phone|cell|call you|reach you|callback)\b")),
+]
+
+
+def luhn_ok(digits):
+    total = 0
+    for i, c in enumerate(reversed(digits)):
+        d = int(c)
+        if i % 2:
+            d = d * 2 - 9 if d > 4 else d * 2
+        total += d
+    return total % 10 == 0
+
+
+def aba_ok(digits):
+    d = [int(c) for c in digits]
+    return len(d) == 9 and (3 * (d[0] + d[3] + d[6]) + 7 * (d[1] + d[4] + d[7]) + d[2] + d[5] + d[8]) % 10 == 0
+
+
+def get_alternative(result):
+    channels = result.get("results", {}).get("channels", [])
+    return channels[0].get("alternatives", [{}])[0] if channels else {}
+
+
+def nearest_context(lower, start):
+    """Label of the keyword closest before word `start`, or None"""
+    window = " ".join(lower[max(0, start - CONTEXT_WORDS):start])
+    best, best_pos = None, -1
+    for label, pattern in CONTEXT:
+        for match in pattern.finditer(window):
+            if match.end() > best_pos:
+                best, best_pos = label, match.end()
+    return best
+
+
+def money_adjacent(lower, start, end):
+    """Whether words start..end-1 read as an amount: "$" right before, "dollars" or "a month" right after"""
+    return (start > 0 and lower[start - 1] == "$") or bool(MONEY_AFTER_RE.match(" ".join(lower[end:end + 2])))
+
+
+def classify_run(digits, shapes, context, money=False):
+    """Label for a digit run, or None to leave it alone; `money` when the run reads as an amount"""
+    n = len(digits)
+    if context == "DOB" and (n in (6, 8) or any(DATE_TOKEN_RE.match(s) for s in shapes)):
+        return "DOB"
+    if context == "CVV" and n in (3, 4):
+        return "CVV"
+    if context == "CARD_EXPIRATION" and (n in (3, 4, 6) or any("/" in s for s in shapes)):
+        return "CARD_EXPIRATION"
+    if 13 <= n <= 19:
+        if luhn_ok(digits) or context == "CREDIT_CARD":
+            return "CREDIT_CARD"
+        return "ACCOUNT_NUMBER"
+    if n == 9:
+        if context == "ROUTING_NUMBER":
+            return "ROUTING_NUMBER"
+        if context == "SSN" or SSN_SHAPE_RE.match(shapes[0]) or [len(s) for s in shapes] == [3, 2, 4]:
+            return "SSN"
+        if context != "ACCOUNT_NUMBER":
+            return "ROUTING_NUMBER" if aba_ok(digits) else "NUMBER"
+    if context == "SSN" and n == 4:
+        return "SSN"  # "last four of your social"
+    # Shorter runs after "account" are premiums, draft days and the like
+    if context in ("ACCOUNT_NUMBER", "ROUTING_NUMBER") and 6 <= n <= 17 and not money:
+        return context
+    if context == "CREDIT_CARD" and n == 4:
+        return "CREDIT_CARD"  # "card ending in 0245"
+    if 10 <= n <= 11 and (context == "PHONE_NUMBER" or any(PHONE_SHAPE_RE.match(s) for s in shapes)):
+        return None
+    if n >= 9:
+        return "NUMBER"
+    return None
+
+
+def find_spans(words, entities=(), labels=DEFAULT_LABELS):
+    """One pass over the words; returns merged redaction spans (end_word exclusive)"""
+    lower = []
+    candidates = []
+    run = []                # word indexes holding digits
+    run_digits = []
+    run_shapes = []
+    gap = 0
+    date_start = None       # month-name date being assembled
+    date_end = None
+
+    def close_run():
+        if run:
+            candidates.append((run[0], run[-1] + 1, "".join(run_digits), list(run_shapes)))
+        run.clear()
+        run_digits.clear()
+        run_shapes.clear()
+
+    repeat, repeat_at = 1, None
+    for i, w in enumerate(words):
+        token = (w.get("word") or "").lower()
+        if token and token[-1] in ".,?!;:":  # Deepgram's "word" is bare; other sources may not be
+            token = PUNCT_RE.sub("", token)
+        lower.append(token)
+
+        # Month-name dates: "august 21", "january 5th 1960"
+        if token in MONTHS:
+            if date_start is not None:
+                candidates.append((date_start, date_end, None, ["date"]))
+            date_start, date_end = i, i + 1
+        elif date_start is not None and i == date_end and (DAY_RE.match(token) or YEAR_RE.match(token)):
+            date_end = i + 1
+        elif date_start is not None and i >= date_end:
+            candidates.append((date_start, date_end, None, ["date"]))
+            date_start = None
+
+        if token in REPEATS:
+            repeat, repeat_at = REPEATS[token], i
+            continue
+        if token[:1] in DIGIT_STARTS and NUMERIC_TOKEN_RE.match(token):
+            digits = re.sub(r"\D", "", token)
+        elif token in SPOKEN_DIGITS:
+            digits = SPOKEN_DIGITS[token] * repeat
+        else:
+            digits = None
+        repeat = 1
+
+        if digits and repeat_at == i - 1 and SPOKEN_DIGITS.get(token):
+            run.append(repeat_at)  # "double" belongs to the span
+        if digits:
+            run.append(i)
+            run_digits.append(digits)
+            run_shapes.append(token)
+            gap = 0
+        elif run and token in FILLERS and gap < MAX_FILLER_GAP:
+            gap += 1
+        elif run:
+            close_run()
+            gap = 0
+    close_run()
+    if date_start is not None:
+        candidates.append((date_start, date_end, None, ["date"]))
+
+    spans = []
+    for start, end, digits, shapes in candidates:
+        context = nearest_context(lower, start)
+        if digits is None:
+            label = "DOB" if context == "DOB" and end - start > 1 else None
+        else:
+            label = classify_run(digits, shapes, context, money_adjacent(lower, start, end))
+        if label in labels:
+            spans.append({"label": label, "start_word": start, "end_word": end, "source": "pattern",
+                          "digits": len(digits) if digits else 0})
+
+    for entity in entities:
+        label = ENTITY_LABELS.get(entity.get("label"))
+        if label in labels:
+            spans.append({"label": label, "start_word": entity["start_word"], "end_word": entity["end_word"],
+                          "source": "entity", "digits": 0})
+    return merge_spans(spans, words)
+
+
+def label_priority(span):
+    # Deepgram calls an expiry or card group a PHONE_NUMBER / CREDIT_CARD often enough that a
+    # keyword-backed pattern label is the better guess
+    specific = span["source"] == "pattern" and span["label"] != "NUMBER"
+    return (0 if specific else 1, LABEL_RANK[span["label"]])
+
+
+def merge_spans(spans, words):
+    spans.sort(key=lambda s: (s["start_word"], -s["end_word"]))
+    merged = []
+    for span in spans:
+        last = merged[-1] if merged else None
+        if last and span["start_word"] < last["end_word"]:
+            last["end_word"] = max(last["end_word"], span["end_word"])
+            if label_priority(span) < last["priority"]:
+                last["label"], last["priority"] = span["label"], label_priority(span)
+            if span["source"] not in last["source"]:
+                last["source"] = "pattern+entity"
+            last["digits"] = max(last["digits"], span["digits"])
+        else:
+            merged.append(dict(span, priority=label_priority(span)))
+    for span in merged:
+        del span["priority"]
+        first, last = words[span["start_word"]], words[span["end_word"] - 1]
+        span["start"] = first.get("start")
+        span["end"] = last.get("end")
+        span["speaker"] = first.get("speaker")
+    return merged
+
+
+def redacted_words(words, spans):
+    """Copies of `words` with span contents replaced by their label; returns (words, {index: original})"""
+    out = list(words)
+    originals = {}
+    for span in spans:
+        tag = f"[{span['label']}]"
+        for i in range(span["start_word"], span["end_word"]):
+            w = words[i]
+            if PUNCT_RE.sub("", (w.get("word") or "").lower()) in FILLERS:
+                continue
+            punctuated = w.get("punctuated_word", w.get("word", ""))
+            trail = PUNCT_RE.search(punctuated)
+            new = dict(w, word=tag.lower(), punctuated_word=tag + (trail.group(0) if trail else ""))
+            out[i] = new
+            originals[i] = punctuated
+    return out, originals
+
+
+def rewrite_text(text, words, redacted, lo, hi):
+    """
+    Swap redacted words lo..hi-1 into `text`, walking it in word order.
+    Back-to-back tags collapse, so nine spoken digits read "[SSN]" once
+    """
+    hi = min(hi, max(redacted) + 1)   # nothing to change past the last redacted word
+    parts = []
+    cursor = 0
+    copied = 0              # text[copied:cursor] is unchanged and not yet in parts
+    open_tag = None         # last emitted tag, while nothing but whitespace follows it
+    for i in range(lo, hi):
+        original = words[i].get("punctuated_word", words[i].get("word", ""))
+        pos = text.find(original, cursor)
+        # Skip tokens that are not where they should be (labels/newlines sit between words, nothing more)
+        if pos < 0 or pos - cursor > len(original) + 32:
+            continue
+        if i in redacted:
+            tagged = redacted[i]["punctuated_word"]
+            tag = tagged[:tagged.index("]") + 1]
+            if tag == open_tag and not text[cursor:pos].strip():
+                parts.append(text[copied:cursor])
+                parts.append(tagged[len(tag):])
+            else:
+                parts.append(text[copied:pos])
+                parts.append(tagged)
+            open_tag = tag if tagged == tag else None
+            copied = pos + len(original)
+        else:
+            open_tag = None
+        cursor = pos + len(original)
+    parts.append(text[copied:])
+    return "".join(parts)
+
+
+def redact(result, labels=DEFAULT_LABELS):
+    """
+    Redacted copy of a Deepgram response plus its span map. Only the parts
+    that change are copied; the rest is shared with `result`
+    """
+    alt = get_alternative(result)
+    words = alt.get("words", [])
+    spans = find_spans(words, alt.get("entities", []), labels)
+    if not spans:
+        return result, spans
+
+    new_words, originals = redacted_words(words, spans)
+    changed = {i: new_words[i] for i in originals}
+    n = len(words)
+
+    out = dict(result)
+    results = out["results"] = dict(result["results"])
+    channels = results["channels"] = list(results["channels"])
+    channel = channels[0] = dict(channels[0])
+    alternatives = channel["alternatives"] = list(channel["alternatives"])
+    out_alt = alternatives[0] = dict(alternatives[0])
+    out_alt["words"] = new_words
+    if "transcript" in out_alt:
+        out_alt["transcript"] = rewrite_text(out_alt["transcript"], words, changed, 0, n)
+
+    if out_alt.get("paragraphs"):
+        paragraphs = out_alt["paragraphs"] = dict(out_alt["paragraphs"])
+        if "transcript" in paragraphs:
+            paragraphs["transcript"] = rewrite_text(paragraphs["transcript"], words, changed, 0, n)
+        starts = [w.get("start", 0) for w in words]
+        rewritten = []
+        for paragraph in paragraphs.get("paragraphs", []):
+            sentences = paragraph.get("sentences", [])
+            new_sentences = list(sentences)
+            for k, sentence in enumerate(sentences):
+                lo = bisect_left(starts, sentence["start"] - 1e-4)
+                hi = bisect_left(starts, sentence["end"] - 1e-4)
+                if any(lo <= i < hi for i in changed):
+                    new_sentences[k] = dict(sentence, text=rewrite_text(sentence["text"], words, changed, lo, hi))
+            rewritten.append(dict(paragraph, sentences=new_sentences) if new_sentences != sentences else paragraph)
+        paragraphs["paragraphs"] = rewritten
+
+    def overlapping(lo, hi):
+        return next((span for span in spans if lo < span["end_word"] and span["start_word"] < hi), None)
+
+    entities = []
+    for entity in out_alt.get("entities", []):
+        span = overlapping(entity["start_word"], entity["end_word"])
+        entities.append(dict(entity, value=f"[{span['label']}]") if span else entity)
+    if "entities" in out_alt:
+        out_alt["entities"] = entities
+
+    for key in ("intents", "sentiments", "topics"):
+        if not results.get(key):
+            continue
+        block = results[key] = dict(results[key])
+        segments = []
+        for segment in block.get("segments", []):
+            lo, hi = segment.get("start_word", 0), segment.get("end_word", 0)
+            if "text" in segment and any(lo <= i < hi for i in changed):
+                segment = dict(segment, text=rewrite_text(segment["text"], words, changed, lo, hi))
+            segments.append(segment)
+        if "segments" in block:
+            block["segments"] = segments
+
+    # Utterances carry their own word copies; match them to the channel words by timing
+    by_time = {(round(words[i].get("start", 0), 3), round(words[i].get("end", 0), 3)): i for i in changed}
+    utterances = []
+    for utterance in results.get("utterances", []):
+        if not any(span["start"] < utterance.get("end", 0) and utterance.get("start", 0) < span["end"]
+                   for span in spans):
+            utterances.append(utterance)
+            continue
+        utt_words = utterance.get("words", [])
+        hits = {}
+        for j, w in enumerate(utt_words):
+            i = by_time.get((round(w.get("start", 0), 3), round(w.get("end", 0), 3)))
+            if i is not None:
+                hits[j] = dict(w, word=changed[i]["word"], punctuated_word=changed[i]["punctuated_word"])
+        if hits:
+            utterance = dict(utterance, words=[hits.get(j, w) for j, w in enumerate(utt_words)])
+            if "transcript" in utterance:
+                utterance["transcript"] = rewrite_text(utterance["transcript"], utt_words, hits, 0, len(utt_words))
+        utterances.append(utterance)
+    if "utterances" in results:
+        results["utterances"] = utterances
+
+    if results.get("search"):
+        results["search"] = [
+            dict(item, hits=[
+                dict(hit, snippet="[REDACTED]")
+                if any(span["start"] < hit.get("end", 0) and hit.get("start", 0) < span["end"] for span in spans)
+                else hit
+                for hit in item.get("hits", [])
+            ])
+            for item in results["search"]
+        ]
+    return out, spans
+
+
+def spans_path(transcript_path):
+    return os.path.splitext(transcript_path)[0] + ".spans.json"
+
+
+def summarize(spans):
+    counts = {}
+    for span in spans:
+        counts[span["label"]] = counts.get(span["label"], 0) + 1
+    return counts
+
+
+def bench(paths, target_words=1_000_000, labels=DEFAULT_LABELS):
+    """Words/sec for span detection alone and for the full redacted copy"""
+    results = []
+    for path in paths:
+        with open(path) as f:
+            results.append(json.load(f))
+    per_pass = sum(len(get_alternative(r).get("words", [])) for r in results)
+    if not per_pass:
+        print("No words in input")
+        return
+    rounds = max(1, target_words // per_pass)
+
+    t0 = time.perf_counter()
+    for _ in range(rounds):
+        for r in results:
+            alt = get_alternative(r)
+            find_spans(alt.get("words", []), alt.get("entities", []), labels)
+    detect = time.perf_counter() - t0
+
+    rounds_full = rounds
+    t0 = time.perf_counter()
+    for _ in range(rounds_full):
+        for r in results:
+            redact(r, labels)
+    full = time.perf_counter() - t0
+
+    print("REDACTION THROUGHPUT")
+    print("=" * 60)
+    print(f"{len(paths)} transcripts, {per_pass:,} words per pass")
+    print(f"  span detection   {per_pass * rounds / detect:12,.0f} words/s  ({rounds} passes)")
+    print(f"  redacted copy    {per_pass * rounds_full / full:12,.0f} words/s  ({rounds_full} passes)")
+    minutes = sum(r.get("metadata", {}).get("duration") or 0 for r in results) / 60
+    if minutes:
+        per_call = full / rounds_full / len(results) * 1000
+        print(f"  {per_call:.1f} ms per call ({minutes / len(results):.1f} min average audio)")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if not args or args[0] not in ("redact", "spans", "bench"):
+        print(__doc__)
+        sys.exit(1)
+    command = args.pop(0)
+    opts = {args[i]: args[i + 1] for i in range(len(args) - 1) if args[i].startswith("--")}
+    paths = [a for i, a in enumerate(args) if not a.startswith("--") and (i == 0 or not args[i - 1].startswith("--"))]
+    labels = set(opts["--labels"].split(",")) if "--labels" in opts else DEFAULT_LABELS
+
+    if command == "bench":
+        bench(paths, int(opts.get("--words", 1_000_000)), labels)
+        sys.exit(0)
+
+    for path in paths:
+        with open(path) as f:
+            result = json.load(f)
+        redacted, spans = redact(result, labels)
+        if command == "spans":
+            alt = get_alternative(redacted)
+            for span in spans:
+                text = " ".join(w.get("punctuated_word", "") for w in alt["words"][span["start_word"]:span["end_word"]])
+                print(f"{span['start']:8.2f}s  speaker {span['speaker']}  {span['label']:17s} "
+                      f"{span['source']:15s} words {span['start_word']}-{span['end_word']}  {text}")
+            print(f"{path}: {len(spans)} spans {summarize(spans)}")
+            continue
+        out_dir = opts.get("--out", "redacted")
+        os.makedirs(out_dir, exist_ok=True)
+        dest = os.path.join(out_dir, os.path.basename(path))
+        with open(dest, "w") as f:
+            json.dump(redacted, f)
+        with open(spans_path(dest), "w") as f:
+            json.dump(spans, f, indent=2)
+        print(f"{path} -> {dest}: {len(spans)} spans {summarize(spans)}")
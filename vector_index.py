@@ -0,0 +1,398 @@
+#!/usr/bin/env python3
+"""
+Local vector index for semantic search over utterances.
+
+src/lib/semantic.ts scores embeddings one pair at a time and
+transcript_embeddings holds a single vector per call. This index keeps one
+embedding per utterance in a contiguous float32 matrix on disk (memory-mapped,
+optionally int8-quantized with a per-row scale) and answers queries with
+batched NumPy matmuls. With --ivf N the rows are clustered into N lists
+(spherical k-means) and stored list by list, so a query only scans the
+--nprobe closest lists.
+
+Embedding functions are pluggable: "hash" is a deterministic local stand-in
+(token + bigram feature hashing), "openai" calls text-embedding-3-small like
+semantic.ts, and "module:function" loads any callable taking a list of texts.
+
+Usage:
+    python vector_index.py build <index-dir> <cached-dir-or-files ...> [--embedder hash] [--int8] [--ivf 1024]
+    python vector_index.py search <index-dir> "customer says it's too expensive" [--k 10] [--nprobe 16]
+    python vector_index.py bench [--utterances 1000000] [--dim 256]
+"""
+import glob
+import importlib
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+import zlib
+
+import numpy as np
+
+from transcript_compaction import utterances_from_deepgram, utterances_from_transcript
+
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
+OPENAI_EMBEDDING_MODEL = "text-embedding-3-small"
+
+HASH_DIM = 384
+SCAN_ROWS = 1 << 18         # rows per matmul block when scanning
+UPCAST_ROWS = 1024          # int8 rows widened at a time; the float32 copy stays in L2
+KMEANS_SAMPLE = 64          # training rows per IVF list
+KMEANS_ITERS = 12
+TOKEN_RE = re.compile(r"[a-z0-9']+")
+
+
+def hash_embedder(texts, dim=HASH_DIM):
+    """Deterministic stand-in: signed feature hashing of tokens and bigrams, L2-normalized"""
+    out = np.zeros((len(texts), dim), dtype=np.float32)
+    for row, text in enumerate(texts):
+        tokens = TOKEN_RE.findall(text.lower())
+        for feature in tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]:
+            h = zlib.crc32(feature.encode())
+            out[row, h % dim] += 1.0 if h & 0x80000000 else -1.0
+    return normalize(out)
+
+
+def openai_embedder(texts, batch=256):
+    import requests
+
+    vectors = []
+    for start in range(0, len(texts), batch):
+        response = requests.post(
+            "https://api.openai.com/v1/embeddings",
+            headers={"Authorization": f"Bearer {OPENAI_API_KEY}"},
+            json={"model": OPENAI_EMBEDDING_MODEL, "input": texts[start:start + batch]},
+            timeout=120,
+        )
+        response.raise_for_status()
+        vectors.extend(d["embedding"] for d in response.json()["data"])
+    return normalize(np.asarray(vectors, dtype=np.float32))
+
+
+EMBEDDERS = {"hash": hash_embedder, "openai": openai_embedder}
+
+
+def get_embedder(name):
+    """Resolve "hash", "openai" or "package.module:function"""
+    if name in EMBEDDERS:
+        return EMBEDDERS[name]
+    module, _, attr = name.partition(":")
+    if not attr:
+        raise ValueError(f"Unknown embedder {name!r}; use {', '.join(EMBEDDERS)} or module:function")
+    return getattr(importlib.import_module(module), attr)
+
+
+def normalize(vectors):
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-9)
+
+
+def quantize_int8(vectors):
+    """Symmetric per-row int8 quantization; returns (int8 rows, float32 scales)"""
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    return np.round(vectors / scales[:, None]).astype(np.int8), scales.astype(np.float32)
+
+
+def spherical_kmeans(sample, lists, iters=KMEANS_ITERS, seed=0):
+    rng = np.random.default_rng(seed)
+    centroids = sample[rng.choice(len(sample), size=lists, replace=False)].copy()
+    for _ in range(iters):
+        assign = np.argmax(sample @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, sample)
+        empty = ~sums.any(axis=1)
+        sums[empty] = sample[rng.choice(len(sample), size=int(empty.sum()), replace=False)]
+        centroids = normalize(sums)
+    return centroids
+
+
+def iter_utterances(paths):
+    """Yield (call_id, utterance) from cached Deepgram responses or analyze-simple results"""
+    for path in paths:
+        files = sorted(glob.glob(os.path.join(path, "*.json"))) if os.path.isdir(path) else [path]
+        for file_path in files:
+            with open(file_path) as f:
+                data = json.load(f)
+            call_id = data.get("id") or os.path.splitext(os.path.basename(file_path))[0]
+            result = data.get("result", data)
+            if "results" in result:
+                utterances = utterances_from_deepgram(result)
+            elif isinstance(result.get("transcript"), str):
+                utterances = utterances_from_transcript(result["transcript"])
+            else:
+                continue
+            for utt in utterances:
+                if utt["text"].strip():
+                    yield call_id, utt
+
+
+class VectorIndex:
+    """Memory-mapped utterance embeddings + metadata on disk"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "header.json")) as f:
+            self.header = json.load(f)
+        self.dim = self.header["dim"]
+        self.count = self.header["count"]
+        self.int8 = self.header["dtype"] == "int8"
+        self.embed = get_embedder(self.header["embedder"])
+
+        dtype = np.int8 if self.int8 else np.float32
+        self.vectors = np.memmap(os.path.join(path, "vectors.bin"), dtype=dtype, mode="r", shape=(self.count, self.dim))
+        self.scales = np.fromfile(os.path.join(path, "scales.bin"), dtype=np.float32) if self.int8 else None
+        self.upcast = np.empty((UPCAST_ROWS, self.dim), dtype=np.float32) if self.int8 else None
+        self.meta_offsets = np.fromfile(os.path.join(path, "meta.idx"), dtype=np.int64)
+        self.meta_file = open(os.path.join(path, "meta.jsonl"), "rb")
+
+        self.centroids = None
+        self.list_offsets = None
+        if self.header.get("ivf_lists"):
+            self.centroids = np.fromfile(os.path.join(path, "centroids.bin"), dtype=np.float32).reshape(-1, self.dim)
+            self.list_offsets = np.fromfile(os.path.join(path, "lists.bin"), dtype=np.int64)
+
+    def meta(self, row):
+        self.meta_file.seek(int(self.meta_offsets[row]))
+        return json.loads(self.meta_file.readline())
+
+    def _int8_scores(self, queries, lo, hi):
+        """queries @ rows[lo:hi].T for int8 rows, widened a cache-sized slice at a time into a reused buffer"""
+        scores = np.empty((len(queries), hi - lo), dtype=np.float32)
+        for sub in range(lo, hi, UPCAST_ROWS):
+            n = min(hi, sub + UPCAST_ROWS) - sub
+            rows = self.upcast[:n]
+            np.copyto(rows, self.vectors[sub:sub + n], casting="unsafe")
+            np.matmul(queries, rows.T, out=scores[:, sub - lo:sub - lo + n])
+        scores *= self.scales[lo:hi]
+        return scores
+
+    def _scan(self, queries, start, end, k, best_scores, best_rows):
+        """Score rows [start, end) for every query and merge into the running top-k"""
+        for lo in range(start, end, SCAN_ROWS):
+            hi = min(end, lo + SCAN_ROWS)
+            if self.int8:
+                scores = self._int8_scores(queries, lo, hi)
+            else:
+                scores = queries @ self.vectors[lo:hi].T
+            take = min(k, hi - lo)
+            top = np.argpartition(-scores, take - 1, axis=1)[:, :take]
+            merged_scores = np.concatenate([best_scores, np.take_along_axis(scores, top, axis=1)], axis=1)
+            merged_rows = np.concatenate([best_rows, top + lo], axis=1)
+            keep = np.argsort(-merged_scores, axis=1)[:, :k]
+            best_scores = np.take_along_axis(merged_scores, keep, axis=1)
+            best_rows = np.take_along_axis(merged_rows, keep, axis=1)
+        return best_scores, best_rows
+
+    def search_vectors(self, queries, k=10, nprobe=16):
+        """Top-k (scores, rows) for a (m, dim) query matrix"""
+        queries = normalize(np.asarray(queries, dtype=np.float32).reshape(-1, self.dim))
+        best_scores = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+        best_rows = np.zeros((len(queries), 0), dtype=np.int64)
+
+        if self.centroids is None:
+            return self._scan(queries, 0, self.count, k, best_scores, best_rows)
+
+        # IVF: each query scans only its nprobe closest lists
+        probes = np.argsort(-(queries @ self.centroids.T), axis=1)[:, :nprobe]
+        out_scores, out_rows = [], []
+        for qi, query in enumerate(queries):
+            s, r = best_scores[qi:qi + 1], best_rows[qi:qi + 1]
+            for lst in probes[qi]:
+                start, end = self.list_offsets[lst], self.list_offsets[lst + 1]
+                if end > start:
+                    s, r = self._scan(query[None, :], start, end, k, s, r)
+            out_scores.append(np.pad(s[0], (0, k - s.shape[1]), constant_values=-np.inf))
+            out_rows.append(np.pad(r[0], (0, k - r.shape[1]), constant_values=-1))
+        return np.stack(out_scores), np.stack(out_rows)
+
+    def search(self, texts, k=10, nprobe=16):
+        """Embed query texts and return, per query, a list of hits with metadata"""
+        scores, rows = self.search_vectors(self.embed(list(texts)), k, nprobe)
+        return [
+            [dict(self.meta(row), score=float(score)) for score, row in zip(s, r) if row >= 0]
+            for s, r in zip(scores, rows)
+        ]
+
+    def close(self):
+        self.meta_file.close()
+
+
+def write_index(path, vectors, metas, embedder, int8=False, ivf_lists=0):
+    """Write an index from an in-memory or memory-mapped float32 matrix and a metadata list"""
+    os.makedirs(path, exist_ok=True)
+    count, dim = vectors.shape
+    order = None
+
+    if ivf_lists:
+        ivf_lists = min(ivf_lists, count)
+        rng = np.random.default_rng(0)
+        sample_rows = np.sort(rng.choice(count, size=min(count, ivf_lists * KMEANS_SAMPLE), replace=False))
+        centroids = spherical_kmeans(np.asarray(vectors[sample_rows]), ivf_lists)
+        assign = np.concatenate([
+            np.argmax(np.asarray(vectors[lo:lo + SCAN_ROWS]) @ centroids.T, axis=1)
+            for lo in range(0, count, SCAN_ROWS)
+        ])
+        order = np.argsort(assign, kind="stable")
+        list_offsets = np.concatenate([[0], np.cumsum(np.bincount(assign, minlength=ivf_lists))]).astype(np.int64)
+        centroids.astype(np.float32).tofile(os.path.join(path, "centroids.bin"))
+        list_offsets.tofile(os.path.join(path, "lists.bin"))
+
+    # Rows are written block by block (in list order for IVF) so the source never has to fit in memory twice
+    scales = []
+    with open(os.path.join(path, "vectors.bin"), "wb") as out:
+        for lo in range(0, count, SCAN_ROWS):
+            rows = order[lo:lo + SCAN_ROWS] if order is not None else slice(lo, min(count, lo + SCAN_ROWS))
+            block = np.asarray(vectors[rows], dtype=np.float32)
+            if int8:
+                block, block_scales = quantize_int8(block)
+                scales.append(block_scales)
+            out.write(block.tobytes())
+    if int8:
+        np.concatenate(scales).tofile(os.path.join(path, "scales.bin"))
+
+    offsets = np.zeros(count, dtype=np.int64)
+    with open(os.path.join(path, "meta.jsonl"), "wb") as out:
+        for i, row in enumerate(order if order is not None else range(count)):
+            offsets[i] = out.tell()
+            out.write(json.dumps(metas[row]).encode() + b"\n")
+    offsets.tofile(os.path.join(path, "meta.idx"))
+
+    with open(os.path.join(path, "header.json"), "w") as f:
+        json.dump({"dim": dim, "count": count, "dtype": "int8" if int8 else "float32",
+                   "embedder": embedder, "ivf_lists": ivf_lists}, f, indent=2)
+
+
+def build(path, sources, embedder="hash", int8=False, ivf_lists=0, batch=512):
+    """Embed every utterance in `sources` in batches and write the index"""
+    embed = get_embedder(embedder)
+    tmp_dir = tempfile.mkdtemp(prefix="vector_index_")
+    raw_path = os.path.join(tmp_dir, "raw.f32")
+    metas = []
+    dim = None
+    texts = []
+
+    try:
+        with open(raw_path, "wb") as raw:
+            def flush():
+                nonlocal dim
+                vectors = np.asarray(embed(texts), dtype=np.float32)
+                dim = vectors.shape[1]
+                raw.write(normalize(vectors).tobytes())
+                texts.clear()
+
+            for call_id, utt in iter_utterances(sources):
+                metas.append({"call_id": call_id, "speaker": utt["speaker"], "start": utt["start"],
+                              "end": utt["end"], "text": utt["text"]})
+                texts.append(utt["text"])
+                if len(texts) >= batch:
+                    flush()
+            if texts:
+                flush()
+
+        if not metas:
+            raise ValueError("No utterances found in the given sources")
+        vectors = np.memmap(raw_path, dtype=np.float32, mode="r", shape=(len(metas), dim))
+        write_index(path, vectors, metas, embedder, int8, ivf_lists)
+        del vectors
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return len(metas)
+
+
+def bench(count, dim, queries=32, k=10):
+    """Latency of flat / int8 / IVF search over a synthetic clustered corpus"""
+    rng = np.random.default_rng(1)
+    tmp_dir = tempfile.mkdtemp(prefix="vector_bench_")
+    try:
+        # Clustered synthetic data so IVF recall is meaningful
+        topics = normalize(rng.standard_normal((512, dim)).astype(np.float32))
+        raw_path = os.path.join(tmp_dir, "raw.f32")
+        vectors = np.memmap(raw_path, dtype=np.float32, mode="w+", shape=(count, dim))
+        for lo in range(0, count, SCAN_ROWS):
+            hi = min(count, lo + SCAN_ROWS)
+            noise = rng.standard_normal((hi - lo, dim)).astype(np.float32) * 0.08
+            vectors[lo:hi] = normalize(topics[rng.integers(0, len(topics), hi - lo)] + noise)
+        vectors.flush()
+        metas = [{"call_id": f"call-{i // 40}", "row": i} for i in range(count)]
+        query_vecs = normalize(topics[rng.integers(0, len(topics), queries)] +
+                               rng.standard_normal((queries, dim)).astype(np.float32) * 0.08)
+
+        lists = max(16, int(np.sqrt(count)))
+        configs = [
+            ("flat float32", dict(), {}),
+            ("flat int8", dict(int8=True), {}),
+            (f"ivf{lists} float32", dict(ivf_lists=lists), {"nprobe": 16}),
+            (f"ivf{lists} int8", dict(ivf_lists=lists, int8=True), {"nprobe": 16}),
+        ]
+        reference = None
+        for name, build_opts, search_opts in configs:
+            index_dir = os.path.join(tmp_dir, name.replace(" ", "_"))
+            t0 = time.perf_counter()
+            write_index(index_dir, vectors, metas, "hash", **build_opts)
+            build_sec = time.perf_counter() - t0
+
+            index = VectorIndex(index_dir)
+            index.search_vectors(query_vecs[:1], k, **search_opts)   # warm the page cache
+            single = []
+            for q in query_vecs:
+                t0 = time.perf_counter()
+                index.search_vectors(q[None, :], k, **search_opts)
+                single.append((time.perf_counter() - t0) * 1000)
+            t0 = time.perf_counter()
+            _, rows = index.search_vectors(query_vecs, k, **search_opts)
+            batch_ms = (time.perf_counter() - t0) * 1000
+
+            found = [set(index.meta(r)["row"] for r in row if r >= 0) for row in rows]
+            if reference is None:
+                reference = found
+            recall = np.mean([len(a & b) / max(1, len(b)) for a, b in zip(found, reference)])
+            single.sort()
+            print(f"{name:18s} build {build_sec:6.1f}s  query p50 {single[len(single) // 2]:7.2f}ms  "
+                  f"p95 {single[int(0.95 * (len(single) - 1))]:7.2f}ms  batch of {queries} {batch_ms:7.1f}ms  "
+                  f"recall@{k} vs flat {recall:.2f}")
+            index.close()
+        del vectors
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    opts = {}
+    for flag in ("--embedder", "--ivf", "--k", "--nprobe", "--utterances", "--dim"):
+        if flag in args:
+            idx = args.index(flag)
+            opts[flag] = args[idx + 1]
+            del args[idx:idx + 2]
+    int8 = "--int8" in args
+    if int8:
+        args.remove("--int8")
+
+    if args and args[0] == "bench":
+        print("VECTOR INDEX BENCHMARK")
+        print("=" * 60)
+        count = int(opts.get("--utterances", 1000000))
+        dim = int(opts.get("--dim", 256))
+        print(f"{count} synthetic utterances x {dim} dims")
+        print("-" * 60)
+        bench(count, dim)
+    elif len(args) >= 3 and args[0] == "build":
+        n = build(args[1], args[2:], opts.get("--embedder", "hash"), int8, int(opts.get("--ivf", 0)))
+        print(f"Indexed {n} utterances into {args[1]}")
+    elif len(args) >= 3 and args[0] == "search":
+        index = VectorIndex(args[1])
+        t0 = time.perf_counter()
+        hits = index.search([args[2]], int(opts.get("--k", 10)), int(opts.get("--nprobe", 16)))[0]
+        elapsed = (time.perf_counter() - t0) * 1000
+        for hit in hits:
+            at = f"{hit['start']:.1f}s" if hit["start"] is not None else "-"
+            print(f"{hit['score']:.3f}  {hit['call_id']}  [{at}] Speaker {hit['speaker']}: {hit['text']}")
+        print(f"{len(hits)} hits in {elapsed:.1f}ms over {index.count} utterances")
+        index.close()
+    else:
+        print(__doc__)
+        sys.exit(1)
@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+"""
+Load generator for the Convoso webhook ingest routes.
+
+Synthesizes call and lead payloads shaped like our dialer's (agents,
+campaigns, dispositions and durations drawn from test-calls.csv), signs
+them with agt_ agency tokens the way getAgencyFromWebhookToken expects
+(X-Agency-Token), and fires them open-loop at a configurable rate profile:
+
+    constant:50             50 webhooks/s
+    burst:20,300,15,60      20/s baseline with 15s bursts of 300/s every 60s (shift change)
+    ramp:10,500             linear ramp from 10/s to 500/s over --duration (saturation search)
+
+Latency is measured from each request's scheduled send time, so a backed-up
+server is not hidden by the generator slowing down. The report has accepted
+/ rejected counts per route, latency percentiles, a per-second timeline and
+the saturation point: the offered rate at which p95 breaks --slo-ms, errors
+exceed 1% or throughput stops keeping up. The generator is CPU-hungry at
+high rates; run it on other cores (or another host) than the server under test.
+
+Usage:
+    python webhook_loadgen.py run [--url http://localhost:3000] [--profile ramp:10,300] [--duration 60]
+                                  [--tokens agt_x,agt_y] [--mix calls=0.6,leads=0.3,immediate=0.1]
+                                  [--invalid-rate 0.02] [--slo-ms 1000] [--max-workers 256]
+    python webhook_loadgen.py tokens-sql <agency_id> [--count 5]
+
+Tokens come from --tokens, WEBHOOK_TOKENS or TEST_WEBHOOK_TOKEN; tokens-sql
+prints INSERT statements for fresh tokens (as create-test-token.mjs does).
+local_stub.py also serves the three routes for a dry run.
+"""
+import csv
+import os
+import random
+import secrets
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+BASE_URL = os.getenv("WEBHOOK_BASE_URL", "http://localhost:3000")
+WEBHOOK_SECRET = os.getenv("CONVOSO_WEBHOOK_SECRET", "")
+
+ROUTES = {
+    "calls": "/api/webhooks/convoso-calls",
+    "immediate": "/api/webhooks/convoso-calls-immediate",
+    "leads": "/api/webhooks/convoso-leads",
+}
+DEFAULT_MIX = {"calls": 0.6, "leads": 0.3, "immediate": 0.1}
+
+FIRST_NAMES = ["Maria", "James", "Linda", "Robert", "Patricia", "Michael", "Barbara", "David", "Susan", "Carlos"]
+LAST_NAMES = ["Garcia", "Johnson", "Smith", "Brown", "Davis", "Miller", "Wilson", "Moore", "Taylor", "Lopez"]
+STATES = ["FL", "TX", "GA", "AZ", "NC", "OH", "PA", "CA", "TN", "MI"]
+
+
+def generate_token():
+    return f"agt_{secrets.token_hex(16)}"
+
+
+def tokens_sql(agency_id, count=5):
+    values = ",\n".join(f"  ('{agency_id}', '{generate_token()}', 'Load test {i + 1}', 'webhook_loadgen.py', true)"
+                        for i in range(count))
+    return ("INSERT INTO webhook_tokens (agency_id, token, name, description, is_active)\nVALUES\n"
+            f"{values}\nRETURNING token;")
+
+
+class PayloadFactory:
+    """Realistic call / lead bodies, seeded from a Convoso CSV export when available"""
+
+    def __init__(self, csv_path="test-calls.csv", seed=None):
+        self.rng = random.Random(seed)
+        self.agents = ["John Smith", "Jane Doe", "Mike Johnson"]
+        self.campaigns = ["Holiday Campaign"]
+        self.dispositions = ["SALE", "INTERESTED", "NOT INTERESTED", "CALLBACK", "NO ANSWER", "VOICEMAIL"]
+        self.durations = [15, 45, 120, 180, 240, 600, 900]
+        if os.path.exists(csv_path):
+            with open(csv_path, newline="") as f:
+                rows = list(csv.DictReader(f))
+            if rows:
+                self.agents = sorted({r["agent_name"] for r in rows if r.get("agent_name")}) or self.agents
+                self.campaigns = sorted({r["campaign"] for r in rows if r.get("campaign")}) or self.campaigns
+                self.dispositions = [r["disposition"] for r in rows if r.get("disposition")] or self.dispositions
+                self.durations = [int(r["duration_sec"]) for r in rows if r.get("duration_sec", "").isdigit()] or self.durations
+
+    def phone(self):
+        return f"555-{self.rng.randrange(10000):04d}"
+
+    def lead_id(self):
+        return str(self.rng.randrange(10 ** 8, 10 ** 9))
+
+    def call(self):
+        duration = max(1, int(self.rng.choice(self.durations) * self.rng.uniform(0.5, 1.5)))
+        ended = datetime.now()
+        started = ended - timedelta(seconds=duration)
+        call_id = f"LOAD-{uuid.uuid4().hex[:12]}"
+        return {
+            "call_id": call_id,
+            "lead_id": self.lead_id(),
+            "agent_name": self.rng.choice(self.agents),
+            "phone_number": self.phone(),
+            "disposition": self.rng.choice(self.dispositions),
+            "duration": duration,
+            "campaign": self.rng.choice(self.campaigns),
+            "recording_url": f"https://example.com/recordings/{call_id}.mp3",
+            "started_at": started.strftime("%Y-%m-%d %H:%M:%S"),
+            "ended_at": ended.strftime("%Y-%m-%d %H:%M:%S"),
+        }
+
+    def lead(self):
+        first, last = self.rng.choice(FIRST_NAMES), self.rng.choice(LAST_NAMES)
+        return {
+            "lead_id": self.lead_id(),
+            "phone_number": self.phone(),
+            "first_name": first,
+            "last_name": last,
+            "email": f"{first.lower()}.{last.lower()}{self.rng.randrange(1000)}@example.com",
+            "address": f"{self.rng.randrange(100, 9999)} Main St",
+            "city": "Springfield",
+            "state": self.rng.choice(STATES),
+            "list_id": str(self.rng.randrange(1000, 1100)),
+        }
+
+
+def parse_profile(spec, duration):
+    """Return rate_at(t) for "constant:R", "burst:BASE,PEAK,BURST_SEC,PERIOD" or "ramp:START,END" """
+    kind, _, params = spec.partition(":")
+    values = [float(v) for v in params.split(",") if v]
+    if kind == "constant":
+        return lambda t: values[0]
+    if kind == "burst":
+        base, peak, burst_sec, period = values
+        return lambda t: peak if (t % period) < burst_sec else base
+    if kind == "ramp":
+        start, end = values
+        return lambda t: start + (end - start) * min(1.0, t / duration)
+    raise ValueError(f"Unknown profile {spec!r}")
+
+
+def parse_mix(spec):
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        if name not in ROUTES:
+            raise ValueError(f"Unknown route {name!r}; choose from {', '.join(ROUTES)}")
+        mix[name] = float(weight)
+    return mix
+
+
+class Results:
+    """Thread-safe per-request records"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.records = []   # (route, scheduled_offset, done_offset, latency_sec, outcome, expected_reject)
+
+    def add(self, *record):
+        with self.lock:
+            self.records.append(record)
+
+
+def classify_status(status):
+    if status is None:
+        return "error"
+    if 200 <= status < 300:
+        return "accepted"
+    if status in (401, 403):
+        return "rejected"
+    if 400 <= status < 500:
+        return "client_error"
+    return "server_error"
+
+
+def run(base_url, rate_at, duration, tokens, mix=None, invalid_rate=0.0, timeout=10, max_workers=256, seed=None):
+    """Fire webhooks open-loop for `duration` seconds; returns Results"""
+    import requests
+
+    mix = mix or DEFAULT_MIX
+    factory = PayloadFactory(seed=seed)
+    rng = random.Random(seed)
+    names = list(mix)
+    weights = [mix[n] for n in names]
+    results = Results()
+    local = threading.local()
+
+    def send(route, payload, headers, scheduled, start, expect_reject):
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        try:
+            response = session.post(base_url + ROUTES[route], json=payload, headers=headers, timeout=timeout)
+            status = response.status_code
+        except requests.RequestException:
+            status = None
+        done = time.perf_counter() - start
+        results.add(route, scheduled, done, done - scheduled, classify_status(status), expect_reject)
+
+    start = time.perf_counter()
+    scheduled = 0.0
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while scheduled < duration:
+            delay = start + scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+            route = rng.choices(names, weights)[0]
+            payload = factory.lead() if route == "leads" else factory.call()
+            expect_reject = rng.random() < invalid_rate
+            headers = {"Content-Type": "application/json"}
+            if route == "immediate":
+                if WEBHOOK_SECRET:
+                    headers["X-Webhook-Secret"] = "wrong-secret" if expect_reject else WEBHOOK_SECRET
+                else:
+                    expect_reject = False
+            else:
+                headers["X-Agency-Token"] = generate_token() if expect_reject else rng.choice(tokens)
+            pool.submit(send, route, payload, headers, scheduled, start, expect_reject)
+
+            scheduled += 1.0 / max(rate_at(scheduled), 0.01)
+    return results
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def windows(results, rate_at):
+    """Per-second rows: offered rate, completions, accepted, errors and p95 latency (by scheduled second)"""
+    rows = {}
+    completed = {}
+    for route, scheduled, done, latency, outcome, expect_reject in results.records:
+        row = rows.setdefault(int(scheduled), {"sent": 0, "ok": 0, "errors": 0, "latencies": []})
+        row["sent"] += 1
+        row["latencies"].append(latency)
+        if outcome in ("accepted", "rejected", "client_error"):
+            row["ok"] += 1
+        else:
+            row["errors"] += 1
+        completed[int(done)] = completed.get(int(done), 0) + 1
+    out = []
+    for second in sorted(rows):
+        row = rows[second]
+        lat = sorted(row["latencies"])
+        out.append({
+            "second": second,
+            "offered": rate_at(second + 0.5),
+            "sent": row["sent"],
+            "completed": completed.get(second, 0),
+            "errors": row["errors"],
+            "p95_ms": percentile(lat, 0.95) * 1000,
+        })
+    return out
+
+
+def saturation(rows, slo_ms, consecutive=2):
+    """Offered rate where the service stops keeping up, and the best rate sustained before it"""
+    bad = 0
+    sustained = 0.0
+    for i, row in enumerate(rows):
+        # Completion-based throughput lags by up to a second, so compare against the previous window's offer too
+        offered = min(row["offered"], rows[i - 1]["offered"]) if i else row["offered"]
+        failing = (row["p95_ms"] > slo_ms or row["errors"] > 0.01 * row["sent"]
+                   or (i and row["completed"] < 0.9 * offered))
+        if failing:
+            bad += 1
+            if bad >= consecutive:
+                return rows[i - consecutive + 1]["offered"], sustained
+        else:
+            bad = 0
+            sustained = max(sustained, row["offered"])
+    return None, sustained
+
+
+def report(results, rate_at, slo_ms):
+    records = results.records
+    print(f"\nRequests: {len(records)}")
+    print("-" * 60)
+    print(f"{'route':12s} {'sent':>7s} {'accepted':>9s} {'rejected':>9s} {'4xx':>6s} {'5xx':>6s} {'error':>6s} "
+          f"{'p50 ms':>8s} {'p95 ms':>8s} {'p99 ms':>8s}")
+    for route in ROUTES:
+        rows = [r for r in records if r[0] == route]
+        if not rows:
+            continue
+        counts = {}
+        for r in rows:
+            counts[r[4]] = counts.get(r[4], 0) + 1
+        lat = sorted(r[3] * 1000 for r in rows)
+        print(f"{route:12s} {len(rows):7d} {counts.get('accepted', 0):9d} {counts.get('rejected', 0):9d} "
+              f"{counts.get('client_error', 0):6d} {counts.get('server_error', 0):6d} {counts.get('error', 0):6d} "
+              f"{percentile(lat, 0.5):8.1f} {percentile(lat, 0.95):8.1f} {percentile(lat, 0.99):8.1f}")
+
+    wrong_accepts = sum(1 for r in records if r[5] and r[4] == "accepted")
+    wrong_rejects = sum(1 for r in records if not r[5] and r[4] == "rejected")
+    print(f"\nInvalid tokens accepted: {wrong_accepts}  Valid tokens rejected: {wrong_rejects}")
+
+    rows = windows(results, rate_at)
+    print(f"\n{'sec':>4s} {'offered/s':>10s} {'sent':>6s} {'done':>6s} {'errors':>7s} {'p95 ms':>9s}")
+    step = max(1, len(rows) // 30)
+    for row in rows[::step]:
+        print(f"{row['second']:4d} {row['offered']:10.1f} {row['sent']:6d} {row['completed']:6d} "
+              f"{row['errors']:7d} {row['p95_ms']:9.1f}")
+
+    point, sustained = saturation(rows, slo_ms)
+    print()
+    if point is None:
+        print(f"No saturation within the profile; sustained up to {sustained:.0f} webhooks/s (p95 <= {slo_ms:.0f}ms)")
+    else:
+        print(f"Saturation at ~{point:.0f} webhooks/s offered; last healthy rate {sustained:.0f}/s "
+              f"(p95 <= {slo_ms:.0f}ms, <1% errors)")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if not args or args[0] not in ("run", "tokens-sql"):
+        print(__doc__)
+        sys.exit(1)
+    command = args.pop(0)
+    opts = {}
+    for flag in ("--url", "--profile", "--duration", "--tokens", "--mix", "--invalid-rate", "--slo-ms",
+                 "--max-workers", "--timeout", "--count", "--seed"):
+        if flag in args:
+            idx = args.index(flag)
+            opts[flag] = args[idx + 1]
+            del args[idx:idx + 2]
+
+    if command == "tokens-sql":
+        if not args:
+            print("Usage: python webhook_loadgen.py tokens-sql <agency_id> [--count 5]")
+            sys.exit(1)
+        print(tokens_sql(args[0], int(opts.get("--count", 5))))
+        sys.exit(0)
+
+    token_list = opts.get("--tokens") or os.getenv("WEBHOOK_TOKENS") or os.getenv("TEST_WEBHOOK_TOKEN", "")
+    tokens = [t for t in token_list.split(",") if t]
+    if not tokens:
+        print("No agt_ tokens: pass --tokens, or set WEBHOOK_TOKENS / TEST_WEBHOOK_TOKEN (see tokens-sql)")
+        sys.exit(1)
+
+    duration = float(opts.get("--duration", 60))
+    profile = opts.get("--profile", "constant:20")
+    rate_at = parse_profile(profile, duration)
+    url = opts.get("--url", BASE_URL).rstrip("/")
+    slo_ms = float(opts.get("--slo-ms", 1000))
+
+    print("WEBHOOK LOAD TEST")
+    print("=" * 60)
+    print(f"Target: {url}  Profile: {profile} for {duration:.0f}s  Tokens: {len(tokens)}")
+    results = run(url, rate_at, duration, tokens, parse_mix(opts["--mix"]) if "--mix" in opts else None,
+                  float(opts.get("--invalid-rate", 0.0)), float(opts.get("--timeout", 10)),
+                  int(opts.get("--max-workers", 256)), int(opts["--seed"]) if "--seed" in opts else None)
+    report(results, rate_at, slo_ms)